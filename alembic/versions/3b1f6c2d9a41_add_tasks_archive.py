@@ -0,0 +1,48 @@
+"""Add tasks archive
+
+Revision ID: 3b1f6c2d9a41
+Revises: 70907e4b670c
+Create Date: 2026-10-19 09:12:40.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b1f6c2d9a41'
+down_revision: Union[str, Sequence[str], None] = '70907e4b670c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'tasks_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('assigned_to', sa.Integer(), nullable=True),
+        sa.Column('status', sa.Enum('TODO', 'IN_PROGRESS', 'COMPLETED', name='taskstatus', create_type=False), nullable=True),
+        sa.Column('priority', sa.Enum('LOW', 'MEDIUM', 'HIGH', name='taskpriority', create_type=False), nullable=True),
+        sa.Column('due_date', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['assigned_to'], ['users.id']),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tasks_archive_project_id'), 'tasks_archive', ['project_id'], unique=False)
+    op.create_index('ix_tasks_status_updated_at', 'tasks', ['status', 'updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_status_updated_at', table_name='tasks')
+    op.drop_index(op.f('ix_tasks_archive_project_id'), table_name='tasks_archive')
+    op.drop_table('tasks_archive')
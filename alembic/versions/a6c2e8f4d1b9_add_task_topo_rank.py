@@ -0,0 +1,67 @@
+"""Add task topo rank
+
+Revision ID: a6c2e8f4d1b9
+Revises: e8a3c5f1b7d9
+Create Date: 2026-10-23 14:05:12.742816
+
+"""
+from heapq import heapify, heappop, heappush
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c2e8f4d1b9'
+down_revision: Union[str, Sequence[str], None] = 'e8a3c5f1b7d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('topo_rank', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=True))
+    op.add_column('tasks_archive', sa.Column('topo_rank', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=True))
+
+    # Existing edges need not run from lower to higher ids; order the tasks
+    # they connect and hand that order the same ids as ranks
+    dependencies = sa.table('task_dependencies', sa.column('blocking_task_id'), sa.column('blocked_task_id'))
+    tasks = sa.table('tasks', sa.column('id'), sa.column('topo_rank'))
+    bind = op.get_bind()
+    successors = {}
+    indegree = {}
+    for blocking, blocked in bind.execute(sa.select(dependencies.c.blocking_task_id, dependencies.c.blocked_task_id)):
+        successors.setdefault(blocking, []).append(blocked)
+        indegree.setdefault(blocking, 0)
+        indegree[blocked] = indegree.get(blocked, 0) + 1
+
+    ready = [task_id for task_id, count in indegree.items() if count == 0]
+    heapify(ready)
+    order = []
+    while ready:
+        task_id = heappop(ready)
+        order.append(task_id)
+        for successor in successors.get(task_id, ()):
+            indegree[successor] -= 1
+            if indegree[successor] == 0:
+                heappush(ready, successor)
+
+    changed = [
+        {'task_id': task_id, 'new_rank': rank}
+        for task_id, rank in zip(order, sorted(order))
+        if task_id != rank
+    ]
+    if changed:
+        bind.execute(
+            tasks.update().where(tasks.c.id == sa.bindparam('task_id')).values(topo_rank=sa.bindparam('new_rank')),
+            changed
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('tasks_archive') as batch_op:
+        batch_op.drop_column('topo_rank')
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_column('topo_rank')
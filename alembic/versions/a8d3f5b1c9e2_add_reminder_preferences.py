@@ -0,0 +1,41 @@
+"""Add reminder preferences
+
+Revision ID: a8d3f5b1c9e2
+Revises: f1c4a8e6b3d7
+Create Date: 2026-10-19 21:37:52.640913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d3f5b1c9e2'
+down_revision: Union[str, Sequence[str], None] = 'f1c4a8e6b3d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'reminder_preferences',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('lead_minutes', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'lead_minutes', name='uq_reminder_preferences_user_id_lead_minutes')
+    )
+    op.create_index('ix_reminder_preferences_lead_minutes_user_id', 'reminder_preferences', ['lead_minutes', 'user_id'], unique=False)
+    op.create_index('ix_tasks_due_date', 'tasks', ['due_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_due_date', table_name='tasks')
+    op.drop_index('ix_reminder_preferences_lead_minutes_user_id', table_name='reminder_preferences')
+    op.drop_table('reminder_preferences')
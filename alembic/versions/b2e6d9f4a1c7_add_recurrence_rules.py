@@ -0,0 +1,71 @@
+"""Add recurrence rules
+
+Revision ID: b2e6d9f4a1c7
+Revises: a8d3f5b1c9e2
+Create Date: 2026-10-19 23:12:08.417352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2e6d9f4a1c7'
+down_revision: Union[str, Sequence[str], None] = 'a8d3f5b1c9e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'recurrence_rules',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('created_by', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('priority', sa.Enum('LOW', 'MEDIUM', 'HIGH', name='taskpriority', create_type=False), nullable=False),
+        sa.Column('assigned_to', sa.Integer(), nullable=True),
+        sa.Column('frequency', sa.Enum('DAILY', 'WEEKLY', 'MONTHLY', name='recurrencefrequency'), nullable=False),
+        sa.Column('interval', sa.Integer(), nullable=False),
+        sa.Column('weekdays', sa.Integer(), nullable=False),
+        sa.Column('month_day', sa.Integer(), nullable=True),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('time_of_day', sa.Time(), nullable=False),
+        sa.Column('timezone', sa.String(), nullable=False),
+        sa.Column('until', sa.Date(), nullable=True),
+        sa.Column('count', sa.Integer(), nullable=True),
+        sa.Column('materialized_through', sa.DateTime(), nullable=False),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id']),
+        sa.ForeignKeyConstraint(['assigned_to'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_recurrence_rules_active_materialized_through', 'recurrence_rules', ['active', 'materialized_through'], unique=False)
+    op.create_index('ix_recurrence_rules_project_id', 'recurrence_rules', ['project_id'], unique=False)
+    # SQLite can't add a foreign key in place; batch mode rebuilds the table there
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.add_column(sa.Column('recurrence_rule_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_tasks_recurrence_rule_id', 'recurrence_rules', ['recurrence_rule_id'], ['id'], ondelete='SET NULL'
+        )
+    op.create_index('uq_tasks_recurrence_rule_id_due_date', 'tasks', ['recurrence_rule_id', 'due_date'], unique=True)
+    op.add_column('tasks_archive', sa.Column('recurrence_rule_id', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('tasks_archive', 'recurrence_rule_id')
+    op.drop_index('uq_tasks_recurrence_rule_id_due_date', table_name='tasks')
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_constraint('fk_tasks_recurrence_rule_id', type_='foreignkey')
+        batch_op.drop_column('recurrence_rule_id')
+    op.drop_index('ix_recurrence_rules_project_id', table_name='recurrence_rules')
+    op.drop_index('ix_recurrence_rules_active_materialized_through', table_name='recurrence_rules')
+    op.drop_table('recurrence_rules')
+    sa.Enum(name='recurrencefrequency').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,41 @@
+"""Add activity log
+
+Revision ID: b4f1d8e2c6a9
+Revises: 8e2b4c6a1f37
+Create Date: 2026-10-19 14:08:51.372016
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4f1d8e2c6a9'
+down_revision: Union[str, Sequence[str], None] = '8e2b4c6a1f37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'activity_log',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('entity', sa.String(length=16), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(length=16), nullable=False),
+        sa.Column('changes', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_activity_log_project_id_id', 'activity_log', ['project_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_activity_log_project_id_id', table_name='activity_log')
+    op.drop_table('activity_log')
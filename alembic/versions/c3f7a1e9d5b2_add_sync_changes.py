@@ -0,0 +1,42 @@
+"""Add sync changes
+
+Revision ID: c3f7a1e9d5b2
+Revises: b2e6d9f4a1c7
+Create Date: 2026-10-20 08:41:27.905163
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f7a1e9d5b2'
+down_revision: Union[str, Sequence[str], None] = 'b2e6d9f4a1c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'sync_changes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('entity', sa.String(), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('deleted', sa.Boolean(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sync_changes_project_id_id', 'sync_changes', ['project_id', 'id'], unique=False)
+    op.create_index('ix_sync_changes_user_id_id', 'sync_changes', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sync_changes_user_id_id', table_name='sync_changes')
+    op.drop_index('ix_sync_changes_project_id_id', table_name='sync_changes')
+    op.drop_table('sync_changes')
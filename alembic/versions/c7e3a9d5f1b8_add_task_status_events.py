@@ -0,0 +1,44 @@
+"""Add task status events
+
+Revision ID: c7e3a9d5f1b8
+Revises: b4f1d8e2c6a9
+Create Date: 2026-10-19 15:42:17.804213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e3a9d5f1b8'
+down_revision: Union[str, Sequence[str], None] = 'b4f1d8e2c6a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    taskstatus = sa.Enum('TODO', 'IN_PROGRESS', 'COMPLETED', name='taskstatus', create_type=False)
+    op.create_table(
+        'task_status_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('from_status', taskstatus, nullable=True),
+        sa.Column('to_status', taskstatus, nullable=True),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_task_status_events_project_id_id', 'task_status_events', ['project_id', 'id'], unique=False)
+    op.create_index('ix_task_status_events_project_id_changed_at', 'task_status_events', ['project_id', 'changed_at', 'from_status', 'to_status'], unique=False)
+    op.create_index('ix_task_status_events_project_id_task_id', 'task_status_events', ['project_id', 'task_id', 'to_status', 'changed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_task_status_events_project_id_task_id', table_name='task_status_events')
+    op.drop_index('ix_task_status_events_project_id_changed_at', table_name='task_status_events')
+    op.drop_index('ix_task_status_events_project_id_id', table_name='task_status_events')
+    op.drop_table('task_status_events')
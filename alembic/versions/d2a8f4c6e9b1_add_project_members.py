@@ -0,0 +1,46 @@
+"""Add project members
+
+Revision ID: d2a8f4c6e9b1
+Revises: c7e3a9d5f1b8
+Create Date: 2026-10-19 17:21:03.519847
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a8f4c6e9b1'
+down_revision: Union[str, Sequence[str], None] = 'c7e3a9d5f1b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'project_members',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('role', sa.Enum('VIEWER', 'EDITOR', 'ADMIN', 'OWNER', name='projectrole'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'project_id', name='uq_project_members_user_id_project_id')
+    )
+    op.create_index('ix_project_members_project_id', 'project_members', ['project_id'], unique=False)
+    op.create_index(op.f('ix_projects_owner_id'), 'projects', ['owner_id'], unique=False)
+    op.create_index(op.f('ix_tasks_project_id'), 'tasks', ['project_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_tasks_project_id'), table_name='tasks')
+    op.drop_index(op.f('ix_projects_owner_id'), table_name='projects')
+    op.drop_index('ix_project_members_project_id', table_name='project_members')
+    op.drop_table('project_members')
+    sa.Enum(name='projectrole').drop(op.get_bind(), checkfirst=True)
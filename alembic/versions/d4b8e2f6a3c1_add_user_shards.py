@@ -0,0 +1,69 @@
+"""Add user shards and widen ids to 64 bits
+
+Revision ID: d4b8e2f6a3c1
+Revises: c3f7a1e9d5b2
+Create Date: 2026-10-21 10:12:53.318402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4b8e2f6a3c1'
+down_revision: Union[str, Sequence[str], None] = 'c3f7a1e9d5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columns holding generated ids (app.core.ids); SQLite's INTEGER is 64-bit already
+ID_COLUMNS = [
+    ('projects', 'id'),
+    ('tasks', 'id'),
+    ('tasks', 'project_id'),
+    ('tasks', 'recurrence_rule_id'),
+    ('tasks_archive', 'id'),
+    ('tasks_archive', 'project_id'),
+    ('tasks_archive', 'recurrence_rule_id'),
+    ('recurrence_rules', 'id'),
+    ('recurrence_rules', 'project_id'),
+    ('project_members', 'project_id'),
+    ('task_dependencies', 'blocking_task_id'),
+    ('task_dependencies', 'blocked_task_id'),
+    ('task_status_events', 'task_id'),
+    ('task_status_events', 'project_id'),
+    ('sync_changes', 'project_id'),
+    ('sync_changes', 'entity_id'),
+    ('activity_log', 'project_id'),
+    ('activity_log', 'entity_id'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'user_shards',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('shard', sa.String(), nullable=False),
+        sa.Column('moving', sa.Boolean(), nullable=False),
+        sa.Column('moves', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_user_shards_shard', 'user_shards', ['shard'], unique=False)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        for table, column in ID_COLUMNS:
+            op.alter_column(table, column, type_=sa.BigInteger(), existing_type=sa.Integer())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        for table, column in reversed(ID_COLUMNS):
+            op.alter_column(table, column, type_=sa.Integer(), existing_type=sa.BigInteger())
+
+    op.drop_index('ix_user_shards_shard', table_name='user_shards')
+    op.drop_table('user_shards')
@@ -0,0 +1,40 @@
+"""Add task dependencies
+
+Revision ID: e5b9c3a7d2f4
+Revises: d2a8f4c6e9b1
+Create Date: 2026-10-19 19:02:44.186530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b9c3a7d2f4'
+down_revision: Union[str, Sequence[str], None] = 'd2a8f4c6e9b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'task_dependencies',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('blocking_task_id', sa.Integer(), nullable=False),
+        sa.Column('blocked_task_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['blocking_task_id'], ['tasks.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['blocked_task_id'], ['tasks.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('blocking_task_id', 'blocked_task_id', name='uq_task_dependencies_blocking_blocked')
+    )
+    op.create_index('ix_task_dependencies_blocked_task_id', 'task_dependencies', ['blocked_task_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_task_dependencies_blocked_task_id', table_name='task_dependencies')
+    op.drop_table('task_dependencies')
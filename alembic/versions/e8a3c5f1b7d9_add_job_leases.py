@@ -0,0 +1,31 @@
+"""Add job leases
+
+Revision ID: e8a3c5f1b7d9
+Revises: d4b8e2f6a3c1
+Create Date: 2026-10-22 09:27:41.550193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a3c5f1b7d9'
+down_revision: Union[str, Sequence[str], None] = 'd4b8e2f6a3c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('jobs', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('jobs') as batch_op:
+        batch_op.drop_column('lease_expires_at')
+        batch_op.drop_column('attempts')
@@ -0,0 +1,58 @@
+"""Add task positions
+
+Revision ID: f1c4a8e6b3d7
+Revises: e5b9c3a7d2f4
+Create Date: 2026-10-19 20:41:07.305118
+
+"""
+from itertools import groupby
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.positions import keys_between
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c4a8e6b3d7'
+down_revision: Union[str, Sequence[str], None] = 'e5b9c3a7d2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+POSITION_TYPE = sa.String().with_variant(sa.String(collation='C'), 'postgresql')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('position', POSITION_TYPE, nullable=True))
+    op.add_column('tasks_archive', sa.Column('position', POSITION_TYPE, nullable=True))
+
+    # Existing tasks keep their creation order within each column
+    tasks = sa.table('tasks', sa.column('id'), sa.column('project_id'), sa.column('status'), sa.column('position'))
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(tasks.c.id, tasks.c.project_id, tasks.c.status)
+        .order_by(tasks.c.project_id, tasks.c.status, tasks.c.id)
+    ).all()
+    values = []
+    for _, column in groupby(rows, key=lambda row: (row.project_id, row.status)):
+        ids = [row.id for row in column]
+        values.extend({'task_id': task_id, 'new_position': key} for task_id, key in zip(ids, keys_between(None, None, len(ids))))
+    if values:
+        bind.execute(
+            tasks.update().where(tasks.c.id == sa.bindparam('task_id')).values(position=sa.bindparam('new_position')),
+            values
+        )
+
+    op.create_index('ix_tasks_project_id_status_position', 'tasks', ['project_id', 'status', 'position'], unique=False)
+    # Superseded by the prefix of the new index
+    op.drop_index('ix_tasks_project_id', table_name='tasks')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_tasks_project_id', 'tasks', ['project_id'], unique=False)
+    op.drop_index('ix_tasks_project_id_status_position', table_name='tasks')
+    op.drop_column('tasks_archive', 'position')
+    op.drop_column('tasks', 'position')
@@ -1,5 +1,11 @@
 from .users import router as users_router
 from .projects import router as projects_router
 from .tasks import router as tasks_router
+from .dashboard import router as dashboard_router
+from .export import router as export_router
+from .imports import router as import_router
+from .jobs import router as jobs_router
+from .recurrences import router as recurrences_router
+from .sync import router as sync_router
 
-__all__ = ["users_router", "projects_router", "tasks_router"]
\ No newline at end of file
+__all__ = ["users_router", "projects_router", "tasks_router", "dashboard_router", "export_router", "import_router", "jobs_router", "recurrences_router", "sync_router"]
\ No newline at end of file
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models import User, Project, Task, TaskStatus
+from app.schemas import DashboardRead, ProjectSummary
+from app.core.dependencies import get_current_user, get_permissions, clamp_limit
+from app.core.permissions import ProjectPermissions
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+
+@router.get("", response_model=DashboardRead)
+def read_dashboard(
+    current_user: User = Depends(get_current_user),
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db),
+    project_limit: int = 100,
+    task_limit: int = 10
+):
+    """
+    Everything the frontend needs on page load in a single request
+
+    Returns the current user, the projects they can see with per-status task counts
+    and the most recently updated tasks, authenticating the caller once.
+
+    - **project_limit**: Maximum number of projects to return (capped at `MAX_PAGE_SIZE`)
+    - **task_limit**: Maximum number of recent tasks to return (capped at `MAX_PAGE_SIZE`)
+    """
+    # One grouped query gives each project together with its status counts
+    readable = permissions.readable()
+    project_ids = (
+        db.query(readable.c.project_id.label("id"))
+        .order_by(readable.c.project_id)
+        .limit(clamp_limit(project_limit))
+        .subquery()
+    )
+    rows = (
+        db.query(Project, Task.status, func.count(Task.id))
+        .join(project_ids, project_ids.c.id == Project.id)
+        .outerjoin(Task, Task.project_id == Project.id)
+        .group_by(Project.id, Task.status)
+        .order_by(Project.id)
+        .all()
+    )
+
+    summaries = {}
+    for project, task_status, count in rows:
+        summary = summaries.get(project.id)
+        if summary is None:
+            summary = ProjectSummary.model_validate(project)
+            summary.task_counts = {s: 0 for s in TaskStatus}
+            summaries[project.id] = summary
+        if task_status is not None:
+            summary.task_counts[task_status] = count
+
+    recent_tasks = (
+        db.query(Task)
+        .join(readable, readable.c.project_id == Task.project_id)
+        .order_by(Task.updated_at.desc(), Task.id.desc())
+        .limit(clamp_limit(task_limit))
+        .all()
+    )
+
+    return {
+        "user": current_user,
+        "projects": list(summaries.values()),
+        "recent_tasks": recent_tasks
+    }
@@ -0,0 +1,165 @@
+import csv
+import io
+import json
+import zlib
+from typing import Iterator, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.core.dependencies import get_current_user
+from app.database import SessionLocal, get_db
+from app.models import User, Project, TaskWithArchived
+from app.schemas import ProjectRead, TaskRead
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+CSV_COLUMNS = [
+    "type", "id", "project_id", "name", "title", "description", "status",
+    "priority", "assigned_to", "due_date", "owner_id", "created_at", "updated_at",
+]
+# Records are buffered into chunks of roughly this many bytes before being sent
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_cursor(cursor: Optional[str]) -> Tuple[str, int]:
+    """
+    Parse a resume cursor of the form `project:<id>` or `task:<id>`
+
+    Returns:
+        The record type and id the previous export stopped after
+    """
+    if not cursor:
+        return "project", 0
+    kind, _, last_id = cursor.partition(":")
+    if kind not in ("project", "task") or not last_id.isdigit():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor. Must be project:<id> or task:<id>"
+        )
+    return kind, int(last_id)
+
+
+def iter_records(owner_id: int, after: Tuple[str, int], shard: Optional[str] = None) -> Iterator[Tuple[str, dict]]:
+    """
+    Yield every project and then every task owned by `owner_id` in id order
+
+    Rows are streamed from a server-side cursor with `yield_per`, so memory
+    stays constant regardless of how much the user owns. The generator uses
+    its own session because it outlives the request handler, on the
+    owner's `shard`.
+    """
+    batch_size = get_settings().export_batch_size
+    kind, last_id = after
+
+    db = SessionLocal()
+    db.info["read_only"] = True
+    db.info["shard"] = shard
+    try:
+        if kind == "project":
+            projects = (
+                select(Project)
+                .where(Project.owner_id == owner_id, Project.id > last_id)
+                .order_by(Project.id)
+                .execution_options(yield_per=batch_size)
+            )
+            for project in db.scalars(projects):
+                yield "project", ProjectRead.model_validate(project).model_dump(mode="json")
+                db.expunge(project)
+            last_id = 0
+
+        tasks = (
+            select(TaskWithArchived)
+            .join(Project, TaskWithArchived.project_id == Project.id)
+            .where(Project.owner_id == owner_id, TaskWithArchived.id > last_id)
+            .order_by(TaskWithArchived.id)
+            .execution_options(yield_per=batch_size)
+        )
+        for task in db.scalars(tasks):
+            yield "task", TaskRead.model_validate(task).model_dump(mode="json")
+            db.expunge(task)
+    finally:
+        db.close()
+
+
+def encode_ndjson(records: Iterator[Tuple[str, dict]]) -> Iterator[str]:
+    for kind, data in records:
+        yield json.dumps({"type": kind, "cursor": f"{kind}:{data['id']}", **data}, separators=(",", ":")) + "\n"
+
+
+def encode_csv(records: Iterator[Tuple[str, dict]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    for kind, data in records:
+        writer.writerow({"type": kind, **data})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def chunked(lines: Iterator[str], compress: bool) -> Iterator[bytes]:
+    """Group encoded lines into chunks, optionally gzip-compressing on the fly"""
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    pending = []
+    size = 0
+
+    def emit(data: bytes, final: bool = False) -> bytes:
+        if compressor is None:
+            return data
+        # A sync flush keeps everything received so far decodable if the stream is cut
+        return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+    for line in lines:
+        pending.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield emit("".join(pending).encode())
+            pending, size = [], 0
+    yield emit("".join(pending).encode(), final=True)
+
+
+@router.get("")
+def export_data(
+    request: Request,
+    export_format: str = Query("ndjson", alias="format"),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream every project and task owned by the current user
+
+    Projects come first, then tasks (including archived ones), each in id
+    order. Every NDJSON record carries a `cursor`; pass the last one received
+    to resume an interrupted export. The response is gzip-compressed when the
+    client sends `Accept-Encoding: gzip`.
+
+    - **format**: `ndjson` (default) or `csv`
+    - **cursor**: Resume after this record, e.g. `task:1234`
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid format. Must be one of: {', '.join(EXPORT_FORMATS)}"
+        )
+
+    records = iter_records(current_user.id, parse_cursor(cursor), db.info.get("shard"))
+    lines = encode_ndjson(records) if export_format == "ndjson" else encode_csv(records)
+    compress = "gzip" in request.headers.get("accept-encoding", "")
+
+    headers = {"Content-Disposition": f'attachment; filename="export.{export_format}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+
+    return StreamingResponse(
+        chunked(lines, compress),
+        media_type=EXPORT_FORMATS[export_format],
+        headers=headers
+    )
@@ -0,0 +1,295 @@
+import csv
+import json
+from typing import AsyncIterator, Dict, List, Set, Tuple, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.core.dependencies import get_current_user
+from app.core.permissions import REQUIRED_ROLE, Action, ProjectPermissions
+from app.database import get_db
+from app.models import User, Project, Task, TaskStatus, TaskStatusEvent
+from app.schemas import ProjectCreate, TaskCreate, ImportLineError, ImportSummary
+from app.services.positions import keys_between, last_position
+from app.services.sync import record_changes
+
+router = APIRouter(prefix="/import", tags=["import"])
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+PROJECTS_ADAPTER = TypeAdapter(List[ProjectCreate])
+TASKS_ADAPTER = TypeAdapter(List[TaskCreate])
+
+
+async def iter_lines(request: Request) -> AsyncIterator[Union[str, ValueError]]:
+    """
+    Split the streamed request body into lines without buffering it whole
+
+    A line longer than `import_max_line_bytes` is dropped as it arrives and
+    a ValueError takes its place, so memory stays bounded without newlines.
+    """
+    max_bytes = get_settings().import_max_line_bytes
+    too_long = ValueError(f"Line longer than {max_bytes} bytes")
+    pending = b""
+    # Inside a line that was already reported as too long
+    skipping = False
+    async for chunk in request.stream():
+        # UTF-8 never has a newline byte inside a character, so splitting bytes is safe
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            if skipping:
+                skipping = False
+            elif len(line) > max_bytes:
+                yield too_long
+            else:
+                yield line.decode("utf-8", errors="replace")
+        if len(pending) > max_bytes:
+            if not skipping:
+                yield too_long
+                skipping = True
+            pending = b""
+    if pending and not skipping:
+        yield pending.decode("utf-8", errors="replace")
+
+
+async def iter_ndjson(lines: AsyncIterator[Union[str, ValueError]]) -> AsyncIterator[Tuple[int, object]]:
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if isinstance(line, ValueError):
+            yield line_no, line
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError:
+            yield line_no, ValueError("Invalid JSON")
+
+
+async def iter_csv(lines: AsyncIterator[Union[str, ValueError]]) -> AsyncIterator[Tuple[int, object]]:
+    max_bytes = get_settings().import_max_line_bytes
+    header = None
+    record = []
+    size = 0
+    quotes = 0
+    line_no = 0
+    start = 0
+    async for line in lines:
+        line_no += 1
+        if not record:
+            start = line_no
+        if isinstance(line, ValueError):
+            record, size, quotes = [], 0, 0
+            yield start, line
+            continue
+        record.append(line)
+        size += len(line.encode("utf-8")) + 1
+        quotes += line.count('"')
+        # A quoted field can span lines; the record ends once quotes balance
+        if quotes % 2:
+            if size > max_bytes:
+                # Most likely a quote that is never closed: give up on it
+                # rather than buffer the rest of the file
+                record, size, quotes = [], 0, 0
+                yield start, ValueError(f"Unterminated quote or record longer than {max_bytes} bytes")
+            continue
+        values = next(csv.reader(["\n".join(record)]), [])
+        record, size, quotes = [], 0, 0
+        if header is None:
+            header = values
+            continue
+        if not values:
+            continue
+        # Empty cells fall back to schema defaults
+        yield start, {key: value for key, value in zip(header, values) if value != ""}
+    if record:
+        yield start, ValueError("Unterminated quote")
+
+
+class Importer:
+    """
+    Validates and inserts rows in batched transactions
+
+    Rows are buffered by `add`; `flush` inserts the batch in one short
+    transaction, so no connection is held between batches.
+
+    Project rows may carry their source `id`; task rows referring to that id
+    are linked to the newly created project, so an export can be imported
+    into another account. Tasks may also go into any existing project the
+    user could add them to through `POST /tasks/`.
+    """
+
+    def __init__(self, db: Session, owner_id: int):
+        settings = get_settings()
+        self.db = db
+        self.owner_id = owner_id
+        self.permissions = ProjectPermissions(db, owner_id)
+        self.batch_size = settings.import_batch_size
+        self.max_errors = settings.import_max_errors
+        self.summary = ImportSummary()
+        self.project_ids: Dict[int, int] = {}
+        self.created_project_ids: Set[int] = set()
+        self.batch: List[Tuple[int, dict]] = []
+
+    def error(self, line: int, message: str) -> None:
+        self.summary.error_count += 1
+        if len(self.summary.errors) < self.max_errors:
+            self.summary.errors.append(ImportLineError(line=line, error=message))
+
+    def add(self, line: int, row: object) -> bool:
+        """Buffer a row; returns whether the batch is full and should be flushed"""
+        if isinstance(row, Exception):
+            self.error(line, str(row))
+        elif not isinstance(row, dict) or row.get("type") not in ("project", "task"):
+            self.error(line, "Row must be an object with type 'project' or 'task'")
+        else:
+            self.batch.append((line, row))
+        return len(self.batch) >= self.batch_size
+
+    def validate(self, adapter: TypeAdapter, rows: List[Tuple[int, dict]]) -> List[Tuple[int, dict, object]]:
+        """
+        Validate a chunk of rows in one call, reporting failures per line
+
+        Returns (line, raw row, model) for every valid row. A chunk with
+        errors is validated a second time without the failing rows.
+        """
+        try:
+            models = adapter.validate_python([row for _, row in rows])
+        except ValidationError as exc:
+            failed = {}
+            for err in exc.errors():
+                index = err["loc"][0]
+                field = ".".join(str(part) for part in err["loc"][1:])
+                failed.setdefault(index, f"{field}: {err['msg']}" if field else err["msg"])
+            for index, message in sorted(failed.items()):
+                self.error(rows[index][0], message)
+            rows = [row for index, row in enumerate(rows) if index not in failed]
+            models = adapter.validate_python([row for _, row in rows]) if rows else []
+        return [(line, row, model) for (line, row), model in zip(rows, models)]
+
+    def flush(self) -> None:
+        if not self.batch:
+            return
+        projects = [(line, row) for line, row in self.batch if row["type"] == "project"]
+        tasks = [(line, row) for line, row in self.batch if row["type"] == "task"]
+        self.batch = []
+
+        if projects:
+            self.insert_projects(self.validate(PROJECTS_ADAPTER, projects))
+        if tasks:
+            self.insert_tasks(self.validate(TASKS_ADAPTER, tasks))
+        self.db.commit()
+
+    def insert_projects(self, rows: List[Tuple[int, dict, ProjectCreate]]) -> None:
+        if not rows:
+            return
+        created = self.db.scalars(
+            insert(Project).returning(Project.id, sort_by_parameter_order=True),
+            [
+                {"name": project.name, "description": project.description, "owner_id": self.owner_id}
+                for _, _, project in rows
+            ]
+        ).all()
+        record_changes(self.db, "project", ((project_id, project_id) for project_id in created))
+        for (_, row, _), new_id in zip(rows, created):
+            source_id = row.get("id")
+            if source_id is not None:
+                try:
+                    self.project_ids[int(source_id)] = new_id
+                except (TypeError, ValueError):
+                    pass
+        self.created_project_ids.update(created)
+        self.summary.projects_created += len(created)
+
+    def insert_tasks(self, rows: List[Tuple[int, dict, TaskCreate]]) -> None:
+        if not rows:
+            return
+        # Project roles are loaded once per import, assignees once per chunk
+        assignees = {task.assigned_to for _, _, task in rows if task.assigned_to}
+        existing_users = set(self.db.scalars(select(User.id).where(User.id.in_(assignees)))) if assignees else set()
+
+        values = []
+        for line, _, task in rows:
+            project_id = self.project_ids.get(task.project_id)
+            if project_id is None and task.project_id in self.created_project_ids:
+                project_id = task.project_id
+            if project_id is None:
+                # The same check as POST /tasks/
+                if not self.permissions.can(task.project_id, Action.WRITE):
+                    self.error(line, "Project not found" if self.permissions.role(task.project_id) is None
+                               else f"Requires the {REQUIRED_ROLE[Action.WRITE].value} role on this project")
+                    continue
+                project_id = task.project_id
+            if task.assigned_to and task.assigned_to not in existing_users:
+                self.error(line, "Assigned user not found")
+                continue
+            values.append({
+                "title": task.title,
+                "description": task.description,
+                "project_id": project_id,
+                "assigned_to": task.assigned_to,
+                "priority": task.priority,
+                "status": task.status or TaskStatus.TODO,
+                "due_date": task.due_date,
+            })
+        if values:
+            # Imported tasks join the end of their columns in file order
+            columns: Dict[Tuple[int, TaskStatus], List[dict]] = {}
+            for value in values:
+                columns.setdefault((value["project_id"], value["status"]), []).append(value)
+            for (project_id, task_status), column in columns.items():
+                last = last_position(self.db, project_id, task_status)
+                for value, position in zip(column, keys_between(last, None, len(column))):
+                    value["position"] = position
+            created = self.db.execute(
+                insert(Task).returning(Task.id, Task.project_id, Task.status, sort_by_parameter_order=True),
+                values
+            ).all()
+            # Core inserts bypass the ORM hooks that record status history and sync changes
+            self.db.execute(insert(TaskStatusEvent), [
+                {"task_id": task_id, "project_id": project_id, "to_status": task_status}
+                for task_id, project_id, task_status in created
+            ])
+            record_changes(self.db, "task", ((project_id, task_id) for task_id, project_id, _ in created))
+            self.summary.tasks_created += len(values)
+
+
+@router.post("", response_model=ImportSummary)
+async def import_data(
+    request: Request,
+    import_format: str = Query("ndjson", alias="format"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Import projects and tasks from a streamed NDJSON or CSV body
+
+    Each row needs a `type` of `project` or `task` and the same fields as
+    `POST /projects/` or `POST /tasks/`, which is exactly what `GET /export`
+    produces. The body is parsed incrementally and rows are validated and
+    inserted in batched transactions, so memory stays bounded regardless of
+    the upload size. Invalid rows are skipped and reported by line number.
+
+    - **format**: `ndjson` (default) or `csv`
+    """
+    if import_format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid format. Must be one of: {', '.join(IMPORT_FORMATS)}"
+        )
+
+    importer = Importer(db, current_user.id)
+    # End the auth transaction first: it holds a connection (SQLite's single
+    # writer) that would otherwise stay checked out for the whole upload
+    db.commit()
+    parse = iter_ndjson if import_format == "ndjson" else iter_csv
+    async for line, row in parse(iter_lines(request)):
+        if importer.add(line, row):
+            # Batches go in off the event loop, while no body is being read
+            await run_in_threadpool(importer.flush)
+    await run_in_threadpool(importer.flush)
+
+    return importer.summary
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models import User, Job
+from app.schemas import JobCreate, JobRead
+from app.core.dependencies import get_current_user
+from app.services.jobs import HANDLERS, enqueue
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.post("/", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+def create_job(
+    job: JobCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Queue a background job and return immediately
+    
+    - **kind**: `delete_project`, `archive_tasks`, `rebalance_positions` or `materialize_recurrences`
+    - **payload**: Job arguments, e.g. `{"project_id": 1}` for `delete_project`
+    """
+    if job.kind not in HANDLERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid job kind. Must be one of: {', '.join(HANDLERS)}"
+        )
+    
+    try:
+        return enqueue(db, job.kind, current_user.id, job.payload)
+    except ValidationError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=exc.errors(include_url=False, include_context=False)
+        )
+
+
+@router.get("/{job_id}", response_model=JobRead)
+def read_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get a job's status, progress and result
+    """
+    job = db.query(Job).filter(Job.id == job_id).filter(Job.owner_id == current_user.id).first()
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return job
@@ -1,16 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database import get_db
-from app.models import User, Project
-from app.schemas import ProjectCreate, ProjectRead, ProjectUpdate, ProjectReadDetailed
-from app.core.dependencies import get_current_user
+from app.models import User, Project, ProjectMember, ProjectRole, ActivityEvent
+from app.schemas import (
+    ProjectCreate, ProjectRead, ProjectUpdate, ProjectReadDetailed, ActivityRead, ProjectAnalytics,
+    ProjectMemberCreate, ProjectMemberUpdate, ProjectMemberRead, ProjectSchedule
+)
+from app.core.dependencies import USER_BY_ID, get_current_user, get_permissions, clamp_limit
+from app.core.permissions import Action, ProjectPermissions, ROLE_RANK
+from app.core.responses import ResponseAdapter
+from app.services.activity import activity_log, pending_changes
+from app.services.analytics import project_analytics
+from app.services.schedule import project_schedule
+from app.services.sharding import shard_directory, sharding_enabled
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
+# Built once and executed with {"project_id": ...}
+PROJECT_BY_ID = select(Project).where(Project.id == bindparam("project_id"))
+
+PROJECT_DETAIL = ResponseAdapter(ProjectReadDetailed)
+
 
 @router.post("/", response_model=ProjectRead, status_code=status.HTTP_201_CREATED)
-async def create_project(
+def create_project(
     project: ProjectCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -30,38 +45,48 @@ async def create_project(
     db.add(db_project)
     db.commit()
     db.refresh(db_project)
+    activity_log.record(db_project.id, current_user.id, "project", db_project.id, "created")
     
     return db_project
 
 
 @router.get("/", response_model=List[ProjectRead])
-async def list_projects(
-    current_user: User = Depends(get_current_user),
+def list_projects(
+    permissions: ProjectPermissions = Depends(get_permissions),
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 10
 ):
     """
-    List all projects owned by the current user
+    List all projects the current user owns or is a member of
     
     - **skip**: Number of projects to skip (for pagination)
-    - **limit**: Maximum number of projects to return
+    - **limit**: Maximum number of projects to return (capped at `MAX_PAGE_SIZE`, default 100)
     """
-    projects = db.query(Project).filter(Project.owner_id == current_user.id).offset(skip).limit(limit).all()
+    readable = permissions.readable()
+    projects = (
+        db.query(Project)
+        .join(readable, readable.c.project_id == Project.id)
+        .order_by(Project.id)
+        .offset(skip)
+        .limit(clamp_limit(limit))
+        .all()
+    )
     
     return projects
 
 
 @router.get("/{project_id}", response_model=ProjectReadDetailed)
-async def read_project(
+def read_project(
     project_id: int,
-    current_user: User = Depends(get_current_user),
+    permissions: ProjectPermissions = Depends(get_permissions),
     db: Session = Depends(get_db)
 ):
     """
     Get a specific project with all of its tasks
     """
-    project = db.query(Project).filter(Project.id == project_id).filter(Project.owner_id == current_user.id).first()
+    permissions.require(project_id, Action.READ)
+    project = db.scalar(PROJECT_BY_ID, {"project_id": project_id})
     
     if not project:
         raise HTTPException(
@@ -69,20 +94,22 @@ async def read_project(
             detail="Project not found"
         )
     
-    return project
+    return PROJECT_DETAIL.response(project)
 
 
 @router.put("/{project_id}", response_model=ProjectRead)
-async def update_project(
+def update_project(
     project_id: int,
     project_update: ProjectUpdate,
     current_user: User = Depends(get_current_user),
+    permissions: ProjectPermissions = Depends(get_permissions),
     db: Session = Depends(get_db)
 ):
     """
-    Update a project
+    Update a project (requires the admin role)
     """
-    project = db.query(Project).filter(Project.id == project_id).filter(Project.owner_id == current_user.id).first()
+    permissions.require(project_id, Action.MANAGE)
+    project = db.scalar(PROJECT_BY_ID, {"project_id": project_id})
     
     if not project:
         raise HTTPException(
@@ -96,23 +123,28 @@ async def update_project(
     if project_update.description:
         project.description = project_update.description
     
+    changes = pending_changes(project)
     db.add(project)
     db.commit()
     db.refresh(project)
+    if changes:
+        activity_log.record(project.id, current_user.id, "project", project.id, "updated", changes)
     
     return project
 
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_project(
+def delete_project(
     project_id: int,
     current_user: User = Depends(get_current_user),
+    permissions: ProjectPermissions = Depends(get_permissions),
     db: Session = Depends(get_db)
 ):
     """
-    Delete a project (cascades to delete all tasks)
+    Delete a project (cascades to delete all tasks; owner only)
     """
-    project = db.query(Project).filter(Project.id == project_id).filter(Project.owner_id == current_user.id).first()
+    permissions.require(project_id, Action.DELETE)
+    project = db.scalar(PROJECT_BY_ID, {"project_id": project_id})
     
     if not project:
         raise HTTPException(
@@ -122,3 +154,217 @@ async def delete_project(
     
     db.delete(project)
     db.commit()
+    activity_log.record(project_id, current_user.id, "project", project_id, "deleted")
+
+
+@router.get("/{project_id}/activity", response_model=List[ActivityRead])
+def list_project_activity(
+    project_id: int,
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db),
+    before: Optional[int] = None,
+    limit: int = 50
+):
+    """
+    List a project's activity, newest first
+    
+    Events are written in the background, so a change can take up to
+    `ACTIVITY_FLUSH_INTERVAL_MS` to appear.
+    
+    - **before**: Return events older than this event id (the last `id` of the previous page)
+    - **limit**: Maximum number of events to return
+    """
+    permissions.require(project_id, Action.READ)
+    
+    # Keyset pagination walks the (project_id, id) index backwards
+    query = db.query(ActivityEvent).filter(ActivityEvent.project_id == project_id)
+    if before is not None:
+        query = query.filter(ActivityEvent.id < before)
+    
+    return query.order_by(ActivityEvent.id.desc()).limit(clamp_limit(limit)).all()
+
+
+@router.get("/{project_id}/analytics", response_model=ProjectAnalytics)
+def get_project_analytics(
+    project_id: int,
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db),
+    weeks: int = Query(12, ge=1, le=104)
+):
+    """
+    Flow analytics for a project from its task status history
+    
+    Weeks start on Monday (UTC) and end with the current week. Cycle time runs
+    from a task's first move to in progress until its last completion.
+    
+    - **weeks**: Number of weeks to report, up to 104
+    """
+    permissions.require(project_id, Action.READ)
+    
+    return project_analytics(db, project_id, weeks)
+
+
+@router.get("/{project_id}/schedule", response_model=ProjectSchedule)
+def get_project_schedule(
+    project_id: int,
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db)
+):
+    """
+    Plan the project's open tasks from their dependencies
+    
+    Returns the open tasks in topological order (every task after all of
+    its blockers), the critical path and the tasks that can start now. A task
+    can't finish before its due date or before any task blocking it; the
+    critical path is the chain that determines the latest finish, which is
+    returned as `finish`.
+    """
+    permissions.require(project_id, Action.READ)
+    
+    return project_schedule(db, project_id)
+
+
+def _check_grant(caller_role: ProjectRole, role: ProjectRole) -> None:
+    """Members can hand out at most their own role, and never ownership"""
+    if role == ProjectRole.OWNER:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The owner role cannot be granted"
+        )
+    if ROLE_RANK[role] > ROLE_RANK[caller_role]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cannot grant a role above your own"
+        )
+
+
+def _get_member(db: Session, project_id: int, user_id: int) -> ProjectMember:
+    member = (
+        db.query(ProjectMember)
+        .filter(ProjectMember.project_id == project_id)
+        .filter(ProjectMember.user_id == user_id)
+        .first()
+    )
+    
+    if not member:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Member not found"
+        )
+    
+    return member
+
+
+@router.get("/{project_id}/members", response_model=List[ProjectMemberRead])
+def list_project_members(
+    project_id: int,
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db)
+):
+    """
+    List the users a project is shared with (the owner is `owner_id` on the project)
+    """
+    permissions.require(project_id, Action.READ)
+    
+    return db.query(ProjectMember).filter(ProjectMember.project_id == project_id).order_by(ProjectMember.id).all()
+
+
+@router.post("/{project_id}/members", response_model=ProjectMemberRead, status_code=status.HTTP_201_CREATED)
+def add_project_member(
+    project_id: int,
+    member: ProjectMemberCreate,
+    current_user: User = Depends(get_current_user),
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db)
+):
+    """
+    Share a project with another user (requires the admin role)
+    
+    - **user_id**: User to add
+    - **role**: viewer, editor or admin (default viewer); at most your own role
+    """
+    caller_role = permissions.require(project_id, Action.MANAGE)
+    _check_grant(caller_role, member.role)
+    
+    if not db.scalar(USER_BY_ID, {"user_id": member.user_id}):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    project = db.scalar(PROJECT_BY_ID, {"project_id": project_id})
+    existing = db.query(ProjectMember).filter(ProjectMember.project_id == project_id).filter(ProjectMember.user_id == member.user_id).first()
+    if project.owner_id == member.user_id or existing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="User is already a member of this project"
+        )
+    
+    if sharding_enabled() and shard_directory.lookup(db, member.user_id).shard != db.info.get("shard"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="User's data lives on another shard; projects can only be shared within one"
+        )
+    
+    db_member = ProjectMember(project_id=project_id, user_id=member.user_id, role=member.role)
+    db.add(db_member)
+    db.commit()
+    db.refresh(db_member)
+    activity_log.record(project_id, current_user.id, "member", member.user_id, "created", {"role": [None, member.role.value]})
+    
+    return db_member
+
+
+@router.put("/{project_id}/members/{user_id}", response_model=ProjectMemberRead)
+def update_project_member(
+    project_id: int,
+    user_id: int,
+    member_update: ProjectMemberUpdate,
+    current_user: User = Depends(get_current_user),
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db)
+):
+    """
+    Change a member's role (requires the admin role)
+    
+    - **role**: viewer, editor or admin; at most your own role
+    """
+    caller_role = permissions.require(project_id, Action.MANAGE)
+    member = _get_member(db, project_id, user_id)
+    _check_grant(caller_role, member.role)
+    _check_grant(caller_role, member_update.role)
+    
+    changes = {"role": [member.role.value, member_update.role.value]}
+    member.role = member_update.role
+    db.commit()
+    db.refresh(member)
+    if changes["role"][0] != changes["role"][1]:
+        activity_log.record(project_id, current_user.id, "member", user_id, "updated", changes)
+    
+    return member
+
+
+@router.delete("/{project_id}/members/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+def remove_project_member(
+    project_id: int,
+    user_id: int,
+    current_user: User = Depends(get_current_user),
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db)
+):
+    """
+    Remove a member from a project
+    
+    Admins can remove members up to their own role; any member can leave.
+    """
+    if user_id == current_user.id:
+        permissions.require(project_id, Action.READ)
+        member = _get_member(db, project_id, user_id)
+    else:
+        caller_role = permissions.require(project_id, Action.MANAGE)
+        member = _get_member(db, project_id, user_id)
+        _check_grant(caller_role, member.role)
+    
+    db.delete(member)
+    db.commit()
+    activity_log.record(project_id, current_user.id, "member", user_id, "deleted")
@@ -0,0 +1,113 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+from app.database import get_db
+from app.models import User, RecurrenceRule, Task
+from app.schemas import RecurrenceRuleCreate, RecurrenceRuleRead
+from app.core.dependencies import get_current_user, get_permissions
+from app.core.permissions import Action, ProjectPermissions
+from app.core.config import get_settings
+from app.services.activity import activity_log
+from app.services.recurrence import materialize_rules, utcnow, weekday_mask
+from app.services.sync import record_changes
+from datetime import timedelta
+
+router = APIRouter(prefix="/projects/{project_id}/recurrences", tags=["recurrences"])
+
+
+@router.post("/", response_model=RecurrenceRuleRead, status_code=status.HTTP_201_CREATED)
+def create_recurrence_rule(
+    project_id: int,
+    rule: RecurrenceRuleCreate,
+    current_user: User = Depends(get_current_user),
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db)
+):
+    """
+    Create a recurring task
+
+    Tasks are created for the occurrences within the next
+    `RECURRENCE_HORIZON_DAYS`; later ones follow as the horizon rolls forward.
+    Occurrences before now are never created.
+
+    - **title**, **description**, **priority**, **assigned_to**: Template for each task
+    - **frequency**: daily, weekly or monthly, every **interval** days/weeks/months
+    - **weekdays**: Days of the week for weekly rules (0 is Monday)
+    - **month_day**: Day of the month for monthly rules, clamped to shorter months
+    - **start_date**, **time_of_day**, **timezone**: First day, and the local time tasks are due
+    - **until**, **count**: Optional last day or number of occurrences
+    """
+    permissions.require(project_id, Action.WRITE)
+
+    if rule.assigned_to:
+        assigned_user = db.query(User).filter(User.id == rule.assigned_to).first()
+        if not assigned_user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Assigned user not found"
+            )
+
+    now = utcnow()
+    db_rule = RecurrenceRule(
+        project_id=project_id,
+        created_by=current_user.id,
+        materialized_through=now,
+        **{**rule.model_dump(), "weekdays": weekday_mask(rule.weekdays)}
+    )
+    db.add(db_rule)
+    db.flush()
+    # The first horizon is small, so it is created right away rather than by the next run
+    materialize_rules(db, [db_rule], now + timedelta(days=get_settings().recurrence_horizon_days))
+    db.commit()
+    db.refresh(db_rule)
+    activity_log.record(project_id, current_user.id, "recurrence", db_rule.id, "created")
+
+    return db_rule
+
+
+@router.get("/", response_model=List[RecurrenceRuleRead])
+def list_recurrence_rules(
+    project_id: int,
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db)
+):
+    """
+    List a project's recurring tasks
+    """
+    permissions.require(project_id, Action.READ)
+
+    return db.query(RecurrenceRule).filter(RecurrenceRule.project_id == project_id).order_by(RecurrenceRule.id).all()
+
+
+@router.delete("/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_recurrence_rule(
+    project_id: int,
+    rule_id: int,
+    current_user: User = Depends(get_current_user),
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db)
+):
+    """
+    Stop a recurring task
+
+    Tasks already created stay, without their `recurrence_rule_id`.
+    """
+    permissions.require(project_id, Action.WRITE)
+
+    db_rule = (
+        db.query(RecurrenceRule)
+        .filter(RecurrenceRule.id == rule_id)
+        .filter(RecurrenceRule.project_id == project_id)
+        .first()
+    )
+    if not db_rule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recurrence rule not found"
+        )
+
+    # The database clears the tasks' recurrence_rule_id, out of sight of the sync hook
+    record_changes(db, "task", db.query(Task.project_id, Task.id).filter(Task.recurrence_rule_id == rule_id).all())
+    db.delete(db_rule)
+    db.commit()
+    activity_log.record(project_id, current_user.id, "recurrence", rule_id, "deleted")
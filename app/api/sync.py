@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.database import get_db
+from app.models import User
+from app.schemas import SyncRead
+from app.core.config import get_settings
+from app.core.dependencies import get_current_user, get_permissions
+from app.core.permissions import ProjectPermissions
+from app.services.sharding import shard_directory, sharding_enabled
+from app.services.sync import (
+    changes_since, collect, current_sequence, make_token, parse_token, settled_sequence
+)
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get("", response_model=SyncRead)
+def sync(
+    since: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db)
+):
+    """
+    Projects and tasks created, updated or deleted since a sync token
+
+    Without `since`, returns only a token for the current state: take it,
+    then load projects and tasks through the list endpoints.
+
+    A token from before the user's data moved to another shard gets 410:
+    sync from scratch. Changes from the last few seconds
+    (`SYNC_SETTLE_SECONDS`) are returned again by the next sync, in case a
+    concurrent write commits behind them.
+
+    - **since**: Token from the previous sync
+    """
+    try:
+        token = parse_token(since)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync token"
+        )
+
+    moves = shard_directory.lookup(db, current_user.id).moves if sharding_enabled() else 0
+    if token is None:
+        return {"token": make_token(current_sequence(db), moves)}
+
+    token_moves, since = token
+    if token_moves != moves:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync token has expired; sync from scratch"
+        )
+
+    entries, has_more = changes_since(
+        db, current_user.id, permissions.readable(), since, get_settings().sync_page_size
+    )
+    if not entries:
+        return {"token": make_token(since, moves)}
+
+    # Entries past the settled ones come again next time, so only a fully settled page has more
+    sequence = settled_sequence(entries, since)
+    return {
+        "token": make_token(sequence, moves),
+        "has_more": has_more and sequence == entries[-1].id,
+        **collect(db, entries)
+    }
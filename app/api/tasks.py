@@ -1,18 +1,80 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import bindparam, func, select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import islice
+import heapq
 from app.database import get_db
-from app.models import User, Project, Task
-from app.schemas import TaskCreate, TaskRead, TaskUpdate, TaskReadDetailed
-from app.core.dependencies import get_current_user
+from app.models import (
+    User, Project, Task, TaskArchive, TaskWithArchived, TaskDependency, TaskStatus, RecurrenceRule
+)
+from app.schemas import (
+    TaskCreate, TaskRead, TaskUpdate, TaskMove, TaskReadDetailed, TaskDependencyCreate, TaskDependencyRead,
+    TaskDependencies, TaskListItem
+)
+from app.core.dependencies import USER_BY_ID, get_current_user, get_permissions, clamp_limit
+from app.core.permissions import READABLE_PROJECT_IDS, Action, ProjectPermissions
+from app.core.responses import ResponseAdapter
+from app.core.config import get_settings
+from app.services.activity import activity_log, pending_changes
+from app.services.positions import append_position, key_between, needs_rebalance, request_rebalance
+from app.services.recurrence import naive_utc, virtual_occurrences
+from app.services.reminders import reminder_scheduler
+from app.services.schedule import order_dependency
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+# Changes to these can give a task new reminders
+REMINDER_FIELDS = {"due_date", "assigned_to", "status"}
+
+# Built once and executed with {"task_id": ...}
+TASK_BY_ID = select(Task).where(Task.id == bindparam("task_id"))
+ARCHIVED_TASK_BY_ID = select(TaskArchive).where(TaskArchive.id == bindparam("task_id"))
+
+TASK_LIST = ResponseAdapter(List[TaskListItem])
+TASK_DETAIL = ResponseAdapter(TaskReadDetailed)
+
+
+@lru_cache(maxsize=None)
+def task_list_statement(include_archived: bool, by_project: bool, by_status: bool,
+                        due_from: bool, due_to: bool, by_due_date: bool):
+    """
+    The task list statement for one combination of filters
+
+    Each combination is built once, with the values left as bound parameters:
+    `project_id` (or `user_id` to join the readable projects), `status`,
+    `due_from`, `due_to`, `skip` and `limit`.
+    """
+    entity = TaskWithArchived if include_archived else Task
+    statement = select(entity)
+    if by_project:
+        statement = statement.where(entity.project_id == bindparam("project_id"))
+    else:
+        statement = statement.join(READABLE_PROJECT_IDS, READABLE_PROJECT_IDS.c.project_id == entity.project_id)
+    if by_status:
+        statement = statement.where(entity.status == bindparam("status"))
+    if due_from:
+        statement = statement.where(entity.due_date >= bindparam("due_from"))
+    if due_to:
+        statement = statement.where(entity.due_date < bindparam("due_to"))
+    
+    if by_due_date:
+        statement = statement.order_by(entity.due_date, entity.id)
+    elif by_project and by_status:
+        # One Kanban column, read in order from ix_tasks_project_id_status_position
+        statement = statement.order_by(entity.position, entity.id)
+    elif include_archived:
+        statement = statement.order_by(entity.id)
+    return statement.offset(bindparam("skip")).limit(bindparam("limit"))
+
 
 @router.post("/", response_model=TaskRead, status_code=status.HTTP_201_CREATED)
-async def create_task(
+def create_task(
     task: TaskCreate,
     current_user: User = Depends(get_current_user),
+    permissions: ProjectPermissions = Depends(get_permissions),
     db: Session = Depends(get_db)
 ):
     """
@@ -25,16 +87,10 @@ async def create_task(
     - **priority**: Priority level (low, medium, high)
     - **due_date**: Due date (optional)
     """ 
-    project = db.query(Project).filter(Project.id == task.project_id).filter(Project.owner_id == current_user.id).first()
-    
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
+    permissions.require(task.project_id, Action.WRITE)
     
     if task.assigned_to:
-        assigned_user = db.query(User).filter(User.id == task.assigned_to).first()
+        assigned_user = db.scalar(USER_BY_ID, {"user_id": task.assigned_to})
         if not assigned_user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -48,21 +104,29 @@ async def create_task(
         assigned_to=task.assigned_to,
         priority=task.priority,
         status=task.status,
-        due_date=task.due_date
+        due_date=task.due_date,
+        position=append_position(db, task.project_id, task.status or TaskStatus.TODO)
     )
     db.add(db_task)
     db.commit()
     db.refresh(db_task)
+    activity_log.record(db_task.project_id, current_user.id, "task", db_task.id, "created")
+    if db_task.due_date:
+        reminder_scheduler.schedule_task(db, db_task)
     
     return db_task
 
 
-@router.get("/", response_model=List[TaskRead])
-async def list_tasks(
-    current_user: User = Depends(get_current_user),
+@router.get("/", response_model=List[TaskListItem])
+def list_tasks(
+    permissions: ProjectPermissions = Depends(get_permissions),
     db: Session = Depends(get_db),
     project_id: int = None,
     task_status: str = None,
+    include_archived: bool = False,
+    due_from: Optional[datetime] = None,
+    due_to: Optional[datetime] = None,
+    include_occurrences: bool = False,
     skip: int = 0,
     limit: int = 10
 ):
@@ -70,12 +134,14 @@ async def list_tasks(
     List tasks with filtering
     
     - **project_id**: Filter by project ID
-    - **task_status**: Filter by status (todo, in_progress, completed)
+    - **task_status**: Filter by status (todo, in_progress, completed); with `project_id`, tasks come in board order
+    - **include_archived**: Also return archived completed tasks
+    - **due_from**, **due_to**: Only tasks due in [due_from, due_to)
+    - **include_occurrences**: Also return recurring tasks not created yet, as `virtual` items without an id,
+      merged by due date; requires both due bounds
     - **skip**: Number of taks to skip (for pagination)
-    - **limit**: Maximum number of tasks to return
+    - **limit**: Maximum number of tasks to return (capped at `MAX_PAGE_SIZE`, default 100)
     """
-    from app.models.task import TaskStatus
-    
     if task_status:
         valid_statuses = [s.value for s in TaskStatus]
         if task_status not in valid_statuses:
@@ -84,50 +150,126 @@ async def list_tasks(
                 detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}"
             )
     
-    query = db.query(Task).join(Project).filter(Project.owner_id == current_user.id)
+    # Task due dates are stored as naive UTC
+    if due_from:
+        due_from = naive_utc(due_from)
+    if due_to:
+        due_to = naive_utc(due_to)
     
-    if project_id:
-        query = query.filter(Task.project_id == project_id)
+    if include_occurrences:
+        if due_from is None or due_to is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="include_occurrences requires due_from and due_to"
+            )
+        max_days = get_settings().recurrence_max_range_days
+        if due_to - due_from > timedelta(days=max_days):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"The due date range can span at most {max_days} days"
+            )
     
-    if task_status:
-        query = query.filter(Task.status == task_status)
+    # One project is checked against the memoized roles; its statement needs no join
+    if project_id and not permissions.can(project_id, Action.READ):
+        return TASK_LIST.response([])
     
-    tasks = query.offset(skip).limit(limit).all()
+    statement = task_list_statement(
+        include_archived, bool(project_id), bool(task_status), bool(due_from), bool(due_to), include_occurrences
+    )
+    params = {
+        "project_id": project_id,
+        "user_id": permissions.user_id,
+        "status": task_status,
+        "due_from": due_from,
+        "due_to": due_to,
+        "skip": skip,
+        "limit": clamp_limit(limit),
+    }
     
-    return tasks
+    if include_occurrences:
+        return TASK_LIST.response(list_with_occurrences(db, permissions, statement, params, project_id, task_status))
+    
+    return TASK_LIST.response(db.scalars(statement, params).all())
+
+
+def list_with_occurrences(db, permissions, statement, params, project_id, task_status):
+    """One page of materialized tasks and virtual occurrences, merged by due date"""
+    skip, due_from, due_to = params["skip"], params["due_from"], params["due_to"]
+    # Neither side can contribute more than skip + limit items to the page
+    wanted = skip + params["limit"]
+    
+    # Virtual occurrences are always to-do
+    rules = []
+    if task_status in (None, TaskStatus.TODO.value):
+        # Plain rows are enough to compute occurrences and far cheaper to load than entities
+        rules = (
+            db.query(*RecurrenceRule.__table__.c)
+            .filter(RecurrenceRule.active.is_(True))
+            .filter(RecurrenceRule.materialized_through < due_to)
+        )
+        if project_id:
+            rules = rules.filter(RecurrenceRule.project_id == project_id)
+        else:
+            readable = permissions.readable()
+            rules = rules.join(readable, readable.c.project_id == RecurrenceRule.project_id)
+        # Every rule in scope is expanded, so their number bounds the cost rather than the page size
+        max_rules = get_settings().recurrence_max_listed_rules
+        rules = rules.limit(max_rules + 1).all()
+        if len(rules) > max_rules:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Occurrences can be listed for at most {max_rules} recurring tasks; "
+                       "filter by project_id or end the due date range earlier"
+            )
+    
+    tasks = [TaskListItem.model_validate(task) for task in db.scalars(statement, {**params, "skip": 0, "limit": wanted})]
+    occurrences = [
+        TaskListItem.model_validate(occurrence)
+        for occurrence in virtual_occurrences(rules, due_from, due_to, wanted)
+    ]
+    
+    merged = heapq.merge(tasks, occurrences, key=lambda item: item.due_date)
+    return list(islice(merged, skip, wanted))
 
 
 @router.get("/{task_id}", response_model=TaskReadDetailed)
-async def read_task(
+def read_task(
     task_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db),
+    include_archived: bool = False
 ):
     """
     Get a specific task with assigned user details
+    
+    - **include_archived**: Also look the task up in the archive
     """
-    task = db.query(Task).join(Project).filter(Project.owner_id == current_user.id).filter(Task.id == task_id).first()
+    task = db.scalar(TASK_BY_ID, {"task_id": task_id})
     
-    if not task:
+    if not task and include_archived:
+        task = db.scalar(ARCHIVED_TASK_BY_ID, {"task_id": task_id})
+    
+    if not task or not permissions.can(task.project_id, Action.READ):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
     
-    return task
+    return TASK_DETAIL.response(task)
 
 
 @router.put("/{task_id}", response_model=TaskRead)
-async def update_task(
+def update_task(
     task_id: int,
     task_update: TaskUpdate,
     current_user: User = Depends(get_current_user),
+    permissions: ProjectPermissions = Depends(get_permissions),
     db: Session = Depends(get_db)
 ):
     """
     Update a task
     """
-    task = db.query(Task).join(Project).filter(Project.owner_id == current_user.id).filter(Task.id == task_id).first()
+    task = db.scalar(TASK_BY_ID, {"task_id": task_id})
     
     if not task:
         raise HTTPException(
@@ -135,6 +277,8 @@ async def update_task(
             detail="Task not found"
         )
     
+    permissions.require(task.project_id, Action.WRITE, detail="Task not found")
+    
     
     if task_update.title:
         task.title = task_update.title
@@ -143,6 +287,9 @@ async def update_task(
         task.description = task_update.description
     
     if task_update.status:
+        if task_update.status != task.status:
+            # A task changing columns joins the end of its new one
+            task.position = append_position(db, task.project_id, task_update.status)
         task.status = task_update.status
     
     if task_update.priority:
@@ -161,23 +308,142 @@ async def update_task(
     if task_update.due_date is not None:
         task.due_date = task_update.due_date
     
+    changes = pending_changes(task)
     db.add(task)
     db.commit()
     db.refresh(task)
+    if changes:
+        activity_log.record(task.project_id, current_user.id, "task", task.id, "updated", changes)
+    if REMINDER_FIELDS & changes.keys():
+        reminder_scheduler.schedule_task(db, task)
+    
+    return task
+
+
+@router.patch("/{task_id}/move", response_model=TaskRead)
+def move_task(
+    task_id: int,
+    move: TaskMove,
+    current_user: User = Depends(get_current_user),
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db)
+):
+    """
+    Move a task within its Kanban column or into another column
+    
+    Only the moved task's row is written; its neighbors keep their positions.
+    Give either neighbor or both. With neither, the task goes to the end of
+    the column.
+    
+    - **after_id**: Task this one should come right after
+    - **before_id**: Task this one should come right before
+    - **status**: Column to move into (defaults to the task's current status)
+    """
+    task = db.scalar(TASK_BY_ID, {"task_id": task_id})
+    
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    permissions.require(task.project_id, Action.WRITE, detail="Task not found")
+    
+    if task_id in (move.after_id, move.before_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A task cannot be moved next to itself"
+        )
+    
+    target_status = move.status or task.status
+    
+    # Serializes moves with column rebalancing on Postgres, so a key is never
+    # computed from neighbors that are being rewritten
+    db.query(Project.id).filter(Project.id == task.project_id).with_for_update().first()
+    
+    neighbor_ids = [neighbor_id for neighbor_id in (move.after_id, move.before_id) if neighbor_id is not None]
+    neighbors = {
+        row.id: row
+        for row in db.query(Task.id, Task.status, Task.position)
+        .filter(Task.id.in_(neighbor_ids))
+        .filter(Task.project_id == task.project_id)
+    } if neighbor_ids else {}
+    for neighbor_id in neighbor_ids:
+        if neighbor_id not in neighbors:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Neighbor task not found in this project"
+            )
+        if neighbors[neighbor_id].status != target_status:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Neighbors must be in the target status column"
+            )
+    
+    column = (
+        db.query(Task.position)
+        .filter(Task.project_id == task.project_id)
+        .filter(Task.status == target_status)
+        .filter(Task.id != task_id)
+    )
+    if move.after_id is not None:
+        lower = neighbors[move.after_id].position
+    elif move.before_id is not None:
+        # The task currently right before `before_id`, one index seek away
+        lower = column.filter(Task.position < neighbors[move.before_id].position).with_entities(
+            func.max(Task.position)
+        ).scalar()
+    else:
+        lower = column.with_entities(func.max(Task.position)).scalar()
+    if move.before_id is not None:
+        upper = neighbors[move.before_id].position
+    elif move.after_id is not None:
+        upper = column.filter(Task.position > lower).with_entities(func.min(Task.position)).scalar()
+    else:
+        upper = None
+    
+    if lower is not None and upper is not None and lower >= upper:
+        if lower == upper:
+            # Concurrent appends can produce equal keys; rebalancing separates them
+            request_rebalance(db, task.project_id, target_status, current_user.id)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Neighbors share a position; retry once the column is rebalanced"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="after_id must come before before_id in the column"
+        )
+    
+    position = key_between(lower, upper)
+    task.status = target_status
+    task.position = position
+    
+    changes = pending_changes(task)
+    db.add(task)
+    db.commit()
+    db.refresh(task)
+    if changes:
+        activity_log.record(task.project_id, current_user.id, "task", task.id, "updated", changes)
+    if "status" in changes:
+        reminder_scheduler.schedule_task(db, task)
+    if needs_rebalance(position):
+        request_rebalance(db, task.project_id, target_status, current_user.id)
     
     return task
 
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_task(
+def delete_task(
     task_id: int,
     current_user: User = Depends(get_current_user),
+    permissions: ProjectPermissions = Depends(get_permissions),
     db: Session = Depends(get_db)
 ):
     """
     Delete a task
     """
-    task = db.query(Task).join(Project).filter(Project.owner_id == current_user.id).filter(Task.id == task_id).first()
+    task = db.scalar(TASK_BY_ID, {"task_id": task_id})
     
     if not task:
         raise HTTPException(
@@ -185,6 +451,141 @@ async def delete_task(
             detail="Task not found"
         )
     
+    permissions.require(task.project_id, Action.WRITE, detail="Task not found")
+    
+    project_id = task.project_id
     db.delete(task)
     db.commit()
+    activity_log.record(project_id, current_user.id, "task", task_id, "deleted")
+
 
+
+@router.get("/{task_id}/dependencies", response_model=TaskDependencies)
+def read_task_dependencies(
+    task_id: int,
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db)
+):
+    """
+    List the tasks blocking this task and the tasks it blocks
+    """
+    task = db.scalar(TASK_BY_ID, {"task_id": task_id})
+    
+    if not task or not permissions.can(task.project_id, Action.READ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    blocked_by = db.query(TaskDependency.blocking_task_id).filter(TaskDependency.blocked_task_id == task_id)
+    blocks = db.query(TaskDependency.blocked_task_id).filter(TaskDependency.blocking_task_id == task_id)
+    
+    return {
+        "blocked_by": sorted(row[0] for row in blocked_by),
+        "blocks": sorted(row[0] for row in blocks)
+    }
+
+
+@router.post("/{task_id}/dependencies", response_model=TaskDependencyRead, status_code=status.HTTP_201_CREATED)
+def add_task_dependency(
+    task_id: int,
+    dependency: TaskDependencyCreate,
+    current_user: User = Depends(get_current_user),
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db)
+):
+    """
+    Mark this task as blocked by another task in the same project
+    
+    - **blocked_by**: ID of the task that must be completed first
+    """
+    task = db.scalar(TASK_BY_ID, {"task_id": task_id})
+    
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    permissions.require(task.project_id, Action.WRITE, detail="Task not found")
+    
+    if dependency.blocked_by == task_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A task cannot block itself"
+        )
+    
+    blocking = db.query(Task).filter(Task.id == dependency.blocked_by).filter(Task.project_id == task.project_id).first()
+    if not blocking:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Blocking task not found in this project"
+        )
+    
+    # Serializes edge inserts per project on Postgres, so two concurrent
+    # inserts can't each pass the cycle check and close a cycle together
+    db.query(Project.id).filter(Project.id == task.project_id).with_for_update().first()
+    
+    existing = (
+        db.query(TaskDependency)
+        .filter(TaskDependency.blocking_task_id == blocking.id)
+        .filter(TaskDependency.blocked_task_id == task_id)
+        .first()
+    )
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Dependency already exists"
+        )
+    
+    if not order_dependency(db, blocking.id, task_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Dependency would create a cycle"
+        )
+    
+    db_dependency = TaskDependency(blocking_task_id=blocking.id, blocked_task_id=task_id)
+    db.add(db_dependency)
+    db.commit()
+    db.refresh(db_dependency)
+    activity_log.record(task.project_id, current_user.id, "task", task_id, "updated", {"blocked_by": [None, blocking.id]})
+    
+    return db_dependency
+
+
+@router.delete("/{task_id}/dependencies/{blocked_by}", status_code=status.HTTP_204_NO_CONTENT)
+def remove_task_dependency(
+    task_id: int,
+    blocked_by: int,
+    current_user: User = Depends(get_current_user),
+    permissions: ProjectPermissions = Depends(get_permissions),
+    db: Session = Depends(get_db)
+):
+    """
+    Remove a dependency so this task is no longer blocked by `blocked_by`
+    """
+    task = db.scalar(TASK_BY_ID, {"task_id": task_id})
+    
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    permissions.require(task.project_id, Action.WRITE, detail="Task not found")
+    
+    dependency = (
+        db.query(TaskDependency)
+        .filter(TaskDependency.blocking_task_id == blocked_by)
+        .filter(TaskDependency.blocked_task_id == task_id)
+        .first()
+    )
+    if not dependency:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dependency not found"
+        )
+    
+    db.delete(dependency)
+    db.commit()
+    activity_log.record(task.project_id, current_user.id, "task", task_id, "updated", {"blocked_by": [blocked_by, None]})
@@ -1,17 +1,26 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.models import User
-from app.schemas import UserCreate, UserRead, UserUpdate, LoginRequest
-from app.core.security import hash_password, verify_password, create_access_token
-from app.core.dependencies import get_current_user
-from datetime import timedelta
+from app.models import User, ReminderPreference
+from app.schemas import UserCreate, UserRead, UserUpdate, LoginRequest, RefreshRequest, ReminderPreferences
+from app.core.security import hash_password, verify_password, create_access_token, decode_token
+from app.core.dependencies import USER_BY_ID, get_current_user, optional_security
+from app.core.responses import ResponseAdapter
+from app.services.reminders import reminder_scheduler
+from app.services.sharding import mirror_users, place_user, sharding_enabled
+from app.services.tokens import (
+    RefreshTokenError, issue_refresh_token, rotate_refresh_token, revoke_refresh_token, revoke_access_token
+)
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+USER = ResponseAdapter(UserRead)
+
 
 @router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+def register(user: UserCreate, db: Session = Depends(get_db)):
     """
     Register a new user
     
@@ -34,14 +43,19 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         password_hash=hashed_password
     )
     db.add(db_user)
+    if sharding_enabled():
+        db.flush()
+        place_user(db, db_user.id)
     db.commit()
+    if sharding_enabled():
+        mirror_users(db, [db_user.id])
     db.refresh(db_user)
     
     return db_user
 
 
 @router.post("/login", response_model=dict)
-async def login(credentials: LoginRequest, db: Session = Depends(get_db)):
+def login(credentials: LoginRequest, db: Session = Depends(get_db)):
     """
     Login with email and password
     
@@ -66,43 +80,122 @@ async def login(credentials: LoginRequest, db: Session = Depends(get_db)):
             detail="Invalid email or password"
         )
     
-    access_token_expires = timedelta(minutes=30)
-    access_token = create_access_token(
-        data={"sub": str(user.id)},
-        expires_delta=access_token_expires
-    )
+    access_token = create_access_token(data={"sub": str(user.id)})
+    refresh_token = issue_refresh_token(db, user.id)
+    db.commit()
     
     return {
         "access_token": access_token,
+        "refresh_token": refresh_token,
         "token_type": "bearer",
         "user": UserRead.model_validate(user)
     }
 
 
+@router.post("/refresh", response_model=dict)
+def refresh(request: RefreshRequest, db: Session = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access token and refresh token
+    
+    Refresh tokens are single use. Reusing one revokes every token issued
+    from the same login, so a stolen token stops working once either party
+    uses it. A deactivated user's token is refused and left unused.
+    """
+    try:
+        record, refresh_token = rotate_refresh_token(db, request.refresh_token)
+    except RefreshTokenError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(exc)
+        )
+    
+    return {
+        "access_token": create_access_token(data={"sub": str(record.user_id)}),
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    request: RefreshRequest,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+):
+    """
+    Log out by revoking the refresh token and every token rotated from it
+    
+    When the request carries an access token in the `Authorization` header,
+    that token is revoked too and stops working immediately instead of at
+    its expiry.
+    """
+    revoke_refresh_token(db, request.refresh_token)
+    if credentials is not None:
+        payload = decode_token(credentials.credentials)
+        if payload is not None:
+            revoke_access_token(db, payload)
+
+
 @router.get("/me", response_model=UserRead)
-async def read_users_me(current_user: User = Depends(get_current_user)):
+def read_users_me(current_user: User = Depends(get_current_user)):
     """
     Get the current authenticated user's information
     """
-    return current_user
+    return USER.response(current_user)
+
+
+@router.get("/me/reminders", response_model=ReminderPreferences)
+def read_reminder_preferences(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the lead times at which the current user is reminded of due tasks
+    """
+    lead_minutes = db.query(ReminderPreference.lead_minutes).filter(ReminderPreference.user_id == current_user.id)
+    return {"lead_minutes": sorted((row[0] for row in lead_minutes), reverse=True)}
+
+
+@router.put("/me/reminders", response_model=ReminderPreferences)
+def update_reminder_preferences(
+    preferences: ReminderPreferences,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Replace the current user's reminder lead times
+    
+    Reminders go to a task's assignee, or to the project owner while it is
+    unassigned, at each lead time before the task's due date.
+    
+    - **lead_minutes**: Up to 5 lead times in minutes (1 to 43200); empty turns reminders off
+    """
+    db.query(ReminderPreference).filter(ReminderPreference.user_id == current_user.id).delete(synchronize_session=False)
+    db.add_all(ReminderPreference(user_id=current_user.id, lead_minutes=lead) for lead in preferences.lead_minutes)
+    db.commit()
+    if sharding_enabled():
+        mirror_users(db, [current_user.id])
+    reminder_scheduler.schedule_user(db, current_user.id)
+    
+    return preferences
 
 
 @router.get("/{user_id}", response_model=UserRead)
-async def read_user(user_id: int, db: Session = Depends(get_db)):
+def read_user(user_id: int, db: Session = Depends(get_db)):
     """
     Get a specific user by ID
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.scalar(USER_BY_ID, {"user_id": user_id})
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return user
+    return USER.response(user)
 
 
 @router.put("/{user_id}", response_model=UserRead)
-async def update_user(
+def update_user(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -118,13 +211,15 @@ async def update_user(
     
     db.add(current_user)
     db.commit()
+    if sharding_enabled():
+        mirror_users(db, [current_user.id])
     db.refresh(current_user)
     
     return current_user
 
 
 @router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(
+def delete_user(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -134,3 +229,5 @@ async def delete_user(
     current_user.is_active = False
     db.add(current_user)
     db.commit()
+    if sharding_enabled():
+        mirror_users(db, [current_user.id])
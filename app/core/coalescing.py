@@ -0,0 +1,161 @@
+"""
+Single-flight coalescing of identical concurrent reads
+
+When several identical reads from the same user arrive while one is still
+running (a dashboard on a shared screen, many tabs polling), only the first
+runs. The others wait for it and replay its serialized response, so the
+queries and Pydantic serialization happen once.
+
+Requests are identical when they share the user id, method, path, normalized
+query string and `Accept-Encoding`. Nothing is cached: once the leading
+request finishes, the next identical read runs again.
+
+A follower never reaches `get_current_user`, so before joining it makes the
+same checks against the database (token not revoked, user still there and
+active) in one small query. One that fails runs on its own and gets the
+endpoint's 401 or 403.
+
+Writes bypass coalescing. Any non-read request detaches every in-flight
+read when it starts and again when it finishes, so a read that arrives after
+a write never joins a read that began before the write committed. That
+covers every user's reads, not just the writer's: a write to a shared
+project changes what its other members read, and which project a write
+touches (`PUT /tasks/{id}`, a body field) isn't known from the request.
+"""
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+from sqlalchemy import bindparam, select
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.metrics import Counter, Gauge
+from app.core.prefixes import PrefixRules
+from app.core.security import bearer_payload
+from app.models import User
+from app.services.tokens import revocation_store
+
+COALESCED_REQUESTS = Counter(
+    "coalesced_requests_total",
+    "Coalescible reads by role: leaders run, followers replay a leader's response",
+    ("role",)
+)
+
+
+def _coalescing_ratio() -> float:
+    leaders = COALESCED_REQUESTS.value(role="leader")
+    followers = COALESCED_REQUESTS.value(role="follower")
+    return followers / (leaders + followers) if leaders + followers else 0.0
+
+
+Gauge("coalescing_ratio", "Fraction of coalescible reads served from another request's response", _coalescing_ratio)
+
+READ_METHODS = ("GET", "HEAD")
+
+ACTIVE_USER = select(User.is_active).where(User.id == bindparam("user_id"))
+
+
+def request_key(scope: Scope) -> Tuple[str, str, str, str]:
+    query = urlencode(sorted(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)))
+    encoding = ""
+    for name, value in scope.get("headers", []):
+        if name == b"accept-encoding":
+            encoding = value.decode("latin-1")
+            break
+    return scope["method"], scope["path"], query, encoding
+
+
+def still_authorized(user_id: str, jti: Optional[str]) -> bool:
+    """The checks `get_current_user` makes beyond decoding the token"""
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        if jti is not None:
+            revocation_store.maybe_refresh(db)
+            if revocation_store.is_revoked(jti):
+                return False
+        return bool(db.scalar(ACTIVE_USER, {"user_id": int(user_id)}))
+    finally:
+        db.close()
+
+
+class CoalescingMiddleware:
+    """ASGI middleware sharing one execution between identical concurrent reads"""
+
+    def __init__(self, app: ASGIApp, paths: List[str]):
+        self.app = app
+        self.paths = PrefixRules({path: True for path in paths})
+        # user id -> request key -> the leader's response messages (None if it failed)
+        self.inflight: Dict[str, Dict[tuple, asyncio.Future]] = {}
+
+    def detach(self) -> None:
+        """Stop new requests from joining any in-flight read"""
+        self.inflight.clear()
+
+    def caller(self, scope: Scope) -> Optional[dict]:
+        """The bearer token's payload, if it names a user"""
+        payload = bearer_payload(scope)
+        if not payload or not str(payload.get("sub", "")).isdigit():
+            return None
+        return payload
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        payload = self.caller(scope)
+        if payload is None:
+            await self.app(scope, receive, send)
+            return
+        user_id = str(payload["sub"])
+
+        if scope["method"] not in READ_METHODS:
+            self.detach()
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.detach()
+            return
+
+        if self.paths.match(scope["path"])[1] is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = request_key(scope)
+        if key in self.inflight.get(user_id, {}):
+            if not await run_in_threadpool(still_authorized, user_id, payload.get("jti")):
+                await self.app(scope, receive, send)
+                return
+        calls = self.inflight.setdefault(user_id, {})
+        leader = calls.get(key)
+        if leader is not None:
+            COALESCED_REQUESTS.inc(role="follower")
+            messages = await asyncio.shield(leader)
+            if messages is not None:
+                for message in messages:
+                    await send(message)
+                return
+            # The leader failed; run this request on its own
+            await self.app(scope, receive, send)
+            return
+
+        COALESCED_REQUESTS.inc(role="leader")
+        future = asyncio.get_running_loop().create_future()
+        calls[key] = future
+        messages: List[Message] = []
+
+        async def capture(message: Message) -> None:
+            messages.append(message)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            future.set_result(messages if self.completed(messages) else None)
+            if calls.get(key) is future:
+                del calls[key]
+                if not calls and self.inflight.get(user_id) is calls:
+                    del self.inflight[user_id]
+
+    @staticmethod
+    def completed(messages: List[Message]) -> bool:
+        return bool(messages) and messages[-1]["type"] == "http.response.body" and not messages[-1].get("more_body")
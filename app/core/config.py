@@ -1,7 +1,7 @@
 from pydantic_settings import BaseSettings
 from pydantic import SecretStr, AnyUrl, ConfigDict
 from functools import lru_cache
-from typing import List
+from typing import Dict, List, Optional
 from os import getenv
 
 class Settings(BaseSettings):
@@ -12,11 +12,161 @@ class Settings(BaseSettings):
 
     # Database
     database_url: AnyUrl = "sqlite:///./test.db"
+    # Optional read replicas; GET requests are routed to these round-robin
+    database_replica_urls: List[str] = []
+    # Seconds a user's reads stay on the primary after they write
+    replica_sticky_seconds: float = 5.0
+    # Seconds before a failed replica is health checked again
+    replica_retry_seconds: float = 30.0
+    # Connections each pool opens at startup, so the first requests don't wait to connect
+    database_prewarm_connections: int = 2
+
+    # Owner-based sharding (app.services.sharding): more databases by name, beside
+    # DATABASE_URL, which is the "main" shard and the directory of users
+    database_shards: Dict[str, str] = {}
+    # Shards new users are placed on, fewest users first (default: all of them)
+    shard_placement: List[str] = []
+    # Seconds each process caches a user's shard
+    shard_cache_seconds: float = 5.0
+    # Seconds a move waits for cached shards and in-flight requests to catch up
+    shard_move_settle_seconds: float = 15.0
+    # Rows copied or deleted per transaction when moving a user
+    shard_move_batch_size: int = 1000
+    # Node number (0-31) in generated ids; must differ between running processes.
+    # Required with DATABASE_SHARDS, the only setup that generates ids (app.core.ids)
+    id_node: Optional[int] = None
+
+    # SQLite file databases: WAL with a single writer connection and a read pool
+    sqlite_tuned: bool = True
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size: int = 268435456
+    sqlite_read_pool_size: int = 8
+    # Seconds a request waits for a pooled connection (SQLite's single writer
+    # included) before it is answered with 503
+    database_pool_timeout_seconds: float = 5.0
+
+    # Completed tasks older than this move to tasks_archive
+    archive_after_days: int = 30
+    archive_batch_size: int = 1000
+
+    # Rows fetched per server-side cursor batch when streaming exports
+    export_batch_size: int = 1000
+    # Rows validated and inserted per transaction during imports
+    import_batch_size: int = 5000
+    # Per-line errors reported in an import summary (the rest are only counted)
+    import_max_errors: int = 1000
+    # Longest import line or CSV record; longer ones are skipped as line errors
+    import_max_line_bytes: int = 1024 * 1024
+
+    # Background jobs: in-process worker count (0 to rely on `python -m app.worker`)
+    job_workers: int = 1
+    job_poll_seconds: float = 1.0
+    # A running job's worker renews its lease every third of this; a job whose
+    # lease ran out (the worker died) is claimed again
+    job_lease_seconds: float = 60.0
+    # Claims before a job that keeps losing its worker is marked failed
+    job_max_attempts: int = 3
+    # Rows deleted per transaction by the delete_project job
+    job_delete_batch_size: int = 1000
+
+    # Recurring tasks exist as rows only this far ahead; later occurrences are virtual
+    recurrence_horizon_days: int = 14
+    # Rules materialized per transaction
+    recurrence_batch_size: int = 1000
+    # Widest due date range GET /tasks/ expands virtual occurrences over
+    recurrence_max_range_days: int = 366
+    # Most active rules GET /tasks/ expands virtual occurrences for in one request
+    recurrence_max_listed_rules: int = 1000
+
+    # Most change feed entries one GET /sync returns
+    sync_page_size: int = 1000
+    # Sync tokens only move past change feed entries older than this. A write
+    # that took a lower id but commits later (concurrent Postgres
+    # transactions) must commit within it to reach every client
+    sync_settle_seconds: float = 5.0
+
+    # Task positions longer than this queue a rebalance of their Kanban column
+    position_rebalance_length: int = 32
+
+    # Due-date reminders: run the scheduler in exactly one process. It keeps the
+    # reminders firing in the next window in memory, at most reminder_max_pending
+    reminders_enabled: bool = False
+    reminder_window_minutes: int = 60
+    reminder_max_pending: int = 100000
+    # How often it reads the change feed for tasks other processes and bulk writes changed
+    reminder_poll_seconds: float = 5.0
+    # "log", "file" (reminder_file_path, one JSON object per line) or "webhook"
+    reminder_sink: str = "log"
+    reminder_file_path: str = "reminders.ndjson"
+    reminder_webhook_url: str = ""
+    reminder_webhook_timeout_seconds: float = 5.0
+
+    # Activity log: events are buffered in memory and batch-inserted in the background
+    activity_buffer_size: int = 10000
+    activity_flush_interval_ms: int = 500
+    activity_flush_batch_size: int = 500
+    # Events that can't be written are appended here and replayed on startup
+    activity_spool_path: str = "activity.spool.ndjson"
 
     # Security
     secret_key: SecretStr = SecretStr(getenv("SECRET_KEY"))
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    refresh_token_expire_days: int = 14
+    # How often each process picks up access tokens revoked by other processes
+    revocation_refresh_seconds: float = 5.0
+
+    # Rate limiting: token buckets per user (or client IP when unauthenticated).
+    # Route group path prefix -> "<requests>/<period>" or "off", where the period is
+    # second, minute, hour or a number of seconds; the longest matching prefix wins
+    rate_limit_enabled: bool = True
+    rate_limits: Dict[str, str] = {
+        "/": "600/minute",
+        "/health": "off",
+        "/users/login": "10/minute",
+        "/users/register": "5/minute",
+        "/users/refresh": "30/minute",
+        "/import": "10/minute",
+        "/export": "10/minute",
+    }
+    # Load shedding: an adaptive (AIMD) cap on concurrent requests; the rest get 503
+    load_shed_enabled: bool = True
+    load_shed_initial_limit: int = 32
+    load_shed_min_limit: int = 4
+    load_shed_max_limit: int = 256
+    # Time to first response byte above which the cap is cut by load_shed_backoff
+    load_shed_latency_target_ms: float = 500.0
+    load_shed_backoff: float = 0.9
+    # Always admitted so orchestrators don't restart a busy but healthy process
+    load_shed_priority_paths: List[str] = ["/health"]
+
+    # Identical concurrent reads by one user under these prefixes share one execution
+    coalesce_enabled: bool = True
+    coalesce_paths: List[str] = ["/projects", "/tasks", "/dashboard", "/users/me"]
+
+    # Request deadlines in seconds per router prefix (0 for none), enforced in the
+    # database with statement_timeout (Postgres) or a progress handler (SQLite)
+    request_timeouts: Dict[str, float] = {
+        "/": 10.0,
+        "/health": 2.0,
+        "/tasks": 5.0,
+        "/projects": 5.0,
+        "/dashboard": 5.0,
+        "/export": 0,
+        "/import": 0,
+    }
+
+    # GET /metrics answers clients in these addresses or networks (e.g. "10.0.0.0/8";
+    # behind a proxy, the proxy's) and anyone sending `Authorization: Bearer
+    # <METRICS_TOKEN>`. With neither set it answers no one; disabled, it is a 404
+    metrics_enabled: bool = True
+    metrics_allowed_ips: List[str] = []
+    metrics_token: Optional[SecretStr] = None
+
+    # Upper bound on `limit` for paginated list endpoints
+    max_page_size: int = 100
 
     # Password policy
     password_min_length: int = 8
@@ -36,6 +186,11 @@ class Settings(BaseSettings):
 def get_settings() -> Settings:
     return Settings()
 
+def cors_origins() -> List[str]:
+    """Origins allowed to call the API from a browser"""
+    return ["https://pulsepm.vercel.app"] if get_settings().is_production else ["*"]
+
+
 def validate_settings() -> List[str]:
     """Validates environment settings and returns list of CORS origins"""
     settings = get_settings()
@@ -46,9 +201,5 @@ def validate_settings() -> List[str]:
             raise ValueError(
                 "Production detected but using SQLite. Set DATABASE_URL to a production database."
             )
-        origins = ["https://pulsepm.vercel.app"]
-    else:
-        origins = ["*"]
     
-    return origins
-
+    return cors_origins()
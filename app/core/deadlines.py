@@ -0,0 +1,143 @@
+"""
+Request deadlines enforced inside the database
+
+`DeadlineMiddleware` gives each request an absolute deadline from
+`Settings.request_timeouts` and stores it in a context variable. Engine
+listeners carry it into the database, so a runaway query is cancelled by the
+server instead of holding a pooled connection after the client has given up:
+
+- Postgres: `SET LOCAL statement_timeout` to the time left, before each statement
+- SQLite: a progress handler that interrupts the statement once the deadline passes
+
+A cancelled query surfaces as `DeadlineExceeded`, which the middleware turns
+into a 504. Work outside a request (jobs, CLIs) has no deadline.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.metrics import Counter
+from app.core.prefixes import PrefixRules
+
+# SQLite virtual machine instructions between deadline checks
+SQLITE_PROGRESS_STEPS = 10_000
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+DEADLINE_EXCEEDED = Counter(
+    "request_deadline_exceeded_total",
+    "Requests answered with 504 because a query ran past the request deadline",
+    ("route",)
+)
+
+
+class DeadlineExceeded(Exception):
+    """A database statement was cancelled because the request deadline passed"""
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None without one"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """Run the enclosed block under a deadline `seconds` from now"""
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def _sqlite_progress() -> int:
+    # Runs on the thread executing the statement, which carries the request context
+    return 1 if expired() else 0
+
+
+def _on_sqlite_connect(dbapi_connection, connection_record) -> None:
+    dbapi_connection.set_progress_handler(_sqlite_progress, SQLITE_PROGRESS_STEPS)
+
+
+def _on_postgres_execute(connection, cursor, statement, parameters, context, executemany) -> None:
+    # Set before every statement: a timeout set once per transaction would let
+    # each of its statements run for the whole time that was left at the start
+    left = remaining()
+    if left is None:
+        return
+    if left <= 0:
+        raise DeadlineExceeded()
+    # A cursor of its own, since the statement's may be a named (server-side)
+    # one; psycopg2 begins the transaction on the first execute either way, so
+    # SET LOCAL applies to the statement that follows
+    timeout_cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        timeout_cursor.execute(f"SET LOCAL statement_timeout = {max(1, int(left * 1000))}")
+    finally:
+        timeout_cursor.close()
+
+
+def _on_error(context) -> None:
+    # Cancellation shows up as OperationalError ("interrupted" on SQLite,
+    # QueryCanceled on Postgres); once the deadline has passed that is the cause
+    if isinstance(context.sqlalchemy_exception, OperationalError) and expired():
+        raise DeadlineExceeded() from context.original_exception
+
+
+def install_deadlines(engine: Engine) -> None:
+    """Attach the listeners that enforce request deadlines to an engine"""
+    backend = engine.url.get_backend_name()
+    if backend == "sqlite":
+        event.listen(engine, "connect", _on_sqlite_connect)
+    elif backend == "postgresql":
+        event.listen(engine, "before_cursor_execute", _on_postgres_execute)
+    else:
+        return
+    event.listen(engine, "handle_error", _on_error)
+
+
+class DeadlineMiddleware:
+    """ASGI middleware applying per-router deadlines and answering 504 on expiry"""
+
+    def __init__(self, app: ASGIApp, timeouts: Dict[str, float]):
+        self.app = app
+        # A timeout of 0 disables the deadline for that prefix
+        self.rules = PrefixRules({prefix: seconds or None for prefix, seconds in timeouts.items()})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route, seconds = self.rules.match(scope["path"])
+        if seconds is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        with deadline(seconds):
+            try:
+                await self.app(scope, receive, send_wrapper)
+            except DeadlineExceeded:
+                DEADLINE_EXCEEDED.inc(route=route)
+                if started:
+                    raise
+                response = JSONResponse({"detail": "Request deadline exceeded"}, status_code=504)
+                await response(scope, receive, send)
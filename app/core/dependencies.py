@@ -1,14 +1,26 @@
-from fastapi import Depends, HTTPException, status
+import ipaddress
+import secrets
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.core.config import get_settings
+from app.core.permissions import ProjectPermissions
 from app.core.security import decode_token
 from app.database import get_db
 from app.models import User
+from app.services.sharding import shard_directory, sharding_enabled
+from app.services.tokens import revocation_store
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
+# Runs on every authenticated request; built once and executed with {"user_id": ...}
+USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
 
-async def get_current_user(
+
+def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> User:
@@ -28,6 +40,16 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    jti = payload.get("jti")
+    if jti is not None:
+        revocation_store.maybe_refresh(db)
+        if revocation_store.is_revoked(jti):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+    
     user_id: int = payload.get("sub")
     if user_id is None:
         raise HTTPException(
@@ -46,7 +68,10 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # Lets the session keep this user's reads on the primary after they write
+    db.info["user_id"] = user_id
+    
+    user = db.scalar(USER_BY_ID, {"user_id": user_id})
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -59,6 +84,17 @@ async def get_current_user(
             detail="Inactive user",
         )
     
+    if sharding_enabled():
+        placement = shard_directory.lookup(db, user_id)
+        if placement.moving and not db.info.get("read_only"):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Your data is being moved; try again shortly",
+                headers={"Retry-After": "30"},
+            )
+        # Statements on projects, tasks and the like go to the user's shard from here on
+        db.info["shard"] = placement.shard
+    
     return user
 
 
@@ -67,4 +103,49 @@ async def get_current_active_user(
     """
     Verify the current user is active
     """
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+def get_permissions(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> ProjectPermissions:
+    """
+    The current user's project permissions
+    
+    FastAPI resolves a dependency once per request, so every check in the
+    request shares one load of the user's roles.
+    """
+    return ProjectPermissions(db, current_user.id)
+
+
+def clamp_limit(limit: int) -> int:
+    """Bound a client-supplied page size to 0..max_page_size"""
+    return max(0, min(limit, get_settings().max_page_size))
+
+
+def require_metrics_access(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> None:
+    """
+    Allow a metrics scrape from METRICS_ALLOWED_IPS or with the METRICS_TOKEN bearer token
+
+    Raises:
+        HTTPException: 404 with metrics disabled, 403 for anyone else
+    """
+    settings = get_settings()
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    token = settings.metrics_token
+    if token is not None and credentials is not None and secrets.compare_digest(
+        credentials.credentials.encode(), token.get_secret_value().encode()
+    ):
+        return
+    try:
+        address = ipaddress.ip_address(request.client.host if request.client else "")
+    except ValueError:
+        address = None
+    if address is not None and any(address in ipaddress.ip_network(network) for network in settings.metrics_allowed_ips):
+        return
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to read metrics")
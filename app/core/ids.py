@@ -0,0 +1,87 @@
+"""
+Globally unique ids for rows that move between shards
+
+Projects, tasks and recurrence rules keep their ids when their owner moves
+to another shard (app.services.sharding), so those ids can't come from a
+per-database sequence. Each process generates them instead, snowflake style,
+in 53 bits so JavaScript clients read them exactly:
+
+    41 bits  milliseconds since 2024-01-01 (good until 2093)
+     5 bits  node, unique per running process (ID_NODE)
+     7 bits  sequence within the millisecond
+
+A node hands out up to 128 ids per millisecond and waits for the next one
+beyond that. Ids grow with time, so ordering by id still orders by creation.
+
+Only sharded deployments (DATABASE_SHARDS) need them; everywhere else the
+columns keep their database's autoincrement. Generated ids start far above
+any autoincremented one, so shards can be configured on an existing database.
+"""
+import threading
+import time
+from typing import Callable, Optional
+from sqlalchemy import BigInteger, Integer
+from app.core.config import get_settings
+
+EPOCH_MS = 1704067200000
+NODE_BITS = 5
+SEQUENCE_BITS = 7
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# 64-bit on Postgres; SQLite's INTEGER already is, and only INTEGER aliases the rowid
+ID_TYPE = BigInteger().with_variant(Integer, "sqlite")
+
+
+class IdGenerator:
+    def __init__(self, node: int):
+        if not 0 <= node <= MAX_NODE:
+            raise ValueError(f"ID node must be between 0 and {MAX_NODE}")
+        self.node = node
+        self._last_ms = 0
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def __call__(self) -> int:
+        with self._lock:
+            # A clock that steps back keeps counting from the last millisecond used
+            now = max(int(time.time() * 1000) - EPOCH_MS, self._last_ms)
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    while now <= self._last_ms:
+                        time.sleep(0.0001)
+                        now = int(time.time() * 1000) - EPOCH_MS
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return (now << (NODE_BITS + SEQUENCE_BITS)) | (self.node << SEQUENCE_BITS) | self._sequence
+
+
+_generator: Optional[IdGenerator] = None
+
+
+def check_node() -> None:
+    """Fail at startup when this process would generate ids without a node of its own"""
+    settings = get_settings()
+    if settings.database_shards and settings.id_node is None:
+        raise ValueError(
+            f"Set ID_NODE (0-{MAX_NODE}) to a different value for every running process: "
+            "sharded deployments generate ids, which would collide between processes"
+        )
+
+
+def new_id() -> int:
+    """Next globally unique id from this process's node"""
+    global _generator
+    if _generator is None:
+        node = get_settings().id_node
+        if node is None:
+            raise ValueError("ID_NODE must be set to generate ids")
+        _generator = IdGenerator(node)
+    return _generator()
+
+
+def id_default() -> Optional[Callable[[], int]]:
+    """Column default for ids that must be unique across shards: generated when sharded, autoincrement otherwise"""
+    return new_id if get_settings().database_shards else None
@@ -0,0 +1,114 @@
+"""
+Adaptive concurrency limiting
+
+When the database slows down, requests queue up in the server and the
+connection pool until every one of them times out together. The limiter
+caps how many requests run at once and rejects the rest with 503 straight
+away, so the requests that are admitted still finish in time.
+
+The cap adapts with AIMD: it grows by about one for every `limit`
+completions that start responding within the latency target, and shrinks
+by a multiplicative factor when a response is slower than that.
+"""
+import time
+from typing import List, Optional
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.metrics import Counter
+
+LOAD_SHED_REJECTED = Counter("load_shed_rejected_total", "Requests rejected with 503 by the concurrency limiter")
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit driven by time to first response byte"""
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        backoff: float = 0.9
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.in_flight = 0
+        self.shed = 0
+        self._last_decrease = 0.0
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            self.shed += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    def record(self, latency: float, now: Optional[float] = None) -> None:
+        """Adjust the limit from one request's latency"""
+        now = time.monotonic() if now is None else now
+        if latency > self.latency_target:
+            # Requests admitted before the last cut are still slow; cutting again
+            # for each of them would collapse the limit to the minimum
+            if now - self._last_decrease >= self.latency_target:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif self.in_flight >= int(self.limit) - 1:
+            # Only grow when the limit is actually what holds requests back
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+
+class LoadSheddingMiddleware:
+    """
+    ASGI middleware admitting requests through an `AdaptiveConcurrencyLimiter`
+
+    Requests under `priority_paths` (e.g. health checks) are always admitted
+    and not counted, so orchestrators can tell a busy process from a dead one.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: AdaptiveConcurrencyLimiter, priority_paths: List[str]):
+        self.app = app
+        self.limiter = limiter
+        self.priority_paths = [path.rstrip("/") for path in priority_paths]
+
+    def is_priority(self, path: str) -> bool:
+        return any(path == prefix or path.startswith(prefix + "/") for prefix in self.priority_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.is_priority(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiter
+        if not limiter.try_acquire():
+            LOAD_SHED_REJECTED.inc()
+            response = JSONResponse(
+                {"detail": "Server is overloaded, try again shortly"},
+                status_code=503,
+                headers={"Retry-After": "1"}
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        recorded = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal recorded
+            # Streaming responses are measured to their first byte, not their end
+            if message["type"] == "http.response.start" and not recorded:
+                recorded = True
+                limiter.record(time.monotonic() - started)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not recorded:
+                limiter.record(time.monotonic() - started)
+            limiter.release()
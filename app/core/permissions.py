@@ -0,0 +1,114 @@
+"""
+Project authorization
+
+Every question of the form "can this user do X on project P" goes through
+`ProjectPermissions`. The first check in a request loads the user's role on
+every project they can see in one query, which both branches answer from an
+index (`projects.owner_id` and `project_members (user_id, project_id)`).
+Later checks in the same request are dictionary lookups.
+
+List endpoints don't filter rows against that set in Python. They join
+`readable_project_ids(user_id)`, the same definition as a subquery, so the
+database does the filtering with the same indexes.
+
+Both run on nearly every request, so each is also built once with the user
+id as a bound parameter (`PROJECT_ROLES`, `READABLE_PROJECT_IDS`): executing
+them neither rebuilds the statement nor recomputes its cache key.
+"""
+import enum
+from typing import Dict, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import String, bindparam, cast, literal, select, union, union_all
+from sqlalchemy.orm import Session
+from app.models import Project, ProjectMember, ProjectRole
+
+ROLE_RANK = {role: rank for rank, role in enumerate(ProjectRole)}
+
+
+class Action(str, enum.Enum):
+    READ = "read"        # See the project, its tasks and history
+    WRITE = "write"      # Create, edit and delete tasks
+    MANAGE = "manage"    # Edit the project and its members
+    DELETE = "delete"    # Delete the project
+
+
+REQUIRED_ROLE = {
+    Action.READ: ProjectRole.VIEWER,
+    Action.WRITE: ProjectRole.EDITOR,
+    Action.MANAGE: ProjectRole.ADMIN,
+    Action.DELETE: ProjectRole.OWNER,
+}
+
+
+def project_roles(user_id: int):
+    """(project_id, role name) for every project the user owns or is a member of"""
+    owned = select(Project.id.label("project_id"), literal(ProjectRole.OWNER.name).label("role")).where(
+        Project.owner_id == user_id
+    )
+    shared = select(ProjectMember.project_id, cast(ProjectMember.role, String).label("role")).where(
+        ProjectMember.user_id == user_id
+    )
+    return union_all(owned, shared)
+
+
+def readable_project_ids(user_id: int):
+    """Subquery of the ids of every project the user can read, for joining into list queries"""
+    return union(
+        select(Project.id.label("project_id")).where(Project.owner_id == user_id),
+        select(ProjectMember.project_id).where(ProjectMember.user_id == user_id),
+    ).subquery("readable_projects")
+
+
+# Executed with {"user_id": ...}
+PROJECT_ROLES = project_roles(bindparam("user_id"))
+READABLE_PROJECT_IDS = readable_project_ids(bindparam("user_id"))
+
+
+def allows(role: Optional[ProjectRole], action: Action) -> bool:
+    return role is not None and ROLE_RANK[role] >= ROLE_RANK[REQUIRED_ROLE[action]]
+
+
+class ProjectPermissions:
+    """A user's project roles, loaded on first use and kept for the rest of the request"""
+
+    def __init__(self, db: Session, user_id: int):
+        self.db = db
+        self.user_id = user_id
+        self._roles: Optional[Dict[int, ProjectRole]] = None
+
+    @property
+    def roles(self) -> Dict[int, ProjectRole]:
+        if self._roles is None:
+            self._roles = {
+                project_id: ProjectRole[role]
+                for project_id, role in self.db.execute(PROJECT_ROLES, {"user_id": self.user_id})
+            }
+        return self._roles
+
+    def role(self, project_id: int) -> Optional[ProjectRole]:
+        return self.roles.get(project_id)
+
+    def can(self, project_id: int, action: Action) -> bool:
+        return allows(self.role(project_id), action)
+
+    def require(self, project_id: int, action: Action, detail: str = "Project not found") -> ProjectRole:
+        """
+        Return the user's role on the project if it allows `action`
+
+        Raises:
+            HTTPException: 404 if the user can't see the project, so its
+                existence isn't revealed; 403 if their role is too low
+        """
+        role = self.role(project_id)
+        if role is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+        if not allows(role, action):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Requires the {REQUIRED_ROLE[action].value} role on this project"
+            )
+        return role
+
+    def readable(self):
+        """Subquery of readable project ids with a `project_id` column"""
+        return readable_project_ids(self.user_id)
@@ -0,0 +1,26 @@
+from typing import Dict, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class PrefixRules(Generic[T]):
+    """
+    Settings keyed by route path prefix, e.g. `{"/": 10, "/tasks": 5}`
+
+    The longest prefix matching a path wins, so `/tasks` applies to
+    `/tasks/1` but not to `/tasksets`, and `/` is the fallback.
+    """
+
+    def __init__(self, rules: Dict[str, T]):
+        self.rules: List[Tuple[str, T]] = sorted(
+            ((prefix.rstrip("/") or "/", value) for prefix, value in rules.items()),
+            key=lambda rule: len(rule[0]),
+            reverse=True
+        )
+
+    def match(self, path: str) -> Tuple[str, Optional[T]]:
+        """Return the matching prefix and its value, or ("", None)"""
+        for prefix, value in self.rules:
+            if prefix == "/" or path == prefix or path.startswith(prefix + "/"):
+                return prefix, value
+        return "", None
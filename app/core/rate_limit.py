@@ -0,0 +1,127 @@
+"""
+Token bucket rate limiting
+
+Every request is charged against a bucket keyed by its route group and
+caller: the user id from a valid bearer token, or the client IP otherwise.
+Route groups are path prefixes configured in `Settings.rate_limits`; the
+longest matching prefix wins. Buckets live in a pluggable backend; the
+default keeps them in process memory, so limits apply per worker process.
+"""
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.prefixes import PrefixRules
+from app.core.security import bearer_payload
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+@dataclass(frozen=True)
+class Rate:
+    capacity: int
+    per_seconds: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.per_seconds
+
+
+def parse_rate(value: str) -> Optional[Rate]:
+    """
+    Parse `<requests>/<period>` where period is second, minute, hour or a number of seconds
+
+    Returns:
+        The rate, or None for `off` (the group is not limited)
+    """
+    if value.strip().lower() == "off":
+        return None
+    count, _, period = value.partition("/")
+    period = period.strip().lower()
+    seconds = PERIODS[period] if period in PERIODS else float(period)
+    if int(count) <= 0 or seconds <= 0:
+        raise ValueError(f"Invalid rate limit: {value}")
+    return Rate(capacity=int(count), per_seconds=seconds)
+
+
+class RateLimitBackend:
+    """Bucket storage; subclass to share buckets between processes (e.g. Redis)"""
+
+    async def take(self, key: str, rate: Rate) -> float:
+        """
+        Take one token from the bucket for `key`
+
+        Returns:
+            0 if the request is allowed, otherwise seconds until a token is available
+        """
+        raise NotImplementedError
+
+
+class InMemoryBackend(RateLimitBackend):
+    """Buckets in a dict; buckets that have refilled completely are swept periodically"""
+
+    def __init__(self, sweep_seconds: float = 60.0):
+        # key -> (tokens, updated, time the bucket is full again)
+        self.buckets: Dict[str, Tuple[float, float, float]] = {}
+        self.sweep_seconds = sweep_seconds
+        self._next_sweep = time.monotonic() + sweep_seconds
+
+    async def take(self, key: str, rate: Rate) -> float:
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        bucket = self.buckets.get(key)
+        tokens = rate.capacity if bucket is None else min(
+            rate.capacity, bucket[0] + (now - bucket[1]) * rate.refill_per_second
+        )
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.buckets[key] = (tokens, now, now + (rate.capacity - tokens) / rate.refill_per_second)
+        return 0.0 if allowed else (1 - tokens) / rate.refill_per_second
+
+    def sweep(self, now: float) -> None:
+        # A full bucket behaves exactly like a missing one
+        self.buckets = {key: bucket for key, bucket in self.buckets.items() if bucket[2] > now}
+        self._next_sweep = now + self.sweep_seconds
+
+
+def client_key(scope: Scope) -> str:
+    """Identify the caller by user id when the bearer token is valid, else by IP"""
+    payload = bearer_payload(scope)
+    if payload and payload.get("sub"):
+        return f"user:{payload['sub']}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 with `Retry-After` once a bucket is empty"""
+
+    def __init__(self, app: ASGIApp, rules: Dict[str, str], backend: Optional[RateLimitBackend] = None):
+        self.app = app
+        self.backend = backend or InMemoryBackend()
+        self.rules = PrefixRules({prefix: parse_rate(value) for prefix, value in rules.items()})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # CORS preflights carry no credentials and are answered by CORSMiddleware
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        group, rate = self.rules.match(scope["path"])
+        if rate is not None:
+            retry_after = await self.backend.take(f"{group}|{client_key(scope)}", rate)
+            if retry_after > 0:
+                response = JSONResponse(
+                    {"detail": "Too many requests"},
+                    status_code=429,
+                    headers={"Retry-After": str(math.ceil(retry_after))}
+                )
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,52 @@
+"""
+JSON responses encoded through prebuilt TypeAdapters
+
+For a route with a `response_model`, FastAPI validates the handler's return
+value, dumps the result to Python objects and encodes those with
+`json.dumps`. `ResponseAdapter` does it in two calls into pydantic-core
+instead: validate the ORM objects, then serialize straight to JSON bytes.
+The hot read endpoints return `adapter.response(...)`. A `Response` is
+passed through untouched, so they keep their `response_model` for the
+OpenAPI schema only.
+
+Adapters are built on first use, or by the startup warm-up in app.main, so
+importing the app doesn't pay for building their schemas.
+"""
+from typing import Any, List, Optional
+from fastapi import Response
+from pydantic import TypeAdapter
+
+ADAPTERS: List["ResponseAdapter"] = []
+
+
+class ResponseAdapter:
+    """A response type with a TypeAdapter kept for the life of the process"""
+
+    def __init__(self, response_type: Any):
+        self.response_type = response_type
+        self._adapter: Optional[TypeAdapter] = None
+        ADAPTERS.append(self)
+
+    @property
+    def adapter(self) -> TypeAdapter:
+        if self._adapter is None:
+            self._adapter = TypeAdapter(self.response_type)
+        return self._adapter
+
+    def dump_json(self, value: Any) -> bytes:
+        """Validate `value` (ORM objects included) against the type and encode it"""
+        adapter = self.adapter
+        return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+    def response(self, value: Any, status_code: int = 200) -> Response:
+        return Response(self.dump_json(value), status_code=status_code, media_type="application/json")
+
+
+def build_adapters() -> int:
+    """Build every adapter that hasn't been used yet; returns how many were built"""
+    built = 0
+    for response_adapter in ADAPTERS:
+        if response_adapter._adapter is None:
+            response_adapter.adapter
+            built += 1
+    return built
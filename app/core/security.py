@@ -1,4 +1,8 @@
 from passlib.context import CryptContext
+import hashlib
+import hmac
+import secrets
+import uuid
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from typing import Optional
@@ -35,7 +39,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
     
-    to_encode.update({"exp": int(expire.timestamp())})
+    # A unique id lets a single token be revoked before it expires
+    to_encode.update({"exp": int(expire.timestamp()), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(
         to_encode,
         settings.secret_key.get_secret_value(),
@@ -63,4 +68,45 @@ def decode_token(token: str) -> Optional[dict]:
         )
         return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+
+def bearer_payload(scope: dict) -> Optional[dict]:
+    """
+    Decode the bearer token of an ASGI request, once per request
+    
+    For middleware that needs the caller before routing. The result is cached
+    in the request state; it says nothing about revocation or whether the
+    user still exists, which `get_current_user` checks.
+    """
+    state = scope.setdefault("state", {})
+    if "token_payload" not in state:
+        payload = None
+        for name, value in scope.get("headers", []):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer":
+                    payload = decode_token(token)
+                break
+        state["token_payload"] = payload
+    return state["token_payload"]
+
+
+def create_refresh_token() -> str:
+    """Generate an opaque, random refresh token"""
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Hash a refresh token for storage and lookup
+    
+    Refresh tokens are high-entropy random values, so a keyed HMAC-SHA256 is
+    enough to protect them at rest, unlike passwords which need pbkdf2.
+    """
+    settings = get_settings()
+    return hmac.new(
+        settings.secret_key.get_secret_value().encode(),
+        token.encode(),
+        hashlib.sha256
+    ).hexdigest()
@@ -0,0 +1,50 @@
+"""
+Compiled statement cache instrumentation
+
+SQLAlchemy compiles each distinct statement shape to SQL once per engine and
+serves later executions from the engine's compiled cache, keyed by the
+statement's cache key. Every execution reports how it was served in
+`context.cache_hit`; a listener on each engine counts the outcomes, and
+`/metrics` shows them with the hit ratio.
+
+The hot statements are built once at import with `bindparam()` for their
+values, so executing them neither rebuilds the statement nor recomputes its
+cache key. A ratio that drops after a change means some statement's shape
+now varies per request, e.g. a value formatted into `text()`.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.default import CacheStats
+from app.core.metrics import Counter, Gauge
+
+RESULTS = {
+    CacheStats.CACHE_HIT: "hit",
+    CacheStats.CACHE_MISS: "miss",
+    CacheStats.CACHING_DISABLED: "uncached",
+    CacheStats.NO_CACHE_KEY: "uncached",
+    CacheStats.NO_DIALECT_SUPPORT: "uncached",
+}
+
+STATEMENTS = Counter(
+    "sql_compiled_cache_total",
+    "Statements executed, by whether their compiled form came from the cache",
+    ("result",)
+)
+
+
+def hit_ratio() -> float:
+    """Share of cacheable statements served from the compiled cache; 0 before any ran"""
+    hits, misses = STATEMENTS.value(result="hit"), STATEMENTS.value(result="miss")
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+Gauge("sql_compiled_cache_hit_ratio", "Share of cacheable statements served from the compiled cache", hit_ratio)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    STATEMENTS.inc(result=RESULTS.get(context.cache_hit, "uncached"))
+
+
+def install_cache_metrics(engine: Engine) -> None:
+    """Count each statement the engine executes by its compiled cache outcome"""
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -1,27 +1,366 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from fastapi import Request
+from sqlalchemy import create_engine, event, text, Delete, Insert, Update
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.util import find_tables
 from app.core.config import get_settings
+from app.core.deadlines import install_deadlines
+from app.core.statement_cache import install_cache_metrics
 
-settings = get_settings()
-DATABASE_URL = str(settings.database_url)
+logger = logging.getLogger(__name__)
 
-connect_args={}
-if DATABASE_URL.startswith("sqlite"):
-    connect_args={"check_same_thread": False}
+READ_ONLY_METHODS = ("GET", "HEAD", "OPTIONS")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args=connect_args
-)
 
-SessionLocal = sessionmaker(autoflush=False, bind=engine)
+def _connect_args(url: str) -> dict:
+    if url.startswith("sqlite"):
+        return {"check_same_thread": False}
+    return {}
+
+
+def _is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def _sqlite_pragmas(read_only: bool = False):
+    """Build a connect listener that applies the tuned SQLite pragmas"""
+    settings = get_settings()
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA cache_size=-{settings.sqlite_cache_size_kib}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        "PRAGMA foreign_keys=ON",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+
+    def apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return apply
+
+
+def _create_engine(url: str, read_only: bool = False, **kwargs) -> Engine:
+    if make_url(url).get_backend_name() != "sqlite" or _is_sqlite_file(url):
+        # Queued pools; a caller waiting longer than this gets a 503 (app.main)
+        kwargs.setdefault("pool_timeout", get_settings().database_pool_timeout_seconds)
+    db_engine = create_engine(url, connect_args=_connect_args(url), **kwargs)
+    if get_settings().sqlite_tuned and _is_sqlite_file(url):
+        event.listen(db_engine, "connect", _sqlite_pragmas(read_only))
+    install_deadlines(db_engine)
+    install_cache_metrics(db_engine)
+    return db_engine
+
+
+# Owner-based sharding (app.services.sharding). The main database is a shard
+# too, and the only home of everything outside SHARDED_TABLES: users, tokens,
+# jobs, activity and the user-to-shard map.
+MAIN_SHARD = "main"
+
+SHARDED_TABLES = frozenset({
+    "projects", "project_members", "tasks", "tasks_archive", "task_status_events",
+    "task_dependencies", "recurrence_rules", "sync_changes",
+})
+
+# Filled by init_engines, main shard first
+shard_engines: Dict[str, Engine] = {}
+
+
+def add_shard(name: str, url: str) -> Engine:
+    """Open a shard's engine; SQLite files get one writer connection, like the main database"""
+    init_engines()
+    if not event.contains(RoutingSession, "do_orm_execute", _route_compound_selects):
+        event.listen(RoutingSession, "do_orm_execute", _route_compound_selects)
+    if get_settings().sqlite_tuned and _is_sqlite_file(url):
+        shard_engines[name] = _create_engine(url, pool_size=1, max_overflow=0)
+    else:
+        shard_engines[name] = _create_engine(url, pool_pre_ping=True)
+    return shard_engines[name]
+
+
+@contextmanager
+def on_shard(db: Session, shard: str) -> Iterator[Session]:
+    """Route the session's sharded statements to `shard` within the block"""
+    previous = db.info.get("shard")
+    db.info["shard"] = shard
+    try:
+        yield db
+    finally:
+        db.info["shard"] = previous
+
+
+class ReplicaPool:
+    """
+    Round-robin selection over read replica engines
+
+    A replica that fails to connect is skipped until `retry_seconds` have
+    passed, after which it is health checked with `SELECT 1` before use.
+    """
+
+    def __init__(self, engines: List[Engine], retry_seconds: float = 30.0):
+        self.engines = engines
+        self.retry_seconds = retry_seconds
+        self._retry_at: Dict[int, float] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+        for replica in engines:
+            event.listen(replica, "handle_error", self._on_error)
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def choose(self) -> Optional[Engine]:
+        """Return the next healthy replica, or None if all are down"""
+        for _ in range(len(self.engines)):
+            with self._lock:
+                index = next(self._counter) % len(self.engines)
+            retry_at = self._retry_at.get(index)
+            if retry_at is None:
+                return self.engines[index]
+            if time.monotonic() >= retry_at and self.check(index):
+                return self.engines[index]
+        return None
+
+    def check(self, index: int) -> bool:
+        """Health check a replica, marking it up or down accordingly"""
+        try:
+            with self.engines[index].connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except Exception:
+            self.mark_down(self.engines[index])
+            return False
+        self._retry_at.pop(index, None)
+        return True
+
+    def mark_down(self, replica: Engine) -> None:
+        index = self.engines.index(replica)
+        self._retry_at[index] = time.monotonic() + self.retry_seconds
+
+    def _on_error(self, context) -> None:
+        # Connection failures and disconnects take the replica out of rotation
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(context.engine)
+
+
+class RecentWriters:
+    """Tracks users who wrote recently so their reads stay on the primary"""
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._until: Dict[int, float] = {}
+
+    def mark(self, user_id: int) -> None:
+        self._until[user_id] = time.monotonic() + self.window_seconds
+
+    def is_recent(self, user_id: int) -> bool:
+        until = self._until.get(user_id)
+        if until is None:
+            return False
+        if time.monotonic() >= until:
+            self._until.pop(user_id, None)
+            return False
+        return True
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to a replica when marked read-only
+
+    Writes, flushes and sessions without `info["read_only"]` always use the
+    primary bind. A read-only session sticks to the replica it first chose,
+    and falls back to the primary when the user in `info["user_id"]` wrote
+    within the stickiness window or no replica is healthy.
+
+    Statements on sharded tables go to the shard in `info["shard"]` instead,
+    when that isn't the main database. Shards have no replicas.
+    """
+
+    def __init__(self, *args, replicas: Optional[ReplicaPool] = None,
+                 recent_writers: Optional[RecentWriters] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self.recent_writers = recent_writers
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs):
+        shard = self.info.get("shard")
+        if shard is not None and shard != MAIN_SHARD and self._is_sharded(mapper, clause):
+            return shard_engines[shard]
+        if self._use_replica(clause):
+            replica = self.info.get("replica")
+            if replica is None:
+                replica = self.replicas.choose()
+                self.info["replica"] = replica
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+    @staticmethod
+    def _is_sharded(mapper, clause) -> bool:
+        if clause is not None:
+            tables = find_tables(clause, include_aliases=True, include_joins=True, include_crud=True)
+        elif mapper is not None:
+            tables = mapper.tables
+        else:
+            return False
+        return any(table.name in SHARDED_TABLES for table in tables)
+
+    def _use_replica(self, clause) -> bool:
+        if not self.replicas or not self.info.get("read_only"):
+            return False
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            return False
+        user_id = self.info.get("user_id")
+        if user_id is not None and self.recent_writers is not None:
+            return not self.recent_writers.is_recent(user_id)
+        return True
+
+
+def _route_compound_selects(orm_execute_state):
+    # ORM unions reach get_bind without their statement, so nothing to route by
+    orm_execute_state.bind_arguments.setdefault("clause", orm_execute_state.statement)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _record_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _mark_recent_writer(session):
+    if session.info.pop("wrote", False) and session.recent_writers is not None:
+        user_id = session.info.get("user_id")
+        if user_id is not None:
+            session.recent_writers.mark(user_id)
+
+
+class _LazySessionmaker(sessionmaker):
+    def __call__(self, **local_kw) -> Session:
+        init_engines()
+        return super().__call__(**local_kw)
+
+
+# Bound to the engines by init_engines
+SessionLocal = _LazySessionmaker(class_=RoutingSession, autoflush=False)
+
+# Module attributes that only exist once init_engines has run
+_ENGINE_ATTRIBUTES = frozenset({
+    "DATABASE_URL", "SQLITE_TUNED", "engine", "sqlite_read_engine", "replica_pool", "recent_writers",
+})
+_init_lock = threading.RLock()
+_initialized = False
+
+
+def init_engines() -> None:
+    """
+    Create the engines, replica pool and shards from the settings
+
+    Importing the app creates no engines: the lifespan hook in app.main calls
+    this at startup, and otherwise the first session or use of `engine` does
+    (scripts, tests, `TestClient` without a `with` block). Later calls do
+    nothing.
+    """
+    global _initialized, DATABASE_URL, SQLITE_TUNED, engine, sqlite_read_engine, replica_pool, recent_writers
+    if _initialized:
+        return
+    with _init_lock:
+        # add_shard calls back in here while the configured shards are opened
+        if _initialized or "engine" in globals():
+            return
+        settings = get_settings()
+        DATABASE_URL = str(settings.database_url)
+        SQLITE_TUNED = settings.sqlite_tuned and _is_sqlite_file(DATABASE_URL)
+
+        if SQLITE_TUNED:
+            # WAL allows one writer alongside many readers. Writes queue on a single
+            # pooled connection instead of contending for the database lock, while
+            # reads are served from their own pool through the routing session.
+            engine = _create_engine(DATABASE_URL, pool_size=1, max_overflow=0)
+            sqlite_read_engine = _create_engine(
+                DATABASE_URL,
+                read_only=True,
+                pool_size=settings.sqlite_read_pool_size,
+                max_overflow=0
+            )
+        else:
+            engine = _create_engine(DATABASE_URL)
+            sqlite_read_engine = None
+
+        if settings.database_replica_urls:
+            replica_pool = ReplicaPool(
+                [_create_engine(url, pool_pre_ping=True) for url in settings.database_replica_urls],
+                retry_seconds=settings.replica_retry_seconds
+            )
+            recent_writers = RecentWriters(settings.replica_sticky_seconds)
+        elif sqlite_read_engine is not None:
+            # Readers see committed WAL data immediately, so no stickiness is needed
+            replica_pool = ReplicaPool([sqlite_read_engine])
+            recent_writers = None
+        else:
+            replica_pool = ReplicaPool([])
+            recent_writers = None
+
+        shard_engines[MAIN_SHARD] = engine
+        for name, url in settings.database_shards.items():
+            add_shard(name, url)
+
+        SessionLocal.configure(bind=engine, replicas=replica_pool, recent_writers=recent_writers)
+        _initialized = True
+
+
+def __getattr__(name: str):
+    if name in _ENGINE_ATTRIBUTES:
+        init_engines()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def prewarm_pools(connections: int) -> int:
+    """
+    Open up to `connections` connections in each pool ahead of the first requests
+
+    Pools that can't keep that many (SQLite's single writer) are filled.
+    Returns the number of connections opened.
+    """
+    init_engines()
+    engines = [engine, *replica_pool.engines, *(shard for name, shard in shard_engines.items() if name != MAIN_SHARD)]
+    opened = 0
+    for db_engine in engines:
+        if not isinstance(db_engine.pool, QueuePool):
+            continue
+        # Held together, so each checkout opens a connection of its own
+        held = []
+        try:
+            for _ in range(min(connections, db_engine.pool.size())):
+                held.append(db_engine.connect())
+        except Exception:
+            logger.warning("Prewarming %s failed", db_engine.url.render_as_string(), exc_info=True)
+        finally:
+            opened += len(held)
+            for connection in held:
+                connection.close()
+    return opened
+
 
 Base = declarative_base()
 
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    db.info["read_only"] = request.method in READ_ONLY_METHODS
     try:
         yield db
     finally:
         db.close()
-
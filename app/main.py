@@ -1,28 +1,136 @@
-from fastapi import FastAPI
+import logging
+import time
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import users_router, projects_router, tasks_router
-from app.database import Base, engine
-from app.core.config import validate_settings
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import exc, text
+from sqlalchemy.orm import configure_mappers
+from app import database, schemas
+from app.api import users_router, projects_router, tasks_router, dashboard_router, export_router, import_router, jobs_router, recurrences_router, sync_router
+from app.core.config import Settings, cors_origins, get_settings, validate_settings
+from app.core import metrics, responses
+from app.core.coalescing import CoalescingMiddleware
+from app.core.deadlines import DeadlineMiddleware
+from app.core.dependencies import require_metrics_access
+from app.core.ids import check_node
+from app.core.load_shedding import AdaptiveConcurrencyLimiter, LoadSheddingMiddleware
+from app.core.rate_limit import RateLimitMiddleware
+from app.services.activity import activity_log
+from app.services.jobs import JobWorkerPool
+from app.services.reminders import reminder_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+def build_schemas() -> int:
+    """Build the response schemas left unbuilt at import (`defer_build`); returns how many were"""
+    built = 0
+    for name in schemas.__all__:
+        schema = getattr(schemas, name)
+        if not schema.__pydantic_complete__:
+            schema.model_rebuild()
+            built += 1
+    return built
+
+
+def warm_up(settings: Settings) -> None:
+    """
+    Do the work the first requests would otherwise wait for
+
+    Engines are created and `database_prewarm_connections` connections opened
+    in each pool, the ORM mappers configured and the schemas and response
+    adapters built.
+    """
+    started = time.perf_counter()
+    database.init_engines()
+    connections = database.prewarm_pools(settings.database_prewarm_connections)
+    configure_mappers()
+    built = build_schemas() + responses.build_adapters()
+    logger.info(
+        "Warmed up in %.0f ms: %d connections opened, %d schemas and adapters built",
+        (time.perf_counter() - started) * 1000, connections, built
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    validate_settings()
+    check_node()
+    warm_up(settings)
+    workers = JobWorkerPool(settings.job_workers, settings.job_poll_seconds)
+    workers.start()
+    activity_log.start()
+    if settings.reminders_enabled:
+        reminder_scheduler.start()
+    yield
+    await reminder_scheduler.stop()
+    await workers.stop()
+    await activity_log.stop()
 
-origins = validate_settings()
 
 app = FastAPI(
     title="Project Management API",
     description="A professional project management API with user authentication",
-    version="1.1.0"
+    version="1.1.0",
+    lifespan=lifespan
 )
 
+settings = get_settings()
+
+# Innermost, so the deadline only covers time spent in the application
+app.add_middleware(DeadlineMiddleware, timeouts=settings.request_timeouts)
+
+if settings.load_shed_enabled:
+    limiter = AdaptiveConcurrencyLimiter(
+        initial_limit=settings.load_shed_initial_limit,
+        min_limit=settings.load_shed_min_limit,
+        max_limit=settings.load_shed_max_limit,
+        latency_target=settings.load_shed_latency_target_ms / 1000,
+        backoff=settings.load_shed_backoff
+    )
+    app.add_middleware(LoadSheddingMiddleware, limiter=limiter, priority_paths=settings.load_shed_priority_paths)
+    metrics.Gauge("load_shed_limit", "Current adaptive concurrency limit", lambda: limiter.limit)
+    metrics.Gauge("load_shed_in_flight", "Requests currently admitted by the limiter", lambda: limiter.in_flight)
+
+# Outside the limiter so requests replaying another's response don't take a slot
+if settings.coalesce_enabled:
+    app.add_middleware(CoalescingMiddleware, paths=settings.coalesce_paths)
+
+# Rate limited requests are rejected before they take a concurrency slot
+if settings.rate_limit_enabled:
+    app.add_middleware(RateLimitMiddleware, rules=settings.rate_limits)
+
+# Added last so it wraps the rate limiter and 429 responses carry CORS headers
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=origins,
+    allow_origins=cors_origins(),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"]
 )
 
+
+@app.exception_handler(exc.TimeoutError)
+async def pool_timeout_handler(request: Request, error: exc.TimeoutError):
+    # No connection freed up within DATABASE_POOL_TIMEOUT_SECONDS
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "The database is busy; try again shortly"},
+        headers={"Retry-After": "1"}
+    )
+
+
 app.include_router(users_router)
 app.include_router(projects_router)
 app.include_router(tasks_router)
+app.include_router(dashboard_router)
+app.include_router(export_router)
+app.include_router(import_router)
+app.include_router(jobs_router)
+app.include_router(recurrences_router)
+app.include_router(sync_router)
 
 
 @app.get("/")
@@ -40,3 +148,24 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+
+
+@app.get("/health/db")
+def database_health_check():
+    """Database health check: runs a trivial query on the primary"""
+    try:
+        with database.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database unavailable"
+        )
+    return {"status": "healthy", "database": "ok"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False,
+         dependencies=[Depends(require_metrics_access)])
+async def read_metrics():
+    """Process metrics in the Prometheus text format"""
+    return metrics.render()
@@ -1,5 +1,17 @@
 from .user import User
 from .project import Project
+from .project_member import ProjectMember, ProjectRole
 from .task import Task, TaskStatus, TaskPriority
+from .task_archive import TaskArchive, TaskWithArchived
+from .job import Job, JobStatus
+from .refresh_token import RefreshToken
+from .revoked_token import RevokedToken
+from .activity import ActivityEvent
+from .task_status_event import TaskStatusEvent
+from .task_dependency import TaskDependency
+from .reminder_preference import ReminderPreference
+from .recurrence_rule import RecurrenceRule, RecurrenceFrequency
+from .sync_change import SyncChange
+from .user_shard import UserShard
 
-__all__ = ["User", "Project", "Task", "TaskStatus", "TaskPriority"]
\ No newline at end of file
+__all__ = ["User", "Project", "Task", "TaskStatus", "TaskPriority", "TaskArchive", "TaskWithArchived", "Job", "JobStatus", "RefreshToken", "RevokedToken", "ActivityEvent", "TaskStatusEvent", "ProjectMember", "ProjectRole", "TaskDependency", "ReminderPreference", "RecurrenceRule", "RecurrenceFrequency", "SyncChange", "UserShard"]
\ No newline at end of file
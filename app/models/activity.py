@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index
+from app.core.ids import ID_TYPE
+from app.database import Base
+
+
+class ActivityEvent(Base):
+    """
+    One change to a project or task, appended by the activity log flusher
+    
+    `project_id` and `user_id` are deliberately not foreign keys: the log is
+    append-only history and keeps its rows after the project is deleted.
+    """
+    __tablename__ = "activity_log"
+    __table_args__ = (
+        # GET /projects/{id}/activity pages backwards through a project's events
+        Index("ix_activity_log_project_id_id", "project_id", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    project_id = Column(ID_TYPE, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    entity = Column(String(16), nullable=False)
+    entity_id = Column(ID_TYPE, nullable=False)
+    action = Column(String(16), nullable=False)
+    changes = Column(JSON, nullable=True)
+    # When the change happened, not when the event was flushed
+    created_at = Column(DateTime, nullable=False)
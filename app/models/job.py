@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum, JSON, Index, func
+import enum
+from app.database import Base
+
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers claim the oldest queued job
+        Index("ix_jobs_status_id", "status", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    progress = Column(Integer, default=0, nullable=False)
+    total = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Claims so far; a running job whose lease ran out is claimed again, up to job_max_attempts
+    attempts = Column(Integer, default=0, server_default="0", nullable=False)
+    # Kept in the future by the running worker's heartbeat
+    lease_expires_at = Column(DateTime, nullable=True)
@@ -1,17 +1,20 @@
 from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, func
 from sqlalchemy.orm import relationship
+from app.core.ids import ID_TYPE, id_default
 from app.database import Base
 
 
 class Project(Base):
     __tablename__ = "projects"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(ID_TYPE, primary_key=True, index=True, default=id_default())
     name = Column(String, index=True, nullable=False)
     description = Column(Text, nullable=True)
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     owner = relationship("User", back_populates="projects", foreign_keys=[owner_id])
-    tasks = relationship("Task", back_populates="project", cascade="all, delete-orphan")
\ No newline at end of file
+    tasks = relationship("Task", back_populates="project", cascade="all, delete-orphan")
+    archived_tasks = relationship("TaskArchive", back_populates="project", cascade="all, delete-orphan")
+    members = relationship("ProjectMember", back_populates="project", cascade="all, delete-orphan")
\ No newline at end of file
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Enum, Index, UniqueConstraint, func
+from sqlalchemy.orm import relationship
+import enum
+from app.core.ids import ID_TYPE
+from app.database import Base
+
+
+class ProjectRole(str, enum.Enum):
+    """Roles in ascending order of privilege"""
+    VIEWER = "viewer"
+    EDITOR = "editor"
+    ADMIN = "admin"
+    OWNER = "owner"
+
+
+class ProjectMember(Base):
+    """
+    A user a project is shared with
+    
+    The owner is not stored here; `Project.owner_id` makes them the implicit
+    holder of the `owner` role.
+    """
+    __tablename__ = "project_members"
+    __table_args__ = (
+        # Loading a user's accessible projects is a range scan on user_id
+        UniqueConstraint("user_id", "project_id", name="uq_project_members_user_id_project_id"),
+        Index("ix_project_members_project_id", "project_id"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    project_id = Column(ID_TYPE, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    role = Column(Enum(ProjectRole), default=ProjectRole.VIEWER, nullable=False)
+    created_at = Column(DateTime, default=func.now())
+    
+    project = relationship("Project", back_populates="members")
+    user = relationship("User")
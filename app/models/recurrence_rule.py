@@ -0,0 +1,59 @@
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, Enum, ForeignKey, Index, Integer, String, Text, Time, func
+)
+import enum
+from app.core.ids import ID_TYPE, id_default
+from app.database import Base
+from .task import TaskPriority
+
+
+class RecurrenceFrequency(str, enum.Enum):
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+
+
+class RecurrenceRule(Base):
+    """
+    A task template and the schedule it repeats on (app.services.recurrence)
+    
+    Occurrences fall at `time_of_day` local time in `timezone` on every
+    `interval`-th day, week (on `weekdays`) or month (on `month_day`) from
+    `start_date`, up to `until` or `count` occurrences. Tasks exist for every
+    occurrence due before `materialized_through`; later ones are virtual.
+    """
+    __tablename__ = "recurrence_rules"
+    __table_args__ = (
+        # The materializer picks the active rules that are furthest behind
+        Index("ix_recurrence_rules_active_materialized_through", "active", "materialized_through"),
+        Index("ix_recurrence_rules_project_id", "project_id"),
+    )
+    
+    id = Column(ID_TYPE, primary_key=True, default=id_default())
+    project_id = Column(ID_TYPE, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    
+    # Template for the tasks
+    title = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    priority = Column(Enum(TaskPriority), default=TaskPriority.MEDIUM, nullable=False)
+    assigned_to = Column(Integer, ForeignKey("users.id"), nullable=True)
+    
+    # Schedule
+    frequency = Column(Enum(RecurrenceFrequency), nullable=False)
+    interval = Column(Integer, default=1, nullable=False)
+    # Bit 0 is Monday; weekly rules only
+    weekdays = Column(Integer, default=0, nullable=False)
+    # Clamped to the last day of shorter months; monthly rules only
+    month_day = Column(Integer, nullable=True)
+    start_date = Column(Date, nullable=False)
+    time_of_day = Column(Time, nullable=False)
+    timezone = Column(String, default="UTC", nullable=False)
+    until = Column(Date, nullable=True)
+    count = Column(Integer, nullable=True)
+    
+    # Exclusive UTC bound below which every occurrence exists as a task
+    materialized_through = Column(DateTime, nullable=False)
+    # Cleared once no occurrences are left
+    active = Column(Boolean, default=True, nullable=False)
+    created_at = Column(DateTime, default=func.now())
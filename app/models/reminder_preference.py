@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index, UniqueConstraint, func
+from app.database import Base
+
+
+class ReminderPreference(Base):
+    """One lead time before a task's due date at which its assignee is reminded"""
+    __tablename__ = "reminder_preferences"
+    __table_args__ = (
+        UniqueConstraint("user_id", "lead_minutes", name="uq_reminder_preferences_user_id_lead_minutes"),
+        # The scheduler reads the distinct lead times, then joins users per lead time
+        Index("ix_reminder_preferences_lead_minutes_user_id", "lead_minutes", "user_id"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    lead_minutes = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=func.now())
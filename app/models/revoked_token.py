@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func
+from app.database import Base
+
+
+class RevokedToken(Base):
+    """
+    An access token revoked before its expiry, identified by its `jti` claim
+    
+    Rows are only needed until `expires_at`; after that the token is rejected
+    on its own and the row can be purged.
+    """
+    __tablename__ = "revoked_tokens"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(32), unique=True, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, default=func.now(), nullable=False, index=True)
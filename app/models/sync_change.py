@@ -0,0 +1,79 @@
+from datetime import datetime, timezone
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String, event, insert
+from sqlalchemy.orm import Session
+from app.core.ids import ID_TYPE
+from app.database import Base
+from .project import Project
+from .project_member import ProjectMember
+from .task import Task
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class SyncChange(Base):
+    """
+    One entry in the change feed behind `GET /sync`
+
+    `id` is the sequence clients sync from. A row names the entity that
+    changed, not its new values, so it is written on every change and read
+    back together with the current row. Rows with a `user_id` are addressed to
+    that user alone (access to the project granted or revoked); the others are
+    visible to everyone who can read the project. There are no foreign keys,
+    so tombstones outlive what they describe.
+
+    `changed_at` is when the entry was written, not when its transaction
+    began, so it bounds when a lower id could still commit
+    (app.services.sync).
+    """
+    __tablename__ = "sync_changes"
+    __table_args__ = (
+        # A sync is a range scan per readable project, plus one on the user's own rows
+        Index("ix_sync_changes_project_id_id", "project_id", "id"),
+        Index("ix_sync_changes_user_id_id", "user_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(ID_TYPE, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    # "project" or "task"
+    entity = Column(String, nullable=False)
+    entity_id = Column(ID_TYPE, nullable=False)
+    deleted = Column(Boolean, default=False, nullable=False)
+    changed_at = Column(DateTime, default=utcnow, nullable=False)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_sync_changes(session, flush_context):
+    """Feed every project, task and membership change made through the ORM to `sync_changes`"""
+    rows = []
+    deleted_projects = {obj.id for obj in session.deleted if isinstance(obj, Project)}
+    for obj in session.new:
+        if isinstance(obj, Project):
+            rows.append({"project_id": obj.id, "entity": "project", "entity_id": obj.id})
+        elif isinstance(obj, Task):
+            rows.append({"project_id": obj.project_id, "entity": "task", "entity_id": obj.id})
+        elif isinstance(obj, ProjectMember):
+            rows.append({"project_id": obj.project_id, "user_id": obj.user_id, "entity": "project",
+                         "entity_id": obj.project_id})
+    for obj in session.dirty:
+        if isinstance(obj, (Project, Task)) and session.is_modified(obj, include_collections=False):
+            entity = "project" if isinstance(obj, Project) else "task"
+            project_id = obj.id if entity == "project" else obj.project_id
+            rows.append({"project_id": project_id, "entity": entity, "entity_id": obj.id})
+    for obj in session.deleted:
+        if isinstance(obj, Project):
+            # Nobody can read a deleted project, so its readers get their own tombstones
+            rows.append({"project_id": obj.id, "user_id": obj.owner_id, "entity": "project",
+                         "entity_id": obj.id, "deleted": True})
+        elif isinstance(obj, ProjectMember):
+            rows.append({"project_id": obj.project_id, "user_id": obj.user_id, "entity": "project",
+                         "entity_id": obj.project_id, "deleted": True})
+        elif isinstance(obj, Task) and obj.project_id not in deleted_projects:
+            rows.append({"project_id": obj.project_id, "entity": "task", "entity_id": obj.id, "deleted": True})
+    if rows:
+        for row in rows:
+            row.setdefault("user_id", None)
+            row.setdefault("deleted", False)
+        session.connection().execute(insert(SyncChange.__table__), rows)
@@ -1,8 +1,13 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum, Index, func
+from sqlalchemy.orm import column_property, relationship
 import enum
+from app.core.ids import ID_TYPE, id_default
 from app.database import Base
 
+# Keys must compare bytewise; Postgres would otherwise use the database's locale collation
+POSITION_TYPE = String().with_variant(String(collation="C"), "postgresql")
+
+
 class TaskStatus(str, enum.Enum):
     TODO = "todo"
     IN_PROGRESS = "in_progress"
@@ -17,15 +22,34 @@ class TaskPriority(str, enum.Enum):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Archival scans completed tasks by age
+        Index("ix_tasks_status_updated_at", "status", "updated_at"),
+        # Kanban columns in order; also serves every lookup by project_id
+        Index("ix_tasks_project_id_status_position", "project_id", "status", "position"),
+        # The reminder scheduler loads upcoming due dates as a range scan
+        Index("ix_tasks_due_date", "due_date"),
+        # Each occurrence of a recurrence rule is materialized once
+        Index("uq_tasks_recurrence_rule_id_due_date", "recurrence_rule_id", "due_date", unique=True),
+        # Never reuse ids, since archived tasks keep theirs
+        {"sqlite_autoincrement": True},
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(ID_TYPE, primary_key=True, index=True, default=id_default())
     title = Column(String, nullable=False, index=True)
     description = Column(Text, nullable=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(ID_TYPE, ForeignKey("projects.id"), nullable=False)
     assigned_to = Column(Integer, ForeignKey("users.id"), nullable=True)
-    status = Column(Enum(TaskStatus), default=TaskStatus.TODO)
+    # Loads the previous value even when the row was expired, so every status change is recorded
+    status = column_property(Column(Enum(TaskStatus), default=TaskStatus.TODO), active_history=True)
     priority = Column(Enum(TaskPriority), default=TaskPriority.MEDIUM)
     due_date = Column(DateTime, nullable=True)
+    # Fractional key ordering the task within its status column (app.services.positions)
+    position = Column(POSITION_TYPE, nullable=True)
+    # Place in the project's dependency order when it differs from the id (app.services.schedule)
+    topo_rank = Column(ID_TYPE, nullable=True)
+    # The rule this task is an occurrence of; kept when the rule is deleted
+    recurrence_rule_id = Column(ID_TYPE, ForeignKey("recurrence_rules.id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
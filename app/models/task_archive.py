@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum, func, select, union_all
+from sqlalchemy.orm import aliased, relationship
+from app.core.ids import ID_TYPE
+from app.database import Base
+from .task import POSITION_TYPE, Task, TaskStatus, TaskPriority
+
+
+class TaskArchive(Base):
+    """Completed tasks moved out of the hot `tasks` table, keeping their original ids"""
+    __tablename__ = "tasks_archive"
+    
+    id = Column(ID_TYPE, primary_key=True, autoincrement=False)
+    title = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    project_id = Column(ID_TYPE, ForeignKey("projects.id"), nullable=False, index=True)
+    assigned_to = Column(Integer, ForeignKey("users.id"), nullable=True)
+    status = Column(Enum(TaskStatus), default=TaskStatus.COMPLETED)
+    priority = Column(Enum(TaskPriority), default=TaskPriority.MEDIUM)
+    due_date = Column(DateTime, nullable=True)
+    position = Column(POSITION_TYPE, nullable=True)
+    topo_rank = Column(ID_TYPE, nullable=True)
+    recurrence_rule_id = Column(ID_TYPE, nullable=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=func.now())
+    
+    project = relationship("Project", back_populates="archived_tasks")
+    assigned_user = relationship("User", foreign_keys=[assigned_to], viewonly=True)
+
+
+# Live and archived tasks as one Task-shaped entity, for reads that include the archive
+TaskWithArchived = aliased(
+    Task,
+    union_all(
+        select(Task.__table__),
+        select(*[TaskArchive.__table__.c[column.name] for column in Task.__table__.columns])
+    ).subquery("tasks_with_archived")
+)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index, UniqueConstraint, func
+from app.core.ids import ID_TYPE
+from app.database import Base
+
+
+class TaskDependency(Base):
+    """An edge of a project's dependency graph: `blocking_task_id` blocks `blocked_task_id`"""
+    __tablename__ = "task_dependencies"
+    __table_args__ = (
+        # Serves both loading a task's successors and the cycle check walking them
+        UniqueConstraint("blocking_task_id", "blocked_task_id", name="uq_task_dependencies_blocking_blocked"),
+        Index("ix_task_dependencies_blocked_task_id", "blocked_task_id"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    blocking_task_id = Column(ID_TYPE, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
+    blocked_task_id = Column(ID_TYPE, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime, default=func.now())
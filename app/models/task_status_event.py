@@ -0,0 +1,54 @@
+from sqlalchemy import Column, Integer, DateTime, Enum, Index, event, func, inspect
+from sqlalchemy.orm import Session, relationship
+from app.core.ids import ID_TYPE
+from app.database import Base
+from .task import Task, TaskStatus
+
+
+class TaskStatusEvent(Base):
+    """
+    One status transition of a task, the source for cycle time analytics
+    
+    `from_status` is null when the task was created and `to_status` is null
+    when it was deleted. There is no foreign key to `tasks`, so the history
+    outlives archival and deletion.
+    """
+    __tablename__ = "task_status_events"
+    __table_args__ = (
+        # max(id) per project is the analytics cache key
+        Index("ix_task_status_events_project_id_id", "project_id", "id"),
+        # Covering indexes: the weekly and cycle time aggregates never touch the table
+        Index("ix_task_status_events_project_id_changed_at", "project_id", "changed_at", "from_status", "to_status"),
+        Index("ix_task_status_events_project_id_task_id", "project_id", "task_id", "to_status", "changed_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    task_id = Column(ID_TYPE, nullable=False)
+    project_id = Column(ID_TYPE, nullable=False)
+    from_status = Column(Enum(TaskStatus), nullable=True)
+    to_status = Column(Enum(TaskStatus), nullable=True)
+    changed_at = Column(DateTime, default=func.now(), nullable=False)
+    
+    # Lets an event for a new task be added before the task has an id
+    task = relationship(Task, primaryjoin="foreign(TaskStatusEvent.task_id) == Task.id")
+
+
+@event.listens_for(Session, "before_flush")
+def _record_status_changes(session, flush_context, instances):
+    """Record an event for every task created, deleted or changing status through the ORM"""
+    for obj in session.new:
+        if isinstance(obj, Task):
+            session.add(TaskStatusEvent(task=obj, project_id=obj.project_id, to_status=obj.status or TaskStatus.TODO))
+    for obj in session.dirty:
+        if isinstance(obj, Task):
+            history = inspect(obj).attrs.status.history
+            if history.added and history.deleted and history.added[0] != history.deleted[0]:
+                session.add(TaskStatusEvent(
+                    task_id=obj.id,
+                    project_id=obj.project_id,
+                    from_status=history.deleted[0],
+                    to_status=history.added[0]
+                ))
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            session.add(TaskStatusEvent(task_id=obj.id, project_id=obj.project_id, from_status=obj.status))
@@ -0,0 +1,23 @@
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String, func
+from app.database import Base
+
+
+class UserShard(Base):
+    """
+    The shard holding a user's projects and tasks (app.services.sharding)
+    
+    Kept on the main database. Users without a row are on the main shard.
+    """
+    __tablename__ = "user_shards"
+    __table_args__ = (
+        # Placement counts users per shard
+        Index("ix_user_shards_shard", "shard"),
+    )
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(String, nullable=False)
+    # Set while a move copies the user's data; their writes are refused meanwhile
+    moving = Column(Boolean, default=False, nullable=False)
+    # Times the user has moved; sync tokens from before a move are refused
+    moves = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
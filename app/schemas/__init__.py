@@ -1,6 +1,16 @@
-from .user import UserBase, UserCreate, UserUpdate, UserRead, UserReadWithProjects, LoginRequest
+from .user import UserBase, UserCreate, UserUpdate, UserRead, UserReadWithProjects, LoginRequest, RefreshRequest
 from .project import ProjectBase, ProjectCreate, ProjectUpdate, ProjectRead, ProjectReadWithTasks, ProjectReadDetailed
-from .task import TaskBase, TaskCreate, TaskUpdate, TaskRead, TaskReadDetailed
+from .task import TaskBase, TaskCreate, TaskUpdate, TaskMove, TaskRead, TaskListItem, TaskReadDetailed
+from .dashboard import ProjectSummary, DashboardRead
+from .bulk import ImportLineError, ImportSummary
+from .job import JobCreate, JobRead
+from .activity import ActivityRead
+from .analytics import WeeklyFlow, CycleTime, ProjectAnalytics
+from .project_member import ProjectMemberCreate, ProjectMemberUpdate, ProjectMemberRead
+from .dependency import TaskDependencyCreate, TaskDependencyRead, TaskDependencies, ProjectSchedule
+from .reminder import ReminderPreferences
+from .recurrence import RecurrenceRuleCreate, RecurrenceRuleRead
+from .sync import SyncDeleted, SyncRead
 
 __all__ = [
     "UserBase",
@@ -9,6 +19,7 @@ __all__ = [
     "UserRead",
     "UserReadWithProjects",
     "LoginRequest",
+    "RefreshRequest",
     "ProjectBase",
     "ProjectCreate",
     "ProjectUpdate",
@@ -18,7 +29,31 @@ __all__ = [
     "TaskBase",
     "TaskCreate",
     "TaskUpdate",
+    "TaskMove",
     "TaskRead",
+    "TaskListItem",
     "TaskReadDetailed",
+    "ProjectSummary",
+    "DashboardRead",
+    "ImportLineError",
+    "ImportSummary",
+    "JobCreate",
+    "JobRead",
+    "ActivityRead",
+    "WeeklyFlow",
+    "CycleTime",
+    "ProjectAnalytics",
+    "ProjectMemberCreate",
+    "ProjectMemberUpdate",
+    "ProjectMemberRead",
+    "TaskDependencyCreate",
+    "TaskDependencyRead",
+    "TaskDependencies",
+    "ProjectSchedule",
+    "ReminderPreferences",
+    "RecurrenceRuleCreate",
+    "RecurrenceRuleRead",
+    "SyncDeleted",
+    "SyncRead",
 ]
 
@@ -0,0 +1,16 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+class ActivityRead(BaseModel):
+    id: int
+    project_id: int
+    user_id: Optional[int] = None
+    entity: str
+    entity_id: int
+    action: str
+    changes: Optional[Dict[str, Any]] = None
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True, defer_build=True)
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import date
+from typing import List, Optional
+
+
+class WeeklyFlow(BaseModel):
+    week_start: date
+    completed: int
+    wip: int
+
+
+class CycleTime(BaseModel):
+    completed_tasks: int
+    median_hours: Optional[float] = None
+    p90_hours: Optional[float] = None
+
+
+class ProjectAnalytics(BaseModel):
+    project_id: int
+    weeks: List[WeeklyFlow]
+    cycle_time: CycleTime
+
+    model_config = ConfigDict(defer_build=True)
@@ -0,0 +1,16 @@
+from pydantic import BaseModel, ConfigDict
+from typing import List
+
+
+class ImportLineError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportSummary(BaseModel):
+    projects_created: int = 0
+    tasks_created: int = 0
+    error_count: int = 0
+    errors: List[ImportLineError] = []
+
+    model_config = ConfigDict(defer_build=True)
@@ -0,0 +1,18 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, List
+from app.models import TaskStatus
+from .user import UserRead
+from .project import ProjectRead
+from .task import TaskRead
+
+
+class ProjectSummary(ProjectRead):
+    task_counts: Dict[TaskStatus, int] = {}
+
+
+class DashboardRead(BaseModel):
+    user: UserRead
+    projects: List[ProjectSummary] = []
+    recent_tasks: List[TaskRead] = []
+
+    model_config = ConfigDict(from_attributes=True, defer_build=True)
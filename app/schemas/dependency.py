@@ -0,0 +1,33 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import List, Optional
+
+
+class TaskDependencyCreate(BaseModel):
+    blocked_by: int
+
+
+class TaskDependencyRead(BaseModel):
+    blocking_task_id: int
+    blocked_task_id: int
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True, defer_build=True)
+
+
+class TaskDependencies(BaseModel):
+    blocked_by: List[int]
+    blocks: List[int]
+
+    model_config = ConfigDict(defer_build=True)
+
+
+class ProjectSchedule(BaseModel):
+    project_id: int
+    order: List[int]
+    critical_path: List[int]
+    finish: Optional[datetime] = None
+    unblocked: List[int]
+    cyclic: List[int] = []
+
+    model_config = ConfigDict(defer_build=True)
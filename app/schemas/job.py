@@ -0,0 +1,25 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+from app.models import JobStatus
+
+
+class JobCreate(BaseModel):
+    kind: str
+    payload: Dict[str, Any] = {}
+
+
+class JobRead(BaseModel):
+    id: int
+    kind: str
+    status: JobStatus
+    payload: Dict[str, Any] = {}
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    progress: int = 0
+    total: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(from_attributes=True, defer_build=True)
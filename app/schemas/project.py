@@ -25,7 +25,7 @@ class ProjectRead(ProjectBase):
     created_at: datetime
     updated_at: datetime
     
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, defer_build=True)
 
 
 class ProjectReadWithTasks(ProjectRead):
@@ -37,8 +37,6 @@ class ProjectReadDetailed(ProjectRead):
     tasks: List["TaskRead"] = []
 
 
-# Avoid circular import
+# Avoid circular import; the forward references resolve when these are built
 from .user import UserRead
-from .task import TaskRead
-ProjectReadWithTasks.model_rebuild()
-ProjectReadDetailed.model_rebuild()
\ No newline at end of file
+from .task import TaskRead
\ No newline at end of file
@@ -0,0 +1,21 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from app.models import ProjectRole
+
+
+class ProjectMemberCreate(BaseModel):
+    user_id: int
+    role: ProjectRole = ProjectRole.VIEWER
+
+
+class ProjectMemberUpdate(BaseModel):
+    role: ProjectRole
+
+
+class ProjectMemberRead(BaseModel):
+    project_id: int
+    user_id: int
+    role: ProjectRole
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True, defer_build=True)
@@ -0,0 +1,82 @@
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+from datetime import date, datetime, time
+from typing import List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from app.models import RecurrenceFrequency, TaskPriority
+
+
+class RecurrenceRuleCreate(BaseModel):
+    title: str
+    description: Optional[str] = None
+    priority: TaskPriority = TaskPriority.MEDIUM
+    assigned_to: Optional[int] = None
+    frequency: RecurrenceFrequency
+    interval: int = Field(default=1, ge=1, le=365)
+    # 0 is Monday; weekly rules default to start_date's weekday
+    weekdays: List[int] = []
+    # Monthly rules default to start_date's day
+    month_day: Optional[int] = Field(default=None, ge=1, le=31)
+    start_date: date
+    time_of_day: time = time(9, 0)
+    timezone: str = "UTC"
+    until: Optional[date] = None
+    count: Optional[int] = Field(default=None, ge=1)
+    
+    @field_validator("weekdays")
+    @classmethod
+    def validate_weekdays(cls, v: List[int]) -> List[int]:
+        if any(weekday < 0 or weekday > 6 for weekday in v):
+            raise ValueError("Weekdays must be between 0 (Monday) and 6 (Sunday)")
+        return sorted(set(v))
+    
+    @field_validator("timezone")
+    @classmethod
+    def validate_timezone(cls, v: str) -> str:
+        try:
+            ZoneInfo(v)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown time zone: {v}")
+        return v
+    
+    @field_validator("time_of_day")
+    @classmethod
+    def strip_tzinfo(cls, v: time) -> time:
+        """The rule's own time zone applies, not an offset in the value"""
+        return v.replace(tzinfo=None)
+    
+    @model_validator(mode="after")
+    def validate_until(self):
+        if self.until is not None and self.until < self.start_date:
+            raise ValueError("until must not be before start_date")
+        return self
+
+
+class RecurrenceRuleRead(BaseModel):
+    id: int
+    project_id: int
+    title: str
+    description: Optional[str] = None
+    priority: TaskPriority
+    assigned_to: Optional[int] = None
+    frequency: RecurrenceFrequency
+    interval: int
+    weekdays: List[int]
+    month_day: Optional[int] = None
+    start_date: date
+    time_of_day: time
+    timezone: str
+    until: Optional[date] = None
+    count: Optional[int] = None
+    materialized_through: datetime
+    active: bool
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True, defer_build=True)
+    
+    @field_validator("weekdays", mode="before")
+    @classmethod
+    def unpack_weekdays(cls, v):
+        """Stored as a bit mask with Monday as bit 0"""
+        if isinstance(v, int):
+            return [weekday for weekday in range(7) if v >> weekday & 1]
+        return v
@@ -0,0 +1,16 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import List
+from typing_extensions import Annotated
+
+# Up to 30 days ahead
+MAX_LEAD_MINUTES = 30 * 24 * 60
+
+
+class ReminderPreferences(BaseModel):
+    lead_minutes: List[Annotated[int, Field(ge=1, le=MAX_LEAD_MINUTES)]] = Field(default=[], max_length=5)
+    
+    @field_validator("lead_minutes")
+    @classmethod
+    def deduplicate(cls, v: List[int]) -> List[int]:
+        """Store each lead time once, longest first"""
+        return sorted(set(v), reverse=True)
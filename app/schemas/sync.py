@@ -0,0 +1,23 @@
+from pydantic import BaseModel, ConfigDict
+from typing import List
+from .project import ProjectRead
+from .task import TaskRead
+
+
+class SyncDeleted(BaseModel):
+    projects: List[int] = []
+    tasks: List[int] = []
+
+
+class SyncRead(BaseModel):
+    # Pass back as `since` on the next sync
+    token: str
+    # More changes are waiting; sync again right away
+    has_more: bool = False
+    projects: List[ProjectRead] = []
+    tasks: List[TaskRead] = []
+    deleted: SyncDeleted = SyncDeleted()
+    # Projects just shared with the user, whose tasks must be fetched in full
+    resync_projects: List[int] = []
+
+    model_config = ConfigDict(defer_build=True)
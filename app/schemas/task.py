@@ -27,21 +27,34 @@ class TaskUpdate(BaseModel):
     due_date: Optional[datetime] = None
 
 
+class TaskMove(BaseModel):
+    before_id: Optional[int] = None
+    after_id: Optional[int] = None
+    status: Optional[TaskStatus] = None
+
+
 class TaskRead(TaskBase):
     id: int
     project_id: int
     assigned_to: Optional[int] = None
     status: TaskStatus
+    position: Optional[str] = None
+    recurrence_rule_id: Optional[int] = None
     created_at: datetime
     updated_at: datetime
     
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, defer_build=True)
+
+
+class TaskListItem(TaskRead):
+    # Virtual occurrences of recurring tasks have no row, and so no id, yet
+    id: Optional[int] = None
+    virtual: bool = False
 
 
 class TaskReadDetailed(TaskRead):
     assigned_user: Optional["UserRead"] = None
 
 
-# Avoid circular import
-from .user import UserRead
-TaskReadDetailed.model_rebuild()
\ No newline at end of file
+# Avoid circular import; the forward references resolve when these are built
+from .user import UserRead
\ No newline at end of file
@@ -26,6 +26,10 @@ class LoginRequest(BaseModel):
     password: str
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
 class UserUpdate(BaseModel):
     full_name: Optional[str] = None
     password: Optional[str] = None
@@ -37,12 +41,11 @@ class UserRead(UserBase):
     created_at: datetime
     updated_at: datetime
     
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, defer_build=True)
 
 
 class UserReadWithProjects(UserRead):
     projects: List["ProjectRead"] = []
 
-# Avoid circular import
-from .project import ProjectRead
-UserReadWithProjects.model_rebuild()
\ No newline at end of file
+# Avoid circular import; the forward references resolve when these are built
+from .project import ProjectRead
\ No newline at end of file
@@ -0,0 +1,235 @@
+"""
+Append-only activity log with write-behind batching
+
+Write handlers call `activity_log.record(...)` after they commit. That only
+appends to an in-memory ring buffer, so it adds no database round trip to
+the request. A background flusher batch-inserts buffered events every
+`activity_flush_interval_ms`, or sooner once `activity_flush_batch_size`
+events are waiting.
+
+Events the database won't take (it is down, or the process is stopping
+without one) are appended to a spool file as NDJSON and replayed on the next
+startup, so a restart doesn't lose history. The replay inserts straight from
+the file, so a spool larger than the buffer comes back whole. If the buffer
+itself overflows the oldest events are dropped, and spool lines that can't be
+read are skipped; both are counted in `activity_events_dropped_total`.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import inspect, insert
+from app.core.config import get_settings
+from app.core.metrics import Counter, Gauge
+from app.models import ActivityEvent
+
+logger = logging.getLogger(__name__)
+
+EVENTS_DROPPED = Counter(
+    "activity_events_dropped_total",
+    "Activity events lost because the buffer was full or their spool line couldn't be read",
+    ("reason",)
+)
+EVENTS_SPOOLED = Counter("activity_events_spooled_total", "Activity events written to the spool file instead of the database")
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def pending_changes(obj) -> Dict[str, List[Any]]:
+    """
+    Field -> [old, new] for the uncommitted changes on an ORM object
+
+    Call before `commit()`, which expires the object and clears its history.
+    """
+    changes = {}
+    for attr in inspect(obj).attrs:
+        history = attr.history
+        if not history.has_changes():
+            continue
+        old = history.deleted[0] if history.deleted else None
+        new = history.added[0] if history.added else None
+        if old != new:
+            changes[attr.key] = jsonable_encoder([old, new])
+    return changes
+
+
+class ActivityLog:
+    def __init__(self, buffer_size: int, batch_size: int, interval_seconds: float, spool_path: str):
+        self.buffer: Deque[dict] = deque(maxlen=buffer_size)
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.spool_path = spool_path
+        self._flush_lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def record(
+        self,
+        project_id: int,
+        user_id: Optional[int],
+        entity: str,
+        entity_id: int,
+        action: str,
+        changes: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Buffer an event; safe to call from request handlers and worker threads"""
+        if len(self.buffer) == self.buffer.maxlen:
+            EVENTS_DROPPED.inc(reason="buffer_full")
+        self.buffer.append({
+            "project_id": project_id,
+            "user_id": user_id,
+            "entity": entity,
+            "entity_id": entity_id,
+            "action": action,
+            "changes": changes or None,
+            "created_at": utcnow(),
+        })
+        if len(self.buffer) >= self.batch_size and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def flush(self, session_factory=None) -> int:
+        """
+        Insert everything buffered in batches, spooling batches that fail
+
+        Returns:
+            Number of events taken from the buffer
+        """
+        if session_factory is None:
+            from app.database import SessionLocal
+            session_factory = SessionLocal
+
+        taken = 0
+        with self._flush_lock:
+            while self.buffer:
+                batch = [self.buffer.popleft() for _ in range(min(self.batch_size, len(self.buffer)))]
+                taken += len(batch)
+                self._write(batch, session_factory)
+        return taken
+
+    def _write(self, batch: List[dict], session_factory) -> None:
+        """Insert one batch in its own transaction, spooling it if that fails"""
+        db = session_factory()
+        try:
+            db.execute(insert(ActivityEvent), batch)
+            db.commit()
+        except Exception:
+            logger.exception("Writing %d activity events failed; spooling them", len(batch))
+            db.rollback()
+            self.spool(batch)
+        finally:
+            db.close()
+
+    def spool(self, events: List[dict]) -> None:
+        with self._spool_lock, open(self.spool_path, "a", encoding="utf-8") as spool:
+            for event in events:
+                spool.write(json.dumps(jsonable_encoder(event)) + "\n")
+            spool.flush()
+            os.fsync(spool.fileno())
+        EVENTS_SPOOLED.inc(len(events))
+
+    def replay_spool(self, session_factory=None) -> int:
+        """
+        Insert events spooled by a previous run, in batches read from the file
+
+        The file is renamed first so a concurrent process appending to the
+        spool isn't lost, and removed only after its events are written (or
+        spooled again). The ring buffer isn't used, so the replay neither
+        drops events from a large spool nor pushes out newly recorded ones.
+
+        Returns:
+            Number of events replayed
+        """
+        if session_factory is None:
+            from app.database import SessionLocal
+            session_factory = SessionLocal
+        if not os.path.exists(self.spool_path):
+            return 0
+        replaying = f"{self.spool_path}.{os.getpid()}.replay"
+        os.replace(self.spool_path, replaying)
+        replayed = 0
+        with open(replaying, encoding="utf-8") as spool:
+            batch = []
+            for event in self._read_spool(spool):
+                batch.append(event)
+                if len(batch) == self.batch_size:
+                    self._write(batch, session_factory)
+                    replayed += len(batch)
+                    batch = []
+            if batch:
+                self._write(batch, session_factory)
+                replayed += len(batch)
+        os.remove(replaying)
+        logger.info("Replayed %d spooled activity events", replayed)
+        return replayed
+
+    def _read_spool(self, spool) -> Iterator[dict]:
+        for line_no, line in enumerate(spool, 1):
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line)
+                event["created_at"] = datetime.fromisoformat(event["created_at"])
+            except (ValueError, KeyError, TypeError):
+                # A torn write from a crash; the rest of the file is still good
+                logger.warning("Skipping unreadable activity spool line %d", line_no)
+                EVENTS_DROPPED.inc(reason="unreadable")
+                continue
+            yield event
+
+    def start(self) -> None:
+        """Replay the spool and start the background flusher on the running loop"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        try:
+            self.replay_spool()
+        except Exception:
+            logger.exception("Replaying the activity spool failed")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write out what is left, spooling it if the database fails"""
+        if self._task is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        self._loop = None
+        await asyncio.to_thread(self.flush)
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self.buffer:
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception:
+                    logger.exception("Activity flush failed")
+
+
+_settings = get_settings()
+activity_log = ActivityLog(
+    buffer_size=_settings.activity_buffer_size,
+    batch_size=_settings.activity_flush_batch_size,
+    interval_seconds=_settings.activity_flush_interval_ms / 1000,
+    spool_path=_settings.activity_spool_path
+)
+
+Gauge("activity_buffer_depth", "Activity events waiting to be flushed", lambda: len(activity_log))
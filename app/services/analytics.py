@@ -0,0 +1,180 @@
+"""
+Cycle time and flow analytics computed in SQL from task_status_events
+
+Everything is aggregated by the database with window functions that both
+SQLite (3.25+) and Postgres support. Only one row per week and a few scalars
+come back to Python. Results are cached per process and keyed by the
+project's newest event id, so a new status change invalidates them without
+any explicit hook.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from sqlalchemy import BigInteger, Integer, case, cast, func, literal_column, select
+from sqlalchemy.orm import Session
+from app.models import TaskStatus, TaskStatusEvent
+
+WEEK_SECONDS = 7 * 24 * 3600
+# The Unix epoch was a Thursday; weeks start on the Monday after it
+MONDAY_OFFSET = 4 * 24 * 3600
+# Julian day number of 1970-01-05 00:00 UTC
+EPOCH_MONDAY_JULIAN = 2440591.5
+CACHE_SIZE = 1024
+
+
+def week_index(column, dialect: str):
+    """Whole weeks between the first Monday after the Unix epoch and `column`"""
+    if dialect == "sqlite":
+        # julianday is several times cheaper than strftime('%s'); CAST truncates
+        # toward zero, which is a floor for every date after 1970-01-05
+        return cast((func.julianday(column) - EPOCH_MONDAY_JULIAN) / 7, Integer)
+    return (cast(func.extract("epoch", column), BigInteger) - MONDAY_OFFSET) // WEEK_SECONDS
+
+
+def seconds_between(start, end, dialect: str):
+    """Seconds from `start` to `end`; julianday is much cheaper than strftime on SQLite"""
+    if dialect == "sqlite":
+        return (func.julianday(end) - func.julianday(start)) * 86400
+    return func.extract("epoch", end - start)
+
+
+def week_start(week: int) -> datetime:
+    return datetime(1970, 1, 1) + timedelta(seconds=week * WEEK_SECONDS + MONDAY_OFFSET)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def current_week() -> int:
+    elapsed = int((utcnow() - datetime(1970, 1, 1)).total_seconds())
+    return (elapsed - MONDAY_OFFSET) // WEEK_SECONDS
+
+
+def _percentile(column, rank, count, percent: int):
+    """Nearest-rank percentile: the first value whose rank covers `percent` of rows"""
+    return func.min(case((rank * 100 >= count * percent, column)))
+
+
+def compute_analytics(db: Session, project_id: int, weeks: int) -> dict:
+    dialect = db.get_bind().dialect.name
+    E = TaskStatusEvent
+    last_week = current_week()
+    first_week = last_week - weeks + 1
+    start = week_start(first_week)
+
+    # +1 when a task enters in_progress, -1 when it leaves (including deletion)
+    wip_delta = (
+        case((E.to_status == TaskStatus.IN_PROGRESS, 1), else_=0)
+        - case((E.from_status == TaskStatus.IN_PROGRESS, 1), else_=0)
+    )
+    completed = case((E.to_status == TaskStatus.COMPLETED, 1), else_=0)
+
+    baseline = db.execute(
+        select(func.coalesce(func.sum(wip_delta), 0))
+        .where(E.project_id == project_id, E.changed_at < start)
+    ).scalar()
+
+    # Throughput per week, and WIP at the end of each week as a running sum of deltas
+    week = week_index(E.changed_at, dialect).label("week")
+    weekly = db.execute(
+        select(
+            week,
+            func.sum(completed).label("completed"),
+            func.sum(func.sum(wip_delta)).over(order_by=week).label("wip_change"),
+        )
+        .where(E.project_id == project_id, E.changed_at >= start)
+        .group_by(week)
+        .order_by(week)
+    ).all()
+
+    by_week = {row.week: row for row in weekly}
+    series = []
+    wip = baseline
+    for index in range(first_week, last_week + 1):
+        row = by_week.get(index)
+        if row is not None:
+            wip = baseline + row.wip_change
+        series.append({
+            "week_start": week_start(index).date(),
+            "completed": row.completed if row is not None else 0,
+            "wip": wip,
+        })
+
+    # Cycle time: first start to last completion, for tasks completed in the window.
+    # Timestamps are aggregated per task first so only one pair per task is subtracted
+    started_at = func.min(case((E.to_status == TaskStatus.IN_PROGRESS, E.changed_at)))
+    completed_at = func.max(case((E.to_status == TaskStatus.COMPLETED, E.changed_at)))
+    spans = (
+        select(started_at.label("started_at"), completed_at.label("completed_at"))
+        .where(E.project_id == project_id)
+        .group_by(E.task_id)
+        .having(started_at.is_not(None), completed_at >= start, completed_at >= started_at)
+        .subquery()
+    )
+    cycles = select(seconds_between(spans.c.started_at, spans.c.completed_at, dialect).label("cycle")).subquery()
+    ranked = select(
+        cycles.c.cycle,
+        func.row_number().over(order_by=cycles.c.cycle).label("rank"),
+        func.count(literal_column("*")).over().label("n"),
+    ).subquery()
+    count, median, p90 = db.execute(
+        select(
+            func.count(),
+            _percentile(ranked.c.cycle, ranked.c.rank, ranked.c.n, 50),
+            _percentile(ranked.c.cycle, ranked.c.rank, ranked.c.n, 90),
+        )
+    ).one()
+
+    return {
+        "project_id": project_id,
+        "weeks": series,
+        "cycle_time": {
+            "completed_tasks": count,
+            "median_hours": None if median is None else round(median / 3600, 2),
+            "p90_hours": None if p90 is None else round(p90 / 3600, 2),
+        },
+    }
+
+
+class AnalyticsCache:
+    """LRU of computed analytics, valid while the project's newest event id is unchanged"""
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self._entries: "OrderedDict[Tuple[int, int, int], Tuple[Optional[int], dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, version, value: dict) -> None:
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+analytics_cache = AnalyticsCache()
+
+
+def project_analytics(db: Session, project_id: int, weeks: int) -> dict:
+    """Analytics for the last `weeks` weeks, served from cache until a new event arrives"""
+    version = db.execute(
+        select(func.max(TaskStatusEvent.id)).where(TaskStatusEvent.project_id == project_id)
+    ).scalar()
+    # The current week is part of the key so the window moves on even without events
+    key = (project_id, weeks, current_week())
+    cached = analytics_cache.get(key, version)
+    if cached is not None:
+        return cached
+    result = compute_analytics(db, project_id, weeks)
+    analytics_cache.put(key, version, result)
+    return result
@@ -0,0 +1,136 @@
+"""
+Moves completed tasks out of the hot `tasks` table into `tasks_archive`
+
+Run periodically from the command line (it goes through every shard):
+
+    python -m app.services.archive --days 30 --batch-size 1000
+
+A task that still blocks an incomplete one stays until that one is done:
+deleting it would take the dependency edge with it (ON DELETE CASCADE).
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+from sqlalchemy import delete, exists, insert, literal, select
+from sqlalchemy.orm import Session, aliased
+from app.core.config import get_settings
+from app.models import Project, Task, TaskArchive, TaskDependency, TaskStatus
+from app.services.sync import record_changes
+
+
+TASK_COLUMNS = [column.name for column in Task.__table__.columns]
+
+
+def archive_completed_tasks(
+    db: Session,
+    older_than_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    owner_id: Optional[int] = None,
+    on_batch: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Archive completed tasks last updated more than `older_than_days` ago
+    
+    Rows are copied and deleted in batches of `batch_size`, each in its own
+    transaction, so locks stay short and an interrupted run can simply be
+    started again. The copy and the delete both check the task is still
+    completed, old and blocking nothing open, so one reopened (or made a
+    blocker) meanwhile stays where it is.
+    
+    Args:
+        db: Database session
+        older_than_days: Minimum age in days (defaults to settings)
+        batch_size: Tasks moved per transaction (defaults to settings)
+        owner_id: Only archive tasks in projects owned by this user
+        on_batch: Called with the running total after each batch
+    
+    Returns:
+        Number of tasks archived
+    """
+    settings = get_settings()
+    if older_than_days is None:
+        older_than_days = settings.archive_after_days
+    if batch_size is None:
+        batch_size = settings.archive_batch_size
+    
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    cutoff = now - timedelta(days=older_than_days)
+    
+    blocked = aliased(Task)
+    blocks_open_task = exists().where(
+        TaskDependency.blocking_task_id == Task.id,
+        TaskDependency.blocked_task_id == blocked.id,
+        blocked.status != TaskStatus.COMPLETED
+    )
+    archivable = (Task.status == TaskStatus.COMPLETED, Task.updated_at < cutoff, ~blocks_open_task)
+    candidates = (
+        select(Task.id, Task.project_id)
+        .where(*archivable)
+        .order_by(Task.id)
+        .limit(batch_size)
+    )
+    if owner_id is not None:
+        candidates = candidates.where(
+            Task.project_id.in_(select(Project.id).where(Project.owner_id == owner_id))
+        )
+    
+    total = 0
+    while True:
+        rows = db.execute(candidates).all()
+        if not rows:
+            break
+        ids = [task_id for task_id, _ in rows]
+        
+        # Each statement sees the latest committed rows (READ COMMITTED), so
+        # both repeat the conditions the candidates were selected by
+        db.execute(
+            insert(TaskArchive).from_select(
+                TASK_COLUMNS + ["archived_at"],
+                select(*Task.__table__.columns, literal(now)).where(Task.id.in_(ids), *archivable)
+            )
+        )
+        moved = set(db.execute(
+            delete(Task).where(Task.id.in_(ids), *archivable).returning(Task.id),
+            execution_options={"synchronize_session": False}
+        ).scalars())
+        if len(moved) < len(ids):
+            # Reopened after being copied: drop the copy
+            db.execute(delete(TaskArchive).where(
+                TaskArchive.id.in_(set(ids) - moved), TaskArchive.archived_at == now
+            ))
+        # Archived tasks leave the synced set like deleted ones
+        record_changes(
+            db, "task", ((project_id, task_id) for task_id, project_id in rows if task_id in moved), deleted=True
+        )
+        db.commit()
+        
+        total += len(moved)
+        if on_batch:
+            on_batch(total)
+    
+    return total
+
+
+def main():
+    from app.database import SessionLocal, init_engines, shard_engines
+    
+    # Shards are only known once the engines exist
+    init_engines()
+    parser = argparse.ArgumentParser(description="Archive completed tasks")
+    parser.add_argument("--days", type=int, default=None, help="Minimum age of completed tasks in days")
+    parser.add_argument("--batch-size", type=int, default=None, help="Tasks moved per transaction")
+    args = parser.parse_args()
+    
+    total = 0
+    for shard in shard_engines:
+        db = SessionLocal()
+        db.info["shard"] = shard
+        try:
+            total += archive_completed_tasks(db, older_than_days=args.days, batch_size=args.batch_size)
+        finally:
+            db.close()
+    print(f"Archived {total} tasks")
+
+
+if __name__ == "__main__":
+    main()
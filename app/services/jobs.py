@@ -0,0 +1,345 @@
+"""
+Database-backed background job queue
+
+Jobs are rows in the `jobs` table. Request handlers enqueue them and return
+immediately; workers claim the oldest queued job with
+`SELECT ... FOR UPDATE SKIP LOCKED` so several workers (in-process asyncio
+tasks or separate `python -m app.worker` processes) never run the same job.
+
+A claim comes with a lease of `JOB_LEASE_SECONDS` that a heartbeat thread
+renews while the job runs. When a worker dies, its job's lease runs out and
+the next claim takes the job again; after `JOB_MAX_ATTEMPTS` claims it is
+marked failed instead. Handlers may therefore run more than once and should
+be safe to repeat, which the batched ones here are.
+"""
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Type
+from pydantic import BaseModel
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.models import Job, JobStatus, Project, Task, TaskArchive, TaskStatus
+from app.services.activity import activity_log
+from app.services.sharding import shard_directory, sharding_enabled
+from app.services.sync import record_changes
+
+logger = logging.getLogger(__name__)
+
+
+class JobContext:
+    """Passed to handlers so they can report progress while they run"""
+
+    def __init__(self, db: Session, job: Job):
+        self.db = db
+        self.job = job
+
+    def report(self, progress: int, total: Optional[int] = None) -> None:
+        values = {"progress": progress}
+        if total is not None:
+            values["total"] = total
+        self.db.execute(update(Job).where(Job.id == self.job.id).values(**values))
+        self.db.commit()
+
+
+@dataclass
+class JobHandler:
+    func: Callable[[JobContext, BaseModel], Optional[dict]]
+    payload: Type[BaseModel]
+
+
+HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str, payload: Type[BaseModel]):
+    """Register a function as the handler for jobs of `kind`"""
+    def decorator(func):
+        HANDLERS[kind] = JobHandler(func=func, payload=payload)
+        return func
+    return decorator
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def enqueue(db: Session, kind: str, owner_id: int, payload: dict) -> Job:
+    """
+    Validate the payload for `kind` and queue a job
+
+    Raises:
+        KeyError: If no handler is registered for `kind`
+        pydantic.ValidationError: If the payload doesn't match the handler's model
+    """
+    handler = HANDLERS[kind]
+    job = Job(
+        kind=kind,
+        owner_id=owner_id,
+        payload=handler.payload.model_validate(payload).model_dump(mode="json")
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def claim_next(db: Session) -> Optional[Job]:
+    """
+    Atomically move the oldest queued or abandoned job to running and return it
+
+    A running job whose lease has expired lost its worker. It is claimed
+    again, or marked failed once it has used up `JOB_MAX_ATTEMPTS`.
+    """
+    settings = get_settings()
+    while True:
+        now = utcnow()
+        job = db.scalars(
+            select(Job)
+            .where(or_(
+                Job.status == JobStatus.QUEUED,
+                and_(Job.status == JobStatus.RUNNING, Job.lease_expires_at < now)
+            ))
+            .order_by(Job.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+        if job is None:
+            db.rollback()
+            return None
+
+        # The guard keeps the claim safe on databases without SKIP LOCKED: it
+        # only matches the job as it was read
+        unchanged = and_(Job.id == job.id, Job.status == job.status, Job.attempts == job.attempts)
+        if job.status == JobStatus.RUNNING and job.attempts >= settings.job_max_attempts:
+            db.execute(update(Job).where(unchanged).values(
+                status=JobStatus.FAILED,
+                error=f"Worker lost {job.attempts} times",
+                finished_at=now,
+                lease_expires_at=None
+            ))
+            db.commit()
+            logger.error("Job %s (%s) failed after %d abandoned attempts", job.id, job.kind, job.attempts)
+            continue
+
+        claimed = db.execute(update(Job).where(unchanged).values(
+            status=JobStatus.RUNNING,
+            started_at=now,
+            attempts=Job.attempts + 1,
+            lease_expires_at=now + timedelta(seconds=settings.job_lease_seconds)
+        )).rowcount
+        db.commit()
+        if not claimed:
+            return None
+        db.refresh(job)
+        return job
+
+
+class Heartbeat(threading.Thread):
+    """Renews a claimed job's lease from its own sessions until stopped"""
+
+    def __init__(self, session_factory, job: Job):
+        super().__init__(name=f"job-{job.id}-heartbeat", daemon=True)
+        self.session_factory = session_factory
+        self.job_id = job.id
+        self.attempt = job.attempts
+        self.lease = timedelta(seconds=get_settings().job_lease_seconds)
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.lease.total_seconds() / 3):
+            db = self.session_factory()
+            try:
+                db.execute(
+                    update(Job)
+                    .where(Job.id == self.job_id, Job.status == JobStatus.RUNNING, Job.attempts == self.attempt)
+                    .values(lease_expires_at=utcnow() + self.lease)
+                )
+                db.commit()
+            except Exception:
+                # The lease has two more renewals' worth of slack
+                logger.exception("Renewing the lease of job %s failed", self.job_id)
+            finally:
+                db.close()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+def run_job(db: Session, job: Job) -> None:
+    # Read before the handler runs; a rollback would reload the row, claims included
+    job_id, attempt = job.id, job.attempts
+    if sharding_enabled():
+        # Jobs work on their owner's data, so they run on the owner's shard
+        db.info["shard"] = shard_directory.lookup(db, job.owner_id).shard
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {job.kind}")
+        result = handler.func(JobContext(db, job), handler.payload.model_validate(job.payload))
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed", job.id, job.kind)
+        db.rollback()
+        outcome = {"status": JobStatus.FAILED, "error": str(exc)}
+    else:
+        outcome = {"status": JobStatus.SUCCEEDED, "result": result}
+    # Only while the claim is still ours: a job whose lease ran out may have been claimed again
+    db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status.in_((JobStatus.QUEUED, JobStatus.RUNNING)), Job.attempts == attempt)
+        .values(finished_at=utcnow(), lease_expires_at=None, **outcome)
+    )
+    db.commit()
+
+
+def run_pending_jobs(session_factory=None, limit: Optional[int] = None) -> int:
+    """
+    Claim and run queued jobs until none are left (or `limit` have run)
+
+    Returns:
+        Number of jobs run
+    """
+    if session_factory is None:
+        from app.database import SessionLocal
+        session_factory = SessionLocal
+
+    count = 0
+    while limit is None or count < limit:
+        db = session_factory()
+        try:
+            job = claim_next(db)
+            if job is None:
+                break
+            heartbeat = Heartbeat(session_factory, job)
+            heartbeat.start()
+            try:
+                run_job(db, job)
+            finally:
+                heartbeat.stop()
+            count += 1
+        finally:
+            db.close()
+    return count
+
+
+class JobWorkerPool:
+    """In-process workers as asyncio tasks, each running jobs in a thread"""
+
+    def __init__(self, count: int, poll_seconds: float):
+        self.count = count
+        self.poll_seconds = poll_seconds
+        self._stopping = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.count)]
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                ran = await asyncio.to_thread(run_pending_jobs, None, 1)
+            except Exception:
+                logger.exception("Job worker iteration failed")
+                ran = 0
+            if not ran:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+
+# Handlers
+
+class DeleteProjectPayload(BaseModel):
+    project_id: int
+
+
+class ArchiveTasksPayload(BaseModel):
+    older_than_days: Optional[int] = None
+
+
+class MaterializeRecurrencesPayload(BaseModel):
+    horizon_days: Optional[int] = None
+
+
+class RebalancePositionsPayload(BaseModel):
+    project_id: int
+    status: TaskStatus
+
+
+@job_handler("delete_project", payload=DeleteProjectPayload)
+def delete_project(ctx: JobContext, payload: DeleteProjectPayload) -> dict:
+    """Delete a large project in batches instead of one long transaction"""
+    db = ctx.db
+    project = db.scalars(
+        select(Project).where(Project.id == payload.project_id, Project.owner_id == ctx.job.owner_id)
+    ).first()
+    if project is None:
+        raise ValueError("Project not found")
+
+    batch_size = get_settings().job_delete_batch_size
+    deleted = 0
+    for model in (Task, TaskArchive):
+        while True:
+            ids = db.scalars(select(model.id).where(model.project_id == project.id).limit(batch_size)).all()
+            if not ids:
+                break
+            db.execute(delete(model).where(model.id.in_(ids)), execution_options={"synchronize_session": False})
+            if model is Task:
+                # Synced clients drop each batch, even if the job stops before the project goes
+                # (archived tasks got their tombstones when they were archived)
+                record_changes(db, "task", ((project.id, task_id) for task_id in ids), deleted=True)
+            db.commit()
+            deleted += len(ids)
+            ctx.report(deleted)
+
+    db.delete(project)
+    db.commit()
+    activity_log.record(payload.project_id, ctx.job.owner_id, "project", payload.project_id, "deleted")
+    return {"tasks_deleted": deleted}
+
+
+@job_handler("archive_tasks", payload=ArchiveTasksPayload)
+def archive_tasks(ctx: JobContext, payload: ArchiveTasksPayload) -> dict:
+    """Archive the owner's old completed tasks"""
+    from app.services.archive import archive_completed_tasks
+
+    archived = archive_completed_tasks(
+        ctx.db,
+        older_than_days=payload.older_than_days,
+        owner_id=ctx.job.owner_id,
+        on_batch=ctx.report
+    )
+    return {"tasks_archived": archived}
+
+
+@job_handler("rebalance_positions", payload=RebalancePositionsPayload)
+def rebalance_positions(ctx: JobContext, payload: RebalancePositionsPayload) -> dict:
+    """Give a Kanban column short position keys again once moves have grown them"""
+    from app.core.permissions import Action, ProjectPermissions
+    from app.services.positions import rebalance_column
+
+    if not ProjectPermissions(ctx.db, ctx.job.owner_id).can(payload.project_id, Action.WRITE):
+        raise ValueError("Project not found")
+    return {"tasks_moved": rebalance_column(ctx.db, payload.project_id, payload.status)}
+
+
+@job_handler("materialize_recurrences", payload=MaterializeRecurrencesPayload)
+def materialize_recurrences(ctx: JobContext, payload: MaterializeRecurrencesPayload) -> dict:
+    """Create the owner's recurring task occurrences up to the horizon"""
+    from app.services.recurrence import materialize_due_rules
+
+    created = materialize_due_rules(
+        ctx.db,
+        horizon_days=payload.horizon_days,
+        owner_id=ctx.job.owner_id,
+        on_batch=ctx.report
+    )
+    return {"tasks_created": created}
@@ -0,0 +1,248 @@
+"""
+Manual ordering of tasks within a Kanban column with fractional keys
+
+A task's `position` is a string key, and a column (project + status) is
+sorted by it bytewise. A key can always be generated strictly between two
+others, so moving a task rewrites that one row and never renumbers its
+neighbors.
+
+Keys are an integer part followed by an optional fraction, both in base 62
+(`0-9A-Za-z`, which is also ASCII order). The integer part's first
+character encodes its length, so appending to the end of a column
+increments it ("a0", "a1", ... "az", "b00") and keys grow logarithmically.
+Repeatedly inserting into the same gap grows the fraction by about one
+character every six moves; once a key passes `position_rebalance_length`,
+a background job rewrites the column with short keys.
+"""
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.models import Job, JobStatus, Project, Task, TaskStatus
+from app.services.sync import record_changes
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+INTEGER_ZERO = "a0"
+SMALLEST_INTEGER = "A" + DIGITS[0] * 26
+
+
+def _integer_length(head: str) -> int:
+    if "a" <= head <= "z":
+        return ord(head) - ord("a") + 2
+    if "A" <= head <= "Z":
+        return ord("Z") - ord(head) + 2
+    raise ValueError(f"Invalid position key head: {head!r}")
+
+
+def _integer_part(key: str) -> str:
+    length = _integer_length(key[0])
+    if length > len(key):
+        raise ValueError(f"Invalid position key: {key!r}")
+    return key[:length]
+
+
+def validate_key(key: str) -> None:
+    if key == SMALLEST_INTEGER:
+        raise ValueError(f"Invalid position key: {key!r}")
+    # A trailing zero digit would leave no room for a key just before this one
+    if key[len(_integer_part(key)):].endswith(DIGITS[0]):
+        raise ValueError(f"Invalid position key: {key!r}")
+
+
+def _increment_integer(integer: str) -> Optional[str]:
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        value = DIGITS.index(digits[i]) + 1
+        if value < len(DIGITS):
+            digits[i] = DIGITS[value]
+            return head + "".join(digits)
+        digits[i] = DIGITS[0]
+    # Every digit carried over: the integer part gets one digit longer
+    if head == "Z":
+        return INTEGER_ZERO
+    if head == "z":
+        return None
+    head = chr(ord(head) + 1)
+    if head > "a":
+        digits.append(DIGITS[0])
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def _decrement_integer(integer: str) -> Optional[str]:
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        value = DIGITS.index(digits[i]) - 1
+        if value >= 0:
+            digits[i] = DIGITS[value]
+            return head + "".join(digits)
+        digits[i] = DIGITS[-1]
+    if head == "a":
+        return "Z" + DIGITS[-1]
+    if head == "A":
+        return None
+    head = chr(ord(head) - 1)
+    if head < "Z":
+        digits.append(DIGITS[-1])
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    """A fraction strictly between fractions `a` and `b` (None means the end)"""
+    if b is not None:
+        # Skip the shared prefix; a missing digit in `a` counts as zero
+        n = 0
+        while (a[n] if n < len(a) else DIGITS[0]) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else len(DIGITS)
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    # Adjacent digits: keep `a`'s digit and go one level deeper
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def key_between(a: Optional[str], b: Optional[str]) -> str:
+    """
+    A key that sorts strictly after `a` and before `b`
+
+    Either bound may be None for the start or end of the column.
+
+    Raises:
+        ValueError: If a key is malformed or `a` doesn't sort before `b`
+    """
+    if a is not None:
+        validate_key(a)
+    if b is not None:
+        validate_key(b)
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"{a!r} does not sort before {b!r}")
+
+    if a is None and b is None:
+        return INTEGER_ZERO
+    if a is None:
+        integer = _integer_part(b)
+        fraction = b[len(integer):]
+        if integer == SMALLEST_INTEGER:
+            return integer + _midpoint("", fraction)
+        if integer < b:
+            return integer
+        previous = _decrement_integer(integer)
+        if previous is None:
+            raise ValueError("Cannot generate a key before the smallest key")
+        return previous
+
+    integer = _integer_part(a)
+    fraction = a[len(integer):]
+    if b is None:
+        following = _increment_integer(integer)
+        return integer + _midpoint(fraction, None) if following is None else following
+
+    integer_b = _integer_part(b)
+    if integer == integer_b:
+        return integer + _midpoint(fraction, b[len(integer_b):])
+    following = _increment_integer(integer)
+    if following is not None and following < b:
+        return following
+    return integer + _midpoint(fraction, None)
+
+
+def keys_between(a: Optional[str], b: Optional[str], count: int) -> List[str]:
+    """`count` ascending keys between `a` and `b`"""
+    if count <= 0:
+        return []
+    if b is None:
+        keys = []
+        for _ in range(count):
+            a = key_between(a, None)
+            keys.append(a)
+        return keys
+    if a is None:
+        keys = []
+        for _ in range(count):
+            b = key_between(None, b)
+            keys.append(b)
+        return keys[::-1]
+    # Split the gap recursively so the keys stay balanced
+    middle = count // 2
+    key = key_between(a, b)
+    return keys_between(a, key, middle) + [key] + keys_between(key, b, count - middle - 1)
+
+
+def last_position(db: Session, project_id: int, task_status: TaskStatus) -> Optional[str]:
+    """The greatest key in a column, read from the end of its index"""
+    return db.execute(
+        select(func.max(Task.position)).where(Task.project_id == project_id, Task.status == task_status)
+    ).scalar()
+
+
+def last_positions(db: Session, project_ids: Iterable[int], task_status: TaskStatus) -> Dict[int, str]:
+    """`last_position` for many projects in one query"""
+    return dict(db.execute(
+        select(Task.project_id, func.max(Task.position))
+        .where(Task.project_id.in_(set(project_ids)), Task.status == task_status)
+        .group_by(Task.project_id)
+    ).all())
+
+
+def append_position(db: Session, project_id: int, task_status: TaskStatus) -> str:
+    return key_between(last_position(db, project_id, task_status), None)
+
+
+def needs_rebalance(key: str) -> bool:
+    return len(key) > get_settings().position_rebalance_length
+
+
+def request_rebalance(db: Session, project_id: int, task_status: TaskStatus, owner_id: int) -> Optional[Job]:
+    """Queue a rebalance of the column unless one is already waiting"""
+    from app.services.jobs import enqueue
+
+    payload = {"project_id": project_id, "status": task_status.value}
+    queued = db.scalars(
+        select(Job.payload).where(Job.kind == "rebalance_positions", Job.status == JobStatus.QUEUED)
+    ).all()
+    if payload in queued:
+        return None
+    return enqueue(db, "rebalance_positions", owner_id, payload)
+
+
+def rebalance_column(db: Session, project_id: int, task_status: TaskStatus) -> int:
+    """
+    Rewrite a column's keys as short sequential keys, keeping its order
+
+    Runs in one transaction with the project row locked (on Postgres), the
+    same lock moves take, so no move can land between old and new keys.
+
+    Returns:
+        Number of tasks whose key changed
+    """
+    db.execute(select(Project.id).where(Project.id == project_id).with_for_update())
+    rows = db.execute(
+        select(Task.id, Task.position)
+        .where(Task.project_id == project_id, Task.status == task_status)
+        .order_by(Task.position, Task.id)
+    ).all()
+    keys = keys_between(None, None, len(rows))
+    changed = [
+        {"task_id": task_id, "new_position": key}
+        for (task_id, position), key in zip(rows, keys)
+        if position != key
+    ]
+    if changed:
+        db.execute(
+            update(Task.__table__)
+            .where(Task.__table__.c.id == bindparam("task_id"))
+            # Reordering isn't an edit; keep updated_at so archival ages are unchanged
+            .values(position=bindparam("new_position"), updated_at=Task.__table__.c.updated_at),
+            changed
+        )
+        record_changes(db, "task", ((project_id, change["task_id"]) for change in changed))
+    db.commit()
+    return len(changed)
@@ -0,0 +1,292 @@
+"""
+Recurring tasks: occurrence generation and lazy materialization
+
+A `RecurrenceRule` only becomes tasks within a rolling horizon
+(`RECURRENCE_HORIZON_DAYS`). `materialize_due_rules` claims the rules whose
+horizon has fallen behind in batches and bulk-inserts their new occurrences,
+one transaction per batch. Run it periodically from the command line, which
+goes through every shard, with an ID_NODE no other process uses:
+
+    ID_NODE=2 python -m app.services.recurrence --horizon-days 14
+
+or as the `materialize_recurrences` job. Occurrences past a rule's
+`materialized_through` are computed on the fly for `GET /tasks/` with
+`include_occurrences`, without writing anything.
+
+Occurrences are computed in local time and stored as naive UTC, like every
+other timestamp. A local time skipped by a DST change moves forward by the
+length of the gap (02:30 becomes 03:30), and a time that happens twice takes
+the first (daylight) instance, so an occurrence is never skipped or doubled.
+"""
+import argparse
+import calendar
+from datetime import date, datetime, time, timedelta, timezone
+from heapq import merge
+from itertools import islice
+from typing import Callable, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.models import Project, RecurrenceFrequency, RecurrenceRule, Task, TaskStatus, TaskStatusEvent
+from app.services.positions import keys_between, last_positions
+from app.services.sync import record_changes
+
+FAR_FUTURE = datetime(9999, 1, 1)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def naive_utc(value: datetime) -> datetime:
+    """Offset-aware datetimes converted to naive UTC; naive ones are taken as UTC already"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def to_utc(day: date, at: time, zone: ZoneInfo) -> datetime:
+    """Local wall-clock time as naive UTC (fold=0: gaps move forward, repeats take the first)"""
+    return datetime.combine(day, at, tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def weekday_mask(weekdays) -> int:
+    mask = 0
+    for weekday in weekdays:
+        mask |= 1 << weekday
+    return mask
+
+
+def weekday_list(mask: int) -> List[int]:
+    return [weekday for weekday in range(7) if mask >> weekday & 1]
+
+
+def _local_dates(rule, first_day: date) -> Iterator[Tuple[int, date]]:
+    """
+    (occurrence number, local date) in order, from the period containing `first_day`
+
+    Whole periods before `first_day` are skipped arithmetically, so starting
+    years into a daily rule costs the same as starting at its first day.
+    """
+    start = rule.start_date
+    step = rule.interval
+    if rule.frequency == RecurrenceFrequency.DAILY:
+        k = max(0, (first_day - start).days // step)
+        while True:
+            yield k, start + timedelta(days=k * step)
+            k += 1
+
+    elif rule.frequency == RecurrenceFrequency.WEEKLY:
+        weekdays = weekday_list(rule.weekdays) or [start.weekday()]
+        first_monday = start - timedelta(days=start.weekday())
+        # Days of the first week before start_date don't count as occurrences
+        before_start = sum(1 for weekday in weekdays if weekday < start.weekday())
+        period = max(0, (first_day - first_monday).days // 7 // step)
+        while True:
+            monday = first_monday + timedelta(weeks=period * step)
+            for i, weekday in enumerate(weekdays):
+                number = period * len(weekdays) + i - before_start
+                if number >= 0:
+                    yield number, monday + timedelta(days=weekday)
+            period += 1
+
+    else:
+        month_day = rule.month_day or start.day
+        first_month = start.year * 12 + start.month - 1
+        # The first month counts only if its (clamped) day isn't before start_date
+        skipped = 1 if min(month_day, calendar.monthrange(start.year, start.month)[1]) < start.day else 0
+        k = max(0, (first_day.year * 12 + first_day.month - 1 - first_month) // step)
+        while True:
+            year, month = divmod(first_month + k * step, 12)
+            if year > 9998:
+                return
+            day = date(year, month + 1, min(month_day, calendar.monthrange(year, month + 1)[1]))
+            if day >= start:
+                yield k - skipped, day
+            k += 1
+
+
+def occurrences(rule, start: datetime, end: datetime) -> Iterator[datetime]:
+    """Due dates (naive UTC) of the rule's occurrences in [start, end), in order"""
+    zone = ZoneInfo(rule.timezone)
+    # A day early, since the UTC bound can fall on the previous local date
+    first_day = start.replace(tzinfo=timezone.utc).astimezone(zone).date() - timedelta(days=1)
+    try:
+        for number, day in _local_dates(rule, first_day):
+            if rule.count is not None and number >= rule.count:
+                return
+            if rule.until is not None and day > rule.until:
+                return
+            due = to_utc(day, rule.time_of_day, zone)
+            if due >= end:
+                return
+            if due >= start:
+                yield due
+    except OverflowError:
+        return
+
+
+def _occurrence_stream(rule, start: datetime, end: datetime):
+    for due in occurrences(rule, max(start, rule.materialized_through), end):
+        yield due, rule.id, rule
+
+
+def virtual_occurrences(rules, start: datetime, end: datetime, limit: int) -> List[dict]:
+    """
+    The first `limit` not yet materialized occurrences of `rules` in [start, end), by due date
+
+    The per-rule generators are merged lazily, so only about `limit`
+    occurrences are computed however many rules there are.
+    """
+    merged = merge(*(_occurrence_stream(rule, start, end) for rule in rules))
+    return [
+        {
+            "id": None,
+            "title": rule.title,
+            "description": rule.description,
+            "project_id": rule.project_id,
+            "assigned_to": rule.assigned_to,
+            "status": TaskStatus.TODO,
+            "priority": rule.priority,
+            "due_date": due,
+            "position": None,
+            "recurrence_rule_id": rule.id,
+            "virtual": True,
+            "created_at": rule.created_at,
+            "updated_at": rule.created_at,
+        }
+        for due, _, rule in islice(merged, limit)
+    ]
+
+
+def materialize_rules(db: Session, rules: List[RecurrenceRule], horizon: datetime) -> int:
+    """
+    Insert the tasks for the rules' occurrences before `horizon` and advance them
+
+    Returns:
+        Number of tasks created
+    """
+    rows = []
+    for rule in rules:
+        for due in occurrences(rule, rule.materialized_through, horizon):
+            rows.append({
+                "title": rule.title,
+                "description": rule.description,
+                "project_id": rule.project_id,
+                "assigned_to": rule.assigned_to,
+                "priority": rule.priority,
+                "status": TaskStatus.TODO,
+                "due_date": due,
+                "recurrence_rule_id": rule.id,
+            })
+        rule.materialized_through = horizon
+        if next(occurrences(rule, horizon, FAR_FUTURE), None) is None:
+            rule.active = False
+
+    if rows:
+        # New occurrences join the end of their projects' to-do columns in due order
+        rows.sort(key=lambda row: (row["project_id"], row["due_date"]))
+        last = last_positions(db, (row["project_id"] for row in rows), TaskStatus.TODO)
+        i = 0
+        while i < len(rows):
+            project_id = rows[i]["project_id"]
+            j = i
+            while j < len(rows) and rows[j]["project_id"] == project_id:
+                j += 1
+            for row, position in zip(rows[i:j], keys_between(last.get(project_id), None, j - i)):
+                row["position"] = position
+            i = j
+        created = db.execute(insert(Task).returning(Task.id, Task.project_id), rows).all()
+        # Core inserts bypass the ORM hooks that record status history and sync changes
+        db.execute(insert(TaskStatusEvent), [
+            {"task_id": task_id, "project_id": project_id, "to_status": TaskStatus.TODO}
+            for task_id, project_id in created
+        ])
+        record_changes(db, "task", ((project_id, task_id) for task_id, project_id in created))
+    db.flush()
+    return len(rows)
+
+
+def materialize_due_rules(
+    db: Session,
+    horizon_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    owner_id: Optional[int] = None,
+    now: Optional[datetime] = None,
+    on_batch: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Materialize every active rule up to `horizon_days` from now
+
+    Rules are claimed `batch_size` at a time with `FOR UPDATE SKIP LOCKED`,
+    so concurrent runs share the work, and each batch commits on its own.
+
+    Args:
+        db: Database session
+        horizon_days: How far ahead tasks should exist (defaults to settings)
+        batch_size: Rules per transaction (defaults to settings)
+        owner_id: Only rules in projects owned by this user
+        now: Current time, for tests
+        on_batch: Called with the running total of tasks after each batch
+
+    Returns:
+        Number of tasks created
+    """
+    settings = get_settings()
+    if horizon_days is None:
+        horizon_days = settings.recurrence_horizon_days
+    if batch_size is None:
+        batch_size = settings.recurrence_batch_size
+    horizon = (now or utcnow()) + timedelta(days=horizon_days)
+
+    behind = (
+        select(RecurrenceRule)
+        .where(RecurrenceRule.active.is_(True), RecurrenceRule.materialized_through < horizon)
+        .order_by(RecurrenceRule.materialized_through, RecurrenceRule.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    if owner_id is not None:
+        behind = behind.where(
+            RecurrenceRule.project_id.in_(select(Project.id).where(Project.owner_id == owner_id))
+        )
+
+    total = 0
+    while True:
+        rules = db.scalars(behind).all()
+        if not rules:
+            db.rollback()
+            break
+        total += materialize_rules(db, rules, horizon)
+        db.commit()
+        if on_batch:
+            on_batch(total)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialize recurring task occurrences")
+    parser.add_argument("--horizon-days", type=int, default=None, help="How far ahead tasks should exist")
+    parser.add_argument("--batch-size", type=int, default=None, help="Rules per transaction")
+    args = parser.parse_args()
+
+    from app.core.ids import check_node
+    from app.database import SessionLocal, init_engines, shard_engines
+    # New tasks get ids from this process too
+    check_node()
+    # Shards are only known once the engines exist
+    init_engines()
+    total = 0
+    for shard in shard_engines:
+        db = SessionLocal()
+        db.info["shard"] = shard
+        try:
+            total += materialize_due_rules(db, horizon_days=args.horizon_days, batch_size=args.batch_size)
+        finally:
+            db.close()
+    print(f"Created {total} tasks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,481 @@
+"""
+Due-date reminders fired from an in-process timer heap
+
+Users choose lead times (`reminder_preferences`). A task's reminders go to
+its assignee, or to the project owner while it is unassigned, at each of
+their lead times before its due date.
+
+The scheduler never scans `tasks`. It holds a min-heap of only the reminders
+that fire in the next `REMINDER_WINDOW_MINUTES`, loaded per distinct lead
+time as a range scan on `ix_tasks_due_date`, and loads the following window
+shortly before the current one runs out. Memory is bounded by
+`REMINDER_MAX_PENDING`; if a window holds more, it is cut short at that many
+reminders and the rest come with the next load. `create_task` and
+`update_task` push reminders for the changed task straight into the heap
+when they fall inside the loaded window.
+
+Everything else that writes tasks (other processes, imports, recurrence
+materialization, user moves) appends to the change feed (app.services.sync).
+Every `REMINDER_POLL_SECONDS` the scheduler reads each shard's feed past its
+high-water mark and pushes the reminders of the tasks named there that are
+still ahead and inside the window.
+
+Entries are never removed from the heap when a task changes. When a
+reminder fires, the task is read again and the reminder is dropped if the
+due date, recipient or status no longer match.
+
+Run the scheduler in one process only (`REMINDERS_ENABLED`); each running
+scheduler delivers every reminder, reading tasks from every shard. Reminders due while no scheduler was
+running are not sent afterwards.
+"""
+import asyncio
+import heapq
+import json
+import logging
+import threading
+import urllib.request
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy import and_, distinct, func, select
+from sqlalchemy.orm import Session
+from app.core.config import Settings, get_settings
+from app.core.metrics import Counter, Gauge
+from app.database import on_shard, shard_engines
+from app.models import Project, ReminderPreference, SyncChange, Task, TaskStatus
+from app.services.sync import current_sequence, settled_sequence
+
+logger = logging.getLogger(__name__)
+
+REMINDERS_SENT = Counter("reminders_sent_total", "Reminders delivered to the sink")
+REMINDERS_SKIPPED = Counter("reminders_skipped_total", "Reminders dropped at fire time because the task changed")
+REMINDERS_FAILED = Counter("reminders_failed_total", "Reminders the sink failed to deliver")
+
+# Tasks re-read per query when reminders fire
+DELIVERY_BATCH_SIZE = 500
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@dataclass(frozen=True, order=True)
+class Reminder:
+    fire_at: datetime
+    task_id: int
+    user_id: int
+    lead_minutes: int
+    due_date: datetime
+
+    @property
+    def key(self) -> Tuple[int, int, int, datetime]:
+        return self.task_id, self.user_id, self.lead_minutes, self.due_date
+
+
+# Sinks
+
+class ReminderSink:
+    """Where reminders go; `send` runs in a worker thread and may block"""
+
+    def send(self, messages: List[dict]) -> None:
+        raise NotImplementedError
+
+
+class LogSink(ReminderSink):
+    def send(self, messages: List[dict]) -> None:
+        for message in messages:
+            logger.info(
+                "Reminder for user %s: task %s (%s) is due at %s",
+                message["user_id"], message["task_id"], message["title"], message["due_date"]
+            )
+
+
+class FileSink(ReminderSink):
+    """Appends one JSON object per reminder; meant for development and tests"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, messages: List[dict]) -> None:
+        with self._lock, open(self.path, "a", encoding="utf-8") as sink:
+            for message in messages:
+                sink.write(json.dumps(message) + "\n")
+
+
+class WebhookSink(ReminderSink):
+    """POSTs each batch as `{"reminders": [...]}`; a failed batch is logged, not retried"""
+
+    def __init__(self, url: str, timeout: float):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, messages: List[dict]) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"reminders": messages}).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+SINKS: Dict[str, Callable[[Settings], ReminderSink]] = {
+    "log": lambda settings: LogSink(),
+    "file": lambda settings: FileSink(settings.reminder_file_path),
+    "webhook": lambda settings: WebhookSink(settings.reminder_webhook_url, settings.reminder_webhook_timeout_seconds),
+}
+
+
+def make_sink(settings: Settings) -> ReminderSink:
+    """
+    Raises:
+        KeyError: If `REMINDER_SINK` isn't a registered sink
+    """
+    return SINKS[settings.reminder_sink](settings)
+
+
+# Scheduler
+
+def _recipient():
+    return func.coalesce(Task.assigned_to, Project.owner_id)
+
+
+def _upcoming(start: datetime, end: datetime, lead_minutes: int, limit: int, user_id: Optional[int] = None):
+    """Open tasks whose reminder `lead_minutes` ahead fires in [start, end), soonest first"""
+    offset = timedelta(minutes=lead_minutes)
+    query = (
+        select(Task.id, Task.due_date, ReminderPreference.user_id)
+        .join(Project, Project.id == Task.project_id)
+        .join(ReminderPreference, and_(
+            ReminderPreference.user_id == _recipient(),
+            ReminderPreference.lead_minutes == lead_minutes
+        ))
+        .where(Task.due_date >= start + offset, Task.due_date < end + offset, Task.status != TaskStatus.COMPLETED)
+        .order_by(Task.due_date)
+        .limit(limit)
+    )
+    if user_id is not None:
+        query = query.where(ReminderPreference.user_id == user_id)
+    return query
+
+
+def _reminders_of(task_ids):
+    """Every reminder of the given open tasks, with its lead time"""
+    return (
+        select(Task.id, Task.due_date, ReminderPreference.user_id, ReminderPreference.lead_minutes)
+        .join(Project, Project.id == Task.project_id)
+        .join(ReminderPreference, ReminderPreference.user_id == _recipient())
+        .where(Task.id.in_(task_ids), Task.due_date.is_not(None), Task.status != TaskStatus.COMPLETED)
+    )
+
+
+class ReminderScheduler:
+    def __init__(self, window: timedelta, max_pending: int, sink: Optional[ReminderSink] = None,
+                 poll_interval: timedelta = timedelta(seconds=5)):
+        self.window = window
+        self.max_pending = max_pending
+        self.sink = sink
+        self.poll_interval = poll_interval
+        self._heap: List[Reminder] = []
+        self._queued: Set[Tuple[int, int, int, datetime]] = set()
+        # Every reminder firing before the horizon is in the heap; None until the first load
+        self._horizon: Optional[datetime] = None
+        # Change feed entries read so far, per shard
+        self._marks: Dict[str, int] = {}
+        self._next_poll: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def horizon(self) -> Optional[datetime]:
+        return self._horizon
+
+    def _push(self, reminders: List[Reminder]) -> None:
+        with self._lock:
+            earliest = self._heap[0].fire_at if self._heap else None
+            for reminder in reminders:
+                if reminder.key not in self._queued:
+                    self._queued.add(reminder.key)
+                    heapq.heappush(self._heap, reminder)
+            woken = self._heap and (earliest is None or self._heap[0].fire_at < earliest)
+        if woken and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def load_window(self, db: Session, start: Optional[datetime] = None) -> int:
+        """
+        Load the reminders firing in the window after `start` (the current horizon by default)
+
+        The horizon moves before the queries run, so a task changed while
+        they run is pushed by `schedule_task` rather than missed; pushes and
+        loaded rows are deduplicated.
+
+        Returns:
+            Number of reminders loaded
+        """
+        with self._lock:
+            if start is None:
+                start = self._horizon or utcnow()
+            end = start + self.window
+            self._horizon = end
+
+        try:
+            leads = db.scalars(select(distinct(ReminderPreference.lead_minutes))).all()
+            found = []
+            for shard in list(shard_engines):
+                with on_shard(db, shard):
+                    if shard not in self._marks:
+                        # Later changes come through `poll_changes`
+                        self._marks[shard] = current_sequence(db)
+                    for lead in leads:
+                        offset = timedelta(minutes=lead)
+                        found.extend(
+                            Reminder(due_date - offset, task_id, user_id, lead, due_date)
+                            for task_id, due_date, user_id in db.execute(_upcoming(start, end, lead, self.max_pending + 1))
+                        )
+        except Exception:
+            # Retried from the same start on the next iteration
+            with self._lock:
+                self._horizon = start
+            raise
+        if len(found) > self.max_pending:
+            # Too many for memory: stop the window at the first reminder that doesn't fit
+            found.sort()
+            end = found[self.max_pending].fire_at
+            found = [reminder for reminder in found if reminder.fire_at < end]
+            with self._lock:
+                self._horizon = min(self._horizon, end)
+        self._push(found)
+        return len(found)
+
+    def schedule_task(self, db: Session, task: Task, now: Optional[datetime] = None) -> None:
+        """Push the reminders of a task whose due date, assignee or status just changed"""
+        horizon = self._horizon
+        if horizon is None or task.due_date is None or task.status == TaskStatus.COMPLETED:
+            return
+        now = now or utcnow()
+        if task.due_date <= now:
+            return
+        recipient = task.assigned_to or db.scalar(select(Project.owner_id).where(Project.id == task.project_id))
+        reminders = []
+        for lead in db.scalars(select(ReminderPreference.lead_minutes).where(ReminderPreference.user_id == recipient)):
+            # A lead time that has already passed fires right away
+            fire_at = max(task.due_date - timedelta(minutes=lead), now)
+            if fire_at < horizon:
+                reminders.append(Reminder(fire_at, task.id, recipient, lead, task.due_date))
+        self._push(reminders)
+
+    def poll_changes(self, db: Session, now: Optional[datetime] = None) -> int:
+        """
+        Push the reminders of tasks changed since the last poll, read from the change feed
+
+        Only reminders still ahead are pushed: the feed doesn't say what
+        changed, and one whose lead time has passed was either sent already
+        or belongs to a due date moved in this process, which `schedule_task`
+        handles. Marks only move past settled entries (app.services.sync), so
+        a write committed out of order is read as well; entries read twice
+        are deduplicated like any push.
+
+        Returns:
+            Number of reminders pushed
+        """
+        horizon = self._horizon
+        if horizon is None:
+            return 0
+        now = now or utcnow()
+        pushed = 0
+        for shard in list(shard_engines):
+            mark = self._marks.get(shard)
+            if mark is None:
+                # A shard added since the last load starts from the next one
+                continue
+            with on_shard(db, shard):
+                cursor = mark
+                while True:
+                    entries = db.execute(
+                        select(SyncChange.id, SyncChange.entity_id, SyncChange.changed_at)
+                        .where(SyncChange.id > cursor, SyncChange.entity == "task", SyncChange.deleted.is_(False))
+                        .order_by(SyncChange.id)
+                        .limit(DELIVERY_BATCH_SIZE)
+                    ).all()
+                    if not entries:
+                        break
+                    cursor = entries[-1].id
+                    mark = max(mark, settled_sequence(entries, mark))
+                    reminders = []
+                    for task_id, due_date, user_id, lead in db.execute(
+                        _reminders_of({entry.entity_id for entry in entries})
+                    ):
+                        fire_at = due_date - timedelta(minutes=lead)
+                        if now <= fire_at < horizon:
+                            reminders.append(Reminder(fire_at, task_id, user_id, lead, due_date))
+                    self._push(reminders)
+                    pushed += len(reminders)
+            self._marks[shard] = mark
+        return pushed
+
+    def schedule_user(self, db: Session, user_id: int, now: Optional[datetime] = None) -> None:
+        """Push a user's reminders in the loaded window after their lead times change"""
+        horizon = self._horizon
+        if horizon is None:
+            return
+        now = now or utcnow()
+        leads = db.scalars(select(ReminderPreference.lead_minutes).where(ReminderPreference.user_id == user_id)).all()
+        reminders = []
+        for shard in list(shard_engines):
+            with on_shard(db, shard):
+                for lead in leads:
+                    offset = timedelta(minutes=lead)
+                    reminders.extend(
+                        Reminder(due_date - offset, task_id, user_id, lead, due_date)
+                        for task_id, due_date, _ in db.execute(_upcoming(now, horizon, lead, self.max_pending, user_id))
+                    )
+        self._push(reminders)
+
+    def pop_due(self, now: Optional[datetime] = None) -> List[Reminder]:
+        now = now or utcnow()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0].fire_at <= now:
+                reminder = heapq.heappop(self._heap)
+                self._queued.discard(reminder.key)
+                due.append(reminder)
+        return due
+
+    def deliver(self, db: Session, reminders: List[Reminder]) -> int:
+        """
+        Send the reminders that still match their task, re-reading tasks in batches
+
+        Returns:
+            Number of reminders sent
+        """
+        sent = 0
+        for i in range(0, len(reminders), DELIVERY_BATCH_SIZE):
+            batch = reminders[i:i + DELIVERY_BATCH_SIZE]
+            tasks = {}
+            for shard in list(shard_engines):
+                with on_shard(db, shard):
+                    tasks.update(
+                        (row.id, row)
+                        for row in db.execute(
+                            select(Task.id, Task.title, Task.project_id, Task.due_date, Task.status,
+                                   _recipient().label("recipient"))
+                            .join(Project, Project.id == Task.project_id)
+                            .where(Task.id.in_({reminder.task_id for reminder in batch}))
+                        )
+                    )
+            preferences = set(db.execute(
+                select(ReminderPreference.user_id, ReminderPreference.lead_minutes)
+                .where(ReminderPreference.user_id.in_({reminder.user_id for reminder in batch}))
+            ).all())
+
+            messages = []
+            for reminder in batch:
+                task = tasks.get(reminder.task_id)
+                if (
+                    task is None
+                    or task.due_date != reminder.due_date
+                    or task.status == TaskStatus.COMPLETED
+                    or task.recipient != reminder.user_id
+                    or (reminder.user_id, reminder.lead_minutes) not in preferences
+                ):
+                    continue
+                messages.append({
+                    "task_id": task.id,
+                    "project_id": task.project_id,
+                    "title": task.title,
+                    "user_id": reminder.user_id,
+                    "due_date": task.due_date.isoformat(),
+                    "lead_minutes": reminder.lead_minutes,
+                })
+            REMINDERS_SKIPPED.inc(len(batch) - len(messages))
+            if not messages:
+                continue
+            try:
+                self.sink.send(messages)
+            except Exception:
+                logger.exception("Sending %d reminders failed", len(messages))
+                REMINDERS_FAILED.inc(len(messages))
+            else:
+                REMINDERS_SENT.inc(len(messages))
+                sent += len(messages)
+        return sent
+
+    def _with_session(self, method, *args):
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            return method(db, *args)
+        finally:
+            db.close()
+
+    def start(self, sink: Optional[ReminderSink] = None) -> None:
+        """Start the timer loop on the running event loop"""
+        if sink is not None:
+            self.sink = sink
+        if self.sink is None:
+            self.sink = make_sink(get_settings())
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        self._loop = None
+        with self._lock:
+            self._heap.clear()
+            self._queued.clear()
+            self._horizon = None
+            self._marks.clear()
+            self._next_poll = None
+
+    async def _run(self) -> None:
+        # The next window is loaded while a tenth of the current one is left
+        prefetch = self.window / 10
+        while not self._stopping.is_set():
+            try:
+                if self._horizon is None or utcnow() >= self._horizon - prefetch:
+                    await asyncio.to_thread(self._with_session, self.load_window)
+                if self._next_poll is None or utcnow() >= self._next_poll:
+                    self._next_poll = utcnow() + self.poll_interval
+                    await asyncio.to_thread(self._with_session, self.poll_changes)
+                due = self.pop_due()
+                if due:
+                    await asyncio.to_thread(self._with_session, self.deliver, due)
+            except Exception:
+                logger.exception("Reminder scheduler iteration failed")
+
+            wake_at = self._horizon - prefetch if self._horizon is not None else utcnow() + prefetch
+            if self._next_poll is not None:
+                wake_at = min(wake_at, self._next_poll)
+            with self._lock:
+                if self._heap:
+                    wake_at = min(wake_at, self._heap[0].fire_at)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max((wake_at - utcnow()).total_seconds(), 0.01))
+            except asyncio.TimeoutError:
+                pass
+
+
+_settings = get_settings()
+reminder_scheduler = ReminderScheduler(
+    window=timedelta(minutes=_settings.reminder_window_minutes),
+    max_pending=_settings.reminder_max_pending,
+    poll_interval=timedelta(seconds=_settings.reminder_poll_seconds)
+)
+
+Gauge("reminders_pending", "Reminders loaded into the scheduler's heap", lambda: len(reminder_scheduler))
@@ -0,0 +1,192 @@
+"""
+Dependency graph of a project's tasks
+
+Every task has a rank, its `topo_rank` or else its id, and each edge goes
+from a lower rank to a higher one. `order_dependency` keeps it that way as
+edges are added, which makes the cycle check incremental: an edge that
+already agrees with the order needs no search at all, and any other only
+searches the tasks ranked between its ends. Ids only grow (tasks never
+reuse one), so ranks stay unique, and removing an edge or a task never
+invalidates the order.
+
+`project_schedule` loads the whole graph as adjacency lists, one row per
+task, and derives the topological order, the critical path and the tasks
+that are ready to start in a few linear passes.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import String, bindparam, cast, func, select, update
+from sqlalchemy.orm import Session
+from app.models import Task, TaskDependency, TaskStatus
+
+# (task id, due date as epoch seconds, comma-separated ids of the tasks it blocks)
+TaskRow = Tuple[int, Optional[float], Optional[str]]
+
+EPOCH = datetime(1970, 1, 1)
+# Julian day number of the Unix epoch
+EPOCH_JULIAN = 2440587.5
+
+RANK = func.coalesce(Task.topo_rank, Task.id)
+
+
+def _walk(db: Session, start: int, forward: bool, within) -> Dict[int, int]:
+    """Task id -> rank of `start` and every task reachable from it (against the edges if not `forward`) within bounds"""
+    source, target = (
+        (TaskDependency.blocking_task_id, TaskDependency.blocked_task_id) if forward
+        else (TaskDependency.blocked_task_id, TaskDependency.blocking_task_id)
+    )
+    reached = select(Task.id.label("task_id"), RANK.label("task_rank")).where(Task.id == start).cte("reached", recursive=True)
+    reached = reached.union(
+        select(Task.id, RANK)
+        .join(TaskDependency, target == Task.id)
+        .where(source == reached.c.task_id, within)
+    )
+    return dict(db.execute(select(reached.c.task_id, reached.c.task_rank)).all())
+
+
+def order_dependency(db: Session, blocking_task_id: int, blocked_task_id: int) -> bool:
+    """
+    Keep the topological order valid for a new edge blocking -> blocked
+
+    If `blocking` already ranks before `blocked`, the edge can't close a
+    cycle and nothing else is read. Otherwise only the tasks ranked between
+    the two are searched (Pearce-Kelly): those `blocked` reaches, which must
+    not include `blocking`, and those that reach `blocking`. The ranks they
+    already hold are then handed out again, the second group first. The
+    caller inserts the edge.
+
+    Returns:
+        False if the edge would close a cycle, in which case nothing changed
+    """
+    if blocking_task_id == blocked_task_id:
+        return False
+    ranks = dict(db.execute(select(Task.id, RANK).where(Task.id.in_((blocking_task_id, blocked_task_id)))).all())
+    upper, lower = ranks[blocking_task_id], ranks[blocked_task_id]
+    if upper < lower:
+        return True
+
+    downstream = _walk(db, blocked_task_id, True, RANK <= upper)
+    if blocking_task_id in downstream:
+        return False
+    upstream = _walk(db, blocking_task_id, False, RANK >= lower)
+    ranks = {**downstream, **upstream}
+    moved = sorted(upstream, key=upstream.get) + sorted(downstream, key=downstream.get)
+    changed = [
+        {"task_id": task_id, "new_rank": rank}
+        for task_id, rank in zip(moved, sorted(ranks.values()))
+        if ranks[task_id] != rank
+    ]
+    db.execute(
+        update(Task.__table__)
+        .where(Task.__table__.c.id == bindparam("task_id"))
+        # Reordering isn't an edit; keep updated_at so archival ages are unchanged
+        .values(topo_rank=bindparam("new_rank"), updated_at=Task.__table__.c.updated_at),
+        changed
+    )
+    return True
+
+
+def _successor_ids(column, dialect: str):
+    if dialect == "sqlite":
+        return func.group_concat(column)
+    return func.string_agg(cast(column, String), ",")
+
+
+def _epoch_seconds(column, dialect: str):
+    # Plain numbers skip datetime parsing and compare faster than datetimes
+    if dialect == "sqlite":
+        return (func.julianday(column) - EPOCH_JULIAN) * 86400.0
+    return func.extract("epoch", column)
+
+
+def load_graph(db: Session, project_id: int) -> List[TaskRow]:
+    """
+    The project's open tasks with the ids each one blocks, in one query
+
+    Completed tasks can't block anything, so they and their edges are left out.
+    """
+    dialect = db.get_bind().dialect.name
+    return db.execute(
+        select(
+            Task.id,
+            _epoch_seconds(Task.due_date, dialect),
+            _successor_ids(TaskDependency.blocked_task_id, dialect)
+        )
+        .outerjoin(TaskDependency, TaskDependency.blocking_task_id == Task.id)
+        .where(Task.project_id == project_id, Task.status != TaskStatus.COMPLETED)
+        .group_by(Task.id)
+        .order_by(Task.id)
+    ).all()
+
+
+def compute_schedule(rows: Sequence[TaskRow]) -> dict:
+    """
+    Topological order, critical path and unblocked tasks of a dependency graph
+
+    Without durations, a task can't finish before its own due date nor before
+    any task blocking it. The critical path is the chain that determines the
+    latest such finish; ties go to the longer chain.
+    """
+    n = len(rows)
+    index = {row[0]: i for i, row in enumerate(rows)}
+    ids = [row[0] for row in rows]
+
+    # Adjacency arrays; edges to completed or archived tasks are dropped
+    successors: List[Sequence[int]] = [()] * n
+    indegree = [0] * n
+    get = index.get
+    for i, row in enumerate(rows):
+        if row[2]:
+            targets = [j for j in map(get, map(int, row[2].split(","))) if j is not None]
+            successors[i] = targets
+            for j in targets:
+                indegree[j] += 1
+    unblocked = [ids[i] for i in range(n) if indegree[i] == 0]
+
+    # Kahn's algorithm, with the list doubling as the queue. Each task is
+    # final when dequeued, so its longest path, keyed by (finish, length), is
+    # relaxed into its successors in the same pass. No due date sorts first.
+    missing = float("-inf")
+    due = [missing if row[1] is None else row[1] for row in rows]
+    finish = due[:]
+    length = [1] * n
+    previous = [-1] * n
+    order = [i for i in range(n) if indegree[i] == 0]
+    position = 0
+    while position < len(order):
+        i = order[position]
+        position += 1
+        finish_i = finish[i]
+        length_i = length[i] + 1
+        for j in successors[i]:
+            through_i = finish_i if finish_i > due[j] else due[j]
+            if through_i > finish[j] or through_i == finish[j] and length_i > length[j]:
+                finish[j] = through_i
+                length[j] = length_i
+                previous[j] = i
+            indegree[j] -= 1
+            if indegree[j] == 0:
+                order.append(j)
+
+    critical_path: List[int] = []
+    end = max(order, key=lambda i: (finish[i], length[i]), default=-1)
+    projected_finish = None
+    if end >= 0 and finish[end] != missing:
+        projected_finish = EPOCH + timedelta(milliseconds=round(finish[end] * 1000))
+    while end >= 0:
+        critical_path.append(ids[end])
+        end = previous[end]
+    critical_path.reverse()
+
+    return {
+        "order": [ids[i] for i in order],
+        "critical_path": critical_path,
+        "finish": projected_finish,
+        "unblocked": unblocked,
+        # Only a race between concurrent inserts could leave tasks here
+        "cyclic": [ids[i] for i in range(n) if indegree[i] > 0],
+    }
+
+
+def project_schedule(db: Session, project_id: int) -> dict:
+    return {"project_id": project_id, **compute_schedule(load_graph(db, project_id))}
@@ -0,0 +1,348 @@
+"""
+Owner-based sharding
+
+A user's projects, and everything in them, live on one shard: chosen when
+they register, recorded in `user_shards` on the main database, and looked up
+by `get_current_user`, which points the request's session at it
+(app.database routes statements on sharded tables there). The main database
+(`DATABASE_URL`) is a shard itself, and the only home of users, tokens,
+jobs, activity and the shard map.
+
+Users and reminder preferences are mirrored from the main database to every
+shard, so foreign keys and the joins that read them stay on one database.
+Sharing stays within a shard: adding a member who lives on another shard is
+refused, and users who share projects can't be moved. Projects, tasks and
+recurrence rules have globally unique ids (app.core.ids), so they keep them
+when they move.
+
+Move a user to another shard, online:
+
+    python -m app.services.sharding move USER_ID SHARD
+
+Copy every user to a newly added shard (or repair one after a failed mirror):
+
+    python -m app.services.sharding mirror SHARD
+"""
+import argparse
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.database import MAIN_SHARD, init_engines, shard_engines
+from app.models import (
+    Job, JobStatus, Project, ProjectMember, RecurrenceRule, ReminderPreference, SyncChange, Task, TaskArchive,
+    TaskDependency, TaskStatusEvent, User, UserShard
+)
+from app.services.sync import record_changes
+
+logger = logging.getLogger(__name__)
+
+# Copied in this order, deleted in reverse; rows of the last two get new ids on the target
+MOVED_TABLES = [
+    Project.__table__, RecurrenceRule.__table__, Task.__table__, TaskArchive.__table__,
+    TaskDependency.__table__, TaskStatusEvent.__table__,
+]
+LOCAL_ID_TABLES = {TaskDependency.__table__, TaskStatusEvent.__table__}
+
+
+class MoveError(Exception):
+    """A user can't be moved"""
+
+
+class Placement(NamedTuple):
+    shard: str
+    moving: bool
+    moves: int
+
+
+def sharding_enabled() -> bool:
+    # Shards are registered by init_engines, which may not have run yet
+    init_engines()
+    return len(shard_engines) > 1
+
+
+class ShardDirectory:
+    """User to shard lookups, cached per process for `ttl_seconds`"""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._cache: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, db: Session, user_id: int) -> Placement:
+        now = time.monotonic()
+        cached = self._cache.get(user_id)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+        row = db.execute(
+            select(UserShard.shard, UserShard.moving, UserShard.moves).where(UserShard.user_id == user_id)
+        ).first()
+        placement = Placement(*row) if row else Placement(MAIN_SHARD, False, 0)
+        with self._lock:
+            self._cache[user_id] = (placement, now + self.ttl_seconds)
+        return placement
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(user_id, None)
+
+
+shard_directory = ShardDirectory(get_settings().shard_cache_seconds)
+
+
+def place_user(db: Session, user_id: int) -> str:
+    """
+    Assign a new user to the placement shard with the fewest users
+
+    Adds the `user_shards` row to the session; the caller commits.
+    """
+    placement = get_settings().shard_placement or list(shard_engines)
+    counts = dict(db.execute(select(UserShard.shard, func.count()).group_by(UserShard.shard)).all())
+    shard = min(placement, key=lambda name: counts.get(name, 0))
+    db.add(UserShard(user_id=user_id, shard=shard))
+    return shard
+
+
+def _upsert(connection: Connection, table, rows: List[dict]) -> None:
+    existing = set(connection.scalars(select(table.c.id).where(table.c.id.in_([row["id"] for row in rows]))))
+    for row in rows:
+        if row["id"] in existing:
+            connection.execute(update(table).where(table.c.id == row["id"]).values(**row))
+    missing = [row for row in rows if row["id"] not in existing]
+    if missing:
+        connection.execute(insert(table), missing)
+
+
+def mirror_users(db: Session, user_ids: Optional[Iterable[int]] = None, shards: Optional[List[str]] = None) -> int:
+    """
+    Copy users and their reminder preferences from the main database to the shards
+
+    Call it after committing a change to either. Each shard is written in
+    its own transaction.
+
+    Args:
+        db: Session to read the main database with
+        user_ids: Users to copy (default: all)
+        shards: Shards to copy to (default: all but main)
+
+    Returns:
+        Number of users copied
+    """
+    targets = [name for name in (shards or shard_engines) if name != MAIN_SHARD]
+    if not targets:
+        return 0
+    users, preferences = User.__table__, ReminderPreference.__table__
+    batch_size = get_settings().shard_move_batch_size
+
+    query = select(users).order_by(users.c.id).limit(batch_size)
+    if user_ids is not None:
+        query = query.where(users.c.id.in_(list(user_ids)))
+    total, last_id = 0, 0
+    while True:
+        rows = [dict(row) for row in db.execute(query.where(users.c.id > last_id)).mappings()]
+        if not rows:
+            break
+        ids = [row["id"] for row in rows]
+        leads = [dict(row) for row in db.execute(select(preferences).where(preferences.c.user_id.in_(ids))).mappings()]
+        for name in targets:
+            with shard_engines[name].begin() as connection:
+                _upsert(connection, users, rows)
+                connection.execute(delete(preferences).where(preferences.c.user_id.in_(ids)))
+                if leads:
+                    connection.execute(insert(preferences), leads)
+        total += len(rows)
+        last_id = ids[-1]
+    db.rollback()
+    return total
+
+
+def _owned(table, user_id: int):
+    """Condition selecting the user's rows of a moved table"""
+    projects = Project.__table__
+    if table is projects:
+        return projects.c.owner_id == user_id
+    owned_projects = select(projects.c.id).where(projects.c.owner_id == user_id)
+    if table is TaskDependency.__table__:
+        tasks = Task.__table__
+        return table.c.blocking_task_id.in_(select(tasks.c.id).where(tasks.c.project_id.in_(owned_projects)))
+    return table.c.project_id.in_(owned_projects)
+
+
+def copy_user_data(source: Engine, target: Engine, user_id: int, batch_size: int) -> Dict[str, int]:
+    """Copy the user's rows of every moved table, `batch_size` rows per transaction"""
+    counts = {}
+    for table in MOVED_TABLES:
+        counts[table.name] = 0
+        last_id = 0
+        while True:
+            # A connection per batch, so the source's other users aren't kept waiting for it
+            with source.connect() as reader:
+                rows = [
+                    dict(row) for row in reader.execute(
+                        select(table).where(_owned(table, user_id), table.c.id > last_id)
+                        .order_by(table.c.id).limit(batch_size)
+                    ).mappings()
+                ]
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+            if table in LOCAL_ID_TABLES:
+                for row in rows:
+                    del row["id"]
+            with target.begin() as writer:
+                writer.execute(insert(table), rows)
+                if table is Task.__table__:
+                    # Arriving tasks reach the reminder scheduler through the change feed
+                    record_changes(writer, "task", ((row["project_id"], row["id"]) for row in rows))
+            counts[table.name] += len(rows)
+    return counts
+
+
+def delete_user_data(engine: Engine, user_id: int, batch_size: int) -> int:
+    """Delete the user's rows of every moved table, and their change feed, in batches"""
+    total = 0
+    tables = list(reversed(MOVED_TABLES))
+    tables.insert(tables.index(Project.__table__), SyncChange.__table__)
+    for table in tables:
+        while True:
+            with engine.begin() as connection:
+                ids = connection.scalars(select(table.c.id).where(_owned(table, user_id)).limit(batch_size)).all()
+                if ids:
+                    connection.execute(delete(table).where(table.c.id.in_(ids)))
+            if not ids:
+                break
+            total += len(ids)
+    return total
+
+
+def move_user(
+    db: Session,
+    user_id: int,
+    target: str,
+    batch_size: Optional[int] = None,
+    settle_seconds: Optional[float] = None
+) -> Dict[str, int]:
+    """
+    Move a user's data to another shard while the API stays up
+
+    1. The user is marked as moving: their writes get 503 until the move is
+       done, while reads go on from the source. The move waits
+       `settle_seconds` for every process to see the mark and for writes
+       already running to finish.
+    2. Their rows are copied to the target in batches, after clearing
+       anything an earlier failed attempt left there.
+    3. The user is switched to the target, and the move waits again until no
+       process reads from the source any more.
+    4. Their rows are deleted from the source.
+
+    The change feed isn't copied: sync tokens from before the move are
+    refused and clients sync from scratch. Copied tasks get new feed entries
+    on the target, which is how the reminder scheduler learns of them. Background passes (archival,
+    recurring tasks) that run on the source during a move may repeat work on
+    the target, but don't lose any.
+
+    Raises:
+        MoveError: If the user or shard doesn't exist, the user shares
+            projects, or has jobs queued or running
+
+    Returns:
+        Rows copied per table
+    """
+    settings = get_settings()
+    if batch_size is None:
+        batch_size = settings.shard_move_batch_size
+    if settle_seconds is None:
+        settle_seconds = settings.shard_move_settle_seconds
+    if target not in shard_engines:
+        raise MoveError(f"Unknown shard: {target}")
+    if db.get(User, user_id) is None:
+        raise MoveError(f"User {user_id} not found")
+
+    placement = db.get(UserShard, user_id)
+    if placement is None:
+        placement = UserShard(user_id=user_id, shard=MAIN_SHARD)
+        db.add(placement)
+    source = placement.shard
+    if source == target:
+        db.rollback()
+        return {}
+
+    with shard_engines[source].connect() as connection:
+        shared = connection.scalar(
+            select(ProjectMember.__table__.c.id)
+            .join(Project.__table__, Project.__table__.c.id == ProjectMember.__table__.c.project_id)
+            .where(or_(Project.__table__.c.owner_id == user_id, ProjectMember.__table__.c.user_id == user_id))
+            .limit(1)
+        )
+    if shared is not None:
+        db.rollback()
+        raise MoveError(f"User {user_id} shares projects, which can't span shards")
+    if db.scalar(select(Job.id).where(Job.owner_id == user_id, Job.status.in_((JobStatus.QUEUED, JobStatus.RUNNING))).limit(1)):
+        db.rollback()
+        raise MoveError(f"User {user_id} has jobs queued or running")
+
+    placement.moving = True
+    db.commit()
+    shard_directory.invalidate(user_id)
+    time.sleep(settle_seconds)
+
+    try:
+        delete_user_data(shard_engines[target], user_id, batch_size)
+        counts = copy_user_data(shard_engines[source], shard_engines[target], user_id, batch_size)
+    except Exception:
+        placement.moving = False
+        db.commit()
+        raise
+
+    placement.shard = target
+    placement.moving = False
+    placement.moves += 1
+    db.commit()
+    shard_directory.invalidate(user_id)
+    time.sleep(settle_seconds)
+
+    delete_user_data(shard_engines[source], user_id, batch_size)
+    logger.info("Moved user %s from %s to %s: %s", user_id, source, target, counts)
+    return counts
+
+
+def main():
+    from app.database import SessionLocal, init_engines
+
+    # Shards are only known once the engines exist
+    init_engines()
+    parser = argparse.ArgumentParser(description="Manage owner-based shards")
+    commands = parser.add_subparsers(dest="command", required=True)
+    move = commands.add_parser("move", help="Move a user's data to another shard")
+    move.add_argument("user_id", type=int)
+    move.add_argument("shard")
+    move.add_argument("--batch-size", type=int, default=None, help="Rows copied or deleted per transaction")
+    mirror = commands.add_parser("mirror", help="Copy every user to a shard")
+    mirror.add_argument("shard")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "move":
+            try:
+                counts = move_user(db, args.user_id, args.shard, batch_size=args.batch_size)
+            except MoveError as exc:
+                parser.exit(1, f"{exc}\n")
+            print(f"Moved {sum(counts.values())} rows: {counts}")
+        else:
+            if args.shard not in shard_engines:
+                parser.exit(1, f"Unknown shard: {args.shard}\n")
+            print(f"Copied {mirror_users(db, shards=[args.shard])} users")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Change feed for incremental sync
+
+Every change to a project, task or membership appends a row to
+`sync_changes`: ORM writes through the `after_flush` listener in
+`app.models.sync_change`, bulk Core writes through `record_changes`. A sync
+token is the id of the last entry a client has seen, so `GET /sync` reads
+only the entries after it, through `(project_id, id)` and `(user_id, id)`,
+and then loads the current rows for what changed. Its cost follows the
+number of changes, not the size of the account.
+
+Ids are taken in order but concurrent transactions can commit out of it, so
+a lower id may become visible after a client has already read a higher one.
+A token therefore only moves past entries older than
+`SYNC_SETTLE_SECONDS`, by which time every lower id has committed; newer
+entries are served, then served again by the next sync.
+"""
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple, Union
+from sqlalchemy import insert, select, union_all
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.models import Project, SyncChange, Task
+from app.models.sync_change import utcnow
+
+
+def record_changes(
+    db: Union[Session, Connection], entity: str, changes: Iterable[Tuple[int, int]], deleted: bool = False
+) -> None:
+    """
+    Feed a bulk Core write to the change feed
+
+    Args:
+        db: Database session or connection, in the transaction that made the change
+        entity: "project" or "task"
+        changes: (project_id, entity_id) pairs
+        deleted: Whether the rows were deleted
+    """
+    rows = [
+        {"project_id": project_id, "user_id": None, "entity": entity, "entity_id": entity_id, "deleted": deleted}
+        for project_id, entity_id in changes
+    ]
+    if rows:
+        db.execute(insert(SyncChange.__table__), rows)
+
+
+def settled_before() -> datetime:
+    """Entries written before this can no longer have a lower id commit after them"""
+    return utcnow() - timedelta(seconds=get_settings().sync_settle_seconds)
+
+
+def current_sequence(db: Session) -> int:
+    """The newest settled entry; walks the primary key back over the unsettled ones"""
+    return db.execute(
+        select(SyncChange.id)
+        .where(SyncChange.changed_at <= settled_before())
+        .order_by(SyncChange.id.desc())
+        .limit(1)
+    ).scalar() or 0
+
+
+def settled_sequence(entries: List[SyncChange], since: int) -> int:
+    """How far a token may move over `entries`: their newest settled id, else `since`"""
+    cutoff = settled_before()
+    return max((entry.id for entry in entries if entry.changed_at <= cutoff), default=since)
+
+
+def changes_since(db: Session, user_id: int, readable, since: int, limit: int) -> Tuple[List[SyncChange], bool]:
+    """
+    The user's change feed entries after `since`, in order
+
+    Returns:
+        Up to `limit` entries, and whether more follow
+    """
+    shared = (
+        select(SyncChange.id)
+        .join(readable, readable.c.project_id == SyncChange.project_id)
+        .where(SyncChange.id > since, SyncChange.user_id.is_(None))
+        .order_by(SyncChange.id)
+        .limit(limit + 1)
+    )
+    own = (
+        select(SyncChange.id)
+        .where(SyncChange.user_id == user_id, SyncChange.id > since)
+        .order_by(SyncChange.id)
+        .limit(limit + 1)
+    )
+    # Each side is limited on its own index; SQLite needs them wrapped to take a LIMIT inside a UNION
+    shared, own = shared.subquery(), own.subquery()
+    ids = union_all(select(shared.c.id), select(own.c.id)).subquery()
+    entries = db.scalars(
+        select(SyncChange).where(SyncChange.id.in_(select(ids.c.id))).order_by(SyncChange.id).limit(limit + 1)
+    ).all()
+    return entries[:limit], len(entries) > limit
+
+
+def collect(db: Session, entries: List[SyncChange]) -> dict:
+    """
+    Collapse feed entries to the latest change per entity and load current rows
+
+    An entity changed and then deleted within the page is only reported as
+    deleted. One that was changed and no longer exists (deleted or archived
+    after the page) is left out; its tombstone comes with a later page.
+    """
+    latest = {}
+    granted = set()
+    for entry in entries:
+        latest[entry.entity, entry.entity_id] = entry
+        if entry.user_id is not None:
+            # Access was just granted: the client has none of the project's tasks
+            if entry.deleted:
+                granted.discard(entry.entity_id)
+            else:
+                granted.add(entry.entity_id)
+
+    deleted = {"projects": [], "tasks": []}
+    changed = {"project": [], "task": []}
+    for (entity, entity_id), entry in latest.items():
+        if entry.deleted:
+            deleted[entity + "s"].append(entity_id)
+        else:
+            changed[entity].append(entity_id)
+
+    projects = tasks = []
+    if changed["project"]:
+        projects = db.scalars(select(Project).where(Project.id.in_(changed["project"])).order_by(Project.id)).all()
+    if changed["task"]:
+        tasks = db.scalars(select(Task).where(Task.id.in_(changed["task"])).order_by(Task.id)).all()
+    return {
+        "projects": projects,
+        "tasks": tasks,
+        "deleted": deleted,
+        "resync_projects": sorted(granted),
+    }
+
+
+def make_token(sequence: int, moves: int = 0) -> str:
+    """
+    A sync token for `sequence` on the user's shard
+
+    Sequences are per shard, so once a user has moved to another shard
+    (app.services.sharding) their tokens carry the number of moves.
+    """
+    return f"{moves}:{sequence}" if moves else str(sequence)
+
+
+def parse_token(token: Optional[str]) -> Optional[Tuple[int, int]]:
+    """The (moves, sequence) a sync token stands for; raises ValueError for a malformed token"""
+    if token is None:
+        return None
+    moves, _, since = token.rpartition(":")
+    moves, since = int(moves or 0), int(since)
+    if moves < 0 or since < 0:
+        raise ValueError(token)
+    return moves, since
@@ -0,0 +1,197 @@
+"""Refresh token rotation and access token revocation"""
+import heapq
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.core.security import create_refresh_token, hash_refresh_token
+from app.models import RefreshToken, RevokedToken, User
+
+
+class RefreshTokenError(Exception):
+    """The refresh token is unknown, expired, revoked or was reused"""
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def issue_refresh_token(db: Session, user_id: int, family_id: Optional[str] = None) -> str:
+    """
+    Create and store a new refresh token, starting a new family if none is given
+    
+    Returns:
+        The raw token to hand to the client; only its hash is stored
+    """
+    settings = get_settings()
+    token = create_refresh_token()
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=hash_refresh_token(token),
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=utcnow() + timedelta(days=settings.refresh_token_expire_days)
+    ))
+    return token
+
+
+def rotate_refresh_token(db: Session, token: str) -> tuple[RefreshToken, str]:
+    """
+    Exchange a refresh token for a new one in the same family
+    
+    Presenting a token that was already rotated or revoked means it leaked,
+    so the whole family is revoked and the caller must log in again. A token
+    of a missing or inactive user is refused without being consumed.
+    
+    Returns:
+        The consumed token row and the new raw token
+    
+    Raises:
+        RefreshTokenError: If the token can't be used
+    """
+    record = db.query(RefreshToken).filter(RefreshToken.token_hash == hash_refresh_token(token)).first()
+    if record is None:
+        raise RefreshTokenError("Invalid refresh token")
+    
+    now = utcnow()
+    if record.revoked_at is not None:
+        revoke_family(db, record.family_id)
+        db.commit()
+        raise RefreshTokenError("Refresh token reused")
+    
+    if record.expires_at <= now:
+        raise RefreshTokenError("Refresh token expired")
+    
+    if not db.scalar(select(User.is_active).where(User.id == record.user_id)):
+        raise RefreshTokenError("Invalid refresh token")
+    
+    # Only one concurrent request can consume the token; a loser is treated as reuse
+    consumed = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == record.id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    ).rowcount
+    if not consumed:
+        revoke_family(db, record.family_id)
+        db.commit()
+        raise RefreshTokenError("Refresh token reused")
+    
+    new_token = issue_refresh_token(db, record.user_id, record.family_id)
+    db.commit()
+    return record, new_token
+
+
+def revoke_family(db: Session, family_id: str) -> None:
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=utcnow())
+    )
+
+
+def revoke_refresh_token(db: Session, token: str) -> None:
+    """Revoke the family a refresh token belongs to (logout)"""
+    record = db.query(RefreshToken).filter(RefreshToken.token_hash == hash_refresh_token(token)).first()
+    if record is not None:
+        revoke_family(db, record.family_id)
+        db.commit()
+
+
+# Access token revocation
+
+# Rows committed out of order (e.g. concurrent Postgres transactions) can land
+# behind the sync watermark; re-reading this much history picks them up
+REVOCATION_OVERLAP = timedelta(seconds=30)
+
+
+class RevocationStore:
+    """
+    In-memory mirror of `revoked_tokens` for O(1) checks on every request
+    
+    Maps jti to the token's expiry. A min-heap on expiry drops entries once the
+    token would be rejected anyway, so memory is bounded by the number of
+    tokens revoked within one access token lifetime. Each process refreshes
+    incrementally from the table, reading only rows revoked since its last
+    sync.
+    """
+    
+    def __init__(self):
+        self._expiry: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self._watermark: Optional[datetime] = None
+        self._next_refresh = 0.0
+    
+    def __len__(self) -> int:
+        return len(self._expiry)
+    
+    def add(self, jti: str, exp: float) -> None:
+        with self._lock:
+            if jti not in self._expiry:
+                self._expiry[jti] = exp
+                heapq.heappush(self._heap, (exp, jti))
+    
+    def is_revoked(self, jti: str, now: Optional[float] = None) -> bool:
+        exp = self._expiry.get(jti)
+        return exp is not None and exp > (time.time() if now is None else now)
+    
+    def prune(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, jti = heapq.heappop(self._heap)
+                del self._expiry[jti]
+    
+    def refresh(self, db: Session) -> None:
+        """Load tokens revoked since the last refresh and drop expired ones"""
+        query = select(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at).where(
+            RevokedToken.expires_at > utcnow()
+        )
+        if self._watermark is not None:
+            query = query.where(RevokedToken.revoked_at >= self._watermark - REVOCATION_OVERLAP)
+        for jti, expires_at, revoked_at in db.execute(query):
+            self.add(jti, expires_at.replace(tzinfo=timezone.utc).timestamp())
+            if self._watermark is None or revoked_at > self._watermark:
+                self._watermark = revoked_at
+        self.prune()
+        self._next_refresh = time.monotonic() + get_settings().revocation_refresh_seconds
+    
+    def maybe_refresh(self, db: Session) -> None:
+        if time.monotonic() >= self._next_refresh:
+            self.refresh(db)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._expiry.clear()
+            self._heap.clear()
+            self._watermark = None
+            self._next_refresh = 0.0
+
+
+revocation_store = RevocationStore()
+
+
+def revoke_access_token(db: Session, payload: dict) -> None:
+    """
+    Revoke a decoded access token until it expires
+    
+    Tokens issued before `jti` was added can't be revoked individually and are
+    ignored; they expire within `access_token_expire_minutes`.
+    """
+    jti = payload.get("jti")
+    if not jti or revocation_store.is_revoked(jti):
+        return
+    expires_at = datetime.fromtimestamp(payload["exp"], timezone.utc).replace(tzinfo=None)
+    
+    # Purging here keeps the table as small as the in-memory set
+    db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= utcnow()))
+    db.add(RevokedToken(jti=jti, user_id=int(payload["sub"]), expires_at=expires_at))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+    revocation_store.add(jti, float(payload["exp"]))
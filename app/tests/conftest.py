@@ -1,5 +1,10 @@
 import os
-os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+# TEST_DATABASE_URL points the suite at another database, e.g. a seeded one for app/tests/perf
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL", "sqlite:///./test.db")
+# The suite logs in far more often than the login limit allows; rate limiting has its own tests
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+# /metrics answers no one by default; tests scrape it with this token
+os.environ["METRICS_TOKEN"] = "test-metrics-token"
 from app.database import Base
 from app.main import app
 from fastapi.testclient import TestClient
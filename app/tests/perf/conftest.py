@@ -0,0 +1,65 @@
+import json
+import os
+import time
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models import User
+from app.tests.perf.seed import PERF_PASSWORD, SeedConfig, seed
+
+PERF_SCALE = float(os.environ.get("PERF_SCALE", "1"))
+PERF_SEED = int(os.environ.get("PERF_SEED", "42"))
+PERF_REPORT = os.environ.get("PERF_REPORT", "perf-report.json")
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), "budgets.json")
+
+
+@pytest.fixture(scope="session")
+def perf_config():
+    """Seed the database once; a database seeded by an earlier run at the same scale is reused"""
+    config = SeedConfig.scaled(PERF_SCALE, PERF_SEED)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        seeded = db.scalar(select(func.count()).select_from(User).where(User.email.like("perf-user-%")))
+        users = db.scalar(select(func.count()).select_from(User))
+    if seeded != config.users:
+        if users:
+            pytest.exit(
+                f"The database has {users} users but scale {PERF_SCALE} needs {config.users} seeded ones; "
+                "point TEST_DATABASE_URL at an empty database", returncode=1
+            )
+        started = time.perf_counter()
+        counts = seed(engine, config)
+        print(f"\nSeeded {sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s")
+    return config
+
+
+@pytest.fixture(scope="session")
+def perf_client(perf_config):
+    client = TestClient(app)
+    response = client.post("/users/login", json={"email": "perf-user-1@example.com", "password": PERF_PASSWORD})
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    return client
+
+
+@pytest.fixture(scope="session")
+def budgets():
+    with open(BUDGETS_PATH) as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="session")
+def perf_report(perf_config, budgets):
+    """Results per endpoint, written to PERF_REPORT when the session ends"""
+    results = {}
+    yield results
+    report = {
+        "scale": PERF_SCALE,
+        "seed": perf_config.as_dict(),
+        "database": engine.dialect.name,
+        "budget_scale": budgets["scale"],
+        "endpoints": dict(sorted(results.items())),
+    }
+    with open(PERF_REPORT, "w") as f:
+        json.dump(report, f, indent=2)
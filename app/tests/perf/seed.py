@@ -0,0 +1,316 @@
+"""
+Deterministic synthetic data for the performance suite
+
+    python -m app.tests.perf.seed --scale 1 --seed 42
+
+fills the database in DATABASE_URL with, at scale 1:
+
+- 20,000 users (`perf-user-<n>@example.com`, password `PERF_PASSWORD`)
+- 2 projects per user, each shared with one other user, and 25 tasks per
+  project spread over the three Kanban columns
+- one large project owned by user 1, with 5,000 tasks in dependency chains
+  of 10 and 20 recurring rules; the suite's requests are made as user 1
+- the status history, activity and change feed rows the API would have
+  written for all of it
+
+That is about 1M tasks and 4.5M rows in all. Ids are assigned in order and
+every value comes from `random.Random(seed)` and a fixed clock, so a seed
+and scale always produce the same database. Rows are written with multi-row
+inserts of `batch_size` rows, or with `COPY` on Postgres.
+"""
+import argparse
+import csv
+import io
+import json
+import random
+import time
+from dataclasses import dataclass, fields
+from datetime import date, datetime, time as time_of_day, timedelta
+from enum import Enum
+from functools import lru_cache
+from typing import Dict, List, Optional
+from sqlalchemy import insert, text
+from sqlalchemy.engine import Engine
+from app.core.security import hash_password
+from app.models import (
+    ActivityEvent, Project, ProjectMember, ProjectRole, RecurrenceFrequency, RecurrenceRule, ReminderPreference,
+    SyncChange, Task, TaskDependency, TaskPriority, TaskStatus, TaskStatusEvent, User
+)
+from app.services.positions import keys_between
+
+PERF_PASSWORD = "perf-password"
+# Every timestamp is relative to this, not the wall clock
+BASE_TIME = datetime(2026, 1, 1)
+LARGE_PROJECT_ID = 1
+
+STATUS_WEIGHTS = {TaskStatus.TODO: 4, TaskStatus.IN_PROGRESS: 2, TaskStatus.COMPLETED: 4}
+ROLE_WEIGHTS = {ProjectRole.VIEWER: 5, ProjectRole.EDITOR: 4, ProjectRole.ADMIN: 1}
+
+# Parents before children, so every batch satisfies its foreign keys
+TABLES = [
+    User.__table__, ReminderPreference.__table__, Project.__table__, ProjectMember.__table__,
+    RecurrenceRule.__table__, Task.__table__, TaskStatusEvent.__table__, TaskDependency.__table__,
+    SyncChange.__table__, ActivityEvent.__table__,
+]
+
+
+@dataclass(frozen=True)
+class SeedConfig:
+    users: int = 20_000
+    projects_per_user: int = 2
+    tasks_per_project: int = 25
+    large_project_tasks: int = 5_000
+    recurrence_rules: int = 20
+    seed: int = 42
+    batch_size: int = 10_000
+
+    @classmethod
+    def scaled(cls, scale: float, seed: int = 42) -> "SeedConfig":
+        """The default shape with `scale` times as many users, and so projects and tasks"""
+        return cls(users=max(10, round(cls.users * scale)), seed=seed)
+
+    def as_dict(self) -> dict:
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+    def user_project_ids(self, user_id: int) -> List[int]:
+        first = 2 + (user_id - 1) * self.projects_per_user
+        return list(range(first, first + self.projects_per_user))
+
+
+@lru_cache(maxsize=None)
+def _positions(count: int) -> List[str]:
+    return keys_between(None, None, count)
+
+
+def _copy_value(value):
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, (datetime, date, time_of_day)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return value
+
+
+class BulkWriter:
+    """Buffers rows per table and writes them in batches, parents first"""
+
+    def __init__(self, engine: Engine, batch_size: int):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.copy = engine.dialect.name == "postgresql"
+        self.buffers: Dict[str, List[dict]] = {table.name: [] for table in TABLES}
+        self.counts: Dict[str, int] = {table.name: 0 for table in TABLES}
+
+    def add(self, table, row: dict) -> None:
+        buffer = self.buffers[table.name]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush(upto=table)
+
+    def flush(self, upto=None) -> None:
+        for table in TABLES:
+            rows = self.buffers[table.name]
+            if rows:
+                self._write(table, rows)
+                self.counts[table.name] += len(rows)
+                self.buffers[table.name] = []
+            if table is upto:
+                break
+
+    def _write(self, table, rows: List[dict]) -> None:
+        if not self.copy:
+            with self.engine.begin() as connection:
+                connection.execute(insert(table), rows)
+            return
+        columns = list(rows[0])
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_copy_value(row[column]) for column in columns])
+        buffer.seek(0)
+        connection = self.engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+            connection.commit()
+        finally:
+            connection.close()
+
+    def finish(self) -> None:
+        self.flush()
+        if self.copy:
+            # COPY with explicit ids leaves the serial sequences behind
+            with self.engine.begin() as connection:
+                for table in TABLES:
+                    connection.execute(text(
+                        f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), max(id)) FROM {table.name}"
+                    ))
+
+
+class Seeder:
+    def __init__(self, config: SeedConfig, writer: BulkWriter):
+        self.config = config
+        self.writer = writer
+        self.rng = random.Random(config.seed)
+        self.task_id = 0
+        self.event_id = 0
+        self.change_id = 0
+        self.activity_id = 0
+
+    def moment(self, max_days_ago: float) -> datetime:
+        return (BASE_TIME - timedelta(days=self.rng.uniform(0, max_days_ago))).replace(microsecond=0)
+
+    def change(self, project_id: int, entity: str, entity_id: int, user_id: Optional[int] = None) -> None:
+        self.change_id += 1
+        self.writer.add(SyncChange.__table__, {
+            "id": self.change_id, "project_id": project_id, "user_id": user_id, "entity": entity,
+            "entity_id": entity_id, "deleted": False, "changed_at": BASE_TIME,
+        })
+
+    def activity(self, project_id: int, user_id: int, entity: str, entity_id: int, at: datetime) -> None:
+        self.activity_id += 1
+        self.writer.add(ActivityEvent.__table__, {
+            "id": self.activity_id, "project_id": project_id, "user_id": user_id, "entity": entity,
+            "entity_id": entity_id, "action": "created", "changes": None, "created_at": at,
+        })
+
+    def status_event(self, task_id: int, project_id: int, from_status, to_status, at: datetime) -> None:
+        self.event_id += 1
+        self.writer.add(TaskStatusEvent.__table__, {
+            "id": self.event_id, "task_id": task_id, "project_id": project_id,
+            "from_status": from_status, "to_status": to_status, "changed_at": at,
+        })
+
+    def users(self) -> None:
+        password_hash = hash_password(PERF_PASSWORD)
+        for user_id in range(1, self.config.users + 1):
+            created = self.moment(365)
+            self.writer.add(User.__table__, {
+                "id": user_id, "email": f"perf-user-{user_id}@example.com", "full_name": f"Perf User {user_id}",
+                "password_hash": password_hash, "is_active": True, "created_at": created, "updated_at": created,
+            })
+        preference_id = 0
+        for user_id in range(1, self.config.users + 1, 10):
+            for lead in ((60, 1440) if user_id == 1 else (60,)):
+                preference_id += 1
+                self.writer.add(ReminderPreference.__table__, {
+                    "id": preference_id, "user_id": user_id, "lead_minutes": lead, "created_at": BASE_TIME,
+                })
+
+    def project(self, project_id: int, owner_id: int, name: str, member_id: Optional[int]) -> None:
+        created = self.moment(365)
+        self.writer.add(Project.__table__, {
+            "id": project_id, "name": name, "description": f"Seeded project {project_id}", "owner_id": owner_id,
+            "created_at": created, "updated_at": created,
+        })
+        self.change(project_id, "project", project_id)
+        self.activity(project_id, owner_id, "project", project_id, created)
+        if member_id is not None:
+            self.writer.add(ProjectMember.__table__, {
+                "id": project_id, "project_id": project_id, "user_id": member_id,
+                "role": self.rng.choices(list(ROLE_WEIGHTS), list(ROLE_WEIGHTS.values()))[0], "created_at": created,
+            })
+            self.change(project_id, "project", project_id, user_id=member_id)
+
+    def tasks(self, project_id: int, owner_id: int, member_id: Optional[int], count: int, chain: int,
+              logged: int) -> None:
+        statuses = self.rng.choices(list(STATUS_WEIGHTS), list(STATUS_WEIGHTS.values()), k=count)
+        positions = {status: iter(_positions(statuses.count(status))) for status in STATUS_WEIGHTS}
+        assignees = [owner_id, owner_id, member_id, None]
+        first_id = self.task_id + 1
+        for n, task_status in enumerate(statuses):
+            self.task_id += 1
+            task_id = self.task_id
+            created = self.moment(180)
+            updated = min(created + timedelta(days=self.rng.uniform(0, 60)), BASE_TIME).replace(microsecond=0)
+            due = None
+            if self.rng.random() < 0.7:
+                due = (BASE_TIME + timedelta(days=self.rng.uniform(-30, 90))).replace(second=0, microsecond=0)
+            self.writer.add(Task.__table__, {
+                "id": task_id, "title": f"Task {task_id}",
+                "description": f"Seeded task {task_id} in project {project_id}" if n % 3 == 0 else None,
+                "project_id": project_id, "assigned_to": self.rng.choice(assignees),
+                "status": task_status, "priority": self.rng.choice(list(TaskPriority)), "due_date": due,
+                "position": next(positions[task_status]), "recurrence_rule_id": None,
+                "created_at": created, "updated_at": updated,
+            })
+            self.status_event(task_id, project_id, None, TaskStatus.TODO, created)
+            if task_status != TaskStatus.TODO:
+                started = created + (updated - created) / 2
+                self.status_event(task_id, project_id, TaskStatus.TODO, TaskStatus.IN_PROGRESS, started)
+                if task_status == TaskStatus.COMPLETED:
+                    self.status_event(task_id, project_id, TaskStatus.IN_PROGRESS, TaskStatus.COMPLETED, updated)
+            self.change(project_id, "task", task_id)
+            if n < logged:
+                self.activity(project_id, owner_id, "task", task_id, created)
+        # Consecutive tasks form chains of `chain`: each blocks the next
+        for task_id in range(first_id, self.task_id):
+            if (task_id - first_id + 1) % chain:
+                self.writer.add(TaskDependency.__table__, {
+                    "blocking_task_id": task_id, "blocked_task_id": task_id + 1, "created_at": BASE_TIME,
+                })
+
+    def recurrence_rules(self) -> None:
+        frequencies = list(RecurrenceFrequency)
+        for rule_id in range(1, self.config.recurrence_rules + 1):
+            frequency = frequencies[rule_id % len(frequencies)]
+            self.writer.add(RecurrenceRule.__table__, {
+                "id": rule_id, "project_id": LARGE_PROJECT_ID, "created_by": 1, "title": f"Recurring {rule_id}",
+                "description": None, "priority": TaskPriority.MEDIUM, "assigned_to": 1, "frequency": frequency,
+                "interval": 1, "weekdays": 0b11111 if frequency == RecurrenceFrequency.WEEKLY else 0,
+                "month_day": rule_id % 28 + 1 if frequency == RecurrenceFrequency.MONTHLY else None,
+                "start_date": BASE_TIME.date(), "time_of_day": time_of_day(9), "timezone": "UTC", "until": None,
+                "count": None, "materialized_through": BASE_TIME, "active": True, "created_at": BASE_TIME,
+            })
+
+    def run(self) -> Dict[str, int]:
+        config = self.config
+        self.users()
+        members = {}
+        self.project(LARGE_PROJECT_ID, 1, "Large project", None)
+        for user_id in range(1, config.users + 1):
+            for project_id in config.user_project_ids(user_id):
+                member_id = self.rng.randint(1, config.users - 1)
+                members[project_id] = member_id + (member_id >= user_id)
+                self.project(project_id, user_id, f"Project {project_id}", members[project_id])
+        self.recurrence_rules()
+        self.tasks(LARGE_PROJECT_ID, 1, None, config.large_project_tasks, chain=10, logged=config.large_project_tasks)
+        for user_id in range(1, config.users + 1):
+            for project_id in config.user_project_ids(user_id):
+                self.tasks(project_id, user_id, members[project_id], config.tasks_per_project, chain=5, logged=5)
+        self.writer.finish()
+        return self.writer.counts
+
+
+def seed(engine: Engine, config: SeedConfig) -> Dict[str, int]:
+    """
+    Write the synthetic dataset into an empty database
+
+    Returns:
+        Rows written per table
+    """
+    return Seeder(config, BulkWriter(engine, config.batch_size)).run()
+
+
+def main():
+    from app.database import Base, engine
+
+    parser = argparse.ArgumentParser(description="Seed a database for the performance suite")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier on the number of users")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    config = SeedConfig.scaled(args.scale, args.seed)
+    started = time.perf_counter()
+    counts = seed(engine, config)
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    print(f"Seeded {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+    for table, count in counts.items():
+        print(f"  {table:<22}{count:>12,}")
+
+
+if __name__ == "__main__":
+    main()
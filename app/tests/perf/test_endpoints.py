@@ -0,0 +1,416 @@
+"""
+Latency, query and memory budgets for every endpoint in app/api
+
+Runs only with PERF_TESTS=1, against the database seeded by app.tests.perf.seed:
+
+    PERF_TESTS=1 TEST_DATABASE_URL=sqlite:///./perf.db python -m pytest app/tests/perf
+
+Each endpoint is requested a number of times as perf-user-1, who owns the
+large project. Anything a request needs (a task to delete, a member to
+remove) is set up before it, outside the measurement. The p95 latency and
+the median number of SQL statements must stay within budgets.json, and so
+must the peak memory Python allocates for one request (tracemalloc). The
+median leaves out statements a request only sometimes makes, such as
+refreshing the revoked token list. Latency and memory depend on the data size, so they're only checked when
+PERF_SCALE is the scale the budgets were set at; statement counts always are.
+"""
+import itertools
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Dict, Tuple
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.database import SessionLocal
+from app.main import app
+from app.services.sync import current_sequence
+from app.tests.perf.conftest import BUDGETS_PATH, PERF_SCALE
+from app.tests.perf.seed import LARGE_PROJECT_ID, PERF_PASSWORD
+
+perf = pytest.mark.skipif(os.environ.get("PERF_TESTS") != "1", reason="set PERF_TESTS=1 to run the performance suite")
+
+OTHER_PROJECT_ID = LARGE_PROJECT_ID + 1
+
+
+@dataclass
+class Scenario:
+    route: str
+    prepare: Callable[["Context"], Tuple[str, dict]]
+    expected: int = 200
+    iterations: int = 20
+
+
+SCENARIOS: Dict[str, Scenario] = {}
+
+
+def scenario(route: str, expected: int = 200, iterations: int = 20):
+    """Register the request for `route`: `prepare` does the setup and returns the URL and request arguments"""
+    def decorator(prepare):
+        SCENARIOS[route] = Scenario(route, prepare, expected, iterations)
+        return prepare
+    return decorator
+
+
+class Context:
+    """Setup helpers; their requests are checked but not measured"""
+
+    def __init__(self, client, config):
+        self.client = client
+        self.config = config
+        self.counter = itertools.count(1)
+        # Seeded users taken in turn as members of the large project; the seed adds none, earlier runs may have
+        self.candidates = itertools.cycle(range(2, min(config.users, 200) + 1))
+        self.members = {member["user_id"] for member in self.call("GET", f"/projects/{LARGE_PROJECT_ID}/members", 200)}
+
+    def call(self, method: str, url: str, expected: int, **kwargs):
+        response = self.client.request(method, url, **kwargs)
+        assert response.status_code == expected, response.text
+        return response.json() if response.content else None
+
+    def unique(self, name: str) -> str:
+        return f"{name} {next(self.counter)}"
+
+    def new_user(self) -> Tuple[dict, dict]:
+        email = f"perf-new-{time.time_ns()}@example.com"
+        self.call("POST", "/users/register", 201, json={"email": email, "full_name": "New", "password": PERF_PASSWORD})
+        tokens = self.call("POST", "/users/login", 200, json={"email": email, "password": PERF_PASSWORD})
+        return tokens, {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    def login(self) -> dict:
+        return self.call("POST", "/users/login", 200, json={"email": "perf-user-1@example.com", "password": PERF_PASSWORD})
+
+    def new_project(self) -> int:
+        return self.call("POST", "/projects/", 201, json={"name": self.unique("Perf project")})["id"]
+
+    def new_task(self) -> int:
+        return self.call("POST", "/tasks/", 201, json={"title": self.unique("Perf task"), "project_id": LARGE_PROJECT_ID})["id"]
+
+    def new_rule(self) -> int:
+        return self.call("POST", f"/projects/{LARGE_PROJECT_ID}/recurrences/", 201, json=recurrence_rule())["id"]
+
+    def member(self) -> int:
+        user_id = next(self.candidates)
+        if user_id not in self.members:
+            self.call("POST", f"/projects/{LARGE_PROJECT_ID}/members", 201, json={"user_id": user_id})
+            self.members.add(user_id)
+        return user_id
+
+    def non_member(self) -> int:
+        user_id = next(self.candidates)
+        if user_id in self.members:
+            self.call("DELETE", f"/projects/{LARGE_PROJECT_ID}/members/{user_id}", 204)
+            self.members.discard(user_id)
+        return user_id
+
+
+def recurrence_rule() -> dict:
+    return {"title": "Perf recurring", "frequency": "daily", "start_date": date.today().isoformat()}
+
+
+@scenario("POST /users/register", expected=201, iterations=10)
+def _(ctx):
+    return "/users/register", {"json": {"email": f"perf-new-{time.time_ns()}@example.com", "full_name": "New",
+                                        "password": PERF_PASSWORD}}
+
+
+@scenario("POST /users/login", iterations=10)
+def _(ctx):
+    return "/users/login", {"json": {"email": "perf-user-1@example.com", "password": PERF_PASSWORD}}
+
+
+@scenario("POST /users/refresh")
+def _(ctx):
+    return "/users/refresh", {"json": {"refresh_token": ctx.login()["refresh_token"]}}
+
+
+@scenario("POST /users/logout", expected=204)
+def _(ctx):
+    tokens = ctx.login()
+    return "/users/logout", {
+        "json": {"refresh_token": tokens["refresh_token"]},
+        "headers": {"Authorization": f"Bearer {tokens['access_token']}"},
+    }
+
+
+@scenario("GET /users/me")
+def _(ctx):
+    return "/users/me", {}
+
+
+@scenario("GET /users/me/reminders")
+def _(ctx):
+    return "/users/me/reminders", {}
+
+
+@scenario("PUT /users/me/reminders")
+def _(ctx):
+    return "/users/me/reminders", {"json": {"lead_minutes": [60, 1440]}}
+
+
+@scenario("GET /users/{user_id}")
+def _(ctx):
+    return "/users/2", {}
+
+
+@scenario("PUT /users/{user_id}")
+def _(ctx):
+    return "/users/1", {"json": {"full_name": ctx.unique("Perf User")}}
+
+
+@scenario("DELETE /users/me", expected=204, iterations=10)
+def _(ctx):
+    return "/users/me", {"headers": ctx.new_user()[1]}
+
+
+@scenario("POST /projects/", expected=201)
+def _(ctx):
+    return "/projects/", {"json": {"name": ctx.unique("Perf project")}}
+
+
+@scenario("GET /projects/")
+def _(ctx):
+    return "/projects/", {"params": {"limit": 100}}
+
+
+@scenario("GET /projects/{project_id}")
+def _(ctx):
+    return f"/projects/{LARGE_PROJECT_ID}", {}
+
+
+@scenario("PUT /projects/{project_id}")
+def _(ctx):
+    return f"/projects/{OTHER_PROJECT_ID}", {"json": {"description": ctx.unique("Updated")}}
+
+
+@scenario("DELETE /projects/{project_id}", expected=204)
+def _(ctx):
+    return f"/projects/{ctx.new_project()}", {}
+
+
+@scenario("GET /projects/{project_id}/activity")
+def _(ctx):
+    return f"/projects/{LARGE_PROJECT_ID}/activity", {}
+
+
+@scenario("GET /projects/{project_id}/analytics")
+def _(ctx):
+    # The seeded history is in the year before 2026
+    return f"/projects/{LARGE_PROJECT_ID}/analytics", {"params": {"weeks": 104}}
+
+
+@scenario("GET /projects/{project_id}/schedule")
+def _(ctx):
+    return f"/projects/{LARGE_PROJECT_ID}/schedule", {}
+
+
+@scenario("GET /projects/{project_id}/members")
+def _(ctx):
+    return f"/projects/{OTHER_PROJECT_ID}/members", {}
+
+
+@scenario("POST /projects/{project_id}/members", expected=201)
+def _(ctx):
+    user_id = ctx.non_member()
+    ctx.members.add(user_id)
+    return f"/projects/{LARGE_PROJECT_ID}/members", {"json": {"user_id": user_id, "role": "editor"}}
+
+
+@scenario("PUT /projects/{project_id}/members/{user_id}")
+def _(ctx):
+    return f"/projects/{LARGE_PROJECT_ID}/members/{ctx.member()}", {"json": {"role": "admin"}}
+
+
+@scenario("DELETE /projects/{project_id}/members/{user_id}", expected=204)
+def _(ctx):
+    user_id = ctx.member()
+    ctx.members.discard(user_id)
+    return f"/projects/{LARGE_PROJECT_ID}/members/{user_id}", {}
+
+
+@scenario("POST /tasks/", expected=201)
+def _(ctx):
+    return "/tasks/", {"json": {"title": ctx.unique("Perf task"), "project_id": LARGE_PROJECT_ID}}
+
+
+@scenario("GET /tasks/")
+def _(ctx):
+    return "/tasks/", {"params": {"project_id": LARGE_PROJECT_ID, "status": "todo", "limit": 100}}
+
+
+@scenario("GET /tasks/{task_id}")
+def _(ctx):
+    return "/tasks/1", {}
+
+
+@scenario("PUT /tasks/{task_id}")
+def _(ctx):
+    return "/tasks/1", {"json": {"title": ctx.unique("Perf task")}}
+
+
+@scenario("PATCH /tasks/{task_id}/move")
+def _(ctx):
+    # To the top of another column, and back on the next request
+    column = "in_progress" if next(ctx.counter) % 2 else "todo"
+    return "/tasks/2/move", {"json": {"status": column}}
+
+
+@scenario("DELETE /tasks/{task_id}", expected=204)
+def _(ctx):
+    return f"/tasks/{ctx.new_task()}", {}
+
+
+@scenario("GET /tasks/{task_id}/dependencies")
+def _(ctx):
+    return "/tasks/5/dependencies", {}
+
+
+@scenario("POST /tasks/{task_id}/dependencies", expected=201)
+def _(ctx):
+    # Task 10 already ranks before the new task, so the cycle check searches nothing
+    return f"/tasks/{ctx.new_task()}/dependencies", {"json": {"blocked_by": 10}}
+
+
+@scenario("DELETE /tasks/{task_id}/dependencies/{blocked_by}", expected=204)
+def _(ctx):
+    task_id = ctx.new_task()
+    ctx.call("POST", f"/tasks/{task_id}/dependencies", 201, json={"blocked_by": 10})
+    return f"/tasks/{task_id}/dependencies/10", {}
+
+
+@scenario("GET /dashboard")
+def _(ctx):
+    return "/dashboard", {}
+
+
+@scenario("GET /export", iterations=5)
+def _(ctx):
+    return "/export", {}
+
+
+@scenario("POST /import", iterations=10)
+def _(ctx):
+    rows = [{"type": "project", "id": "p", "name": ctx.unique("Imported")}]
+    rows += [{"type": "task", "title": f"Imported task {n}", "project_id": "p"} for n in range(500)]
+    return "/import", {"params": {"format": "ndjson"}, "content": "\n".join(json.dumps(row) for row in rows)}
+
+
+@scenario("POST /jobs/", expected=202)
+def _(ctx):
+    return "/jobs/", {"json": {"kind": "archive_tasks", "payload": {}}}
+
+
+@scenario("GET /jobs/{job_id}")
+def _(ctx):
+    job = ctx.call("POST", "/jobs/", 202, json={"kind": "archive_tasks", "payload": {}})
+    return f"/jobs/{job['id']}", {}
+
+
+@scenario("POST /projects/{project_id}/recurrences/", expected=201)
+def _(ctx):
+    return f"/projects/{LARGE_PROJECT_ID}/recurrences/", {"json": recurrence_rule()}
+
+
+@scenario("GET /projects/{project_id}/recurrences/")
+def _(ctx):
+    return f"/projects/{LARGE_PROJECT_ID}/recurrences/", {}
+
+
+@scenario("DELETE /projects/{project_id}/recurrences/{rule_id}", expected=204)
+def _(ctx):
+    return f"/projects/{LARGE_PROJECT_ID}/recurrences/{ctx.new_rule()}", {}
+
+
+@scenario("GET /sync")
+def _(ctx):
+    # A client that is 50 changes behind
+    with SessionLocal() as db:
+        since = current_sequence(db) - 50
+    return "/sync", {"params": {"since": str(since)}}
+
+
+def api_routes():
+    return {
+        f"{method} {route.path}"
+        for route in app.routes
+        if getattr(route, "endpoint", None) and route.endpoint.__module__.startswith("app.api")
+        for method in route.methods
+    }
+
+
+def test_every_endpoint_has_a_scenario_and_budget():
+    with open(BUDGETS_PATH) as f:
+        budgets = json.load(f)["endpoints"]
+    assert set(SCENARIOS) == api_routes()
+    assert set(budgets) == api_routes()
+
+
+@pytest.fixture(scope="module")
+def context(perf_client, perf_config):
+    return Context(perf_client, perf_config)
+
+
+@pytest.fixture(scope="module")
+def statements():
+    """Statements sent to any database, so reads routed to a replica count too"""
+    executed = []
+
+    def count(*args):
+        executed.append(args[2])
+
+    event.listen(Engine, "before_cursor_execute", count)
+    yield executed
+    event.remove(Engine, "before_cursor_execute", count)
+
+
+def measure(ctx: Context, scenario: Scenario, statements: list) -> dict:
+    method = scenario.route.split()[0]
+
+    def request():
+        url, kwargs = scenario.prepare(ctx)
+        statements.clear()
+        started = time.perf_counter()
+        response = ctx.client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - started
+        assert response.status_code == scenario.expected, f"{scenario.route}: {response.text[:500]}"
+        return elapsed, len(statements)
+
+    request()  # Warm-up
+    timings, counts = zip(*(request() for _ in range(scenario.iterations)))
+    timings = sorted(timings)
+
+    # Separately, since tracing slows everything down
+    tracemalloc.start()
+    try:
+        url, kwargs = scenario.prepare(ctx)
+        tracemalloc.reset_peak()
+        response = ctx.client.request(method, url, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert response.status_code == scenario.expected
+
+    return {
+        "iterations": scenario.iterations,
+        "p50_ms": round(statistics.median(timings) * 1000, 2),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 2),
+        "queries": sorted(counts)[len(counts) // 2],
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+@perf
+@pytest.mark.parametrize("route", list(SCENARIOS))
+def test_endpoint_budget(route, context, statements, budgets, perf_report):
+    result = measure(context, SCENARIOS[route], statements)
+    budget = budgets["endpoints"][route]
+    checked = ["queries"]
+    if budgets["scale"] == PERF_SCALE:
+        checked += ["p95_ms", "peak_kib"]
+    failures = [f"{key} {result[key]} > {budget[key]}" for key in checked if result[key] > budget[key]]
+    perf_report[route] = {**result, "budget": budget, "failures": failures}
+    assert not failures, f"{route} over budget: {', '.join(failures)}"
@@ -1,8 +1,13 @@
 from fastapi.testclient import TestClient
 from app.main import app
+from app.services.tokens import RevocationStore, revocation_store
+from app.core.config import get_settings
+from app.services.activity import activity_log
 import uuid
 
 client = TestClient(app)
+# METRICS_TOKEN is set in conftest.py
+METRICS_HEADERS = {"Authorization": "Bearer test-metrics-token"}
 
 
 def test_full_flow():
@@ -280,4 +285,2057 @@ def test_soft_delete_functionality():
     # Inactive user cannot access protected endpoints
     r = client.get("/users/me", headers=headers)
     assert r.status_code == 403
-    assert "Inactive user" in r.json()["detail"]
\ No newline at end of file
+    assert "Inactive user" in r.json()["detail"]
+
+def test_dashboard_combines_user_projects_and_tasks():
+    """Test that the dashboard returns the user, project status counts and recent tasks in one call"""
+    unique_email = f"dashboard_{uuid.uuid4().hex[:8]}@example.com"
+    
+    # Register and login
+    r = client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Dashboard User",
+        "password": "password123"
+    })
+    assert r.status_code == 201
+    
+    r = client.post("/users/login", json={
+        "email": unique_email,
+        "password": "password123"
+    })
+    token = r.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    # Create a project with tasks in two different statuses
+    r = client.post("/projects/", headers=headers, json={"name": "Dashboard Project"})
+    assert r.status_code == 201
+    project_id = r.json()["id"]
+    
+    r = client.post("/projects/", headers=headers, json={"name": "Empty Project"})
+    assert r.status_code == 201
+    empty_project_id = r.json()["id"]
+    
+    for title, task_status in [("A", "todo"), ("B", "todo"), ("C", "completed")]:
+        r = client.post("/tasks/", headers=headers, json={
+            "title": title,
+            "project_id": project_id,
+            "status": task_status
+        })
+        assert r.status_code == 201
+    
+    r = client.get("/dashboard", headers=headers)
+    assert r.status_code == 200
+    dashboard = r.json()
+    
+    assert dashboard["user"]["email"] == unique_email
+    
+    projects = {p["id"]: p for p in dashboard["projects"]}
+    assert projects[project_id]["task_counts"] == {"todo": 2, "in_progress": 0, "completed": 1}
+    assert projects[empty_project_id]["task_counts"] == {"todo": 0, "in_progress": 0, "completed": 0}
+    
+    assert {t["title"] for t in dashboard["recent_tasks"]} == {"A", "B", "C"}
+    
+    # Limits are capped at MAX_PAGE_SIZE like every other list
+    settings = get_settings()
+    max_page_size = settings.max_page_size
+    settings.max_page_size = 1
+    try:
+        dashboard = client.get("/dashboard", headers=headers, params={"project_limit": 1000, "task_limit": 1000}).json()
+    finally:
+        settings.max_page_size = max_page_size
+    assert len(dashboard["projects"]) == 1 and len(dashboard["recent_tasks"]) == 1
+    
+    # Dashboard requires authentication
+    r = client.get("/dashboard")
+    assert r.status_code in (401, 403)
+
+
+def test_archived_tasks_are_hidden_unless_requested():
+    """Test that archived completed tasks only appear with include_archived"""
+    from datetime import datetime, timedelta
+    from app.database import SessionLocal
+    from app.models import Task, TaskDependency, TaskStatus
+    from app.services.archive import archive_completed_tasks
+    
+    unique_email = f"archive_{uuid.uuid4().hex[:8]}@example.com"
+    
+    r = client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Archive User",
+        "password": "password123"
+    })
+    assert r.status_code == 201
+    user_id = r.json()["id"]
+    
+    r = client.post("/users/login", json={
+        "email": unique_email,
+        "password": "password123"
+    })
+    token = r.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    r = client.post("/projects/", headers=headers, json={"name": "Archive Project"})
+    project_id = r.json()["id"]
+    
+    r = client.post("/tasks/", headers=headers, json={"title": "Old Done", "project_id": project_id, "status": "completed"})
+    old_task_id = r.json()["id"]
+    r = client.post("/tasks/", headers=headers, json={"title": "Still Open", "project_id": project_id})
+    open_task_id = r.json()["id"]
+    
+    # Age the completed task past the archive threshold and archive it
+    db = SessionLocal()
+    try:
+        db.query(Task).filter(Task.id == old_task_id).update(
+            {Task.updated_at: datetime.utcnow() - timedelta(days=90)}
+        )
+        db.commit()
+        assert archive_completed_tasks(db, older_than_days=30, batch_size=1, owner_id=user_id) == 1
+    finally:
+        db.close()
+    
+    r = client.get(f"/tasks/?project_id={project_id}", headers=headers)
+    assert [t["id"] for t in r.json()] == [open_task_id]
+    
+    r = client.get(f"/tasks/?project_id={project_id}&include_archived=true", headers=headers)
+    assert {t["id"] for t in r.json()} == {old_task_id, open_task_id}
+    
+    r = client.get(f"/tasks/{old_task_id}", headers=headers)
+    assert r.status_code == 404
+    
+    r = client.get(f"/tasks/{old_task_id}?include_archived=true", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["title"] == "Old Done"
+    
+    # A completed task that still blocks an open one keeps its edge until that one is done
+    blocker_id = client.post("/tasks/", headers=headers, json={
+        "title": "Blocker", "project_id": project_id, "status": "completed"
+    }).json()["id"]
+    r = client.post(f"/tasks/{open_task_id}/dependencies", headers=headers, json={"blocked_by": blocker_id})
+    assert r.status_code == 201
+    db = SessionLocal()
+    try:
+        db.query(Task).filter(Task.id == blocker_id).update(
+            {Task.updated_at: datetime.utcnow() - timedelta(days=90)}
+        )
+        db.commit()
+        assert archive_completed_tasks(db, older_than_days=30, owner_id=user_id) == 0
+        assert db.query(TaskDependency).filter(TaskDependency.blocking_task_id == blocker_id).count() == 1
+        
+        db.query(Task).filter(Task.id == open_task_id).update({Task.status: TaskStatus.COMPLETED})
+        db.commit()
+        assert archive_completed_tasks(db, older_than_days=30, owner_id=user_id) == 1
+    finally:
+        db.close()
+    
+    # Deleting the project removes its archived tasks too
+    r = client.delete(f"/projects/{project_id}", headers=headers)
+    assert r.status_code == 204
+
+
+def test_export_streams_and_resumes():
+    """Test that the export streams projects then tasks and can resume from a cursor"""
+    import csv
+    import io
+    import json
+    
+    unique_email = f"export_{uuid.uuid4().hex[:8]}@example.com"
+    
+    r = client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Export User",
+        "password": "password123"
+    })
+    assert r.status_code == 201
+    
+    r = client.post("/users/login", json={
+        "email": unique_email,
+        "password": "password123"
+    })
+    token = r.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    r = client.post("/projects/", headers=headers, json={"name": "Export Project"})
+    project_id = r.json()["id"]
+    task_ids = []
+    for i in range(3):
+        r = client.post("/tasks/", headers=headers, json={"title": f"Export {i}", "project_id": project_id})
+        task_ids.append(r.json()["id"])
+    
+    # NDJSON, gzip-compressed on the wire (the client decompresses transparently)
+    r = client.get("/export?format=ndjson", headers={**headers, "Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "gzip"
+    records = [json.loads(line) for line in r.text.splitlines()]
+    assert [(rec["type"], rec["id"]) for rec in records] == [("project", project_id)] + [("task", t) for t in task_ids]
+    
+    # Resume after the first task
+    r = client.get(f"/export?cursor={records[1]['cursor']}", headers=headers)
+    resumed = [json.loads(line) for line in r.text.splitlines()]
+    assert [rec["id"] for rec in resumed] == task_ids[1:]
+    
+    # CSV with a header row
+    r = client.get("/export?format=csv", headers=headers)
+    assert r.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert [row["type"] for row in rows] == ["project", "task", "task", "task"]
+    assert rows[1]["title"] == "Export 0"
+    
+    # Invalid format and cursor
+    assert client.get("/export?format=xml", headers=headers).status_code == 400
+    assert client.get("/export?cursor=bogus", headers=headers).status_code == 400
+
+
+def test_archive_leaves_tasks_reopened_while_it_runs():
+    """Test that a task reopened between the archive's copy and delete stays a live task"""
+    from datetime import datetime, timedelta
+    from sqlalchemy import event, update
+    from app import database
+    from app.database import SessionLocal
+    from app.models import Task, TaskArchive, TaskStatus
+    from app.services.archive import archive_completed_tasks
+    
+    unique_email = f"archive_race_{uuid.uuid4().hex[:8]}@example.com"
+    user_id = client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Archive Race User",
+        "password": "password123"
+    }).json()["id"]
+    token = client.post("/users/login", json={"email": unique_email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = client.post("/projects/", headers=headers, json={"name": "Archive Race"}).json()["id"]
+    reopened_id, archived_id = (
+        client.post("/tasks/", headers=headers, json={"title": title, "project_id": project_id, "status": "completed"}).json()["id"]
+        for title in ("Reopened", "Archived")
+    )
+    
+    # Another transaction reopens the task once the copy has been made, as
+    # READ COMMITTED lets the following delete see
+    def reopen(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("DELETE FROM tasks ") and not reopened:
+            reopened.append(True)
+            conn.execute(update(Task).where(Task.id == reopened_id).values(
+                status=TaskStatus.IN_PROGRESS, updated_at=datetime.utcnow()
+            ))
+    
+    reopened = []
+    db = SessionLocal()
+    event.listen(database.engine, "before_cursor_execute", reopen)
+    try:
+        db.query(Task).filter(Task.project_id == project_id).update(
+            {Task.updated_at: datetime.utcnow() - timedelta(days=90)}
+        )
+        db.commit()
+        assert archive_completed_tasks(db, older_than_days=30, owner_id=user_id) == 1
+    finally:
+        event.remove(database.engine, "before_cursor_execute", reopen)
+        db.close()
+    assert reopened
+    
+    db = SessionLocal()
+    try:
+        assert db.get(Task, reopened_id).status == TaskStatus.IN_PROGRESS
+        assert db.get(TaskArchive, reopened_id) is None
+        assert db.get(Task, archived_id) is None
+        assert db.get(TaskArchive, archived_id) is not None
+    finally:
+        db.close()
+
+
+def test_import_ndjson_and_csv():
+    """Test that imports insert valid rows, link tasks to imported projects and report bad lines"""
+    import json
+    
+    unique_email = f"import_{uuid.uuid4().hex[:8]}@example.com"
+    
+    r = client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Import User",
+        "password": "password123"
+    })
+    assert r.status_code == 201
+    
+    r = client.post("/users/login", json={
+        "email": unique_email,
+        "password": "password123"
+    })
+    token = r.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    rows = [
+        {"type": "project", "id": 9001, "name": "Imported Project"},
+        {"type": "task", "title": "Linked Task", "project_id": 9001, "status": "in_progress"},
+        {"type": "task", "project_id": 9001},
+        {"type": "task", "title": "Orphan", "project_id": 987654321},
+    ]
+    body = "\n".join(json.dumps(row) for row in rows) + "\nnot json\n"
+    r = client.post("/import?format=ndjson", headers=headers, content=body)
+    assert r.status_code == 200
+    summary = r.json()
+    assert summary["projects_created"] == 1
+    assert summary["tasks_created"] == 1
+    assert summary["error_count"] == 3
+    assert {e["line"] for e in summary["errors"]} == {3, 4, 5}
+    
+    r = client.get("/projects/", headers=headers)
+    project_id = next(p["id"] for p in r.json() if p["name"] == "Imported Project")
+    r = client.get(f"/tasks/?project_id={project_id}", headers=headers)
+    assert [(t["title"], t["status"]) for t in r.json()] == [("Linked Task", "in_progress")]
+    
+    # CSV into an existing project, including a quoted multi-line description
+    body = (
+        "type,title,project_id,description,priority\n"
+        f'task,CSV Task,{project_id},"first line\nsecond line",high\n'
+        f"task,Second CSV Task,{project_id},,\n"
+    )
+    r = client.post("/import?format=csv", headers=headers, content=body)
+    assert r.status_code == 200
+    assert r.json()["tasks_created"] == 2
+    assert r.json()["error_count"] == 0
+    
+    r = client.get(f"/tasks/?project_id={project_id}", headers=headers)
+    csv_task = next(t for t in r.json() if t["title"] == "CSV Task")
+    assert csv_task["description"] == "first line\nsecond line"
+    assert csv_task["priority"] == "high"
+
+
+def test_import_bounds_lines_and_imports_into_shared_projects():
+    """Test that oversized lines and unterminated quotes are line errors, and shared projects take imports"""
+    import json
+    from app.core.config import get_settings
+    
+    def register(name):
+        email = f"{name}_{uuid.uuid4().hex[:8]}@example.com"
+        user = client.post("/users/register", json={"email": email, "full_name": name, "password": "password123"}).json()
+        token = client.post("/users/login", json={"email": email, "password": "password123"}).json()["access_token"]
+        return user["id"], {"Authorization": f"Bearer {token}"}
+    
+    owner_id, owner = register("import_owner")
+    member_id, member = register("import_member")
+    project_id = client.post("/projects/", headers=owner, json={"name": "Shared Import"}).json()["id"]
+    client.post(f"/projects/{project_id}/members", headers=owner, json={"user_id": member_id})
+    
+    # Viewers can't import tasks, editors can
+    row = json.dumps({"type": "task", "title": "Imported by member", "project_id": project_id})
+    r = client.post("/import?format=ndjson", headers=member, content=row).json()
+    assert r["tasks_created"] == 0
+    assert r["errors"] == [{"line": 1, "error": "Requires the editor role on this project"}]
+    client.put(f"/projects/{project_id}/members/{member_id}", headers=owner, json={"role": "editor"})
+    r = client.post("/import?format=ndjson", headers=member, content=row).json()
+    assert r["tasks_created"] == 1 and r["error_count"] == 0
+    
+    settings = get_settings()
+    max_line_bytes = settings.import_max_line_bytes
+    settings.import_max_line_bytes = 200
+    try:
+        # A line over the limit is skipped, even when it spans chunks and never ends
+        def chunks(*parts):
+            yield from (part.encode() for part in parts)
+        body = chunks(row + "\n", "x" * 150, "x" * 150 + "\n" + row + "\n", "y" * 500)
+        r = client.post("/import?format=ndjson", headers=owner, content=body).json()
+        assert r["tasks_created"] == 2
+        assert r["errors"] == [
+            {"line": 2, "error": "Line longer than 200 bytes"},
+            {"line": 4, "error": "Line longer than 200 bytes"},
+        ]
+        
+        # An unterminated quote stops buffering at the limit, and at the end of the file
+        header = "type,title,project_id,description\n"
+        body = header + f'task,Runaway,{project_id},"never closed\n' + "more text\n" * 30
+        r = client.post("/import?format=csv", headers=owner, content=body).json()
+        assert r["tasks_created"] == 0
+        assert r["errors"][0] == {"line": 2, "error": "Unterminated quote or record longer than 200 bytes"}
+        body = header + f"task,Fine,{project_id},\n" + f'task,Open,{project_id},"never closed\n'
+        r = client.post("/import?format=csv", headers=owner, content=body).json()
+        assert r["tasks_created"] == 1
+        assert r["errors"] == [{"line": 3, "error": "Unterminated quote"}]
+    finally:
+        settings.import_max_line_bytes = max_line_bytes
+
+
+def test_paused_import_stream_holds_no_connection():
+    """Test that writes go through while an import upload is waiting on the client"""
+    import asyncio
+    import json
+    import httpx
+    from app import database
+    from app.core.config import get_settings
+    
+    unique_email = f"import_pause_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Paused Import User",
+        "password": "password123"
+    })
+    r = client.post("/users/login", json={
+        "email": unique_email,
+        "password": "password123"
+    })
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    
+    settings = get_settings()
+    pool = database.engine.pool
+    batch_size, timeout = settings.import_batch_size, pool._timeout
+    # The stream pauses with a partial batch buffered, then fills it after resuming
+    settings.import_batch_size = 2
+    pool._timeout = 1.0
+    resume = asyncio.Event()
+    
+    async def body():
+        yield (json.dumps({"type": "project", "name": "Paused Import"}) + "\n").encode()
+        await resume.wait()
+        for name in ("Resumed Import", "Last Import"):
+            yield (json.dumps({"type": "project", "name": name}) + "\n").encode()
+    
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            upload = asyncio.create_task(c.post("/import?format=ndjson", headers=headers, content=body()))
+            await asyncio.sleep(0.2)
+            write = await c.post("/projects/", headers=headers, json={"name": "Written Meanwhile"})
+            resume.set()
+            return await upload, write
+    
+    try:
+        upload, write = asyncio.run(scenario())
+    finally:
+        settings.import_batch_size = batch_size
+        pool._timeout = timeout
+    assert write.status_code == 201
+    assert upload.status_code == 200
+    assert upload.json()["projects_created"] == 3
+    
+    names = {p["name"] for p in client.get("/projects/", headers=headers).json()}
+    assert {"Paused Import", "Resumed Import", "Last Import", "Written Meanwhile"} <= names
+
+
+def test_background_jobs():
+    """Test that jobs are queued, run by a worker and report their result"""
+    from app.database import SessionLocal
+    from app.models import SyncChange
+    from app.services.jobs import run_pending_jobs
+    
+    unique_email = f"jobs_{uuid.uuid4().hex[:8]}@example.com"
+    
+    r = client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Jobs User",
+        "password": "password123"
+    })
+    assert r.status_code == 201
+    
+    r = client.post("/users/login", json={
+        "email": unique_email,
+        "password": "password123"
+    })
+    token = r.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    r = client.post("/projects/", headers=headers, json={"name": "Doomed Project"})
+    project_id = r.json()["id"]
+    task_ids = [
+        client.post("/tasks/", headers=headers, json={"title": f"Doomed {i}", "project_id": project_id}).json()["id"]
+        for i in range(3)
+    ]
+    
+    r = client.post("/jobs/", headers=headers, json={"kind": "delete_project", "payload": {"project_id": project_id}})
+    assert r.status_code == 202
+    job = r.json()
+    assert job["status"] == "queued"
+    
+    # Unknown kinds and bad payloads are rejected up front
+    assert client.post("/jobs/", headers=headers, json={"kind": "nope"}).status_code == 400
+    assert client.post("/jobs/", headers=headers, json={"kind": "delete_project", "payload": {}}).status_code == 422
+    
+    assert run_pending_jobs() >= 1
+    
+    r = client.get(f"/jobs/{job['id']}", headers=headers)
+    assert r.status_code == 200
+    job = r.json()
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"tasks_deleted": 3}
+    assert job["progress"] == 3
+    
+    r = client.get(f"/projects/{project_id}", headers=headers)
+    assert r.status_code == 404
+    
+    # The batched deletes leave tombstones in the change feed, like deleting through the API
+    db = SessionLocal()
+    try:
+        tombstones = set(db.query(SyncChange.entity, SyncChange.entity_id).filter(
+            SyncChange.project_id == project_id, SyncChange.deleted.is_(True)
+        ))
+    finally:
+        db.close()
+    assert tombstones == {("project", project_id)} | {("task", task_id) for task_id in task_ids}
+    
+    # A job for a project the user doesn't own fails without touching it
+    r = client.post("/jobs/", headers=headers, json={"kind": "delete_project", "payload": {"project_id": project_id}})
+    run_pending_jobs()
+    r = client.get(f"/jobs/{r.json()['id']}", headers=headers)
+    assert r.json()["status"] == "failed"
+    assert r.json()["error"] == "Project not found"
+
+
+def test_abandoned_jobs_are_claimed_again():
+    """Test that a running job whose lease ran out is retried, then failed after too many attempts"""
+    from datetime import timedelta
+    from app.core.config import get_settings
+    from app.database import SessionLocal
+    from app.models import Job, JobStatus
+    from app.services.jobs import claim_next, run_pending_jobs, utcnow
+    
+    unique_email = f"leases_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Lease User",
+        "password": "password123"
+    })
+    r = client.post("/users/login", json={
+        "email": unique_email,
+        "password": "password123"
+    })
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    project_id = client.post("/projects/", headers=headers, json={"name": "Lease Project"}).json()["id"]
+    
+    run_pending_jobs()
+    job_id = client.post("/jobs/", headers=headers, json={
+        "kind": "delete_project", "payload": {"project_id": project_id}
+    }).json()["id"]
+    
+    # A worker claims the job and dies with it
+    db = SessionLocal()
+    try:
+        job = claim_next(db)
+        assert job.id == job_id
+        assert job.attempts == 1
+        assert job.lease_expires_at > utcnow()
+        # A live lease keeps other workers off the job
+        assert claim_next(db) is None
+        job.lease_expires_at = utcnow() - timedelta(seconds=1)
+        db.commit()
+    finally:
+        db.close()
+    
+    # The next worker picks it up again once the lease has run out
+    assert run_pending_jobs() == 1
+    job = client.get(f"/jobs/{job_id}", headers=headers).json()
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"tasks_deleted": 0}
+    
+    # A job that keeps losing its worker is given up on
+    project_id = client.post("/projects/", headers=headers, json={"name": "Cursed Project"}).json()["id"]
+    job_id = client.post("/jobs/", headers=headers, json={
+        "kind": "delete_project", "payload": {"project_id": project_id}
+    }).json()["id"]
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        job.status = JobStatus.RUNNING
+        job.attempts = get_settings().job_max_attempts
+        job.lease_expires_at = utcnow() - timedelta(seconds=1)
+        db.commit()
+    finally:
+        db.close()
+    assert run_pending_jobs() == 0
+    job = client.get(f"/jobs/{job_id}", headers=headers).json()
+    assert job["status"] == "failed"
+    assert client.get(f"/projects/{project_id}", headers=headers).status_code == 200
+
+
+def test_refresh_token_rotation_and_logout():
+    """Test that refresh tokens rotate, detect reuse and are revoked on logout"""
+    unique_email = f"refresh_{uuid.uuid4().hex[:8]}@example.com"
+    
+    r = client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Refresh User",
+        "password": "password123"
+    })
+    assert r.status_code == 201
+    
+    r = client.post("/users/login", json={
+        "email": unique_email,
+        "password": "password123"
+    })
+    assert r.status_code == 200
+    first_refresh = r.json()["refresh_token"]
+    
+    # Refreshing returns a working access token and a new refresh token
+    r = client.post("/users/refresh", json={"refresh_token": first_refresh})
+    assert r.status_code == 200
+    second_refresh = r.json()["refresh_token"]
+    assert second_refresh != first_refresh
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    assert client.get("/users/me", headers=headers).status_code == 200
+    
+    # Reusing a rotated token revokes the whole family
+    r = client.post("/users/refresh", json={"refresh_token": first_refresh})
+    assert r.status_code == 401
+    r = client.post("/users/refresh", json={"refresh_token": second_refresh})
+    assert r.status_code == 401
+    
+    # Logout revokes a fresh login's refresh token
+    r = client.post("/users/login", json={
+        "email": unique_email,
+        "password": "password123"
+    })
+    refresh_token = r.json()["refresh_token"]
+    assert client.post("/users/logout", json={"refresh_token": refresh_token}).status_code == 204
+    assert client.post("/users/refresh", json={"refresh_token": refresh_token}).status_code == 401
+    
+    assert client.post("/users/refresh", json={"refresh_token": "garbage"}).status_code == 401
+
+
+def test_refresh_is_refused_for_inactive_users_without_rotating():
+    """Test that a deactivated user's refresh token is rejected and left unused"""
+    from app.database import SessionLocal
+    from app.models import User
+    
+    unique_email = f"inactive_{uuid.uuid4().hex[:8]}@example.com"
+    user_id = client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Inactive User",
+        "password": "password123"
+    }).json()["id"]
+    refresh_token = client.post("/users/login", json={
+        "email": unique_email,
+        "password": "password123"
+    }).json()["refresh_token"]
+    
+    def set_active(active):
+        db = SessionLocal()
+        try:
+            db.query(User).filter(User.id == user_id).update({User.is_active: active})
+            db.commit()
+        finally:
+            db.close()
+    
+    set_active(False)
+    r = client.post("/users/refresh", json={"refresh_token": refresh_token})
+    assert r.status_code == 401
+    assert r.json()["detail"] == "Invalid refresh token"
+    
+    # The token wasn't consumed, so it isn't treated as reused once the user is back
+    set_active(True)
+    r = client.post("/users/refresh", json={"refresh_token": refresh_token})
+    assert r.status_code == 200
+    assert client.post("/users/refresh", json={"refresh_token": r.json()["refresh_token"]}).status_code == 200
+
+
+def test_logout_revokes_access_token():
+    """Test that logout revokes the presented access token but not others"""
+    unique_email = f"revoke_{uuid.uuid4().hex[:8]}@example.com"
+    
+    client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Revoke User",
+        "password": "password123"
+    })
+    sessions = [
+        client.post("/users/login", json={"email": unique_email, "password": "password123"}).json()
+        for _ in range(2)
+    ]
+    headers = [{"Authorization": f"Bearer {s['access_token']}"} for s in sessions]
+    
+    r = client.post("/users/logout", json={"refresh_token": sessions[0]["refresh_token"]}, headers=headers[0])
+    assert r.status_code == 204
+    
+    r = client.get("/users/me", headers=headers[0])
+    assert r.status_code == 401
+    assert r.json()["detail"] == "Token has been revoked"
+    assert client.get("/users/me", headers=headers[1]).status_code == 200
+    
+    # A fresh process rebuilds the denylist from the table
+    revocation_store.clear()
+    assert client.get("/users/me", headers=headers[0]).status_code == 401
+
+
+def test_revocation_store_expires_entries():
+    """Test that revoked ids are dropped from memory at their expiry"""
+    store = RevocationStore()
+    store.add("a", 100.0)
+    store.add("b", 200.0)
+    assert store.is_revoked("a", now=50.0)
+    assert not store.is_revoked("a", now=150.0)
+    
+    store.prune(now=150.0)
+    assert len(store) == 1
+    assert store.is_revoked("b", now=150.0)
+
+
+def test_list_limit_is_capped():
+    """Test that list endpoints never return more than max_page_size rows"""
+    unique_email = f"cap_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Cap User",
+        "password": "password123"
+    })
+    token = client.post("/users/login", json={"email": unique_email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    r = client.post("/import", headers=headers, content="\n".join(
+        f'{{"type": "project", "name": "Project {i}"}}' for i in range(get_settings().max_page_size + 5)
+    ))
+    assert r.status_code == 200
+    
+    assert len(client.get("/projects/?limit=100000", headers=headers).json()) == get_settings().max_page_size
+    assert client.get("/projects/?limit=-1", headers=headers).json() == []
+
+
+def test_rate_limit_returns_429_with_retry_after():
+    """Test token buckets per route group and per user or IP"""
+    from fastapi import FastAPI
+    from app.core.rate_limit import RateLimitMiddleware
+    from app.core.security import create_access_token
+    
+    limited = FastAPI()
+    limited.add_middleware(RateLimitMiddleware, rules={"/": "100/minute", "/login": "2/minute", "/health": "off"})
+    
+    @limited.get("/{path:path}")
+    async def echo(path: str):
+        return {"path": path}
+    
+    limited_client = TestClient(limited)
+    assert limited_client.get("/login").status_code == 200
+    assert limited_client.get("/login").status_code == 200
+    r = limited_client.get("/login")
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) == 30
+    
+    # Other groups and other users have their own buckets
+    assert limited_client.get("/projects").status_code == 200
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': '42'})}"}
+    assert limited_client.get("/login", headers=headers).status_code == 200
+    
+    for _ in range(5):
+        assert limited_client.get("/health").status_code == 200
+
+
+def test_database_health_check():
+    """Test the database health endpoint"""
+    r = client.get("/health/db")
+    assert r.status_code == 200
+    assert r.json() == {"status": "healthy", "database": "ok"}
+
+
+def test_adaptive_concurrency_limit():
+    """Test AIMD growth on fast responses and backoff on slow ones"""
+    from app.core.load_shedding import AdaptiveConcurrencyLimiter
+    
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=1, max_limit=10, latency_target=0.1)
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+    assert limiter.shed == 1
+    
+    # Fast completions while saturated raise the limit
+    limiter.record(0.01, now=1.0)
+    assert limiter.limit == 2.5
+    
+    # One cut per latency_target window however many slow responses arrive
+    limiter.record(1.0, now=2.0)
+    limiter.record(1.0, now=2.01)
+    assert limiter.limit == 2.25
+    limiter.record(1.0, now=3.0)
+    assert limiter.limit == 2.025
+
+
+def test_load_shedding_rejects_excess_but_admits_health():
+    """Test that requests over the limit get 503 while health checks pass"""
+    import asyncio
+    import httpx
+    from fastapi import FastAPI
+    from app.core.load_shedding import AdaptiveConcurrencyLimiter, LoadSheddingMiddleware
+    
+    shed_app = FastAPI()
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, max_limit=1, latency_target=10)
+    shed_app.add_middleware(LoadSheddingMiddleware, limiter=limiter, priority_paths=["/health"])
+    release = asyncio.Event()
+    
+    @shed_app.get("/slow")
+    async def slow():
+        await release.wait()
+        return {}
+    
+    @shed_app.get("/health/db")
+    async def health():
+        return {}
+    
+    async def scenario():
+        transport = httpx.ASGITransport(app=shed_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            first = asyncio.create_task(c.get("/slow"))
+            while limiter.in_flight == 0:
+                await asyncio.sleep(0.01)
+            rejected = await c.get("/slow")
+            health = await c.get("/health/db")
+            release.set()
+            return (await first), rejected, health
+    
+    first, rejected, health = asyncio.run(scenario())
+    assert first.status_code == 200
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == "1"
+    assert health.status_code == 200
+    assert limiter.in_flight == 0
+
+
+def test_request_deadline_returns_504_and_counts_metric():
+    """Test that a query past the router deadline is cancelled and reported as 504"""
+    from fastapi import Depends, FastAPI
+    from sqlalchemy import text
+    from app.core.deadlines import DEADLINE_EXCEEDED, DeadlineMiddleware
+    from app.database import get_db
+    
+    slow_app = FastAPI()
+    slow_app.add_middleware(DeadlineMiddleware, timeouts={"/": 0, "/slow": 0.05})
+    
+    @slow_app.get("/slow")
+    async def slow(db=Depends(get_db)):
+        db.execute(text(
+            "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) "
+            "SELECT count(*) FROM (SELECT x FROM c LIMIT 100000000)"
+        ))
+        return {}
+    
+    before = DEADLINE_EXCEEDED.value(route="/slow")
+    r = TestClient(slow_app).get("/slow")
+    assert r.status_code == 504
+    assert r.json()["detail"] == "Request deadline exceeded"
+    assert DEADLINE_EXCEEDED.value(route="/slow") == before + 1
+    
+    r = client.get("/metrics", headers=METRICS_HEADERS)
+    assert r.status_code == 200
+    assert "# TYPE request_deadline_exceeded_total counter" in r.text
+    assert 'request_deadline_exceeded_total{route="/slow"}' in r.text
+
+
+def test_metrics_require_an_allowed_address_or_token():
+    """Test that /metrics is only served to allowed networks or with the metrics token"""
+    settings = get_settings()
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert client.get("/metrics", headers=METRICS_HEADERS).status_code == 200
+    
+    saved = settings.metrics_allowed_ips, settings.metrics_enabled
+    try:
+        settings.metrics_allowed_ips = ["10.0.0.0/8"]
+        assert TestClient(app, client=("10.1.2.3", 5000)).get("/metrics").status_code == 200
+        assert TestClient(app, client=("192.0.2.1", 5000)).get("/metrics").status_code == 403
+        settings.metrics_enabled = False
+        assert client.get("/metrics", headers=METRICS_HEADERS).status_code == 404
+    finally:
+        settings.metrics_allowed_ips, settings.metrics_enabled = saved
+
+
+def test_identical_concurrent_reads_are_coalesced():
+    """Test that concurrent identical reads share one execution until someone writes"""
+    import asyncio
+    import httpx
+    from fastapi import FastAPI
+    from app.core.coalescing import COALESCED_REQUESTS, CoalescingMiddleware
+    from app.core.security import create_access_token
+    from app.database import SessionLocal
+    from app.models import User
+    
+    coalesced_app = FastAPI()
+    coalesced_app.add_middleware(CoalescingMiddleware, paths=["/tasks"])
+    calls = []
+    gate = asyncio.Event()
+    
+    @coalesced_app.get("/tasks/")
+    async def list_tasks(project_id: int = 0, limit: int = 10):
+        calls.append((project_id, limit))
+        call = len(calls)
+        await gate.wait()
+        return {"call": call}
+    
+    @coalesced_app.post("/tasks/")
+    async def create_task():
+        return {}
+    
+    def register(name):
+        email = f"{name}_{uuid.uuid4().hex[:8]}@example.com"
+        user_id = client.post("/users/register", json={"email": email, "full_name": name, "password": "password123"}).json()["id"]
+        return user_id, {"Authorization": f"Bearer {create_access_token(data={'sub': str(user_id)})}"}
+    
+    _, alice = register("alice")
+    _, bob = register("bob")
+    carol_id, carol = register("carol")
+    
+    def deactivate(user_id):
+        with SessionLocal() as db:
+            db.get(User, user_id).is_active = False
+            db.commit()
+    
+    async def scenario():
+        transport = httpx.ASGITransport(app=coalesced_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            async def get(url, headers):
+                task = asyncio.create_task(c.get(url, headers=headers))
+                await asyncio.sleep(0.02)
+                return task
+            
+            leader = await get("/tasks/?project_id=1&limit=5", alice)
+            # Same parameters in a different order join the leader
+            follower = await get("/tasks/?limit=5&project_id=1", alice)
+            # Another user never shares a response
+            other_user = await get("/tasks/?project_id=1&limit=5", bob)
+            # A write by the same user makes later reads run again
+            await c.post("/tasks/", headers=alice)
+            after_write = await get("/tasks/?project_id=1&limit=5", alice)
+            # So does a write by anyone else, who may share the project
+            await c.post("/tasks/", headers=bob)
+            after_other_write = await get("/tasks/?project_id=1&limit=5", alice)
+            # A user deactivated meanwhile doesn't get the leader's response
+            carol_leader = await get("/tasks/?project_id=2", carol)
+            await asyncio.to_thread(deactivate, carol_id)
+            carol_follower = await get("/tasks/?project_id=2", carol)
+            gate.set()
+            return [
+                (await task).json()["call"]
+                for task in (leader, follower, other_user, after_write, after_other_write, carol_leader, carol_follower)
+            ]
+    
+    followers_before = COALESCED_REQUESTS.value(role="follower")
+    results = asyncio.run(scenario())
+    assert len(calls) == 6
+    assert results[0] == results[1]
+    assert len({results[0], *results[2:]}) == 6
+    assert COALESCED_REQUESTS.value(role="follower") == followers_before + 1
+
+
+def test_project_activity_log():
+    """Test that task and project changes are logged and paged newest first"""
+    unique_email = f"activity_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Activity User",
+        "password": "password123"
+    })
+    token = client.post("/users/login", json={"email": unique_email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    project_id = client.post("/projects/", headers=headers, json={"name": "Logged"}).json()["id"]
+    task_id = client.post("/tasks/", headers=headers, json={"title": "Logged task", "project_id": project_id}).json()["id"]
+    client.put(f"/tasks/{task_id}", headers=headers, json={"status": "in_progress"})
+    client.delete(f"/tasks/{task_id}", headers=headers)
+    
+    # Events are write-behind; flush what the handlers buffered
+    activity_log.flush()
+    
+    r = client.get(f"/projects/{project_id}/activity", headers=headers)
+    assert r.status_code == 200
+    events = r.json()
+    assert [(e["entity"], e["action"]) for e in events] == [
+        ("task", "deleted"), ("task", "updated"), ("task", "created"), ("project", "created")
+    ]
+    assert events[1]["changes"]["status"] == ["todo", "in_progress"]
+    
+    page = client.get(f"/projects/{project_id}/activity?limit=2", headers=headers).json()
+    rest = client.get(f"/projects/{project_id}/activity?before={page[-1]['id']}", headers=headers).json()
+    assert [e["id"] for e in page + rest] == [e["id"] for e in events]
+    
+    other = client.post("/users/register", json={
+        "email": f"other_{uuid.uuid4().hex[:8]}@example.com",
+        "full_name": "Other",
+        "password": "password123"
+    })
+    other_token = client.post("/users/login", json={"email": other.json()["email"], "password": "password123"}).json()["access_token"]
+    r = client.get(f"/projects/{project_id}/activity", headers={"Authorization": f"Bearer {other_token}"})
+    assert r.status_code == 404
+
+
+def test_activity_log_spools_when_database_fails(tmp_path):
+    """Test that events the database rejects are spooled and replayed, even past the buffer size"""
+    from app.database import SessionLocal
+    from app.models import ActivityEvent
+    from app.services.activity import EVENTS_DROPPED, ActivityLog
+    
+    class BrokenSession:
+        def execute(self, *args, **kwargs):
+            raise RuntimeError("database is down")
+        def rollback(self):
+            pass
+        def close(self):
+            pass
+    
+    spool = tmp_path / "spool.ndjson"
+    log = ActivityLog(buffer_size=3, batch_size=2, interval_seconds=1, spool_path=str(spool))
+    project_id = 10_000_000 + uuid.uuid4().int % 1_000_000
+    for _ in range(2):
+        for i in range(3):
+            log.record(project_id, None, "task", i, "created")
+        assert log.flush(BrokenSession) == 3
+    assert len(log) == 0
+    assert len(spool.read_text().splitlines()) == 6
+    
+    # A torn line is skipped and counted; the six events don't fit the buffer
+    # but all come back, and an event recorded meanwhile stays buffered
+    with spool.open("a") as f:
+        f.write('{"project_id": 1, "crea\n')
+    log.record(project_id, None, "task", 99, "created")
+    dropped = EVENTS_DROPPED.value(reason="unreadable")
+    assert log.replay_spool(SessionLocal) == 6
+    assert EVENTS_DROPPED.value(reason="unreadable") == dropped + 1
+    assert [event["entity_id"] for event in log.buffer] == [99]
+    assert not spool.exists()
+    db = SessionLocal()
+    try:
+        assert db.query(ActivityEvent).filter(ActivityEvent.project_id == project_id).count() == 6
+    finally:
+        db.close()
+
+
+def test_project_analytics_from_status_events():
+    """Test that status changes are recorded and summarized into throughput, WIP and cycle time"""
+    from datetime import timedelta
+    from app.database import SessionLocal
+    from app.models import TaskStatus, TaskStatusEvent
+    
+    unique_email = f"analytics_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Analytics User",
+        "password": "password123"
+    })
+    token = client.post("/users/login", json={"email": unique_email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    project_id = client.post("/projects/", headers=headers, json={"name": "Measured"}).json()["id"]
+    task_ids = [
+        client.post("/tasks/", headers=headers, json={"title": f"Task {i}", "project_id": project_id}).json()["id"]
+        for i in range(3)
+    ]
+    client.put(f"/tasks/{task_ids[0]}", headers=headers, json={"status": "in_progress"})
+    client.put(f"/tasks/{task_ids[1]}", headers=headers, json={"status": "in_progress"})
+    
+    db = SessionLocal()
+    try:
+        events = db.query(TaskStatusEvent).filter(TaskStatusEvent.project_id == project_id).order_by(TaskStatusEvent.id).all()
+        assert [(e.task_id, e.from_status, e.to_status) for e in events] == [
+            (task_ids[0], None, TaskStatus.TODO),
+            (task_ids[1], None, TaskStatus.TODO),
+            (task_ids[2], None, TaskStatus.TODO),
+            (task_ids[0], TaskStatus.TODO, TaskStatus.IN_PROGRESS),
+            (task_ids[1], TaskStatus.TODO, TaskStatus.IN_PROGRESS),
+        ]
+        # Pretend the first task was started two hours ago
+        events[3].changed_at = events[3].changed_at - timedelta(hours=2)
+        db.commit()
+    finally:
+        db.close()
+    
+    client.put(f"/tasks/{task_ids[0]}", headers=headers, json={"status": "completed"})
+    
+    r = client.get(f"/projects/{project_id}/analytics?weeks=4", headers=headers)
+    assert r.status_code == 200
+    data = r.json()
+    assert len(data["weeks"]) == 4
+    assert data["weeks"][-1]["completed"] == 1
+    assert data["weeks"][-1]["wip"] == 1
+    assert sum(week["completed"] for week in data["weeks"]) == 1
+    assert data["weeks"][0]["wip"] == 0
+    assert data["cycle_time"]["completed_tasks"] == 1
+    assert 1.9 < data["cycle_time"]["median_hours"] <= 2.1
+    assert data["cycle_time"]["p90_hours"] == data["cycle_time"]["median_hours"]
+    
+    # A new event invalidates the cached result
+    client.delete(f"/tasks/{task_ids[1]}", headers=headers)
+    data = client.get(f"/projects/{project_id}/analytics?weeks=4", headers=headers).json()
+    assert data["weeks"][-1]["wip"] == 0
+
+
+def test_project_sharing_with_roles():
+    """Test that members see shared projects and can only do what their role allows"""
+    def register(name):
+        email = f"{name}_{uuid.uuid4().hex[:8]}@example.com"
+        user = client.post("/users/register", json={"email": email, "full_name": name, "password": "password123"}).json()
+        token = client.post("/users/login", json={"email": email, "password": "password123"}).json()["access_token"]
+        return user["id"], {"Authorization": f"Bearer {token}"}
+    
+    owner_id, owner = register("owner")
+    member_id, member = register("member")
+    _, stranger = register("stranger")
+    
+    project_id = client.post("/projects/", headers=owner, json={"name": "Shared"}).json()["id"]
+    task_id = client.post("/tasks/", headers=owner, json={"title": "Shared task", "project_id": project_id}).json()["id"]
+    
+    assert client.get(f"/projects/{project_id}", headers=member).status_code == 404
+    
+    r = client.post(f"/projects/{project_id}/members", headers=owner, json={"user_id": member_id})
+    assert r.status_code == 201
+    assert r.json()["role"] == "viewer"
+    assert client.post(f"/projects/{project_id}/members", headers=owner, json={"user_id": member_id}).status_code == 409
+    assert client.post(f"/projects/{project_id}/members", headers=owner, json={"user_id": owner_id}).status_code == 409
+    
+    # Viewers can read but not write
+    assert [p["id"] for p in client.get("/projects/", headers=member).json()] == [project_id]
+    assert [t["id"] for t in client.get("/tasks/", headers=member).json()] == [task_id]
+    assert client.get(f"/tasks/{task_id}", headers=member).status_code == 200
+    assert client.put(f"/tasks/{task_id}", headers=member, json={"title": "Nope"}).status_code == 403
+    assert client.post("/tasks/", headers=member, json={"title": "Nope", "project_id": project_id}).status_code == 403
+    assert client.post(f"/projects/{project_id}/members", headers=member, json={"user_id": owner_id}).status_code == 403
+    
+    # Editors can change tasks; only the owner can delete the project
+    r = client.put(f"/projects/{project_id}/members/{member_id}", headers=owner, json={"role": "editor"})
+    assert r.json()["role"] == "editor"
+    assert client.put(f"/tasks/{task_id}", headers=member, json={"status": "in_progress"}).status_code == 200
+    assert client.delete(f"/projects/{project_id}", headers=member).status_code == 403
+    
+    r = client.put(f"/projects/{project_id}/members/{member_id}", headers=owner, json={"role": "owner"})
+    assert r.status_code == 400
+    
+    # Strangers can't tell the project exists
+    assert client.get(f"/projects/{project_id}", headers=stranger).status_code == 404
+    assert client.get(f"/tasks/{task_id}", headers=stranger).status_code == 404
+    assert client.get(f"/tasks/?project_id={project_id}", headers=stranger).json() == []
+    
+    assert client.delete(f"/projects/{project_id}/members/{member_id}", headers=member).status_code == 204
+    assert client.get(f"/projects/{project_id}", headers=member).status_code == 404
+    assert client.get(f"/projects/{project_id}/members", headers=owner).json() == []
+
+
+def test_permissions_load_roles_once():
+    """Test that a request's permission checks share one query"""
+    from sqlalchemy import event
+    from app.core.permissions import Action, ProjectPermissions
+    from app.database import SessionLocal, engine
+    from app.models import Project, ProjectMember, ProjectRole, User
+    
+    db = SessionLocal()
+    statements = []
+    
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    try:
+        users = [User(email=f"perm_{uuid.uuid4().hex[:8]}@example.com", full_name="Perm", password_hash="x") for _ in range(2)]
+        db.add_all(users)
+        db.flush()
+        owned = Project(name="Owned", owner_id=users[0].id)
+        shared = Project(name="Shared", owner_id=users[1].id)
+        hidden = Project(name="Hidden", owner_id=users[1].id)
+        db.add_all([owned, shared, hidden])
+        db.flush()
+        db.add(ProjectMember(project_id=shared.id, user_id=users[0].id, role=ProjectRole.EDITOR))
+        ids = users[0].id, owned.id, shared.id, hidden.id
+        db.commit()
+        user_id, owned_id, shared_id, hidden_id = ids
+        
+        permissions = ProjectPermissions(db, user_id)
+        event.listen(engine, "before_cursor_execute", count)
+        assert permissions.can(owned_id, Action.DELETE)
+        assert permissions.can(shared_id, Action.WRITE)
+        assert not permissions.can(shared_id, Action.MANAGE)
+        assert not permissions.can(hidden_id, Action.READ)
+        assert len(statements) == 1
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+        db.close()
+
+
+def test_task_dependencies_and_schedule():
+    """Test that dependencies reject cycles and drive the project schedule"""
+    unique_email = f"schedule_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Schedule User",
+        "password": "password123"
+    })
+    token = client.post("/users/login", json={"email": unique_email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    project_id = client.post("/projects/", headers=headers, json={"name": "Planned"}).json()["id"]
+    due_dates = ["2030-01-10T00:00:00", "2030-01-05T00:00:00", "2030-01-20T00:00:00", "2030-01-01T00:00:00"]
+    design, build, launch, docs = [
+        client.post("/tasks/", headers=headers, json={"title": f"Task {i}", "project_id": project_id, "due_date": due}).json()["id"]
+        for i, due in enumerate(due_dates)
+    ]
+    
+    # design -> build -> launch, docs -> launch
+    for blocked, blocking in [(build, design), (launch, build), (launch, docs)]:
+        r = client.post(f"/tasks/{blocked}/dependencies", headers=headers, json={"blocked_by": blocking})
+        assert r.status_code == 201
+    
+    assert client.post(f"/tasks/{design}/dependencies", headers=headers, json={"blocked_by": launch}).status_code == 409
+    assert client.post(f"/tasks/{build}/dependencies", headers=headers, json={"blocked_by": design}).status_code == 409
+    assert client.post(f"/tasks/{build}/dependencies", headers=headers, json={"blocked_by": build}).status_code == 400
+    assert client.get(f"/tasks/{launch}/dependencies", headers=headers).json() == {"blocked_by": sorted([build, docs]), "blocks": []}
+    
+    schedule = client.get(f"/projects/{project_id}/schedule", headers=headers).json()
+    order = schedule["order"]
+    assert order.index(design) < order.index(build) < order.index(launch)
+    assert order.index(docs) < order.index(launch)
+    assert schedule["critical_path"] == [design, build, launch]
+    assert schedule["finish"] == "2030-01-20T00:00:00"
+    assert sorted(schedule["unblocked"]) == sorted([design, docs])
+    
+    # Completing design unblocks build; removing an edge unblocks launch's other side
+    client.put(f"/tasks/{design}", headers=headers, json={"status": "completed"})
+    assert client.delete(f"/tasks/{launch}/dependencies/{docs}", headers=headers).status_code == 204
+    schedule = client.get(f"/projects/{project_id}/schedule", headers=headers).json()
+    assert design not in schedule["order"]
+    assert sorted(schedule["unblocked"]) == sorted([build, docs])
+    assert schedule["critical_path"] == [build, launch]
+
+
+def test_critical_path_prefers_latest_finish_then_longest_chain():
+    """Test the critical path on a graph with missing due dates and ties"""
+    from app.services.schedule import compute_schedule
+    
+    # 1 -> 2 -> 4, 3 -> 4, 5 alone; 99 is outside the graph (e.g. completed)
+    rows = [
+        (1, None, "2,99"),
+        (2, 100.0, "4"),
+        (3, 100.0, "4"),
+        (4, None, None),
+        (5, 50.0, None),
+    ]
+    schedule = compute_schedule(rows)
+    assert schedule["unblocked"] == [1, 3, 5]
+    assert schedule["critical_path"] == [1, 2, 4]
+    assert schedule["cyclic"] == []
+    
+    schedule = compute_schedule([(1, None, "2"), (2, None, "1"), (3, None, None)])
+    assert schedule["order"] == [3]
+    assert schedule["cyclic"] == [1, 2]
+    assert schedule["finish"] is None
+
+
+def test_dependency_order_matches_reachability():
+    """Test that random edge inserts reject exactly the cycles and keep every edge ranked forward"""
+    import random
+    from sqlalchemy import select
+    from app.database import SessionLocal
+    from app.models import Project, Task, TaskDependency, User
+    from app.services.schedule import RANK, order_dependency
+
+    db = SessionLocal()
+    try:
+        user = User(email=f"rank_{uuid.uuid4().hex[:8]}@example.com", full_name="Rank", password_hash="x")
+        db.add(user)
+        db.flush()
+        project = Project(name="Ranked", owner_id=user.id)
+        db.add(project)
+        db.flush()
+        tasks = [Task(title=f"Task {i}", project_id=project.id) for i in range(30)]
+        db.add_all(tasks)
+        db.flush()
+        ids = [task.id for task in tasks]
+
+        rng = random.Random(42)
+        reaches = {task_id: {task_id} for task_id in ids}
+        edges = []
+        for _ in range(150):
+            blocking, blocked = rng.sample(ids, 2)
+            if (blocking, blocked) in edges:
+                continue
+            assert order_dependency(db, blocking, blocked) == (blocking not in reaches[blocked])
+            if blocking in reaches[blocked]:
+                continue
+            db.add(TaskDependency(blocking_task_id=blocking, blocked_task_id=blocked))
+            db.flush()
+            edges.append((blocking, blocked))
+            for task_id in ids:
+                if blocking in reaches[task_id]:
+                    reaches[task_id] |= reaches[blocked]
+
+        ranks = dict(db.execute(select(Task.id, RANK).where(Task.id.in_(ids))).all())
+        assert len(set(ranks.values())) == len(ids)
+        assert all(ranks[blocking] < ranks[blocked] for blocking, blocked in edges)
+        assert len(edges) > 30
+    finally:
+        db.rollback()
+        db.close()
+
+
+def test_move_task_between_neighbors():
+    """Test that moving a task writes only its own row and keeps the column ordered"""
+    from sqlalchemy import event
+    from app.database import engine
+    
+    unique_email = f"kanban_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Kanban User",
+        "password": "password123"
+    })
+    token = client.post("/users/login", json={"email": unique_email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    project_id = client.post("/projects/", headers=headers, json={"name": "Board"}).json()["id"]
+    a, b, c, d = [
+        client.post("/tasks/", headers=headers, json={"title": title, "project_id": project_id}).json()["id"]
+        for title in "abcd"
+    ]
+    
+    def column(task_status="todo"):
+        r = client.get("/tasks/", headers=headers, params={"project_id": project_id, "task_status": task_status})
+        return [task["id"] for task in r.json()]
+    
+    assert column() == [a, b, c, d]
+    
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        r = client.patch(f"/tasks/{d}/move", headers=headers, json={"after_id": a, "before_id": b})
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert r.status_code == 200
+    assert len([s for s in statements if s.startswith("UPDATE tasks")]) == 1
+    assert column() == [a, d, b, c]
+    
+    # One neighbor is enough: the other is looked up
+    assert client.patch(f"/tasks/{a}/move", headers=headers, json={"after_id": b}).status_code == 200
+    assert column() == [d, b, a, c]
+    assert client.patch(f"/tasks/{c}/move", headers=headers, json={"before_id": d}).status_code == 200
+    assert column() == [c, d, b, a]
+    
+    # Into another column, then to the end of an empty one
+    r = client.patch(f"/tasks/{b}/move", headers=headers, json={"status": "in_progress"})
+    assert r.status_code == 200 and r.json()["status"] == "in_progress"
+    assert client.patch(f"/tasks/{c}/move", headers=headers, json={"status": "in_progress", "before_id": b}).status_code == 200
+    assert column("in_progress") == [c, b]
+    assert column() == [d, a]
+    
+    assert client.patch(f"/tasks/{a}/move", headers=headers, json={"after_id": a}).status_code == 400
+    assert client.patch(f"/tasks/{a}/move", headers=headers, json={"after_id": b}).status_code == 400
+    assert client.patch(f"/tasks/{d}/move", headers=headers, json={"after_id": a, "before_id": 0}).status_code == 404
+
+
+def test_position_keys_and_rebalance():
+    """Test that keys stay ordered under repeated inserts and rebalancing shortens them"""
+    from app.database import SessionLocal
+    from app.models import Project, Task, TaskStatus, User
+    from app.services.jobs import run_job
+    from app.services.positions import key_between, keys_between, request_rebalance
+    
+    keys = keys_between(None, None, 5000)
+    assert keys == sorted(keys) and len(set(keys)) == 5000
+    assert max(map(len, keys)) <= 4
+    
+    # Always inserting right after the first key grows the key slowly
+    low, high = "a0", "a1"
+    for _ in range(100):
+        high = key_between(low, high)
+        assert low < high < "a1"
+    assert len(high) < 25
+    assert key_between(None, "a0") < "a0"
+    
+    db = SessionLocal()
+    try:
+        user = User(email=f"rebalance_{uuid.uuid4().hex[:8]}@example.com", full_name="Rebalance", password_hash="x")
+        db.add(user)
+        db.flush()
+        project = Project(name="Rebalanced", owner_id=user.id)
+        db.add(project)
+        db.flush()
+        positions = ["a0", high, "a1", key_between(high, "a1")]
+        tasks = [Task(title=f"T{i}", project_id=project.id, status=TaskStatus.TODO, position=p) for i, p in enumerate(positions)]
+        db.add_all(tasks)
+        db.commit()
+        order = [task.id for task in sorted(tasks, key=lambda task: task.position)]
+        project_id, user_id = project.id, user.id
+        
+        job = request_rebalance(db, project_id, TaskStatus.TODO, user_id)
+        assert request_rebalance(db, project_id, TaskStatus.TODO, user_id) is None
+        run_job(db, job)
+        assert job.result == {"tasks_moved": 3}
+        rows = db.query(Task.id, Task.position).filter(Task.project_id == project_id).order_by(Task.position).all()
+        assert [row.id for row in rows] == order
+        assert [row.position for row in rows] == ["a0", "a1", "a2", "a3"]
+    finally:
+        db.close()
+
+
+def test_due_date_reminders(tmp_path):
+    """Test that reminders load from the window, follow task changes and skip stale entries"""
+    import json
+    from datetime import datetime, timedelta
+    from app.database import SessionLocal
+    from app.models import Project, Task, TaskStatus, User
+    from app.services.reminders import FileSink, ReminderScheduler
+    
+    unique_email = f"remind_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Reminder User",
+        "password": "password123"
+    })
+    token = client.post("/users/login", json={"email": unique_email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    r = client.put("/users/me/reminders", headers=headers, json={"lead_minutes": [60, 1440, 60]})
+    assert r.status_code == 200
+    assert r.json() == {"lead_minutes": [1440, 60]}
+    assert client.get("/users/me/reminders", headers=headers).json() == {"lead_minutes": [1440, 60]}
+    assert client.put("/users/me/reminders", headers=headers, json={"lead_minutes": [0]}).status_code == 422
+    
+    base = datetime(2031, 1, 1) + timedelta(minutes=uuid.uuid4().int % 100000)
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == unique_email).one()
+        user_id = user.id
+        project = Project(name="Reminded", owner_id=user_id)
+        db.add(project)
+        db.flush()
+        soon, later, done = [
+            Task(title=title, project_id=project.id, status=task_status, due_date=due)
+            for title, task_status, due in [
+                ("Soon", TaskStatus.TODO, base + timedelta(minutes=30)),
+                ("Later", TaskStatus.IN_PROGRESS, base + timedelta(hours=5)),
+                ("Done", TaskStatus.COMPLETED, base + timedelta(minutes=30)),
+            ]
+        ]
+        db.add_all([soon, later, done])
+        db.commit()
+        
+        path = tmp_path / "reminders.ndjson"
+        scheduler = ReminderScheduler(window=timedelta(hours=1), max_pending=1000, sink=FileSink(str(path)))
+        scheduler.load_window(db, start=base - timedelta(hours=1))
+        assert scheduler.horizon == base
+        mine = [reminder for reminder in scheduler._heap if reminder.user_id == user_id]
+        assert [(reminder.task_id, reminder.lead_minutes) for reminder in mine] == [(soon.id, 60)]
+        
+        # Moving a due date into the window pushes its reminders, and lead times
+        # that have already passed fire at once; moving one out leaves a stale entry
+        later.due_date = base + timedelta(minutes=15)
+        soon.due_date = base + timedelta(hours=3)
+        db.commit()
+        scheduler.schedule_task(db, later, now=base - timedelta(hours=1))
+        scheduler.schedule_task(db, soon, now=base - timedelta(hours=1))
+        
+        due = [reminder for reminder in scheduler.pop_due(now=base) if reminder.user_id == user_id]
+        assert len(due) == 4
+        assert scheduler.deliver(db, due) == 3
+        messages = [json.loads(line) for line in path.read_text().splitlines()]
+        assert sorted((m["task_id"], m["lead_minutes"]) for m in messages) == sorted([
+            (later.id, 60), (later.id, 1440), (soon.id, 1440)
+        ])
+        
+        # A window with more reminders than fit in memory ends early
+        capped = ReminderScheduler(window=timedelta(days=2), max_pending=1, sink=FileSink(str(path)))
+        capped.load_window(db, start=base - timedelta(days=1))
+        assert len(capped) == 1
+        assert capped.horizon < base + timedelta(days=1)
+    finally:
+        db.close()
+
+
+def test_reminders_follow_tasks_written_elsewhere(tmp_path):
+    """Test that tasks written without schedule_task reach the scheduler through the change feed"""
+    import json
+    from datetime import datetime, timedelta
+    from app.database import SessionLocal
+    from app.services.reminders import FileSink, ReminderScheduler
+    
+    unique_email = f"remind_feed_{uuid.uuid4().hex[:8]}@example.com"
+    user_id = client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Feed Reminder User",
+        "password": "password123"
+    }).json()["id"]
+    token = client.post("/users/login", json={"email": unique_email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.put("/users/me/reminders", headers=headers, json={"lead_minutes": [60]})
+    project_id = client.post("/projects/", headers=headers, json={"name": "Imported reminders"}).json()["id"]
+    
+    base = datetime(2032, 1, 1) + timedelta(minutes=uuid.uuid4().int % 100000)
+    now = base - timedelta(hours=1)
+    db = SessionLocal()
+    try:
+        scheduler = ReminderScheduler(window=timedelta(hours=2), max_pending=1000,
+                                      sink=FileSink(str(tmp_path / "reminders.ndjson")))
+        scheduler.load_window(db, start=now)
+        # The scheduler's sessions don't outlive a pass; release SQLite's writer likewise
+        db.rollback()
+        
+        def mine():
+            return [(reminder.task_id, reminder.lead_minutes) for reminder in scheduler._heap if reminder.user_id == user_id]
+        
+        # Bulk writes, like writes in other processes, don't push reminders themselves
+        rows = [
+            ("In window", base + timedelta(minutes=30)),
+            ("Lead time passed", base - timedelta(minutes=30)),
+            ("After window", base + timedelta(hours=3)),
+        ]
+        body = "\n".join(
+            json.dumps({"type": "task", "title": title, "project_id": project_id, "due_date": due.isoformat()})
+            for title, due in rows
+        )
+        assert client.post("/import", headers=headers, content=body).json()["tasks_created"] == 3
+        assert mine() == []
+        
+        tasks = client.get("/tasks/", headers=headers, params={"project_id": project_id}).json()
+        in_window = next(task["id"] for task in tasks if task["title"] == "In window")
+        assert scheduler.poll_changes(db, now=now) >= 1
+        assert mine() == [(in_window, 60)]
+        
+        # Unsettled entries are read again, without queueing anything twice
+        scheduler.poll_changes(db, now=now)
+        assert mine() == [(in_window, 60)]
+    finally:
+        db.close()
+
+
+def test_recurrence_occurrences_across_dst_and_month_ends():
+    """Test that occurrences keep local time across DST changes and clamp to short months"""
+    from datetime import date, datetime, time, timedelta
+    from types import SimpleNamespace
+    from app.models import RecurrenceFrequency
+    from app.services.recurrence import occurrences, weekday_mask
+    
+    def rule(frequency, start_date, at=time(9, 0), zone="America/New_York", **kwargs):
+        fields = {"interval": 1, "weekdays": 0, "month_day": None, "until": None, "count": None}
+        fields.update(kwargs)
+        return SimpleNamespace(frequency=frequency, start_date=start_date, time_of_day=at, timezone=zone, **fields)
+    
+    # 09:00 in New York is 14:00 UTC until DST starts on 2030-03-10, then 13:00
+    weekly = rule(RecurrenceFrequency.WEEKLY, date(2030, 3, 1), weekdays=weekday_mask([4]))
+    assert list(occurrences(weekly, datetime(2030, 3, 1), datetime(2030, 3, 16))) == [
+        datetime(2030, 3, 1, 14), datetime(2030, 3, 8, 14), datetime(2030, 3, 15, 13)
+    ]
+    
+    # 02:30 doesn't exist on the spring-forward day and happens twice on the fall-back day
+    daily = rule(RecurrenceFrequency.DAILY, date(2030, 3, 9), at=time(2, 30))
+    assert list(occurrences(daily, datetime(2030, 3, 10), datetime(2030, 3, 11))) == [datetime(2030, 3, 10, 7, 30)]
+    daily = rule(RecurrenceFrequency.DAILY, date(2030, 11, 2), at=time(1, 30))
+    assert list(occurrences(daily, datetime(2030, 11, 3), datetime(2030, 11, 4))) == [datetime(2030, 11, 3, 5, 30)]
+    
+    monthly = rule(RecurrenceFrequency.MONTHLY, date(2031, 1, 31), zone="UTC", count=4)
+    assert [due.date() for due in occurrences(monthly, datetime(2031, 1, 1), datetime(2032, 1, 1))] == [
+        date(2031, 1, 31), date(2031, 2, 28), date(2031, 3, 31), date(2031, 4, 30)
+    ]
+    
+    # Every other week on Monday and Thursday, starting on a Wednesday, until a date
+    biweekly = rule(
+        RecurrenceFrequency.WEEKLY, date(2030, 1, 2), zone="UTC", interval=2,
+        weekdays=weekday_mask([0, 3]), until=date(2030, 1, 27)
+    )
+    assert [due.date() for due in occurrences(biweekly, datetime(2030, 1, 1), datetime(2031, 1, 1))] == [
+        date(2030, 1, 3), date(2030, 1, 14), date(2030, 1, 17)
+    ]
+    
+    # Starting deep into a rule skips ahead arithmetically but agrees with walking from the start
+    for frequency, extra in [
+        (RecurrenceFrequency.DAILY, {"interval": 3, "count": 500}),
+        (RecurrenceFrequency.WEEKLY, {"interval": 2, "weekdays": weekday_mask([1, 5]), "count": 300}),
+        (RecurrenceFrequency.MONTHLY, {"interval": 5, "month_day": 30, "count": 100}),
+    ]:
+        long_rule = rule(frequency, date(2030, 1, 15), **extra)
+        window = (datetime(2033, 6, 1), datetime(2034, 6, 1))
+        walked = [due for due in occurrences(long_rule, datetime(2030, 1, 1), datetime(2100, 1, 1))
+                  if window[0] <= due < window[1]]
+        assert walked
+        assert list(occurrences(long_rule, *window)) == walked
+
+
+def test_recurring_tasks_materialize_and_list_virtually():
+    """Test that a recurring task creates tasks up to the horizon and lists later occurrences as virtual"""
+    from datetime import datetime, timedelta, timezone
+    from app.core.config import get_settings
+    from app.database import SessionLocal
+    from app.models import RecurrenceRule, Task, User
+    from app.services.recurrence import materialize_due_rules
+    
+    unique_email = f"recur_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "Recurring User",
+        "password": "password123"
+    })
+    token = client.post("/users/login", json={"email": unique_email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = client.post("/projects/", headers=headers, json={"name": "Chores"}).json()["id"]
+    
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    r = client.post(f"/projects/{project_id}/recurrences/", headers=headers, json={
+        "title": "Water plants",
+        "frequency": "daily",
+        "start_date": now.date().isoformat(),
+        "time_of_day": "12:00:00",
+        "timezone": "Europe/Berlin"
+    })
+    assert r.status_code == 201
+    rule = r.json()
+    assert rule["weekdays"] == [] and rule["active"] is True
+    bad = client.post(f"/projects/{project_id}/recurrences/", headers=headers, json={
+        "title": "Bad", "frequency": "daily", "start_date": "2030-01-01", "timezone": "Mars/Olympus"
+    })
+    assert bad.status_code == 422
+    
+    # Tasks exist up to the horizon, each due at noon Berlin time (one fewer when a DST change
+    # moves noon an hour later in UTC)
+    horizon = get_settings().recurrence_horizon_days
+    tasks = client.get("/tasks/", headers=headers, params={"project_id": project_id, "limit": 100}).json()
+    assert horizon - 1 <= len(tasks) <= horizon + 1
+    assert all(task["recurrence_rule_id"] == rule["id"] and task["status"] == "todo" for task in tasks)
+    assert len({task["position"] for task in tasks}) == len(tasks)
+    
+    params = {
+        "project_id": project_id,
+        "include_occurrences": True,
+        "due_from": now.isoformat(),
+        "due_to": (now + timedelta(days=30)).isoformat(),
+        "limit": 100
+    }
+    listed = client.get("/tasks/", headers=headers, params=params).json()
+    assert len(listed) in (29, 30, 31)
+    assert [item["due_date"] for item in listed] == sorted(item["due_date"] for item in listed)
+    assert [item["virtual"] for item in listed] == [False] * len(tasks) + [True] * (len(listed) - len(tasks))
+    assert all(item["id"] is None for item in listed if item["virtual"])
+    
+    page = client.get("/tasks/", headers=headers, params={**params, "skip": len(tasks) - 2, "limit": 4}).json()
+    assert page == listed[len(tasks) - 2:len(tasks) + 2]
+    assert client.get("/tasks/", headers=headers, params={**params, "task_status": "completed"}).json() == []
+    assert client.get("/tasks/", headers=headers, params={
+        "include_occurrences": True, "due_from": now.isoformat()
+    }).status_code == 400
+    assert client.get("/tasks/", headers=headers, params={
+        **params, "due_to": (now + timedelta(days=1000)).isoformat()
+    }).status_code == 400
+    settings = get_settings()
+    settings.recurrence_max_listed_rules = 0
+    try:
+        assert client.get("/tasks/", headers=headers, params=params).status_code == 400
+        # Rules already materialized past the range aren't expanded, so they don't count
+        assert client.get("/tasks/", headers=headers, params={
+            **params, "due_to": (now + timedelta(days=2)).isoformat()
+        }).status_code == 200
+    finally:
+        settings.recurrence_max_listed_rules = 1000
+    
+    # Rolling the horizon forward creates the next tasks once
+    db = SessionLocal()
+    try:
+        owner_id = db.query(User).filter(User.email == unique_email).one().id
+        later = now + timedelta(days=10)
+        created = materialize_due_rules(db, owner_id=owner_id, now=later)
+        assert created == 10
+        assert materialize_due_rules(db, owner_id=owner_id, now=later) == 0
+        assert db.query(Task).filter(Task.recurrence_rule_id == rule["id"]).count() == len(tasks) + 10
+        assert db.get(RecurrenceRule, rule["id"]).materialized_through == later + timedelta(days=horizon)
+    finally:
+        db.close()
+    
+    r = client.delete(f"/projects/{project_id}/recurrences/{rule['id']}", headers=headers)
+    assert r.status_code == 204
+    assert client.get(f"/projects/{project_id}/recurrences/", headers=headers).json() == []
+    remaining = client.get("/tasks/", headers=headers, params={"project_id": project_id, "limit": 100}).json()
+    assert len(remaining) == len(tasks) + 10
+    assert all(task["recurrence_rule_id"] is None for task in remaining)
+
+
+def test_maintenance_commands_run_in_a_fresh_process():
+    """Test that the archive and recurrence commands reach the database when run on their own"""
+    import os
+    import subprocess
+    import sys
+    from datetime import datetime, timedelta
+    from pathlib import Path
+    from app.database import SessionLocal
+    from app.models import RecurrenceRule, Task, TaskArchive
+    
+    unique_email = f"cli_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/users/register", json={
+        "email": unique_email,
+        "full_name": "CLI User",
+        "password": "password123"
+    })
+    token = client.post("/users/login", json={"email": unique_email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = client.post("/projects/", headers=headers, json={"name": "CLI Project"}).json()["id"]
+    done_id = client.post("/tasks/", headers=headers, json={
+        "title": "Done long ago", "project_id": project_id, "status": "completed"
+    }).json()["id"]
+    created_at = datetime.utcnow()
+    rule_id = client.post(f"/projects/{project_id}/recurrences/", headers=headers, json={
+        "title": "Stand-up", "frequency": "daily", "start_date": datetime.utcnow().date().isoformat()
+    }).json()["id"]
+    
+    # Age the completed task and drop the rule's tasks, so both commands have work
+    db = SessionLocal()
+    try:
+        db.query(Task).filter(Task.id == done_id).update({Task.updated_at: datetime.utcnow() - timedelta(days=90)})
+        materialized = db.query(Task).filter(Task.recurrence_rule_id == rule_id).delete()
+        db.get(RecurrenceRule, rule_id).materialized_through = created_at
+        db.commit()
+    finally:
+        db.close()
+    assert materialized > 0
+    
+    def run(*args, **env):
+        result = subprocess.run([sys.executable, "-m", *args], cwd=Path(__file__).resolve().parents[2],
+                                env={**{k: v for k, v in os.environ.items() if k != "ID_NODE"}, **env},
+                                capture_output=True, text=True)
+        return result.returncode, result.stdout
+    
+    assert run("app.services.archive", "--days", "30")[1].startswith("Archived ")
+    # Unsharded, new tasks keep autoincremented ids, so no ID_NODE is needed
+    assert run("app.services.recurrence")[1].startswith("Created ")
+    
+    db = SessionLocal()
+    try:
+        assert db.get(TaskArchive, done_id) is not None
+        assert db.query(Task).filter(Task.recurrence_rule_id == rule_id).count() >= materialized
+    finally:
+        db.close()
+
+
+def test_ids_are_generated_only_when_sharded():
+    """Test that ids are generated, and ID_NODE required, only with shards configured"""
+    import pytest
+    from app.core.ids import IdGenerator, check_node, id_default, new_id
+    
+    settings = get_settings()
+    saved = settings.id_node, settings.database_shards
+    settings.id_node, settings.database_shards = None, {}
+    try:
+        check_node()
+        assert id_default() is None
+        settings.database_shards = {"s1": "sqlite:///s1.db"}
+        assert id_default() is new_id
+        with pytest.raises(ValueError):
+            check_node()
+        settings.id_node = 3
+        check_node()
+    finally:
+        settings.id_node, settings.database_shards = saved
+    
+    # 53-bit, growing, and different between nodes
+    first, second = IdGenerator(3), IdGenerator(4)
+    ids = [first() for _ in range(300)]
+    assert ids == sorted(set(ids)) and ids[-1] < 2 ** 53
+    assert second() not in ids
+
+
+def test_sync_returns_only_changes_and_tombstones():
+    """Test that a sync returns what changed since the token, with tombstones and access changes"""
+    def register(name):
+        email = f"{name}_{uuid.uuid4().hex[:8]}@example.com"
+        user = client.post("/users/register", json={"email": email, "full_name": name, "password": "password123"}).json()
+        token = client.post("/users/login", json={"email": email, "password": "password123"}).json()["access_token"]
+        return user["id"], {"Authorization": f"Bearer {token}"}
+    
+    # Tokens follow every change at once here; see the out-of-order test for the window
+    settings = get_settings()
+    settle_seconds = settings.sync_settle_seconds
+    settings.sync_settle_seconds = 0
+    try:
+        owner_id, owner = register("syncer")
+        member_id, member = register("synced")
+        project_id = client.post("/projects/", headers=owner, json={"name": "Offline"}).json()["id"]
+        task_ids = [
+            client.post("/tasks/", headers=owner, json={"title": f"Task {i}", "project_id": project_id}).json()["id"]
+            for i in range(5)
+        ]
+    
+        r = client.get("/sync", headers=owner)
+        assert r.status_code == 200
+        token = r.json()["token"]
+        assert r.json()["tasks"] == [] and r.json()["has_more"] is False
+        member_token = client.get("/sync", headers=member).json()["token"]
+    
+        client.put(f"/tasks/{task_ids[0]}", headers=owner, json={"title": "Renamed"})
+        client.put(f"/tasks/{task_ids[0]}", headers=owner, json={"status": "in_progress"})
+        client.delete(f"/tasks/{task_ids[1]}", headers=owner)
+        new_id = client.post("/tasks/", headers=owner, json={"title": "New", "project_id": project_id}).json()["id"]
+    
+        r = client.get("/sync", headers=owner, params={"since": token})
+        assert r.status_code == 200
+        data = r.json()
+        assert [task["id"] for task in data["tasks"]] == [task_ids[0], new_id]
+        assert data["tasks"][0]["title"] == "Renamed" and data["tasks"][0]["status"] == "in_progress"
+        assert data["deleted"] == {"projects": [], "tasks": [task_ids[1]]}
+        assert data["projects"] == [] and data["resync_projects"] == []
+        assert int(data["token"]) > int(token)
+        assert client.get("/sync", headers=owner, params={"since": data["token"]}).json()["tasks"] == []
+    
+        # Pages follow the sequence when more changes are waiting
+        page_size = settings.sync_page_size
+        settings.sync_page_size = 2
+        try:
+            first = client.get("/sync", headers=owner, params={"since": token}).json()
+            second = client.get("/sync", headers=owner, params={"since": first["token"]}).json()
+        finally:
+            settings.sync_page_size = page_size
+        assert first["has_more"] is True and second["has_more"] is False
+        assert second["token"] == data["token"]
+        assert [task["id"] for task in second["tasks"]] == [new_id]
+    
+        # Sharing tells the member to load the project; unsharing and deleting leave tombstones
+        client.post(f"/projects/{project_id}/members", headers=owner, json={"user_id": member_id})
+        data = client.get("/sync", headers=member, params={"since": member_token}).json()
+        assert [project["id"] for project in data["projects"]] == [project_id]
+        assert data["resync_projects"] == [project_id]
+        member_token = data["token"]
+    
+        client.delete(f"/projects/{project_id}/members/{member_id}", headers=owner)
+        client.put(f"/tasks/{task_ids[2]}", headers=owner, json={"title": "Private again"})
+        data = client.get("/sync", headers=member, params={"since": member_token}).json()
+        assert data["deleted"]["projects"] == [project_id]
+        assert data["tasks"] == []
+    
+        token = client.get("/sync", headers=owner).json()["token"]
+        client.delete(f"/projects/{project_id}", headers=owner)
+        data = client.get("/sync", headers=owner, params={"since": token}).json()
+        assert data["deleted"] == {"projects": [project_id], "tasks": []}
+    
+        assert client.get("/sync", headers=owner, params={"since": "abc"}).status_code == 400
+        assert client.get("/sync", headers=owner, params={"since": "-1"}).status_code == 400
+    finally:
+        settings.sync_settle_seconds = settle_seconds
+
+
+def test_sync_token_waits_for_out_of_order_commits():
+    """Test that a lower id committed after a higher one still reaches a client that synced in between"""
+    from datetime import timedelta
+    from sqlalchemy import func, insert, select, update
+    from app.database import SessionLocal
+    from app.models import SyncChange
+    from app.models.sync_change import utcnow
+    
+    email = f"settle_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/users/register", json={"email": email, "full_name": "Settle", "password": "password123"})
+    token = client.post("/users/login", json={"email": email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = client.post("/projects/", headers=headers, json={"name": "Out of order"}).json()["id"]
+    first_id, second_id = (
+        client.post("/tasks/", headers=headers, json={"title": title, "project_id": project_id}).json()["id"]
+        for title in ("Slow writer", "Fast writer")
+    )
+    
+    def write(sequence, task_id):
+        db = SessionLocal()
+        try:
+            db.execute(insert(SyncChange.__table__).values(
+                id=sequence, project_id=project_id, user_id=None, entity="task", entity_id=task_id, deleted=False
+            ))
+            db.commit()
+        finally:
+            db.close()
+    
+    db = SessionLocal()
+    try:
+        # Settle everything so far, then leave a gap for the slow transaction's id
+        db.execute(update(SyncChange).values(changed_at=utcnow() - timedelta(minutes=1)))
+        db.commit()
+        since = db.scalar(select(func.max(SyncChange.id)))
+    finally:
+        db.close()
+    assert client.get("/sync", headers=headers).json()["token"] == str(since)
+    
+    # The fast transaction commits first with the higher id; the client sees it but its token stays
+    write(since + 2, second_id)
+    r = client.get("/sync", headers=headers, params={"since": str(since)}).json()
+    assert [task["id"] for task in r["tasks"]] == [second_id]
+    assert r["token"] == str(since) and r["has_more"] is False
+    
+    # The slow one commits its lower id afterwards and is not skipped
+    write(since + 1, first_id)
+    r = client.get("/sync", headers=headers, params={"since": r["token"]}).json()
+    assert [task["id"] for task in r["tasks"]] == [first_id, second_id]
+    
+    # Once the window has passed, the token moves past both
+    settings = get_settings()
+    settle_seconds = settings.sync_settle_seconds
+    settings.sync_settle_seconds = 0
+    try:
+        r = client.get("/sync", headers=headers, params={"since": r["token"]}).json()
+        assert r["token"] == str(since + 2)
+        assert client.get("/sync", headers=headers, params={"since": r["token"]}).json()["tasks"] == []
+    finally:
+        settings.sync_settle_seconds = settle_seconds
+
+
+def test_sharding_routes_by_owner_and_moves_users(tmp_path):
+    """Test that a user's data lives on their shard and moves with them"""
+    from sqlalchemy import func, select
+    from app.database import Base, SessionLocal, add_shard, shard_engines
+    from app.models import Project, SyncChange, Task, TaskStatusEvent
+    from app.services.sharding import mirror_users, move_user, shard_directory
+    
+    def count(shard, model):
+        with shard_engines[shard].connect() as connection:
+            return connection.scalar(select(func.count()).select_from(model.__table__))
+    
+    settings = get_settings()
+    for name in ("s1", "s2"):
+        Base.metadata.create_all(add_shard(name, f"sqlite:///{tmp_path / name}.db"))
+    db = SessionLocal()
+    settings.shard_placement = ["s1"]
+    try:
+        mirror_users(db)
+        users = {}
+        for name in ("owner", "other"):
+            email = f"shard_{name}_{uuid.uuid4().hex[:8]}@example.com"
+            user_id = client.post("/users/register", json={
+                "email": email, "full_name": "Shard User", "password": "password123"
+            }).json()["id"]
+            token = client.post("/users/login", json={"email": email, "password": "password123"}).json()["access_token"]
+            users[name] = (user_id, {"Authorization": f"Bearer {token}"})
+        owner_id, owner = users["owner"]
+        
+        # Writes land on the owner's shard
+        project = client.post("/projects/", headers=owner, json={"name": "Sharded"}).json()
+        tasks = [
+            client.post("/tasks/", headers=owner, json={"title": f"Task {i}", "project_id": project["id"]}).json()
+            for i in range(3)
+        ]
+        client.post(f"/tasks/{tasks[1]['id']}/dependencies", headers=owner, json={"blocked_by": tasks[0]["id"]})
+        assert count("s1", Task) == 3 and count("s2", Task) == 0
+        with SessionLocal() as main_db:
+            assert main_db.query(Project).filter(Project.owner_id == owner_id).count() == 0
+        assert len(client.get("/tasks/", headers=owner, params={"project_id": project["id"]}).json()) == 3
+        token = client.get("/sync", headers=owner).json()["token"]
+        
+        # Projects can only be shared within a shard
+        other_id, other = users["other"]
+        move_user(db, other_id, "s2", settle_seconds=0)
+        r = client.post(f"/projects/{project['id']}/members", headers=owner, json={"user_id": other_id})
+        assert r.status_code == 409
+        
+        # A move copies everything, keeps ids and leaves nothing behind
+        copied = move_user(db, owner_id, "s2", batch_size=2, settle_seconds=0)
+        assert copied["tasks"] == 3 and copied["task_dependencies"] == 1
+        # The target's change feed announces the tasks, e.g. to the reminder scheduler
+        with shard_engines["s2"].connect() as connection:
+            announced = set(connection.scalars(select(SyncChange.entity_id).where(SyncChange.entity == "task")))
+        assert {task["id"] for task in tasks} <= announced
+        assert count("s1", Task) == count("s1", TaskStatusEvent) == 0
+        r = client.get(f"/tasks/{tasks[1]['id']}", headers=owner)
+        assert r.status_code == 200 and r.json()["title"] == "Task 1"
+        r = client.get(f"/tasks/{tasks[1]['id']}/dependencies", headers=owner)
+        assert r.json()["blocked_by"] == [tasks[0]["id"]]
+        assert client.get("/sync", headers=owner, params={"since": token}).status_code == 410
+        assert client.get("/sync", headers=owner).json()["token"].startswith("1:")
+    finally:
+        settings.shard_placement = []
+        db.close()
+        for name in ("s1", "s2"):
+            shard_engines.pop(name).dispose()
+        shard_directory.invalidate()
+
+
+def test_cold_start_budget(tmp_path):
+    """Test that importing the app stays cheap and the first response comes quickly after startup"""
+    import json
+    import os
+    import subprocess
+    import sys
+    
+    # Generous enough for a slow CI machine; a regression to eager setup blows well past them
+    import_budget, first_response_budget = 3.0, 1.5
+    script = """
+import json, time
+started = time.perf_counter()
+import app.main, app.database
+imported = time.perf_counter()
+eager_engine = "engine" in vars(app.database)
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    status = client.get("/health/db").status_code
+print(json.dumps({
+    "eager_engine": eager_engine,
+    "import": imported - started,
+    "first_response": time.perf_counter() - imported,
+    "status": status,
+}))
+"""
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path}/cold.db", RATE_LIMIT_ENABLED="false")
+    env.setdefault("SECRET_KEY", "cold-start")
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    assert timings["status"] == 200
+    assert not timings["eager_engine"]
+    assert timings["import"] < import_budget, timings
+    assert timings["first_response"] < first_response_budget, timings
+
+
+def test_hot_statements_are_built_once_and_hit_the_compiled_cache():
+    """Test task list filters through the prebuilt statements, and that repeats only hit the compiled cache"""
+    from app.api.tasks import task_list_statement
+    from app.core.statement_cache import STATEMENTS
+    
+    email = f"cached_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/users/register", json={"email": email, "full_name": "Cached", "password": "password123"})
+    token = client.post("/users/login", json={"email": email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = client.post("/projects/", headers=headers, json={"name": "Cached"}).json()["id"]
+    task_ids = [
+        client.post("/tasks/", headers=headers, json={
+            "title": f"Task {i}", "project_id": project_id, "due_date": f"2030-01-0{i + 1}T00:00:00"
+        }).json()["id"]
+        for i in range(3)
+    ]
+    client.put(f"/tasks/{task_ids[1]}", headers=headers, json={"status": "completed"})
+    
+    requests = [
+        ("/users/me", {}),
+        (f"/projects/{project_id}", {}),
+        (f"/tasks/{task_ids[0]}", {}),
+        ("/tasks/", {"project_id": project_id}),
+        ("/tasks/", {"project_id": project_id, "task_status": "todo"}),
+        ("/tasks/", {"task_status": "completed", "include_archived": True}),
+        ("/tasks/", {"due_from": "2030-01-02T00:00:00", "due_to": "2030-01-03T00:00:00"}),
+    ]
+    responses = [client.get(path, headers=headers, params=params) for path, params in requests]
+    assert all(r.status_code == 200 for r in responses)
+    assert responses[0].json()["email"] == email
+    assert sorted(task["id"] for task in responses[1].json()["tasks"]) == task_ids
+    assert sorted(task["id"] for task in responses[3].json()) == task_ids
+    assert [task["id"] for task in responses[4].json()] == [task_ids[0], task_ids[2]]
+    assert [task["id"] for task in responses[5].json()] == [task_ids[1]]
+    assert [task["id"] for task in responses[6].json()] == [task_ids[1]]
+    
+    # Each filter combination's statement is built once; repeating the requests compiles nothing
+    shapes = task_list_statement.cache_info().currsize
+    hits, misses = STATEMENTS.value(result="hit"), STATEMENTS.value(result="miss")
+    for path, params in requests:
+        client.get(path, headers=headers, params=params)
+    assert task_list_statement.cache_info().currsize == shapes
+    assert STATEMENTS.value(result="miss") == misses
+    assert STATEMENTS.value(result="hit") > hits
+    assert "sql_compiled_cache_hit_ratio" in client.get("/metrics", headers=METRICS_HEADERS).text
+
+
+def test_busy_writer_answers_503_without_blocking_the_loop():
+    """Test that a write waiting on the busy SQLite writer times out with 503 while other requests keep running"""
+    import asyncio
+    import time
+    import httpx
+    from app import database
+    
+    email = f"writer_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/users/register", json={"email": email, "full_name": "Writer", "password": "password123"})
+    token = client.post("/users/login", json={"email": email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert database.SQLITE_TUNED and database.engine.pool.size() == 1
+    
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            started = time.perf_counter()
+            write = asyncio.create_task(c.post("/projects/", headers=headers, json={"name": "Blocked"}))
+            await asyncio.sleep(0.1)
+            # The write waits for the writer in a worker thread, not on the loop
+            health = await c.get("/health")
+            elapsed = time.perf_counter() - started
+            return await write, health, elapsed
+    
+    pool = database.engine.pool
+    timeout, pool._timeout = pool._timeout, 1.0
+    held = database.engine.connect()
+    try:
+        write, health, elapsed = asyncio.run(scenario())
+    finally:
+        held.close()
+        pool._timeout = timeout
+    assert write.status_code == 503 and write.headers["Retry-After"] == "1"
+    assert health.status_code == 200 and elapsed < 0.5
+    assert client.post("/projects/", headers=headers, json={"name": "Unblocked"}).status_code == 201
@@ -0,0 +1,194 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.core.deadlines import DeadlineExceeded, deadline, install_deadlines
+from app.database import Base, ReplicaPool, RecentWriters, RoutingSession
+from app.models import User
+import os
+import pytest
+import time
+import uuid
+
+
+def make_sessionmaker(tmp_path, replica_urls, create_replicas=True):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    Base.metadata.create_all(bind=primary)
+    replicas = []
+    for url in replica_urls:
+        replica = create_engine(url)
+        if create_replicas:
+            Base.metadata.create_all(bind=replica)
+        replicas.append(replica)
+    return sessionmaker(
+        class_=RoutingSession,
+        autoflush=False,
+        bind=primary,
+        replicas=ReplicaPool(replicas, retry_seconds=60.0),
+        recent_writers=RecentWriters(60.0)
+    )
+
+
+def add_user(db, email):
+    db.add(User(email=email, full_name="Replica User", password_hash="x"))
+    db.commit()
+
+
+def test_read_only_sessions_use_replica(tmp_path):
+    """Test that read-only sessions read from the replica and writes go to the primary"""
+    Session = make_sessionmaker(tmp_path, [f"sqlite:///{tmp_path / 'replica.db'}"])
+    email = f"replica_{uuid.uuid4().hex[:8]}@example.com"
+
+    db = Session()
+    add_user(db, email)
+    db.close()
+
+    # The replica was never written to, so a read-only session doesn't see the user
+    db = Session()
+    db.info["read_only"] = True
+    assert db.query(User).filter(User.email == email).first() is None
+    db.close()
+
+    # A regular session reads from the primary
+    db = Session()
+    assert db.query(User).filter(User.email == email).first() is not None
+    db.close()
+
+
+def test_recent_writer_sticks_to_primary(tmp_path):
+    """Test that a user who just wrote reads their own writes from the primary"""
+    Session = make_sessionmaker(tmp_path, [f"sqlite:///{tmp_path / 'replica.db'}"])
+    email = f"sticky_{uuid.uuid4().hex[:8]}@example.com"
+
+    db = Session()
+    db.info["user_id"] = 42
+    add_user(db, email)
+    db.close()
+
+    db = Session()
+    db.info.update(read_only=True, user_id=42)
+    assert db.query(User).filter(User.email == email).first() is not None
+    db.close()
+
+    # Other users still read from the replica
+    db = Session()
+    db.info.update(read_only=True, user_id=7)
+    assert db.query(User).filter(User.email == email).first() is None
+    db.close()
+
+
+def test_unhealthy_replica_falls_back_to_primary(tmp_path):
+    """Test that a replica that can't be reached is skipped"""
+    Session = make_sessionmaker(tmp_path, ["sqlite:////nonexistent/dir/replica.db"], create_replicas=False)
+    email = f"fallback_{uuid.uuid4().hex[:8]}@example.com"
+
+    db = Session()
+    add_user(db, email)
+    db.close()
+
+    # The first connection attempt fails and takes the replica out of rotation
+    db = Session()
+    db.info["read_only"] = True
+    assert not db.replicas.check(0)
+    assert db.replicas.choose() is None
+    assert db.query(User).filter(User.email == email).first() is not None
+    db.close()
+
+
+def test_sqlite_profile_pragmas():
+    """Test that the tuned SQLite profile applies WAL and a read-only reader pool"""
+    from sqlalchemy import text
+    from app.database import SQLITE_TUNED, engine, sqlite_read_engine
+
+    if not SQLITE_TUNED:
+        return
+
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA foreign_keys")).scalar() == 1
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+
+    with sqlite_read_engine.connect() as connection:
+        assert connection.execute(text("PRAGMA query_only")).scalar() == 1
+    
+    # Writes are serialised through a single pooled connection
+    assert engine.pool.size() == 1
+
+
+SLOW_QUERY = text(
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) "
+    "SELECT count(*) FROM (SELECT x FROM c LIMIT 100000000)"
+)
+
+
+def test_sqlite_deadline_interrupts_query(tmp_path):
+    """Test that a query running past the request deadline is interrupted"""
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'deadline.db'}", pool_size=1, max_overflow=0)
+    install_deadlines(db_engine)
+
+    started = time.monotonic()
+    with deadline(0.05):
+        with pytest.raises(DeadlineExceeded):
+            with db_engine.connect() as connection:
+                connection.execute(SLOW_QUERY)
+    assert time.monotonic() - started < 1
+
+    # The connection went back to the pool and works without a deadline
+    with db_engine.connect() as connection:
+        assert connection.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_postgres_deadline_sets_timeout_per_statement():
+    """Test that every statement under a deadline is preceded by SET LOCAL with the time left"""
+    from types import SimpleNamespace
+    from sqlalchemy import event
+    from app.core.deadlines import _on_postgres_execute
+
+    db_engine = create_engine("postgresql+psycopg2://user@localhost/deadlines")
+    install_deadlines(db_engine)
+    assert event.contains(db_engine, "before_cursor_execute", _on_postgres_execute)
+
+    emitted = []
+
+    class RecordingCursor:
+        def execute(self, statement):
+            emitted.append(statement)
+
+        def close(self):
+            pass
+
+    connection = SimpleNamespace(connection=SimpleNamespace(dbapi_connection=SimpleNamespace(cursor=RecordingCursor)))
+
+    def execute():
+        _on_postgres_execute(connection, None, "SELECT 1", {}, None, False)
+
+    execute()
+    assert emitted == []
+    with deadline(1.0):
+        execute()
+        time.sleep(0.2)
+        execute()
+    assert [statement.split(" = ")[0] for statement in emitted] == ["SET LOCAL statement_timeout"] * 2
+    first, second = (int(statement.split(" = ")[1]) for statement in emitted)
+    assert 800 < first <= 1000 and second <= first - 200
+
+    with deadline(0):
+        with pytest.raises(DeadlineExceeded):
+            execute()
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL is not set")
+def test_postgres_deadline_cancels_later_statement():
+    """Test that a statement late in a transaction only gets what is left of the deadline"""
+    db_engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    install_deadlines(db_engine)
+
+    started = time.monotonic()
+    with deadline(1.0):
+        with pytest.raises(DeadlineExceeded):
+            with db_engine.connect() as connection:
+                connection.execute(text("SELECT pg_sleep(0.6)"))
+                # A timeout set when the transaction began would allow the full second here
+                connection.execute(text("SELECT pg_sleep(0.9)"))
+    assert time.monotonic() - started < 1.3
+
+    with db_engine.connect() as connection:
+        assert connection.execute(text("SELECT 1")).scalar() == 1
@@ -0,0 +1,45 @@
+"""
+Standalone background job worker
+
+    python -m app.worker
+
+Runs alongside the API and claims queued jobs from the database. Start as
+many as needed (each with its own ID_NODE when sharded); SKIP LOCKED keeps
+them from running the same job twice.
+"""
+import logging
+import signal
+import time
+from app.core.config import get_settings
+from app.core.ids import check_node
+from app.services.activity import activity_log
+from app.services.jobs import run_pending_jobs
+
+logger = logging.getLogger("app.worker")
+
+
+def main():
+    settings = get_settings()
+    logging.basicConfig(level=settings.log_level.upper())
+    check_node()
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    logger.info("Job worker started")
+    while not stopping:
+        if not run_pending_jobs(limit=1):
+            time.sleep(settings.job_poll_seconds)
+        # Jobs record activity too; without an event loop it is flushed between jobs
+        activity_log.flush()
+    activity_log.flush()
+    logger.info("Job worker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Latency benchmark for GET /projects/{id}/analytics
+
+Seeds one project with `--events` task status events spread over the last
+`--weeks` weeks (each task goes todo -> in_progress -> completed), then
+times the first, uncached request and repeated cached ones. A final request
+after one more status change shows the cost of invalidation.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--requests", type=int, default=50)
+    return parser.parse_args()
+
+
+def seed(engine, project_id, events, weeks, batch=30_000):
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert
+    from app.models import TaskStatusEvent
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    span = weeks * 7 * 24 * 3600
+    rows = []
+    for task_id in range(1, events // 3 + 1):
+        created = now - timedelta(seconds=rng.randrange(span))
+        started = created + timedelta(hours=rng.expovariate(1 / 24))
+        completed = started + timedelta(hours=rng.expovariate(1 / 72))
+        rows.append({"task_id": task_id, "project_id": project_id, "from_status": None, "to_status": "TODO", "changed_at": created})
+        rows.append({"task_id": task_id, "project_id": project_id, "from_status": "TODO", "to_status": "IN_PROGRESS", "changed_at": started})
+        # Tasks that would finish in the future are still in progress
+        if completed < now:
+            rows.append({"task_id": task_id, "project_id": project_id, "from_status": "IN_PROGRESS", "to_status": "COMPLETED", "changed_at": completed})
+        if len(rows) >= batch:
+            with engine.begin() as connection:
+                connection.execute(insert(TaskStatusEvent.__table__), rows)
+            rows = []
+    if rows:
+        with engine.begin() as connection:
+            connection.execute(insert(TaskStatusEvent.__table__), rows)
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="pm-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    # Imported after the environment is configured
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func, select
+    from app.database import Base, engine
+    from app.main import app
+    from app.models import TaskStatusEvent
+
+    Base.metadata.create_all(bind=engine)
+    client = TestClient(app)
+    email = f"bench_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/users/register", json={"email": email, "full_name": "Bench", "password": "password123"})
+    token = client.post("/users/login", json={"email": email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = client.post("/projects/", headers=headers, json={"name": "Analytics"}).json()["id"]
+
+    started = time.perf_counter()
+    seed(engine, project_id, args.events, args.weeks)
+    with engine.connect() as connection:
+        count = connection.execute(select(func.count()).select_from(TaskStatusEvent.__table__)).scalar()
+    print(f"seeded:      {count} events in {time.perf_counter() - started:.1f}s")
+
+    url = f"/projects/{project_id}/analytics?weeks={args.weeks}"
+    started = time.perf_counter()
+    response = client.get(url, headers=headers)
+    cold = time.perf_counter() - started
+    response.raise_for_status()
+    data = response.json()
+
+    timings = []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        client.get(url, headers=headers)
+        timings.append(time.perf_counter() - started)
+
+    task_id = client.post("/tasks/", headers=headers, json={"title": "New", "project_id": project_id}).json()["id"]
+    client.put(f"/tasks/{task_id}", headers=headers, json={"status": "in_progress"})
+    started = time.perf_counter()
+    client.get(url, headers=headers)
+    invalidated = time.perf_counter() - started
+
+    print(f"cycle time:  median {data['cycle_time']['median_hours']}h, p90 {data['cycle_time']['p90_hours']}h "
+          f"over {data['cycle_time']['completed_tasks']} tasks")
+    print(f"cold:        {cold * 1000:.0f} ms")
+    print(f"cached:      p50 {statistics.median(timings) * 1000:.1f} ms over {args.requests} requests")
+    print(f"invalidated: {invalidated * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Throughput benchmark for POST /import
+
+Streams a generated NDJSON body of `--tasks` tasks (plus their projects)
+through the API without building it in memory, and reports rows per second
+and peak memory growth. Point DATABASE_URL at a local Postgres to measure
+against the production database; otherwise a fresh SQLite file is used.
+"""
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+import uuid
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=200_000)
+    parser.add_argument("--projects", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=None, help="Override IMPORT_BATCH_SIZE")
+    return parser.parse_args()
+
+
+def generate_body(projects, tasks):
+    """Yield the NDJSON body in chunks, projects first"""
+    chunk = []
+    for i in range(projects):
+        chunk.append(json.dumps({"type": "project", "id": i + 1, "name": f"Project {i}"}))
+    for i in range(tasks):
+        chunk.append(json.dumps({
+            "type": "task",
+            "title": f"Task {i}",
+            "description": "Imported by benchmark",
+            "project_id": i % projects + 1,
+            "priority": "medium",
+        }))
+        if len(chunk) >= 1000:
+            yield ("\n".join(chunk) + "\n").encode()
+            chunk = []
+    yield ("\n".join(chunk) + "\n").encode()
+
+
+def main():
+    args = parse_args()
+    if "DATABASE_URL" not in os.environ:
+        workdir = tempfile.mkdtemp(prefix="pm-bench-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    if args.batch_size:
+        os.environ["IMPORT_BATCH_SIZE"] = str(args.batch_size)
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    # Imported after the environment is configured
+    from fastapi.testclient import TestClient
+    from app.database import Base, engine
+    from app.main import app
+
+    Base.metadata.create_all(bind=engine)
+    client = TestClient(app)
+    email = f"bench_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/users/register", json={"email": email, "full_name": "Bench", "password": "password123"})
+    token = client.post("/users/login", json={"email": email, "password": "password123"}).json()["access_token"]
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    response = client.post(
+        "/import?format=ndjson",
+        headers={"Authorization": f"Bearer {token}"},
+        content=generate_body(args.projects, args.tasks)
+    )
+    elapsed = time.perf_counter() - started
+    summary = response.json()
+
+    rows = summary["projects_created"] + summary["tasks_created"]
+    print(f"status:     {response.status_code}  errors: {summary['error_count']}")
+    print(f"imported:   {rows} rows in {elapsed:.2f}s")
+    print(f"throughput: {rows / elapsed:,.0f} rows/s")
+    print(f"rss growth: {(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
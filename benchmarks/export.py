@@ -0,0 +1,107 @@
+"""
+Memory and throughput benchmark for GET /export
+
+Seeds one user with `--tasks` tasks spread over `--projects` projects in a
+fresh SQLite file, then streams the full export through the API and reports
+rows per second, bytes sent and peak memory growth. With constant-memory
+streaming the peak should stay flat as `--tasks` grows.
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--projects", type=int, default=100)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--gzip", action="store_true", help="Request a gzip-compressed stream")
+    parser.add_argument("--trace-memory", action="store_true", help="Use tracemalloc (slow) instead of RSS")
+    return parser.parse_args()
+
+
+def seed(engine, owner_id, projects, tasks, batch=10_000):
+    from datetime import datetime
+    from sqlalchemy import insert
+    from app.models import Project, Task
+
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(Project), [
+            {"name": f"Project {i}", "owner_id": owner_id, "created_at": now, "updated_at": now}
+            for i in range(projects)
+        ])
+        project_ids = [row.id for row in connection.execute(
+            Project.__table__.select().where(Project.owner_id == owner_id)
+        )]
+    for start in range(0, tasks, batch):
+        with engine.begin() as connection:
+            connection.execute(insert(Task), [
+                {
+                    "title": f"Task {i}",
+                    "description": "Benchmark task",
+                    "project_id": project_ids[i % len(project_ids)],
+                    "status": "TODO",
+                    "priority": "MEDIUM",
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(start, min(start + batch, tasks))
+            ])
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="pm-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    # Imported after the environment is configured
+    from fastapi.testclient import TestClient
+    from app.database import Base, engine
+    from app.main import app
+
+    Base.metadata.create_all(bind=engine)
+    client = TestClient(app)
+    email = f"bench_{uuid.uuid4().hex[:8]}@example.com"
+    user = client.post("/users/register", json={"email": email, "full_name": "Bench", "password": "password123"}).json()
+    token = client.post("/users/login", json={"email": email, "password": "password123"}).json()["access_token"]
+
+    started = time.perf_counter()
+    seed(engine, user["id"], args.projects, args.tasks)
+    print(f"seeded:     {args.tasks} tasks in {time.perf_counter() - started:.1f}s")
+
+    headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "gzip" if args.gzip else "identity"}
+    if args.trace_memory:
+        tracemalloc.start()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    started = time.perf_counter()
+    sent = 0
+    lines = 0
+    with client.stream("GET", f"/export?format={args.format}", headers=headers) as response:
+        for chunk in response.iter_raw():
+            sent += len(chunk)
+            if not args.gzip:
+                lines += chunk.count(b"\n")
+    elapsed = time.perf_counter() - started
+
+    rows = args.tasks + args.projects
+    print(f"format:     {args.format}{' (gzip)' if args.gzip else ''}")
+    print(f"exported:   {rows} rows, {sent / 1e6:.1f} MB on the wire in {elapsed:.2f}s")
+    print(f"throughput: {rows / elapsed:,.0f} rows/s")
+    if args.trace_memory:
+        print(f"peak heap:  {tracemalloc.get_traced_memory()[1] / 1e6:.1f} MB")
+    else:
+        growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+        print(f"rss growth: {growth / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
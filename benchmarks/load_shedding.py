@@ -0,0 +1,114 @@
+"""
+Goodput under overload with and without the adaptive concurrency limiter
+
+Drives an in-process FastAPI app through `LoadSheddingMiddleware` with an
+open-loop (Poisson) arrival rate above what its simulated database can
+serve. The "database" is a pool of `--pool-size` connections, each query
+holding one for `--service-ms`, so capacity is pool_size / service time.
+Clients give up after `--deadline` seconds, but like a real server the app
+keeps working on abandoned requests. Goodput counts only responses that
+arrived within the deadline.
+
+Without the limiter the queue grows until every request misses its deadline;
+with it the excess is shed immediately and admitted requests stay fast.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rate", type=float, default=800, help="Offered requests per second")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--service-ms", type=float, default=20)
+    parser.add_argument("--deadline", type=float, default=1.0, help="Client timeout in seconds")
+    parser.add_argument("--latency-target-ms", type=float, default=200)
+    return parser.parse_args()
+
+
+def build_app(args, limited):
+    from fastapi import FastAPI
+    from app.core.load_shedding import AdaptiveConcurrencyLimiter, LoadSheddingMiddleware
+
+    app = FastAPI()
+    pool = asyncio.Semaphore(args.pool_size)
+    limiter = None
+    if limited:
+        limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=args.pool_size * 2,
+            min_limit=1,
+            max_limit=args.pool_size * 20,
+            latency_target=args.latency_target_ms / 1000
+        )
+        app.add_middleware(LoadSheddingMiddleware, limiter=limiter, priority_paths=["/health"])
+
+    @app.get("/tasks")
+    async def list_tasks():
+        async with pool:
+            await asyncio.sleep(args.service_ms / 1000)
+        return {"ok": True}
+
+    return app, limiter
+
+
+async def run(args, limited):
+    import httpx
+
+    app, limiter = build_app(args, limited)
+    transport = httpx.ASGITransport(app=app)
+    rng = random.Random(42)
+    results = []
+    pending = set()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            started = time.perf_counter()
+            response = await client.get("/tasks")
+            results.append((response.status_code, time.perf_counter() - started))
+
+        started = time.perf_counter()
+        next_at = started
+        while next_at - started < args.duration:
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            task = asyncio.create_task(one())
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            next_at += rng.expovariate(args.rate)
+        # Stop measuring at the last deadline; abandoned requests are not waited for
+        if pending:
+            await asyncio.wait(pending, timeout=args.deadline)
+        elapsed = time.perf_counter() - started
+        abandoned = len(pending)
+        for task in list(pending):
+            task.cancel()
+
+    good = [latency for code, latency in results if code == 200 and latency <= args.deadline]
+    late = sum(1 for code, latency in results if code == 200 and latency > args.deadline)
+    shed = sum(1 for code, _ in results if code == 503)
+    sent = len(results) + abandoned
+    print(f"\n{'with' if limited else 'without'} limiter")
+    print(f"  sent:      {sent}")
+    print(f"  goodput:   {len(good) / elapsed:,.0f} req/s ({len(good)} within {args.deadline}s)")
+    print(f"  late:      {late + abandoned}")
+    print(f"  shed 503:  {shed}")
+    if good:
+        good.sort()
+        print(f"  p50/p99:   {statistics.median(good) * 1000:.0f} / {good[int(len(good) * 0.99) - 1] * 1000:.0f} ms")
+    if limiter is not None:
+        print(f"  limit:     {limiter.limit:.1f} at the end")
+
+
+def main():
+    args = parse_args()
+    capacity = args.pool_size / (args.service_ms / 1000)
+    print(f"offered {args.rate:.0f} req/s against capacity {capacity:.0f} req/s for {args.duration:.0f}s")
+    asyncio.run(run(args, limited=False))
+    asyncio.run(run(args, limited=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Authorization overhead for users who belong to thousands of projects
+
+Seeds `--projects` projects shared with one user (a fifth of them owned by
+that user, the rest through memberships), the same number of unrelated
+projects owned by someone else, and `--tasks-per-project` tasks in each.
+Then reports latency and SQL statements per request for the endpoints that
+check permissions, and how long loading the user's role set takes.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--projects", type=int, default=5_000)
+    parser.add_argument("--tasks-per-project", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    return parser.parse_args()
+
+
+def seed(engine, user_id, other_id, projects, tasks_per_project):
+    from datetime import datetime
+    from sqlalchemy import insert, select
+    from app.models import Project, ProjectMember, Task
+
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        rows = []
+        for i in range(projects * 2):
+            # Every other project is unrelated; a fifth of the user's are their own
+            mine = i % 2 == 0 and i % 10 == 0
+            rows.append({"name": f"Project {i}", "owner_id": user_id if mine else other_id, "created_at": now, "updated_at": now})
+        connection.execute(insert(Project), rows)
+        project_ids = connection.execute(select(Project.id, Project.owner_id).order_by(Project.id)).all()
+        shared = [pid for index, (pid, owner) in enumerate(project_ids) if index % 2 == 0 and owner != user_id]
+        connection.execute(insert(ProjectMember), [
+            {"project_id": pid, "user_id": user_id, "role": "EDITOR", "created_at": now} for pid in shared
+        ])
+        connection.execute(insert(Task), [
+            {
+                "title": f"Task {n}",
+                "project_id": pid,
+                "status": "TODO",
+                "priority": "MEDIUM",
+                "created_at": now,
+                "updated_at": now,
+            }
+            for pid, _ in project_ids
+            for n in range(tasks_per_project)
+        ])
+    return shared[0]
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="pm-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    # Imported after the environment is configured
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app.core.permissions import ProjectPermissions
+    from app.database import Base, SessionLocal, engine
+    from app.main import app
+    from app.models import Task
+
+    Base.metadata.create_all(bind=engine)
+    client = TestClient(app)
+
+    def register(name):
+        email = f"{name}_{uuid.uuid4().hex[:8]}@example.com"
+        user = client.post("/users/register", json={"email": email, "full_name": name, "password": "password123"}).json()
+        token = client.post("/users/login", json={"email": email, "password": "password123"}).json()["access_token"]
+        return user["id"], {"Authorization": f"Bearer {token}"}
+
+    user_id, headers = register("member")
+    other_id, _ = register("other")
+
+    started = time.perf_counter()
+    project_id = seed(engine, user_id, other_id, args.projects, args.tasks_per_project)
+    print(f"seeded:     {args.projects * 2} projects, {args.projects * 2 * args.tasks_per_project} tasks "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    db = SessionLocal()
+    task_id = db.query(Task.id).filter(Task.project_id == project_id).first()[0]
+    timings = []
+    for _ in range(20):
+        started = time.perf_counter()
+        roles = ProjectPermissions(db, user_id).roles
+        timings.append(time.perf_counter() - started)
+    db.close()
+    print(f"role set:   {len(roles)} projects loaded in {statistics.median(timings) * 1000:.2f} ms")
+
+    # Reads may go to the read-only engine, so count on every engine
+    statements = []
+    event.listen(Engine, "before_cursor_execute", lambda *args: statements.append(1))
+
+    paths = [
+        "/projects/?limit=100",
+        "/tasks/?limit=100",
+        f"/tasks/?project_id={project_id}&limit=100",
+        f"/tasks/{task_id}",
+        f"/projects/{project_id}/members",
+        "/dashboard",
+    ]
+    print(f"{'endpoint':<42} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8}")
+    for path in paths:
+        timings = []
+        statements.clear()
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            response = client.get(path, headers=headers)
+            timings.append(time.perf_counter() - started)
+            response.raise_for_status()
+        timings.sort()
+        print(f"{path:<42} {statistics.median(timings) * 1000:>8.2f} "
+              f"{timings[int(len(timings) * 0.95)] * 1000:>8.2f} {len(statements) / args.requests:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Reminder scheduler cost with millions of pending reminders
+
+Seeds `--tasks` open tasks with due dates spread evenly over `--days` days,
+assigned across `--users` users who each pick two of the lead times in
+`LEAD_CHOICES`. Then reports how long loading one scheduler window takes,
+how many reminders it holds and how much memory they take, what pushing a
+changed task costs, and how fast a window's reminders are delivered.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+LEAD_CHOICES = [15, 60, 240, 1440]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--window-minutes", type=int, default=60)
+    return parser.parse_args()
+
+
+def seed(engine, args, start):
+    from datetime import timedelta
+    from sqlalchemy import insert, select
+    from app.models import Project, ReminderPreference, Task, User
+
+    rng = random.Random(42)
+    now = start
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"email": f"user{i}@example.com", "full_name": f"User {i}", "password_hash": "x", "is_active": True,
+             "created_at": now, "updated_at": now}
+            for i in range(args.users)
+        ])
+        user_ids = connection.execute(select(User.id).order_by(User.id)).scalars().all()
+        connection.execute(insert(ReminderPreference), [
+            {"user_id": user_id, "lead_minutes": lead, "created_at": now}
+            for user_id in user_ids
+            for lead in rng.sample(LEAD_CHOICES, 2)
+        ])
+        connection.execute(insert(Project), [
+            {"name": f"Project {i}", "owner_id": user_id, "created_at": now, "updated_at": now}
+            for i, user_id in enumerate(user_ids)
+        ])
+        project_ids = connection.execute(select(Project.id).order_by(Project.id)).scalars().all()
+
+        spacing = args.days * 86400 / args.tasks
+        batch = []
+        for n in range(args.tasks):
+            batch.append({
+                "title": f"Task {n}",
+                "project_id": project_ids[n % len(project_ids)],
+                "assigned_to": user_ids[rng.randrange(len(user_ids))],
+                "status": "TODO",
+                "priority": "MEDIUM",
+                "due_date": start + timedelta(seconds=n * spacing),
+                "position": "a0",
+                "created_at": now,
+                "updated_at": now,
+            })
+            if len(batch) == 50_000:
+                connection.execute(insert(Task), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(Task), batch)
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="pm-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    # Imported after the environment is configured
+    from datetime import timedelta
+    from app.database import Base, SessionLocal, engine
+    from app.models import Task
+    from app.services.reminders import ReminderScheduler, ReminderSink, utcnow
+
+    class CountingSink(ReminderSink):
+        def __init__(self):
+            self.count = 0
+
+        def send(self, messages):
+            self.count += len(messages)
+
+    Base.metadata.create_all(bind=engine)
+    start = utcnow().replace(microsecond=0) + timedelta(days=2)
+    started = time.perf_counter()
+    seed(engine, args, start)
+    print(f"seeded:        {args.tasks} tasks, {args.users} users, ~{args.tasks * 2} pending reminders "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    db = SessionLocal()
+    sink = CountingSink()
+    window = timedelta(minutes=args.window_minutes)
+    timings = []
+    for i in range(5):
+        scheduler = ReminderScheduler(window=window, max_pending=100_000, sink=sink)
+        tracemalloc.start()
+        began = time.perf_counter()
+        loaded = scheduler.load_window(db, start=start + timedelta(days=30 + i))
+        timings.append(time.perf_counter() - began)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    print(f"load window:   {loaded} reminders in {statistics.median(timings) * 1000:.1f} ms (p50 of 5), "
+          f"peak {peak / 1024:.0f} KiB")
+
+    # A changed task pushes its own reminders: two small indexed queries
+    tasks = db.query(Task).filter(Task.due_date >= start + timedelta(days=34, minutes=30)).limit(200).all()
+    timings = []
+    for task in tasks:
+        began = time.perf_counter()
+        scheduler.schedule_task(db, task, now=start + timedelta(days=34))
+        timings.append(time.perf_counter() - began)
+    print(f"schedule_task: {statistics.median(timings) * 1000:.2f} ms p50")
+
+    due = scheduler.pop_due(now=scheduler.horizon)
+    began = time.perf_counter()
+    sent = scheduler.deliver(db, due)
+    elapsed = time.perf_counter() - began
+    print(f"deliver:       {sent} of {len(due)} reminders in {elapsed * 1000:.1f} ms "
+          f"({len(due) / elapsed:,.0f}/s)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
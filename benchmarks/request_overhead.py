@@ -0,0 +1,125 @@
+"""
+Per-request Python overhead on the hot read endpoints
+
+Seeds one user with a project of `--tasks` tasks in a fresh SQLite file,
+then calls each hot endpoint `--requests` times in process. For each one it
+reports the median latency, the part of it spent executing SQL, and the rest:
+routing, dependencies, building statements and encoding the response.
+`GET /health` runs no SQL and shows the framework and test client floor.
+Also reports the compiled statement cache hit ratio over the measured
+requests.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1_000)
+    return parser.parse_args()
+
+
+def seed(engine, owner_id, tasks):
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert
+    from app.models import Project, Task
+    from app.services.positions import key_between
+
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        project_id = connection.execute(
+            insert(Project).values(name="Overhead", description="Benchmark project", owner_id=owner_id,
+                                   created_at=now, updated_at=now)
+        ).inserted_primary_key[0]
+        positions = []
+        for _ in range(tasks):
+            positions.append(key_between(positions[-1] if positions else None, None))
+        connection.execute(insert(Task), [
+            {
+                "title": f"Task {i}",
+                "description": "Benchmark task",
+                "project_id": project_id,
+                "assigned_to": owner_id,
+                "status": "TODO",
+                "priority": "MEDIUM",
+                "due_date": now + timedelta(days=i),
+                "position": positions[i],
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(tasks)
+        ])
+    return project_id
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="pm-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    # Imported after the environment is configured
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app.core.statement_cache import STATEMENTS
+    from app.database import Base, engine
+    from app.main import app
+
+    Base.metadata.create_all(bind=engine)
+    email = f"overhead_{uuid.uuid4().hex[:8]}@example.com"
+    with TestClient(app) as client:
+        user_id = client.post("/users/register", json={"email": email, "full_name": "Overhead", "password": "password123"}).json()["id"]
+        token = client.post("/users/login", json={"email": email, "password": "password123"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        project_id = seed(engine, user_id, args.tasks)
+        task_id = client.get("/tasks/", headers=headers, params={"project_id": project_id, "limit": 1}).json()[0]["id"]
+
+        # Reads go to the read-only engine, so time SQL on every engine
+        sql_time = [0.0]
+        started_at = {}
+
+        @event.listens_for(Engine, "before_cursor_execute")
+        def before(conn, cursor, statement, parameters, context, executemany):
+            started_at[id(cursor)] = time.perf_counter()
+
+        @event.listens_for(Engine, "after_cursor_execute")
+        def after(conn, cursor, statement, parameters, context, executemany):
+            sql_time[0] += time.perf_counter() - started_at.pop(id(cursor))
+
+        paths = [
+            "/health",
+            "/users/me",
+            f"/projects/{project_id}",
+            f"/tasks/{task_id}",
+            f"/tasks/?project_id={project_id}&limit=100",
+            f"/tasks/?project_id={project_id}&task_status=todo&limit=100",
+            "/tasks/?limit=100",
+        ]
+        hits, misses = STATEMENTS.value(result="hit"), STATEMENTS.value(result="miss")
+        print(f"{'endpoint':<52} {'p50 ms':>8} {'sql ms':>8} {'python ms':>10}")
+        for path in paths:
+            # Compile and warm up outside the measurement
+            for _ in range(10):
+                client.get(path, headers=headers).raise_for_status()
+            timings = []
+            sql_time[0] = 0.0
+            for _ in range(args.requests):
+                started = time.perf_counter()
+                client.get(path, headers=headers)
+                timings.append(time.perf_counter() - started)
+            p50 = statistics.median(timings) * 1000
+            sql = sql_time[0] / args.requests * 1000
+            print(f"{path:<52} {p50:>8.2f} {sql:>8.2f} {p50 - sql:>10.2f}")
+        hits, misses = STATEMENTS.value(result="hit") - hits, STATEMENTS.value(result="miss") - misses
+        print(f"compiled cache: {hits:.0f} hits, {misses:.0f} misses ({hits / max(hits + misses, 1):.1%} hit ratio)")
+
+
+if __name__ == "__main__":
+    main()
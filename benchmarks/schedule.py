@@ -0,0 +1,145 @@
+"""
+Latency benchmark for GET /projects/{id}/schedule
+
+Seeds one project with `--tasks` tasks and `--edges` random dependency edges
+(always from a lower to a higher task number, so the graph is acyclic), then
+times the schedule endpoint end to end and split into loading the graph and
+computing on it. Also times dependency inserts, which run the cycle check:
+half agree with the existing order and half run against it.
+
+Exits non-zero when a p50 or p95 is over its budget in the "benchmarks"
+section of app/tests/perf/budgets.json. The budgets were set on a 1-vCPU
+machine at the default sizes, so they only apply at those sizes.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), "..", "app", "tests", "perf", "budgets.json")
+DEFAULTS = {"tasks": 50_000, "edges": 200_000}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=DEFAULTS["tasks"])
+    parser.add_argument("--edges", type=int, default=DEFAULTS["edges"])
+    parser.add_argument("--requests", type=int, default=20)
+    return parser.parse_args()
+
+
+def seed(engine, project_id, tasks, edges, batch=50_000):
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert, select
+    from app.models import Task, TaskDependency
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    statuses = ["TODO"] * 6 + ["IN_PROGRESS"] * 2 + ["COMPLETED"] * 2
+    with engine.begin() as connection:
+        connection.execute(insert(Task), [
+            {
+                "title": f"Task {i}",
+                "project_id": project_id,
+                "status": rng.choice(statuses),
+                "priority": "MEDIUM",
+                "due_date": now + timedelta(days=rng.randrange(365)) if rng.random() < 0.8 else None,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(tasks)
+        ])
+        ids = connection.execute(select(Task.id).where(Task.project_id == project_id).order_by(Task.id)).scalars().all()
+    pairs = set()
+    while len(pairs) < edges:
+        a, b = rng.randrange(tasks), rng.randrange(tasks)
+        if a != b:
+            pairs.add((min(a, b), max(a, b)))
+    pairs = list(pairs)
+    for start in range(0, len(pairs), batch):
+        with engine.begin() as connection:
+            connection.execute(insert(TaskDependency), [
+                {"blocking_task_id": ids[a], "blocked_task_id": ids[b], "created_at": now}
+                for a, b in pairs[start:start + batch]
+            ])
+    return ids
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="pm-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    # Imported after the environment is configured
+    from fastapi.testclient import TestClient
+    from app.database import Base, SessionLocal, engine
+    from app.main import app
+    from app.services.schedule import compute_schedule, load_graph
+
+    Base.metadata.create_all(bind=engine)
+    client = TestClient(app)
+    email = f"bench_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/users/register", json={"email": email, "full_name": "Bench", "password": "password123"})
+    token = client.post("/users/login", json={"email": email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = client.post("/projects/", headers=headers, json={"name": "Schedule"}).json()["id"]
+
+    started = time.perf_counter()
+    ids = seed(engine, project_id, args.tasks, args.edges)
+    print(f"seeded:     {args.tasks} tasks, {args.edges} edges in {time.perf_counter() - started:.1f}s")
+
+    db = SessionLocal()
+    load, compute = [], []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        rows = load_graph(db, project_id)
+        loaded = time.perf_counter()
+        schedule = compute_schedule(rows)
+        load.append(loaded - started)
+        compute.append(time.perf_counter() - loaded)
+    db.close()
+    print(f"critical:   {len(schedule['critical_path'])} tasks, {len(schedule['unblocked'])} unblocked")
+    print(f"load graph: p50 {statistics.median(load) * 1000:.1f} ms")
+    print(f"compute:    p50 {statistics.median(compute) * 1000:.1f} ms")
+
+    results = {}
+    timings = []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        client.get(f"/projects/{project_id}/schedule", headers=headers).raise_for_status()
+        timings.append(time.perf_counter() - started)
+    results["endpoint_p50_ms"] = statistics.median(timings) * 1000
+    print(f"endpoint:   p50 {results['endpoint_p50_ms']:.1f} ms")
+
+    rng = random.Random(7)
+    forward, backward = [], []
+    for _ in range(args.requests):
+        a, b = sorted(rng.sample(ids, 2))
+        # Seeded edges run from lower to higher ids, so a -> b already fits
+        # the order; b -> a needs a search and is rejected with 409 if a
+        # reaches b
+        for blocking, blocked, timings in ((a, b, forward), (b, a, backward)):
+            started = time.perf_counter()
+            response = client.post(f"/tasks/{blocked}/dependencies", headers=headers, json={"blocked_by": blocking})
+            timings.append(time.perf_counter() - started)
+            assert response.status_code in (201, 409), response.text
+    for name, timings in (("forward", forward), ("backward", backward)):
+        timings = sorted(timings)
+        results[f"add_edge_{name}_p95_ms"] = timings[int(0.95 * (len(timings) - 1))] * 1000
+        print(f"add {name + ':':10}p50 {statistics.median(timings) * 1000:.1f} ms, p95 {results[f'add_edge_{name}_p95_ms']:.1f} ms")
+
+    if {"tasks": args.tasks, "edges": args.edges} == DEFAULTS:
+        with open(BUDGETS_PATH) as f:
+            budgets = json.load(f)["benchmarks"]["schedule"]
+        over = [f"{key} {results[key]:.1f} > {budget}" for key, budget in budgets.items() if results[key] > budget]
+        if over:
+            raise SystemExit("over budget: " + ", ".join(over))
+
+if __name__ == "__main__":
+    main()
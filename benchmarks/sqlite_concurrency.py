@@ -0,0 +1,100 @@
+"""
+Mixed read/write concurrency benchmark for the SQLite profile
+
+Runs worker threads against the real API (each with its own TestClient and
+event loop) on a fresh SQLite file. Each worker issues a mix of task list
+reads and task creates and the script reports throughput, latency
+percentiles and failures. Compare runs with and without `--untuned`.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per thread")
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--untuned", action="store_true", help="Use the default rollback journal setup")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="pm-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["SQLITE_TUNED"] = "false" if args.untuned else "true"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    # Imported after the environment is configured
+    from fastapi.testclient import TestClient
+    from app.database import Base, engine
+    from app.main import app
+    from app import models  # noqa: F401
+
+    Base.metadata.create_all(bind=engine)
+
+    setup = TestClient(app)
+    email = f"bench_{uuid.uuid4().hex[:8]}@example.com"
+    setup.post("/users/register", json={"email": email, "full_name": "Bench", "password": "password123"})
+    token = setup.post("/users/login", json={"email": email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = setup.post("/projects/", headers=headers, json={"name": "Bench"}).json()["id"]
+
+    latencies = {"read": [], "write": []}
+    failures = []
+    lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = TestClient(app)
+        local = {"read": [], "write": []}
+        errors = []
+        for i in range(args.requests):
+            kind = "write" if rng.random() < args.write_ratio else "read"
+            start = time.perf_counter()
+            try:
+                if kind == "write":
+                    r = client.post("/tasks/", headers=headers, json={"title": f"t{seed}-{i}", "project_id": project_id})
+                else:
+                    r = client.get(f"/tasks/?project_id={project_id}&limit=50", headers=headers)
+                if r.status_code >= 400:
+                    errors.append(r.status_code)
+            except Exception as exc:
+                errors.append(type(exc).__name__)
+            local[kind].append(time.perf_counter() - start)
+        with lock:
+            for key in local:
+                latencies[key].extend(local[key])
+            failures.extend(errors)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"profile:    {'untuned' if args.untuned else 'tuned (WAL, single writer)'}")
+    print(f"threads:    {args.threads}  requests: {total}  elapsed: {elapsed:.2f}s")
+    print(f"throughput: {total / elapsed:.1f} req/s")
+    for kind, samples in latencies.items():
+        if not samples:
+            continue
+        samples.sort()
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        print(f"{kind:5} p50: {statistics.median(samples) * 1000:.1f}ms  p99: {p99 * 1000:.1f}ms  n={len(samples)}")
+    print(f"failures:   {len(failures)} {sorted(set(map(str, failures)))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Delta sync cost for a large account with few changes
+
+Seeds `--tasks` tasks (with their change feed entries, as if created through
+the API) across `--projects` projects, takes a sync token, makes `--changes`
+edits through the API and then compares `GET /sync` against refetching every
+task through `GET /tasks/`: rows transferred, bytes and time.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--projects", type=int, default=10)
+    parser.add_argument("--changes", type=int, default=10)
+    return parser.parse_args()
+
+
+def seed(engine, user_id, args):
+    from sqlalchemy import insert, select
+    from app.models import Project, SyncChange, Task
+
+    with engine.begin() as connection:
+        project_ids = connection.execute(
+            insert(Project).returning(Project.id),
+            [{"name": f"Project {i}", "owner_id": user_id} for i in range(args.projects)]
+        ).scalars().all()
+        batch = []
+        for n in range(args.tasks):
+            batch.append({
+                "title": f"Task {n}",
+                "project_id": project_ids[n % len(project_ids)],
+                "status": "TODO",
+                "priority": "MEDIUM",
+                "position": "a0",
+            })
+            if len(batch) == 50_000 or n == args.tasks - 1:
+                connection.execute(insert(Task), batch)
+                batch = []
+        connection.execute(insert(SyncChange), [
+            {"project_id": project_id, "entity": "project", "entity_id": project_id, "deleted": False}
+            for project_id in project_ids
+        ])
+        rows = connection.execute(select(Task.project_id, Task.id).order_by(Task.id)).all()
+        for i in range(0, len(rows), 50_000):
+            connection.execute(insert(SyncChange), [
+                {"project_id": project_id, "entity": "task", "entity_id": task_id, "deleted": False}
+                for project_id, task_id in rows[i:i + 50_000]
+            ])
+        return [task_id for _, task_id in rows]
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="pm-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    # Imported after the environment is configured
+    from fastapi.testclient import TestClient
+    from app.database import Base, engine
+    from app.main import app
+
+    Base.metadata.create_all(bind=engine)
+    client = TestClient(app)
+    email = f"sync_{uuid.uuid4().hex[:8]}@example.com"
+    user_id = client.post("/users/register", json={"email": email, "full_name": "Sync", "password": "password123"}).json()["id"]
+    token = client.post("/users/login", json={"email": email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    started = time.perf_counter()
+    task_ids = seed(engine, user_id, args)
+    print(f"seeded:      {args.tasks} tasks in {args.projects} projects in {time.perf_counter() - started:.1f}s")
+
+    since = client.get("/sync", headers=headers).json()["token"]
+    step = len(task_ids) // args.changes
+    for i in range(args.changes):
+        client.put(f"/tasks/{task_ids[i * step]}", headers=headers, json={"title": f"Edited {i}"})
+
+    timings = []
+    for _ in range(20):
+        began = time.perf_counter()
+        response = client.get("/sync", headers=headers, params={"since": since})
+        timings.append(time.perf_counter() - began)
+    data = response.json()
+    print(f"sync:        {len(data['tasks'])} rows, {len(response.content):,} bytes, "
+          f"{statistics.median(timings) * 1000:.1f} ms p50")
+
+    # The alternative: page through every task with the largest page the API allows
+    began = time.perf_counter()
+    rows = 0
+    size = 0
+    after = 0
+    while True:
+        response = client.get("/tasks/", headers=headers, params={"skip": after, "limit": 100})
+        page = response.json()
+        if not page:
+            break
+        rows += len(page)
+        size += len(response.content)
+        after += len(page)
+    print(f"full fetch:  {rows} rows, {size:,} bytes, {time.perf_counter() - began:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
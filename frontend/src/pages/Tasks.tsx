@@ -1,10 +1,10 @@
-import { useState } from 'react'
+import { useEffect, useState } from 'react'
 import { useQuery, useQueryClient } from '@tanstack/react-query'
 import api from '../api/axios'
 import { Link } from 'react-router-dom'
 
 import TaskForm from '../components/TaskForm'
-import { Project, Task } from '../types'
+import { Dashboard, Task } from '../types'
 
 async function fetchTasks(projectId?: number): Promise<Task[]> {
   const params = projectId ? { project_id: projectId } : {}
@@ -12,8 +12,8 @@ async function fetchTasks(projectId?: number): Promise<Task[]> {
   return resp.data
 }
 
-async function fetchProjects(): Promise<Project[]> {
-  const resp = await api.get<Project[]>('/projects/')
+async function fetchDashboard(): Promise<Dashboard> {
+  const resp = await api.get<Dashboard>('/dashboard')
   return resp.data
 }
 
@@ -23,19 +23,30 @@ export default function Tasks() {
   const [deleteError, setDeleteError] = useState<string | null>(null)
   const queryClient = useQueryClient()
 
-  const { data: projects, isLoading: projectsLoading } = useQuery<Project[]>({
-    queryKey: ['projects'],
-    queryFn: fetchProjects,
+  // The dashboard carries the user, projects and first page of tasks in one request
+  const { data: dashboard, isLoading: dashboardLoading, error: dashboardError } = useQuery<Dashboard>({
+    queryKey: ['dashboard'],
+    queryFn: fetchDashboard,
   })
 
-  const { data: tasks, isLoading: tasksLoading, error } = useQuery<Task[]>({
+  useEffect(() => {
+    if (dashboard) queryClient.setQueryData(['me'], dashboard.user)
+  }, [dashboard, queryClient])
+
+  const { data: projectTasks, isLoading: tasksLoading, error: tasksError } = useQuery<Task[]>({
     queryKey: ['tasks', selectedProjectId],
     queryFn: () => fetchTasks(selectedProjectId || undefined),
+    enabled: selectedProjectId !== null,
   })
 
+  const projects = dashboard?.projects
+  const tasks = selectedProjectId ? projectTasks : dashboard?.recent_tasks
+  const error = dashboardError || tasksError
+
   const handleCreateSuccess = () => {
     setShowCreateForm(false)
     queryClient.invalidateQueries({ queryKey: ['tasks'] })
+    queryClient.invalidateQueries({ queryKey: ['dashboard'] })
   }
 
   const handleDelete = async (taskId: number) => {
@@ -47,12 +58,13 @@ export default function Tasks() {
       setDeleteError(null)
       await api.delete(`/tasks/${taskId}`)
       queryClient.invalidateQueries({ queryKey: ['tasks'] })
+      queryClient.invalidateQueries({ queryKey: ['dashboard'] })
     } catch (err: any) {
       setDeleteError(err?.response?.data?.detail || err.message)
     }
   }
 
-  if (projectsLoading || tasksLoading) return <div>Loading...</div>
+  if (dashboardLoading || (selectedProjectId !== null && tasksLoading)) return <div>Loading...</div>
   if (error) return <div>Error loading tasks</div>
 
   return (
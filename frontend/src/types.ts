@@ -36,3 +36,15 @@ export interface Task {
   created_at: string
   updated_at: string
 }
+
+// Project with per-status task counts (for /dashboard)
+export interface ProjectSummary extends Project {
+  task_counts: Record<Task['status'], number>
+}
+
+// Combined page-load payload returned by /dashboard
+export interface Dashboard {
+  user: User
+  projects: ProjectSummary[]
+  recent_tasks: Task[]
+}